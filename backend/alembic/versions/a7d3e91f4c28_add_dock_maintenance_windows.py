@@ -0,0 +1,39 @@
+"""add dock maintenance windows
+
+Revision ID: a7d3e91f4c28
+Revises: e4c7a2d9b513
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e91f4c28'
+down_revision: Union[str, None] = 'e4c7a2d9b513'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dock_maintenance_windows',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('dock_id', sa.Integer(), nullable=False),
+        sa.Column('status', postgresql.ENUM('active', 'inactive', 'maintenance', name='dockstatus', create_type=False), nullable=False),
+        sa.Column('from_date', sa.Date(), nullable=False),
+        sa.Column('to_date', sa.Date(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['dock_id'], ['docks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_dock_maintenance_windows_dock_id'), 'dock_maintenance_windows', ['dock_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_dock_maintenance_windows_dock_id'), table_name='dock_maintenance_windows')
+    op.drop_table('dock_maintenance_windows')
@@ -0,0 +1,25 @@
+"""index booking_time_slots.time_slot_id
+
+Revision ID: b5e2f8c41d97
+Revises: a7d3e91f4c28
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2f8c41d97'
+down_revision: Union[str, None] = 'a7d3e91f4c28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_booking_time_slots_time_slot_id'), 'booking_time_slots', ['time_slot_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_booking_time_slots_time_slot_id'), table_name='booking_time_slots')
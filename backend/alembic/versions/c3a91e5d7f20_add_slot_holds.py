@@ -0,0 +1,53 @@
+"""add slot holds
+
+Revision ID: c3a91e5d7f20
+Revises: b674c34706ca
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91e5d7f20'
+down_revision: Union[str, None] = 'b674c34706ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'slot_holds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('booking_type', postgresql.ENUM('in', 'out', name='bookingdirection', create_type=False), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['object_id'], ['objects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_slot_holds_expires_at'), 'slot_holds', ['expires_at'], unique=False)
+    op.create_table(
+        'slot_hold_time_slots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hold_id', sa.Integer(), nullable=False),
+        sa.Column('time_slot_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['hold_id'], ['slot_holds.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['time_slot_id'], ['time_slots.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hold_id', 'time_slot_id', name='uq_slot_hold_time_slot'),
+    )
+    op.create_index(op.f('ix_slot_hold_time_slots_time_slot_id'), 'slot_hold_time_slots', ['time_slot_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_slot_hold_time_slots_time_slot_id'), table_name='slot_hold_time_slots')
+    op.drop_table('slot_hold_time_slots')
+    op.drop_index(op.f('ix_slot_holds_expires_at'), table_name='slot_holds')
+    op.drop_table('slot_holds')
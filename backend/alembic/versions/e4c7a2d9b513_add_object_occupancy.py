@@ -0,0 +1,52 @@
+"""add object occupancy counters
+
+Revision ID: e4c7a2d9b513
+Revises: d81b4f0c2a6e
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c7a2d9b513'
+down_revision: Union[str, None] = 'd81b4f0c2a6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'object_occupancy',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('capacity_class', postgresql.ENUM('in', 'out', name='bookingdirection', create_type=False), nullable=False),
+        sa.Column('slot_date', sa.Date(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('bookings', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['object_id'], ['objects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('object_id', 'capacity_class', 'slot_date', 'start_time', 'end_time', name='uq_object_occupancy_key'),
+    )
+    # Backfill from confirmed bookings: entrance and universal docks count for "in", exit and universal for "out".
+    op.execute("""
+        INSERT INTO object_occupancy (object_id, capacity_class, slot_date, start_time, end_time, bookings)
+        SELECT d.object_id, c.capacity_class::bookingdirection, ts.slot_date, ts.start_time, ts.end_time, COUNT(*)
+        FROM booking_time_slots bts
+        JOIN bookings b ON b.id = bts.booking_id
+        JOIN time_slots ts ON ts.id = bts.time_slot_id
+        JOIN docks d ON d.id = ts.dock_id
+        JOIN (VALUES ('in', 'entrance'), ('in', 'universal'), ('out', 'exit'), ('out', 'universal'))
+            AS c(capacity_class, dock_type) ON c.dock_type = d.dock_type::text
+        WHERE b.status = 'confirmed' AND d.object_id IS NOT NULL
+        GROUP BY d.object_id, c.capacity_class, ts.slot_date, ts.start_time, ts.end_time
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('object_occupancy')
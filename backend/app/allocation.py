@@ -0,0 +1,246 @@
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, joinedload
+
+from . import models, schemas
+from .availability import ALLOCATION_POLICIES, AvailabilityIndex, Chain, ChainFilters
+from .bulk_utils import PhaseTimer
+from .metrics import BOOKING_PHASE_SECONDS
+from .prr_utils import PrrDurationLookup
+from .quota_utils import QuotaLedger
+from .tracing import trace
+
+# Dock choice among the free chains at the requested start, see availability.ALLOCATION_POLICIES.
+DEFAULT_ALLOCATION_POLICY = os.getenv("ALLOCATION_POLICY", "first_fit")
+
+
+@dataclass
+class Allocation:
+    chain: Chain
+    direction: models.BookingDirection
+    booking_date: date
+    quota_applies: bool
+
+
+def move_request(
+    booking: models.Booking,
+    object_id: int,
+    booking_date: str,
+    start_time: str,
+    time_slot_id: Optional[int] = None,
+) -> schemas.BookingCreateUpdated:
+    """The create_booking request that would place an existing booking at a new start."""
+    return schemas.BookingCreateUpdated(
+        vehicle_type_id=booking.vehicle_type_id,
+        vehicle_plate=booking.vehicle_plate or "",
+        driver_full_name=booking.driver_full_name or "",
+        driver_phone=booking.driver_phone or "",
+        supplier_id=booking.supplier_id,
+        zone_id=booking.zone_id,
+        transport_type_id=booking.transport_type_id,
+        cubes=booking.cubes,
+        transport_sheet=booking.transport_sheet,
+        booking_date=booking_date,
+        start_time=start_time,
+        object_id=object_id,
+        booking_type=booking.booking_type.value,
+        time_slot_id=time_slot_id,
+    )
+
+
+class BookingAllocator:
+    """
+    The allocation rules of create_booking over request-scoped state.
+
+    Reference rows, PRR rules, slot availability and quota usage are loaded once
+    and shared by every booking allocated through the same instance; each
+    allocation is applied to the in-memory occupancy and quota counters, so
+    later bookings of the request see it. Nothing is written to the database.
+
+    `policy` picks the dock when no slot was chosen: first_fit keeps the search
+    order, best_fit the chain leaving the smallest gap on its dock.
+    """
+
+    def __init__(self, db: Session, policy: Optional[str] = None):
+        policy = policy or DEFAULT_ALLOCATION_POLICY
+        if policy not in ALLOCATION_POLICIES:
+            raise ValueError(f"Unknown allocation policy: {policy}")
+        self.db = db
+        self.policy = policy
+        self.availability = AvailabilityIndex(db)
+        self.quotas = QuotaLedger(db)
+        self._vehicle_types: dict[int, Optional[models.VehicleType]] = {}
+        self._objects: dict[int, Optional[models.Object]] = {}
+        self._suppliers: dict[int, Optional[models.Supplier]] = {}
+        self._durations: dict[int, PrrDurationLookup] = {}
+
+    def preload(self, bookings: List[schemas.BookingCreateUpdated]) -> None:
+        """Load the reference rows of all `bookings` with one query per table."""
+        vehicle_type_ids = {b.vehicle_type_id for b in bookings} - set(self._vehicle_types)
+        object_ids = {b.object_id for b in bookings} - set(self._objects)
+        supplier_ids = {b.supplier_id for b in bookings if b.supplier_id} - set(self._suppliers)
+        if vehicle_type_ids:
+            found = self.db.query(models.VehicleType).filter(models.VehicleType.id.in_(vehicle_type_ids)).all()
+            self._vehicle_types.update({vt_id: None for vt_id in vehicle_type_ids})
+            self._vehicle_types.update({vt.id: vt for vt in found})
+        if object_ids:
+            found = self.db.query(models.Object).filter(models.Object.id.in_(object_ids)).all()
+            self._objects.update({obj_id: None for obj_id in object_ids})
+            self._objects.update({obj.id: obj for obj in found})
+            durations = PrrDurationLookup.load(self.db, object_ids=object_ids)
+            self._durations.update({obj_id: durations for obj_id in object_ids})
+        if supplier_ids:
+            found = self.db.query(models.Supplier).options(
+                joinedload(models.Supplier.vehicle_types),
+                joinedload(models.Supplier.zone),
+            ).filter(models.Supplier.id.in_(supplier_ids)).all()
+            self._suppliers.update({supplier_id: None for supplier_id in supplier_ids})
+            self._suppliers.update({supplier.id: supplier for supplier in found})
+
+    def allocate(self, booking: schemas.BookingCreateUpdated, hold: Optional[models.SlotHold] = None) -> Allocation:
+        """
+        Pick the slots for `booking` or raise the HTTPException create_booking would.
+
+        An unexpired `hold` being consumed frees its slots for this booking first;
+        without an explicit time_slot_id its chain is tried before any other. If
+        the booking fails, the hold keeps its slots.
+        """
+        if hold is None:
+            return self._allocate(booking, booking.time_slot_id)
+        held = sorted((link.time_slot for link in hold.hold_slots), key=lambda s: (s.slot_date, s.start_time))
+        self.availability.ensure_loaded(hold.object_id, {s.slot_date for s in held})
+        self.availability.release(held)
+        try:
+            return self._allocate(booking, booking.time_slot_id or (held[0].id if held else None))
+        except HTTPException:
+            self.availability.occupy(held)
+            raise
+
+    def release_booking(self, booking: models.Booking, object_id: int, slots: List[models.TimeSlot]) -> None:
+        """Free the slots and quota volume of an existing confirmed booking in memory, so it can be moved."""
+        self._apply_booking(booking, object_id, slots, -1)
+
+    def restore_booking(self, booking: models.Booking, object_id: int, slots: List[models.TimeSlot]) -> None:
+        """Undo release_booking() for a booking that stays where it is."""
+        self._apply_booking(booking, object_id, slots, 1)
+
+    def _apply_booking(self, booking: models.Booking, object_id: int, slots: List[models.TimeSlot], sign: int) -> None:
+        days = {s.slot_date for s in slots}
+        self.availability.docks(object_id)
+        self.availability.ensure_loaded(object_id, days)
+        if sign > 0:
+            self.availability.occupy(slots)
+        else:
+            self.availability.release(slots)
+        # The booking's volume counts once on every date it touches.
+        if booking.cubes and booking.transport_type_id:
+            for day in days:
+                self.quotas.consume(object_id, booking.transport_type_id, day, booking.booking_type, sign * booking.cubes)
+
+    def _allocate(self, booking: schemas.BookingCreateUpdated, time_slot_id: Optional[int]) -> Allocation:
+        phases = PhaseTimer(BOOKING_PHASE_SECONDS)
+        self.preload([booking])
+
+        # Р’Р°Р»РёРґР°С†РёСЏ С‚РёРїР° С‚СЂР°РЅСЃРїРѕСЂС‚Р°
+        vehicle_type = self._vehicle_types[booking.vehicle_type_id]
+        if not vehicle_type:
+            raise HTTPException(status_code=404, detail="Vehicle type not found")
+
+        if not self._objects[booking.object_id]:
+            raise HTTPException(status_code=404, detail="Object not found")
+
+        supplier_zone_id: int | None = None
+        if booking.supplier_id:
+            supplier = self._suppliers[booking.supplier_id]
+            if not supplier:
+                raise HTTPException(status_code=404, detail="Supplier not found")
+            supplier_zone_id = supplier.zone_id
+
+            if booking.zone_id is not None and booking.zone_id != supplier_zone_id:
+                raise HTTPException(status_code=400, detail="Booking zone must match supplier zone")
+
+            if supplier.vehicle_types:
+                allowed_ids = {vt.id for vt in supplier.vehicle_types}
+                if booking.vehicle_type_id not in allowed_ids:
+                    raise HTTPException(status_code=400, detail="Selected vehicle type is not allowed for this supplier")
+        phases.mark("validation")
+
+        duration = self._durations[booking.object_id].resolve_minutes(
+            booking.object_id, booking.supplier_id, booking.transport_type_id, booking.vehicle_type_id
+        )
+        if duration is None:
+            duration = vehicle_type.duration_minutes
+
+        if duration <= 0:
+            raise HTTPException(status_code=400, detail="Invalid duration")
+
+        required_slots = duration // 30 + (1 if duration % 30 != 0 else 0)
+
+        booking_date = datetime.strptime(booking.booking_date, "%Y-%m-%d").date()
+        start_time = datetime.strptime(booking.start_time, "%H:%M").time()
+        trace(
+            "allocation.request",
+            object_id=booking.object_id,
+            booking_date=booking_date,
+            start_time=start_time,
+            duration=duration,
+            required_slots=required_slots,
+        )
+
+        try:
+            booking_direction = models.BookingDirection(booking.booking_type or "in")
+        except Exception:
+            raise HTTPException(status_code=400, detail="booking_type must be 'in' or 'out'")
+
+        filters = ChainFilters(
+            direction=booking_direction,
+            supplier_zone_id=supplier_zone_id,
+            transport_type_id=booking.transport_type_id,
+        )
+        phases.mark("duration")
+
+        # The slot the user picked first; its dock gets exactly the required number of back-to-back slots.
+        chosen = None
+        if time_slot_id:
+            chosen = self.availability.chain_from_slot(time_slot_id, booking.object_id, booking_date, start_time, required_slots, filters)
+            trace("allocation.chosen_slot", time_slot_id=time_slot_id, slot_ids=lambda: chosen.slot_ids if chosen else None)
+
+        # Otherwise a dock with a free chain starting at the requested time, picked by the policy.
+        if chosen is None:
+            chosen = self.availability.choose_chain(booking.object_id, booking_date, start_time, duration, filters, self.policy)
+            trace(
+                "allocation.search",
+                policy=self.policy,
+                dock_ids=lambda: [d.id for d in self.availability.candidate_docks(booking.object_id, filters)],
+                slot_ids=lambda: chosen.slot_ids if chosen else None,
+            )
+
+        if chosen is None:
+            trace("allocation.no_free_slots")
+            raise HTTPException(
+                status_code=409,
+                detail="РќР° Р·Р°РїСЂРѕС€РµРЅРЅС‹Р№ РїРµСЂРёРѕРґ РЅРµ РЅР°Р№РґРµРЅРѕ РґРѕСЃС‚СѓРїРЅС‹С… РІСЂРµРјРµРЅРЅС‹С… СЃР»РѕС‚РѕРІ"
+            )
+        phases.mark("allocation")
+
+        quota, total_quota_volume = self.quotas.quota(booking.object_id, booking.transport_type_id, booking_date, booking_direction)
+        quota_applies = bool(quota) and total_quota_volume is not None
+        if quota_applies:
+            if booking.cubes is None:
+                raise HTTPException(status_code=400, detail="Volume (cubes) is required because a quota applies on this date")
+            remaining_volume = self.quotas.remaining(booking.object_id, booking.transport_type_id, booking_date, booking_direction)
+            if not quota.allow_overbooking and booking.cubes > remaining_volume:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Quota exceeded for {booking_date}. Remaining: {remaining_volume}, requested: {booking.cubes}",
+                )
+
+        self.availability.occupy(chosen.slots)
+        if quota_applies:
+            self.quotas.consume(booking.object_id, booking.transport_type_id, booking_date, booking_direction, booking.cubes)
+        phases.mark("quota")
+        return Allocation(chain=chosen, direction=booking_direction, booking_date=booking_date, quota_applies=quota_applies)
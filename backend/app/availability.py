@@ -0,0 +1,538 @@
+from bisect import insort
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+
+def capacity_class(dock_type: models.DockType, direction: models.BookingDirection) -> models.BookingDirection:
+    """Object capacity limit a booking on this dock counts against (universal docks follow the booking)."""
+    if dock_type == models.DockType.entrance:
+        return models.BookingDirection.inbound
+    if dock_type == models.DockType.exit:
+        return models.BookingDirection.outbound
+    return direction
+
+
+# Dock types whose confirmed bookings make up the object occupancy of each capacity class.
+CAPACITY_CLASS_DOCK_TYPES = {
+    models.BookingDirection.inbound: (models.DockType.entrance, models.DockType.universal),
+    models.BookingDirection.outbound: (models.DockType.exit, models.DockType.universal),
+}
+
+
+def slot_minutes(slot: models.TimeSlot) -> int:
+    return int((datetime.combine(slot.slot_date, slot.end_time) - datetime.combine(slot.slot_date, slot.start_time)).total_seconds() // 60)
+
+
+def back_to_back(current: models.TimeSlot, following: models.TimeSlot) -> bool:
+    return datetime.combine(current.slot_date, current.end_time) == datetime.combine(following.slot_date, following.start_time)
+
+
+def dock_matches_zone(dock: models.Dock, supplier_zone_id: int | None) -> bool:
+    if supplier_zone_id is None or not dock.available_zones:
+        return True
+    return any(zone.id == supplier_zone_id for zone in dock.available_zones)
+
+
+def dock_is_active(dock: models.Dock) -> bool:
+    """Docks in maintenance or switched off take no new bookings."""
+    return models.DockStatus(dock.status) == models.DockStatus.active
+
+
+def dock_closed_on(dock: models.Dock, day: date) -> bool:
+    """A maintenance window of `dock` covers `day`."""
+    return any(w.from_date <= day <= w.to_date for w in dock.maintenance_windows)
+
+
+def dock_preference(dock: models.Dock, direction: models.BookingDirection) -> int:
+    """Search order: dedicated docks of the booking direction first, then universal ones."""
+    dedicated = models.DockType.entrance if direction == models.BookingDirection.inbound else models.DockType.exit
+    if dock.dock_type == dedicated:
+        return 0
+    if dock.dock_type == models.DockType.universal:
+        return 1
+    return 2
+
+
+@dataclass(frozen=True)
+class ChainFilters:
+    direction: models.BookingDirection
+    supplier_zone_id: Optional[int] = None
+    transport_type_id: Optional[int] = None
+
+
+@dataclass
+class Fragmentation:
+    """Free slot minutes of a day split into runs of back-to-back slots."""
+
+    free_minutes: int = 0
+    # Free minutes in runs too short for a typical booking.
+    stranded_minutes: int = 0
+    largest_run_minutes: int = 0
+
+    def add_run(self, minutes: int, min_minutes: int) -> None:
+        if not minutes:
+            return
+        self.free_minutes += minutes
+        if minutes < min_minutes:
+            self.stranded_minutes += minutes
+        self.largest_run_minutes = max(self.largest_run_minutes, minutes)
+
+    @property
+    def ratio(self) -> float:
+        return self.stranded_minutes / self.free_minutes if self.free_minutes else 0.0
+
+
+@dataclass
+class Chain:
+    dock: models.Dock
+    slots: list[models.TimeSlot]
+
+    @property
+    def start(self) -> datetime:
+        first = self.slots[0]
+        return datetime.combine(first.slot_date, first.start_time)
+
+    @property
+    def slot_ids(self) -> list[int]:
+        return [s.id for s in self.slots]
+
+
+class DockDay:
+    """Available slots of one dock on one date, ordered by start time."""
+
+    __slots__ = ("slots", "positions")
+
+    def __init__(self, slots: list[models.TimeSlot]):
+        self.slots = slots
+        self.positions = {s.id: i for i, s in enumerate(slots)}
+
+
+class AvailabilityIndex:
+    """
+    Slot availability of objects as bitmaps per (dock, date).
+
+    Days are loaded on first use with set-based queries (docks, available slots,
+    booking and unexpired hold counts per slot); ensure_loaded() fetches a whole
+    date window at once. Bit i of a dock-day mask is set when slot i
+    still has free capacity and the object capacity limit of the booking's
+    class is not reached at that slot time. Writes made through the index
+    (occupy/release) update the counters in place, so one index can serve a
+    whole import or batch.
+
+    It is request-scoped on purpose rather than kept current by the booking
+    writes: the workers are separate processes writing to the same tables, so
+    an index updated in place by one worker would go stale for the others, and
+    the writes are rechecked under locks anyway (app.occupancy). Building it
+    is cheap: one object-day of the medium seed (221,760 slots, 50,000
+    bookings) loads in ~14 ms p50, of ~63 ms for a whole POST /api/bookings/.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.now = datetime.utcnow()
+        self._objects: dict[int, Optional[models.Object]] = {}
+        self._docks: dict[int, list[models.Dock]] = {}
+        self._dock_by_id: dict[int, models.Dock] = {}
+        self._days: dict[tuple[int, date], DockDay] = {}
+        self._loaded: set[tuple[int, date]] = set()
+        self._slot_by_id: dict[int, models.TimeSlot] = {}
+        # All booking links per slot (slot capacity) and confirmed bookings per
+        # (object, capacity class, date, start, end) (object capacity).
+        self._slot_occupancy: dict[int, int] = defaultdict(int)
+        self._class_occupancy: dict[tuple, int] = defaultdict(int)
+        self._masks: dict[tuple[int, date, models.BookingDirection], int] = {}
+
+    # Loading
+
+    def docks(self, object_id: int) -> list[models.Dock]:
+        if object_id not in self._docks:
+            docks = self.db.query(models.Dock).options(
+                joinedload(models.Dock.available_zones),
+                joinedload(models.Dock.available_transport_types),
+                joinedload(models.Dock.maintenance_windows),
+            ).filter(models.Dock.object_id == object_id).order_by(models.Dock.id).all()
+            self._docks[object_id] = docks
+            for dock in docks:
+                self._dock_by_id[dock.id] = dock
+        return self._docks[object_id]
+
+    def _object(self, object_id: int) -> Optional[models.Object]:
+        if object_id not in self._objects:
+            self._objects[object_id] = self.db.get(models.Object, object_id)
+        return self._objects[object_id]
+
+    def ensure_loaded(self, object_id: int, days: Iterable[date]) -> None:
+        missing = sorted({day for day in days if (object_id, day) not in self._loaded})
+        if missing:
+            self._load_days(object_id, missing)
+
+    def _load_days(self, object_id: int, days: list[date]) -> None:
+        self._loaded.update((object_id, day) for day in days)
+        dock_types = {d.id: d.dock_type for d in self.docks(object_id)}
+        if not dock_types:
+            return
+
+        slots = self.db.query(models.TimeSlot).filter(
+            models.TimeSlot.dock_id.in_(list(dock_types)),
+            models.TimeSlot.slot_date.in_(days),
+            models.TimeSlot.is_available == True,
+        ).order_by(models.TimeSlot.start_time, models.TimeSlot.id).all()
+        # A dock offers nothing on the days of its maintenance windows.
+        slots = [s for s in slots if not dock_closed_on(self._dock_by_id[s.dock_id], s.slot_date)]
+        by_dock_day: dict[tuple[int, date], list[models.TimeSlot]] = defaultdict(list)
+        for s in slots:
+            by_dock_day[(s.dock_id, s.slot_date)].append(s)
+            self._slot_by_id[s.id] = s
+        for dock_id in dock_types:
+            for day in days:
+                self._days[(dock_id, day)] = DockDay(by_dock_day.get((dock_id, day), []))
+
+        counts = self.db.query(
+            models.BookingTimeSlot.time_slot_id,
+            func.count(models.BookingTimeSlot.id),
+        ).join(
+            models.TimeSlot, models.BookingTimeSlot.time_slot_id == models.TimeSlot.id
+        ).filter(
+            models.TimeSlot.dock_id.in_(list(dock_types)),
+            models.TimeSlot.slot_date.in_(days),
+        ).group_by(models.BookingTimeSlot.time_slot_id).all()
+        for slot_id, linked in counts:
+            self._slot_occupancy[slot_id] += linked
+
+        # Object occupancy comes from the maintained counters, which also count
+        # bookings on slots switched off after booking.
+        counters = self.db.query(models.ObjectOccupancy).filter(
+            models.ObjectOccupancy.object_id == object_id,
+            models.ObjectOccupancy.slot_date.in_(days),
+        ).all()
+        for row in counters:
+            self._class_occupancy[(object_id, row.capacity_class, row.slot_date, row.start_time, row.end_time)] += row.bookings
+
+        # Unexpired holds take slot and object capacity like confirmed bookings.
+        holds = self.db.query(
+            models.TimeSlot.id,
+            models.TimeSlot.dock_id,
+            models.TimeSlot.slot_date,
+            models.TimeSlot.start_time,
+            models.TimeSlot.end_time,
+            func.count(models.SlotHoldTimeSlot.id),
+        ).join(
+            models.SlotHoldTimeSlot, models.SlotHoldTimeSlot.time_slot_id == models.TimeSlot.id
+        ).join(
+            models.SlotHold, models.SlotHoldTimeSlot.hold_id == models.SlotHold.id
+        ).filter(
+            models.TimeSlot.dock_id.in_(list(dock_types)),
+            models.TimeSlot.slot_date.in_(days),
+            models.SlotHold.expires_at > self.now,
+        ).group_by(
+            models.TimeSlot.id, models.TimeSlot.dock_id, models.TimeSlot.slot_date, models.TimeSlot.start_time, models.TimeSlot.end_time
+        ).all()
+        for slot_id, dock_id, day, start, end, held in holds:
+            self._slot_occupancy[slot_id] += held
+            for direction, types in CAPACITY_CLASS_DOCK_TYPES.items():
+                if dock_types[dock_id] in types:
+                    self._class_occupancy[(object_id, direction, day, start, end)] += held
+
+    # Bitmaps
+
+    def slot_occupancy(self, slot_id: int) -> int:
+        return self._slot_occupancy[slot_id]
+
+    def object_occupancy(self, object_id: int, direction: models.BookingDirection, day: date, start: time, end: time) -> int:
+        return self._class_occupancy[(object_id, direction, day, start, end)]
+
+    def _capacity_limit(self, object_id: int, direction: models.BookingDirection) -> Optional[int]:
+        obj = self._object(object_id)
+        if obj is None:
+            return None
+        limit = obj.capacity_in if direction == models.BookingDirection.inbound else obj.capacity_out
+        return limit if limit and limit > 0 else None
+
+    def free_mask(self, dock: models.Dock, day: date, direction: models.BookingDirection) -> int:
+        """Bitmap of the dock-day slots a booking of `direction` could still take."""
+        cls = capacity_class(dock.dock_type, direction)
+        key = (dock.id, day, cls)
+        mask = self._masks.get(key)
+        if mask is None:
+            self.ensure_loaded(dock.object_id, [day])
+            limit = self._capacity_limit(dock.object_id, cls)
+            mask = 0
+            for i, s in enumerate(self._days[(dock.id, day)].slots):
+                if self._slot_occupancy[s.id] >= s.capacity:
+                    continue
+                if limit is not None and self._class_occupancy[(dock.object_id, cls, day, s.start_time, s.end_time)] >= limit:
+                    continue
+                mask |= 1 << i
+            self._masks[key] = mask
+        return mask
+
+    def _line(self, dock: models.Dock, day: date, direction: models.BookingDirection) -> tuple[list[models.TimeSlot], int]:
+        """Slots of the dock on `day` and the next day (a booking may run past midnight) with their mask."""
+        next_day = day + timedelta(days=1)
+        self.ensure_loaded(dock.object_id, [day, next_day])
+        first = self._days[(dock.id, day)].slots
+        second = self._days[(dock.id, next_day)].slots
+        mask = self.free_mask(dock, day, direction) | (self.free_mask(dock, next_day, direction) << len(first))
+        return first + second, mask
+
+    @staticmethod
+    def _chain_length(slots: list[models.TimeSlot], start: int, duration: int) -> Optional[int]:
+        accumulated = 0
+        for offset, s in enumerate(slots[start:], start=1):
+            accumulated += slot_minutes(s)
+            if accumulated >= duration:
+                return offset
+        return None
+
+    @staticmethod
+    def _all_free(mask: int, start: int, length: int) -> bool:
+        run = (1 << length) - 1
+        return (mask >> start) & run == run
+
+    # Queries
+
+    def candidate_docks(self, object_id: int, filters: ChainFilters) -> list[models.Dock]:
+        """Docks a booking may use, in search order."""
+        result = []
+        for dock in self.docks(object_id):
+            if not dock_is_active(dock):
+                continue
+            if filters.direction == models.BookingDirection.inbound and dock.dock_type == models.DockType.exit:
+                continue
+            if filters.direction == models.BookingDirection.outbound and dock.dock_type == models.DockType.entrance:
+                continue
+            if not dock_matches_zone(dock, filters.supplier_zone_id):
+                continue
+            if filters.transport_type_id and dock.available_transport_types:
+                if filters.transport_type_id not in {t.id for t in dock.available_transport_types}:
+                    continue
+            result.append(dock)
+        result.sort(key=lambda d: (dock_preference(d, filters.direction), d.id))
+        return result
+
+    def _chain_at(self, dock: models.Dock, day: date, position: int, duration: int, filters: ChainFilters) -> Optional[Chain]:
+        slots, mask = self._line(dock, day, filters.direction)
+        if not (mask >> position) & 1:
+            return None
+        length = self._chain_length(slots, position, duration)
+        if length is None or not self._all_free(mask, position, length):
+            return None
+        return Chain(dock=dock, slots=slots[position:position + length])
+
+    def find_chains(
+        self,
+        object_id: int,
+        day: date,
+        start: time,
+        duration: int,
+        filters: ChainFilters,
+        limit: Optional[int] = None,
+    ) -> list[Chain]:
+        """
+        Chains starting exactly at `start` on `day`, one per dock in search order.
+
+        A chain walks the dock's following slots (gaps in the schedule allowed)
+        until their minutes cover `duration`; every slot must be free.
+        """
+        chains: list[Chain] = []
+        for dock in self.candidate_docks(object_id, filters):
+            self.ensure_loaded(object_id, [day])
+            position = next((i for i, s in enumerate(self._days[(dock.id, day)].slots) if s.start_time == start), None)
+            if position is None:
+                continue
+            chain = self._chain_at(dock, day, position, duration, filters)
+            if chain is not None:
+                chains.append(chain)
+                if limit is not None and len(chains) >= limit:
+                    break
+        return chains
+
+    def earliest_chains(
+        self,
+        object_id: int,
+        day: date,
+        not_before: time,
+        duration: int,
+        filters: ChainFilters,
+        limit: int,
+        not_after: Optional[time] = None,
+    ) -> list[Chain]:
+        """
+        Up to `limit` chains starting on `day` at or after `not_before` (and
+        not after `not_after` when given), earliest first; at equal start times
+        the preferred dock comes first.
+
+        Each dock's slots are scanned in time order and the scan stops as soon as
+        a start can no longer make it into the result.
+        """
+        best: list[tuple[time, int, Chain]] = []
+        self.ensure_loaded(object_id, [day])
+        for rank, dock in enumerate(self.candidate_docks(object_id, filters)):
+            for position, s in enumerate(self._days[(dock.id, day)].slots):
+                if s.start_time < not_before:
+                    continue
+                if not_after is not None and s.start_time > not_after:
+                    break
+                if len(best) >= limit and s.start_time >= best[-1][0]:
+                    break
+                chain = self._chain_at(dock, day, position, duration, filters)
+                if chain is not None:
+                    insort(best, (s.start_time, rank, chain), key=lambda item: item[:2])
+                    del best[limit:]
+        return [chain for _, _, chain in best]
+
+    def earliest_fit(
+        self,
+        object_id: int,
+        day: date,
+        not_before: time,
+        duration: int,
+        filters: ChainFilters,
+        not_after: Optional[time] = None,
+    ) -> Optional[Chain]:
+        """The earliest chain starting on `day` at or after `not_before`; ties go to the preferred dock."""
+        chains = self.earliest_chains(object_id, day, not_before, duration, filters, limit=1, not_after=not_after)
+        return chains[0] if chains else None
+
+    def chain_from_slot(
+        self,
+        slot_id: int,
+        object_id: int,
+        day: date,
+        start: time,
+        slot_count: int,
+        filters: ChainFilters,
+    ) -> Optional[Chain]:
+        """
+        `slot_count` back-to-back slots of one dock beginning with a slot the user
+        picked. Only dock status, zone and capacity rules apply here; dock type
+        and transport type were already narrowed down by the slot list the user
+        picked from.
+        """
+        self.ensure_loaded(object_id, [day])
+        slot = self._slot_by_id.get(slot_id)
+        if slot is None or slot.slot_date != day or slot.start_time != start:
+            return None
+        dock = self._dock_by_id[slot.dock_id]
+        slots, mask = self._line(dock, day, filters.direction)
+        position = self._days[(dock.id, day)].positions[slot.id]
+        if position + slot_count > len(slots):
+            return None
+        chain = slots[position:position + slot_count]
+        for current, following in zip(chain, chain[1:]):
+            if not back_to_back(current, following):
+                return None
+        if not dock_is_active(dock) or not dock_matches_zone(dock, filters.supplier_zone_id):
+            return None
+        if not self._all_free(mask, position, slot_count):
+            return None
+        return Chain(dock=dock, slots=chain)
+
+    def choose_chain(
+        self,
+        object_id: int,
+        day: date,
+        start: time,
+        duration: int,
+        filters: ChainFilters,
+        policy: str = "first_fit",
+    ) -> Optional[Chain]:
+        """One of the chains starting exactly at `start`, picked by an ALLOCATION_POLICIES entry."""
+        choose = ALLOCATION_POLICIES[policy]
+        chains = self.find_chains(object_id, day, start, duration, filters, limit=1 if choose is first_fit else None)
+        return choose(self, chains, filters.direction)
+
+    # Fragmentation
+
+    def leftover_gap(self, chain: Chain, direction: models.BookingDirection) -> int:
+        """Free minutes left right before and after `chain` on its dock (back-to-back slots only)."""
+        day = chain.slots[0].slot_date
+        slots, mask = self._line(chain.dock, day, direction)
+        first = self._days[(chain.dock.id, day)].positions[chain.slots[0].id]
+        last = first + len(chain.slots) - 1
+        minutes = 0
+        i = first
+        while i > 0 and (mask >> (i - 1)) & 1 and back_to_back(slots[i - 1], slots[i]):
+            i -= 1
+            minutes += slot_minutes(slots[i])
+        i = last
+        while i + 1 < len(slots) and (mask >> (i + 1)) & 1 and back_to_back(slots[i], slots[i + 1]):
+            i += 1
+            minutes += slot_minutes(slots[i])
+        return minutes
+
+    def fragmentation(self, object_id: int, day: date, direction: models.BookingDirection, min_minutes: int) -> Fragmentation:
+        """Free capacity of the object's docks on `day` for `direction`; runs shorter than `min_minutes` are stranded."""
+        result = Fragmentation()
+        self.ensure_loaded(object_id, [day])
+        for dock in self.candidate_docks(object_id, ChainFilters(direction=direction)):
+            slots = self._days[(dock.id, day)].slots
+            mask = self.free_mask(dock, day, direction)
+            run = 0
+            for i, s in enumerate(slots):
+                if not (mask >> i) & 1:
+                    result.add_run(run, min_minutes)
+                    run = 0
+                    continue
+                if run and not back_to_back(slots[i - 1], s):
+                    result.add_run(run, min_minutes)
+                    run = 0
+                run += slot_minutes(s)
+            result.add_run(run, min_minutes)
+        return result
+
+    # Writes
+
+    def _apply(self, slots: Iterable[models.TimeSlot], delta: int) -> None:
+        for s in slots:
+            dock = self._dock_by_id[s.dock_id]
+            self._slot_occupancy[s.id] += delta
+            for cls, types in CAPACITY_CLASS_DOCK_TYPES.items():
+                if dock.dock_type in types:
+                    self._class_occupancy[(dock.object_id, cls, s.slot_date, s.start_time, s.end_time)] += delta
+            # Object occupancy is shared by every dock of the object on that date.
+            for other in self._docks.get(dock.object_id, []):
+                for cls in CAPACITY_CLASS_DOCK_TYPES:
+                    self._masks.pop((other.id, s.slot_date, cls), None)
+
+    def occupy(self, slots: Iterable[models.TimeSlot]) -> None:
+        """Record a confirmed booking on `slots` made in this request."""
+        self._apply(slots, 1)
+
+    def release(self, slots: Iterable[models.TimeSlot]) -> None:
+        """Undo occupy() for a confirmed booking or hold cancelled, moved or consumed in this request."""
+        self._apply(slots, -1)
+
+
+# Allocation policies: pick one of the chains find_chains() returned for a start time.
+
+def first_fit(index: AvailabilityIndex, chains: list[Chain], direction: models.BookingDirection) -> Optional[Chain]:
+    """The first dock in search order (dedicated docks first), as create_booking always did."""
+    return chains[0] if chains else None
+
+
+def best_fit(index: AvailabilityIndex, chains: list[Chain], direction: models.BookingDirection) -> Optional[Chain]:
+    """The chain leaving the smallest free gap around it on its dock; ties keep search order."""
+    return min(chains, key=lambda chain: index.leftover_gap(chain, direction), default=None)
+
+
+ALLOCATION_POLICIES = {
+    "first_fit": first_fit,
+    "best_fit": best_fit,
+}
+
+# Batch callers (import, simulation) also accept "optimized": a day's bookings
+# are placed in start order, shortest first at equal starts, with best_fit.
+BATCH_POLICIES = (*ALLOCATION_POLICIES, "optimized")
+
+
+def batch_policy(policy: str) -> str:
+    """The per-booking policy a batch policy places with."""
+    return "best_fit" if policy == "optimized" else policy
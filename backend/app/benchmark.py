@@ -0,0 +1,409 @@
+"""
+Benchmark suite for the booking, slot, listing, analytics and import endpoints.
+
+Runs each scenario through the full application (middlewares, auth and all)
+against a database filled by app.seed_data, and reports per scenario:
+
+    p50/p95/mean latency, SQL queries and DB time per call (the
+    X-DB-Query-Count / X-DB-Time-Ms headers of app.query_stats), and the peak
+    Python memory of one extra call run under tracemalloc.
+
+DB time covers statement execution only; SQLite computes much of a result
+while it is fetched, so there latency is the number to watch.
+
+Results can be saved as a baseline and later runs compared against it: a
+scenario regresses when its p50 latency or peak memory grows by more than
+--tolerance, or when it runs more queries than the baseline.
+
+Run:
+    python -m app.seed_data --database-url sqlite:///yms-bench.db --scale medium
+    python -m app.benchmark --database-url sqlite:///yms-bench.db --save-baseline bench-baseline.json
+    python -m app.benchmark --database-url sqlite:///yms-bench.db --baseline bench-baseline.json
+
+The exit status is 1 when a compared run has regressions. Bookings made by
+create_booking are cancelled and deleted again after each call.
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time as timer
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Callable, Optional
+
+from openpyxl import Workbook
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models
+from .security import create_access_token
+from .seed_data import SEED_ADMIN_EMAIL, WORK_END, WORK_START
+
+DEFAULT_REPEAT = 20
+DEFAULT_TOLERANCE = 0.25
+# Differences below these are noise, whatever the tolerance says.
+LATENCY_NOISE_MS = 2.0
+MEMORY_NOISE_KB = 256.0
+
+IMPORT_ROWS = 200
+
+
+@dataclass
+class BenchmarkContext:
+    """Ids and names of seeded rows the scenarios work with, drawn from the database."""
+
+    headers: dict
+    object_id: int
+    object_name: str
+    supplier_id: int
+    supplier_name: str
+    zone_id: int
+    transport_type_id: int
+    transport_type_name: str
+    vehicle_type_id: int
+    vehicle_type_name: str
+    from_date: date
+    to_date: date
+    # Days with slots among the last seven.
+    last_week: list[date]
+
+    @classmethod
+    def load(cls, db: Session) -> "BenchmarkContext":
+        admin = db.query(models.User).filter(models.User.email == SEED_ADMIN_EMAIL).first()
+        obj = db.query(models.Object).order_by(models.Object.id).first()
+        if admin is None or obj is None:
+            raise ValueError("No seeded data found; fill the database with python -m app.seed_data first")
+        # The busiest supplier, so listing and analytics filters hit real rows.
+        supplier_id = db.query(models.Booking.supplier_id).group_by(models.Booking.supplier_id).order_by(
+            func.count(models.Booking.id).desc()
+        ).limit(1).scalar()
+        supplier = db.get(models.Supplier, supplier_id)
+        # Create and import rows use what the supplier is allowed to bring, the shortest vehicle first.
+        transport_type = min(supplier.transport_types, key=lambda t: t.id)
+        vehicle_type = min(supplier.vehicle_types, key=lambda v: (v.duration_minutes, v.id))
+        first_day, last_day = db.query(func.min(models.TimeSlot.slot_date), func.max(models.TimeSlot.slot_date)).one()
+        last_week = [
+            day for day, in db.query(models.TimeSlot.slot_date).filter(
+                models.TimeSlot.slot_date > last_day - timedelta(days=7)
+            ).distinct().order_by(models.TimeSlot.slot_date)
+        ]
+        return cls(
+            headers={"Authorization": f"Bearer {create_access_token(admin.email)}"},
+            object_id=obj.id,
+            object_name=obj.name,
+            supplier_id=supplier.id,
+            supplier_name=supplier.name,
+            zone_id=supplier.zone_id,
+            transport_type_id=transport_type.id,
+            transport_type_name=transport_type.name,
+            vehicle_type_id=vehicle_type.id,
+            vehicle_type_name=vehicle_type.name,
+            from_date=first_day,
+            to_date=last_day,
+            last_week=last_week,
+        )
+
+    def month(self) -> tuple[date, date]:
+        """The last 30 days with slots."""
+        return max(self.from_date, self.to_date - timedelta(days=29)), self.to_date
+
+    def random_start(self, rng: random.Random) -> str:
+        hour = rng.randint(WORK_START.hour, WORK_END.hour - 3)
+        return f"{hour:02d}:{rng.choice((0, 30)):02d}"
+
+
+@dataclass
+class Scenario:
+    name: str
+    call: Callable  # (client, ctx, rng) -> response
+    cleanup: Optional[Callable] = None  # (client, ctx, response), not timed
+
+
+def _create_booking(client, ctx: BenchmarkContext, rng: random.Random):
+    return client.post("/api/bookings/", headers=ctx.headers, json={
+        "vehicle_type_id": ctx.vehicle_type_id,
+        "booking_date": rng.choice(ctx.last_week).isoformat(),
+        "start_time": ctx.random_start(rng),
+        "object_id": ctx.object_id,
+        "supplier_id": ctx.supplier_id,
+        "zone_id": ctx.zone_id,
+        "transport_type_id": ctx.transport_type_id,
+        "cubes": 40.0,
+        "transport_sheet": "BENCH",
+        "vehicle_plate": "А000АА77",
+        "driver_full_name": "Benchmark Driver",
+        "driver_phone": "+7 900 000-00-00",
+    })
+
+
+def _delete_booking(client, ctx: BenchmarkContext, response) -> None:
+    if response.status_code == 200:
+        booking_id = response.json()["id"]
+        client.put(f"/api/bookings/{booking_id}/cancel", headers=ctx.headers)
+        client.delete(f"/api/bookings/{booking_id}", headers=ctx.headers)
+
+
+def _list_time_slots(response_format: str) -> Callable:
+    def call(client, ctx: BenchmarkContext, rng: random.Random):
+        day = ctx.to_date - timedelta(days=rng.randint(6, 13))
+        return client.get("/api/time-slots/", headers=ctx.headers, params={
+            "from_date": day, "to_date": day + timedelta(days=6), "object_id": ctx.object_id, "format": response_format,
+        })
+    return call
+
+
+def _bookings_page(page: int) -> Callable:
+    def call(client, ctx: BenchmarkContext, rng: random.Random):
+        date_from, date_to = ctx.month()
+        return client.get("/api/bookings/all", headers=ctx.headers, params={
+            "page": page, "page_size": 50, "date_from": date_from, "date_to": date_to,
+        })
+    return call
+
+
+def _analytics(path: str) -> Callable:
+    def call(client, ctx: BenchmarkContext, rng: random.Random):
+        start_date, end_date = ctx.month()
+        return client.get(f"/api/analytics/{path}", headers=ctx.headers, params={
+            "start_date": start_date, "end_date": end_date,
+        })
+    return call
+
+
+def _import_workbook(ctx: BenchmarkContext, rng: random.Random) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["transport_sheet", "supplier_name", "cubes", "booking_date", "start_time", "transport_type", "vehicle_type", "object_name", "driver_full_name", "driver_phone"])
+    date_from, date_to = ctx.month()
+    for number in range(1, IMPORT_ROWS + 1):
+        day = date_from + timedelta(days=rng.randint(0, (date_to - date_from).days))
+        ws.append([
+            f"BENCH-{number:04d}", ctx.supplier_name, 30, day.isoformat(), ctx.random_start(rng),
+            ctx.transport_type_name, ctx.vehicle_type_name, ctx.object_name, "Benchmark Driver", "+7 900 000-00-00",
+        ])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _import_dry_run(client, ctx: BenchmarkContext, rng: random.Random):
+    return client.post(
+        "/api/bookings/import",
+        headers=ctx.headers,
+        params={"direction": "in", "dry_run": True},
+        files={"file": ("bench.xlsx", _import_workbook(ctx, rng), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("create_booking", _create_booking, _delete_booking),
+        Scenario("list_time_slots", _list_time_slots("rows")),
+        Scenario("list_time_slots_columnar", _list_time_slots("columnar")),
+        Scenario("bookings_page_first", _bookings_page(1)),
+        Scenario("bookings_page_deep", _bookings_page(40)),
+        Scenario("analytics_by_day", _analytics("bookings-by-day")),
+        Scenario("analytics_by_zone", _analytics("bookings-by-zone")),
+        Scenario("analytics_by_supplier", _analytics("bookings-by-supplier")),
+        Scenario("analytics_by_hour", _analytics("bookings-by-hour")),
+        Scenario("analytics_shift_dynamics", _analytics("shift-dynamics")),
+        Scenario("import_dry_run", _import_dry_run),
+    )
+}
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    runs: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    queries: int
+    db_ms: float
+    peak_memory_kb: float
+
+
+@dataclass
+class Regression:
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        return f"{self.scenario}: {self.metric} {self.baseline} -> {self.current}"
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def run_scenario(client, ctx: BenchmarkContext, scenario: Scenario, repeat: int = DEFAULT_REPEAT, seed: int = 1) -> ScenarioResult:
+    """One warm-up call, `repeat` timed calls, then one call under tracemalloc for the peak memory."""
+    rng = random.Random(seed)
+
+    def call():
+        response = scenario.call(client, ctx, rng)
+        if scenario.cleanup is not None:
+            scenario.cleanup(client, ctx, response)
+        return response
+
+    call()
+    latencies, queries, db_ms, errors = [], [], [], 0
+    for _ in range(repeat):
+        started = timer.perf_counter()
+        response = scenario.call(client, ctx, rng)
+        latencies.append((timer.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+        queries.append(int(response.headers.get("X-DB-Query-Count", 0)))
+        db_ms.append(float(response.headers.get("X-DB-Time-Ms", 0)))
+        if scenario.cleanup is not None:
+            scenario.cleanup(client, ctx, response)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    return ScenarioResult(
+        name=scenario.name,
+        runs=repeat,
+        errors=errors,
+        p50_ms=round(statistics.median(latencies), 2),
+        p95_ms=round(_percentile(latencies, 0.95), 2),
+        mean_ms=round(statistics.fmean(latencies), 2),
+        queries=max(queries),
+        db_ms=round(statistics.median(db_ms), 2),
+        peak_memory_kb=round(peak / 1024, 1),
+    )
+
+
+def run(client, ctx: BenchmarkContext, names: Optional[list[str]] = None, repeat: int = DEFAULT_REPEAT, seed: int = 1) -> list[ScenarioResult]:
+    from . import query_stats
+
+    # Per-call query counts come from the response headers.
+    headers_were_on = query_stats.QUERY_STATS_HEADERS
+    query_stats.QUERY_STATS_HEADERS = True
+    try:
+        return [run_scenario(client, ctx, SCENARIOS[name], repeat, seed) for name in names or SCENARIOS]
+    finally:
+        query_stats.QUERY_STATS_HEADERS = headers_were_on
+
+
+def compare(results: list[ScenarioResult], baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[Regression]:
+    """Regressions of `results` against a saved baseline; scenarios missing from it are skipped."""
+    regressions = []
+    for result in results:
+        base = baseline.get("scenarios", {}).get(result.name)
+        if base is None:
+            continue
+        if result.p50_ms > base["p50_ms"] * (1 + tolerance) and result.p50_ms - base["p50_ms"] > LATENCY_NOISE_MS:
+            regressions.append(Regression(result.name, "p50_ms", base["p50_ms"], result.p50_ms))
+        if result.queries > base["queries"]:
+            regressions.append(Regression(result.name, "queries", base["queries"], result.queries))
+        if (
+            result.peak_memory_kb > base["peak_memory_kb"] * (1 + tolerance)
+            and result.peak_memory_kb - base["peak_memory_kb"] > MEMORY_NOISE_KB
+        ):
+            regressions.append(Regression(result.name, "peak_memory_kb", base["peak_memory_kb"], result.peak_memory_kb))
+        if result.errors > base["errors"]:
+            regressions.append(Regression(result.name, "errors", base["errors"], result.errors))
+    return regressions
+
+
+def dataset_summary(db: Session) -> dict:
+    return {
+        "database": db.get_bind().dialect.name,
+        "time_slots": db.query(func.count(models.TimeSlot.id)).scalar(),
+        "bookings": db.query(func.count(models.Booking.id)).scalar(),
+    }
+
+
+def open_client(database_url: str):
+    """A TestClient of the application bound to `database_url`, and a session factory for the same database."""
+    from . import db as app_db
+
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    app_db.engine = create_engine(database_url, pool_pre_ping=True, connect_args=connect_args)
+    app_db.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=app_db.engine)
+    app_db.ReportsSessionLocal = app_db.SessionLocal
+
+    from fastapi.testclient import TestClient
+
+    from .main import app
+
+    # Endpoint failures are counted as errors instead of aborting the run.
+    return TestClient(app, raise_server_exceptions=False), app_db.SessionLocal
+
+
+def _print_table(results: list[ScenarioResult]) -> None:
+    print(f"{'scenario':<26} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'queries':>7} {'db ms':>7} {'peak KB':>9} {'errors':>6}")
+    for r in results:
+        print(
+            f"{r.name:<26} {r.p50_ms:>8.1f} {r.p95_ms:>8.1f} {r.mean_ms:>8.1f} {r.queries:>7} "
+            f"{r.db_ms:>7.1f} {r.peak_memory_kb:>9.0f} {r.errors:>6}"
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the YMS endpoints on seeded data.")
+    parser.add_argument("--database-url", required=True, help="SQLAlchemy URL of a database filled by app.seed_data")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenarios to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results to PATH as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare the results against the baseline at PATH")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative growth of p50 latency and peak memory")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    # The test client logs every request at INFO.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client, session_factory = open_client(args.database_url)
+    with session_factory() as db:
+        ctx = BenchmarkContext.load(db)
+        dataset = dataset_summary(db)
+    with client:
+        results = run(client, ctx, args.scenario, args.repeat, args.seed)
+
+    report = {"dataset": dataset, "repeat": args.repeat, "scenarios": {r.name: asdict(r) for r in results}}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{dataset['database']}: {dataset['time_slots']} time slots, {dataset['bookings']} bookings")
+        _print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("dataset") != dataset:
+            print(f"warning: baseline dataset {baseline.get('dataset')} differs from {dataset}", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
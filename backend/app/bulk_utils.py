@@ -0,0 +1,84 @@
+from itertools import islice
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Sequence, TypeVar
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from .metrics import Histogram
+
+T = TypeVar("T")
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def chunked(items: Iterable[T], size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[T]]:
+    """Yield lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert_statement(
+    db: Session,
+    table: Table,
+    index_elements: Sequence[str],
+    update_columns: Sequence[str],
+    constraint: str | None = None,
+    increment: bool = False,
+):
+    """
+    Build INSERT ... ON CONFLICT DO UPDATE for the session dialect.
+
+    PostgreSQL targets the named constraint when given; SQLite has no
+    ON CONSTRAINT form, so it always targets `index_elements`. With
+    `increment` the update adds the new values to the stored ones.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+        conflict_target = {"constraint": constraint} if constraint else {"index_elements": list(index_elements)}
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+        conflict_target = {"index_elements": list(index_elements)}
+    else:
+        raise NotImplementedError(f"Upsert is not supported for dialect '{dialect}'")
+
+    return stmt.on_conflict_do_update(
+        **conflict_target,
+        set_={
+            column: (table.c[column] + stmt.excluded[column]) if increment else stmt.excluded[column]
+            for column in update_columns
+        },
+    )
+
+
+class PhaseTimer:
+    """
+    Collect elapsed milliseconds per named phase of a long operation.
+
+    With `histogram` every phase is also observed there, in seconds, under its
+    `phase` label.
+    """
+
+    def __init__(self, histogram: Optional["Histogram"] = None):
+        self.timings: dict[str, float] = {}
+        self.histogram = histogram
+        self._started = perf_counter()
+        self._last = self._started
+
+    def mark(self, phase: str) -> None:
+        now = perf_counter()
+        self.timings[f"{phase}_ms"] = round((now - self._last) * 1000, 2)
+        if self.histogram is not None:
+            self.histogram.observe(now - self._last, phase=phase)
+        self._last = now
+
+    def finish(self) -> dict[str, float]:
+        self.timings["total_ms"] = round((perf_counter() - self._started) * 1000, 2)
+        return self.timings
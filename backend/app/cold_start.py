@@ -0,0 +1,112 @@
+"""
+Cold-start benchmark of a worker.
+
+Starts --runs fresh interpreters; each imports app.main, runs the lifespan
+startup, polls GET /ready until the warm-up is done, then sends one first
+request. Reports the median of:
+
+    import_ms         import app.main (routers, schemas, models)
+    startup_ms        lifespan startup (migrations when DB_MIGRATE_ON_STARTUP)
+    ready_ms          from the start of the import until /ready answers 200
+    first_request_ms  the first GET /api/docks/ on the warm worker
+    process_ms        wall clock of the whole interpreter, as seen from outside
+
+plus the number of loaded modules and whether openpyxl was among them (it
+should load only on the first import or export).
+
+Run:
+    python -m app.cold_start --database-url sqlite:///yms-bench.db --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time as timer
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_RUNS = 5
+DEFAULT_READY_TIMEOUT_SECONDS = 60
+
+_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app, raise_server_exceptions=False) as client:
+    up = time.perf_counter()
+    ready = None
+    while time.perf_counter() - started < {timeout}:
+        if client.get("/ready").status_code == 200:
+            ready = time.perf_counter()
+            break
+        time.sleep(0.005)
+    before_first = time.perf_counter()
+    status = client.get("/api/docks/").status_code
+    first = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (up - imported) * 1000,
+    "ready_ms": (ready - started) * 1000 if ready else None,
+    "first_request_ms": (first - before_first) * 1000,
+    "first_request_status": status,
+    "modules": len(sys.modules),
+    "openpyxl_loaded": "openpyxl" in sys.modules,
+}}))
+"""
+
+
+def measure_once(env: dict, ready_timeout: float = DEFAULT_READY_TIMEOUT_SECONDS) -> dict:
+    started = timer.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(timeout=ready_timeout)],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample["process_ms"] = (timer.perf_counter() - started) * 1000
+    return sample
+
+
+def summarize(samples: list[dict]) -> dict:
+    summary = {}
+    for key in ("import_ms", "startup_ms", "ready_ms", "first_request_ms", "process_ms"):
+        values = [s[key] for s in samples if s[key] is not None]
+        summary[key] = round(statistics.median(values), 1) if values else None
+    summary["never_ready"] = sum(1 for s in samples if s["ready_ms"] is None)
+    summary["modules"] = samples[-1]["modules"]
+    summary["openpyxl_loaded"] = any(s["openpyxl_loaded"] for s in samples)
+    summary["first_request_statuses"] = sorted({s["first_request_status"] for s in samples})
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold start of a YMS worker.")
+    parser.add_argument("--database-url", help="DATABASE_URL for the workers (default: the environment's)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--ready-timeout", type=float, default=DEFAULT_READY_TIMEOUT_SECONDS, help="Seconds to wait for /ready per run")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    summary = summarize([measure_once(env, args.ready_timeout) for _ in range(args.runs)])
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print(f"{key:<24} {value}")
+    return 1 if summary["never_ready"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
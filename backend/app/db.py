@@ -1,23 +1,205 @@
+import logging
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import time
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_USER = os.getenv("POSTGRES_USER", "yms")
 DATABASE_PASSWORD = os.getenv("POSTGRES_PASSWORD", "yms_password")
 DATABASE_HOST = os.getenv("POSTGRES_HOST", "localhost")
 DATABASE_PORT = os.getenv("POSTGRES_PORT", "5432")
 DATABASE_NAME = os.getenv("POSTGRES_DB", "yms")
 
-SQLALCHEMY_DATABASE_URL = (
+# DATABASE_URL wins over the POSTGRES_* parts (e.g. a seeded SQLite file for benchmarks).
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql+psycopg2://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+# Read-heavy endpoints (slot calendar, booking lists, analytics, reference lists) use an
+# asyncio session when set; everything else stays on the sync engine either way.
+# Experimental and off by default: the gain on PostgreSQL is not measured yet (README).
+ASYNC_DB = os.getenv("ASYNC_DB", "0").lower() in ("1", "true", "yes")
+
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """The same database behind an asyncio driver (psycopg2 -> asyncpg, pysqlite -> aiosqlite)."""
+    parsed = make_url(url)
+    return parsed.set(drivername=_ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+
+# Pool sizing of the main engine (bookings and everything else) and of the reports
+# engine (analytics, exports, journal), so a pile of slow reports cannot take the
+# connections booking traffic needs. Recycle and checkout timeout are shared.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+REPORTS_DB_POOL_SIZE = int(os.getenv("REPORTS_DB_POOL_SIZE", "3"))
+REPORTS_DB_MAX_OVERFLOW = int(os.getenv("REPORTS_DB_MAX_OVERFLOW", "2"))
+
+# Per-statement limits by route class (PostgreSQL only, 0 = none): booking writes fail
+# fast instead of queueing behind locks, reports get room but not forever.
+BOOKING_STATEMENT_TIMEOUT_MS = int(os.getenv("BOOKING_STATEMENT_TIMEOUT_MS", "2000"))
+REPORT_STATEMENT_TIMEOUT_MS = int(os.getenv("REPORT_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+def _engine_args(url: str, pool_size: int, max_overflow: int) -> dict:
+    if url.startswith("sqlite"):
+        # The threadpool hands one SQLite connection to several threads over its life.
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, **_engine_args(SQLALCHEMY_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+reports_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, **_engine_args(SQLALCHEMY_DATABASE_URL, REPORTS_DB_POOL_SIZE, REPORTS_DB_MAX_OVERFLOW)
+)
+ReportsSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=reports_engine)
+
+# Reports can read from a replica instead. While it cannot be reached or its replay lags
+# more than REPLICA_MAX_LAG_SECONDS (0 = any lag is fine), they go to the primary's
+# reports pool, or answer 503 when REPLICA_FALLBACK is off.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+REPLICA_FALLBACK = os.getenv("REPLICA_FALLBACK", "1").lower() in ("1", "true", "yes")
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+
+replica_engine = None
+ReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        REPLICA_DATABASE_URL, pool_pre_ping=True, **_engine_args(REPLICA_DATABASE_URL, REPORTS_DB_POOL_SIZE, REPORTS_DB_MAX_OVERFLOW)
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = None
+AsyncSessionLocal = None
+async_reports_engine = None
+AsyncReportsSessionLocal = None
+AsyncReplicaSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, pool_pre_ping=True, **_engine_args(ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+    )
+    async_reports_engine = create_async_engine(
+        ASYNC_DATABASE_URL, pool_pre_ping=True, **_engine_args(ASYNC_DATABASE_URL, REPORTS_DB_POOL_SIZE, REPORTS_DB_MAX_OVERFLOW)
+    )
+    # Nothing is committed on the read path; keep loaded rows usable after the session closes.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReportsSessionLocal = async_sessionmaker(async_reports_engine, autoflush=False, expire_on_commit=False)
+    if REPLICA_DATABASE_URL:
+        async_replica_url = async_database_url(REPLICA_DATABASE_URL)
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            create_async_engine(
+                async_replica_url, pool_pre_ping=True, **_engine_args(async_replica_url, REPORTS_DB_POOL_SIZE, REPORTS_DB_MAX_OVERFLOW)
+            ),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+
+def replica_lag_seconds(connection) -> Optional[float]:
+    """Replay lag of a PostgreSQL standby; None when the database cannot tell (a primary, SQLite)."""
+    if connection.dialect.name != "postgresql":
+        return None
+    return connection.exec_driver_sql(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL"
+        " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ).scalar()
+
+
+class ReplicaRouter:
+    """Decides whether report sessions may go to the replica.
+
+    Reachability and lag are probed at most every `check_seconds`; requests in
+    between reuse the last answer.
+    """
+
+    def __init__(self, engine, max_lag_seconds: float, fallback: bool, check_seconds: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.fallback = fallback
+        self.check_seconds = check_seconds
+        self.usable = True
+        self.lag_seconds: Optional[float] = None
+        self._checked_at: Optional[float] = None
+
+    def use_replica(self) -> bool:
+        """True for the replica, False for the primary; 503 when neither may serve."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_seconds:
+            self._checked_at = now
+            usable = self._probe()
+            if usable != self.usable:
+                logger.warning("Read replica %s", "back in use" if usable else f"out of use (lag {self.lag_seconds})")
+            self.usable = usable
+        if self.usable:
+            return True
+        if not self.fallback:
+            raise HTTPException(status_code=503, detail="Read replica unavailable")
+        return False
+
+    def _probe(self) -> bool:
+        try:
+            with self.engine.connect() as connection:
+                lag = replica_lag_seconds(connection)
+        except DBAPIError:
+            self.lag_seconds = None
+            return False
+        self.lag_seconds = float(lag) if lag is not None else None
+        return not (self.max_lag_seconds and self.lag_seconds is not None and self.lag_seconds > self.max_lag_seconds)
+
+
+reports_router = (
+    ReplicaRouter(replica_engine, REPLICA_MAX_LAG_SECONDS, REPLICA_FALLBACK, REPLICA_CHECK_SECONDS)
+    if REPLICA_DATABASE_URL else None
+)
+
+
+def set_statement_timeout(db: Session, milliseconds: int) -> None:
+    """SET LOCAL statement_timeout at the start of every transaction of `db` (PostgreSQL only)."""
+    if not milliseconds or db.get_bind().dialect.name != "postgresql":
+        return
+    statement = f"SET LOCAL statement_timeout = {int(milliseconds)}"
+
+    @event.listens_for(db, "after_begin")
+    def _set_timeout(session, transaction, connection):
+        connection.exec_driver_sql(statement)
+
+    if db.in_transaction():
+        db.connection().exec_driver_sql(statement)
+
+
+def is_statement_timeout(exc: DBAPIError) -> bool:
+    """Whether PostgreSQL cancelled the statement (SQLSTATE 57014, psycopg2 or asyncpg)."""
+    orig = exc.orig
+    return (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) == "57014"
+
 
 class Base(DeclarativeBase):
     pass
@@ -29,3 +211,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_booking_write_db(db: Session = Depends(get_db)) -> Session:
+    """get_db under the booking-write statement timeout."""
+    set_statement_timeout(db, BOOKING_STATEMENT_TIMEOUT_MS)
+    return db
+
+
+def get_reports_db():
+    """A report session - replica when configured and usable, else the reports pool - under the report statement timeout."""
+    use_replica = reports_router is not None and reports_router.use_replica()
+    db = ReplicaSessionLocal() if use_replica else ReportsSessionLocal()
+    try:
+        set_statement_timeout(db, REPORT_STATEMENT_TIMEOUT_MS)
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_reports_db():
+    # The probe is a sync connect; keep it off the event loop.
+    use_replica = reports_router is not None and await run_in_threadpool(reports_router.use_replica)
+    async with (AsyncReplicaSessionLocal if use_replica else AsyncReportsSessionLocal)() as db:
+        set_statement_timeout(db.sync_session, REPORT_STATEMENT_TIMEOUT_MS)
+        yield db
+
+
+# What read-only endpoints depend on. Plain get_db unless ASYNC_DB is set, so existing
+# dependency overrides of get_db keep working with the default configuration.
+get_read_db = get_async_db if ASYNC_DB else get_db
+get_read_reports_db = get_async_reports_db if ASYNC_DB else get_reports_db
+
+
+async def run_read(db, fn, *args, **kwargs):
+    """Run fn(session, ...) without blocking the event loop.
+
+    An AsyncSession runs it through run_sync (fn gets the sync facade of the same
+    connection), a plain Session runs it in the threadpool. Either way fn keeps the
+    ordinary db.query code, so the sync and async paths cannot drift apart.
+    """
+    if hasattr(db, "run_sync"):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -1,24 +1,46 @@
+import functools
+import inspect
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from .db import get_db
+from .db import ASYNC_DB, get_async_db, get_db, get_read_db, get_read_reports_db, get_reports_db, run_read
 from . import models
 from .security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+def _token_email(token: str) -> str:
     payload = decode_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    email = payload["sub"]
-    user = db.query(models.User).filter(models.User.email == email).first()
+    return payload["sub"]
+
+
+def _check_active(user: models.User | None) -> models.User:
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive or missing user")
     return user
 
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+    email = _token_email(token)
+    user = db.query(models.User).filter(models.User.email == email).first()
+    return _check_active(user)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)) -> models.User:
+    email = _token_email(token)
+    user = (await db.execute(select(models.User).where(models.User.email == email))).scalars().first()
+    return _check_active(user)
+
+
+# The user lookup on the read path shares the request's read session.
+get_read_user = get_current_user_async if ASYNC_DB else get_current_user
+
+
 def require_admin(user: models.User = Depends(get_current_user)) -> models.User:
     if user.role != models.UserRole.admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
@@ -26,3 +48,30 @@ def require_admin(user: models.User = Depends(get_current_user)) -> models.User:
 
 # Backward-compatible alias expected by routers
 get_current_admin = require_admin
+
+
+def read_endpoint(fn):
+    """Serve a read-only sync endpoint off the event loop through the read session.
+
+    The body keeps its Session code: it runs via run_read, so on an AsyncSession
+    (ASYNC_DB) and in the threadpool otherwise. Its get_db / get_reports_db /
+    get_current_user dependencies become their get_read_* counterparts. ORM rows it returns must have
+    everything the response model reads already loaded - a lazy load after
+    run_sync has returned fails on the async path.
+    """
+    swap = {get_db: get_read_db, get_reports_db: get_read_reports_db, get_current_user: get_read_user}
+    signature = inspect.signature(fn)
+    parameters = []
+    for parameter in signature.parameters.values():
+        dependency = getattr(parameter.default, "dependency", None)
+        if dependency in swap:
+            parameter = parameter.replace(default=Depends(swap[dependency]))
+        parameters.append(parameter)
+
+    @functools.wraps(fn)
+    async def endpoint(**kwargs):
+        db = kwargs.pop("db")
+        return await run_read(db, lambda session: fn(db=session, **kwargs))
+
+    endpoint.__signature__ = signature.replace(parameters=parameters)
+    return endpoint
@@ -0,0 +1,76 @@
+import os
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from . import models
+
+DEFAULT_HOLD_SECONDS = 120
+MAX_HOLD_SECONDS = 600
+# Unexpired holds one user may keep at a time; 0 = no limit.
+MAX_ACTIVE_HOLDS_PER_USER = int(os.getenv("MAX_ACTIVE_HOLDS_PER_USER", "5"))
+
+
+def active_hold_counts(
+    db: Session,
+    slot_ids: Iterable[int],
+    now: Optional[datetime] = None,
+    exclude_hold_ids: Iterable[int] = (),
+) -> dict[int, int]:
+    """Unexpired holds per slot; they take slot capacity like bookings do."""
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return {}
+    query = (
+        db.query(models.SlotHoldTimeSlot.time_slot_id, func.count(models.SlotHoldTimeSlot.id))
+        .join(models.SlotHold, models.SlotHold.id == models.SlotHoldTimeSlot.hold_id)
+        .filter(
+            models.SlotHoldTimeSlot.time_slot_id.in_(slot_ids),
+            models.SlotHold.expires_at > (now or datetime.utcnow()),
+        )
+    )
+    exclude_hold_ids = list(exclude_hold_ids)
+    if exclude_hold_ids:
+        query = query.filter(models.SlotHold.id.notin_(exclude_hold_ids))
+    rows = query.group_by(models.SlotHoldTimeSlot.time_slot_id).all()
+    return {slot_id: count for slot_id, count in rows}
+
+
+def user_active_hold_count(db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+    return (
+        db.query(func.count(models.SlotHold.id))
+        .filter(models.SlotHold.user_id == user_id, models.SlotHold.expires_at > (now or datetime.utcnow()))
+        .scalar()
+    )
+
+
+def purge_expired_holds(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete expired holds with a range condition on the expires_at index.
+
+    Capacity checks already ignore expired holds, so this only keeps the
+    tables small; it does not commit.
+    """
+    expired = models.SlotHold.expires_at <= (now or datetime.utcnow())
+    db.query(models.SlotHoldTimeSlot).filter(
+        models.SlotHoldTimeSlot.hold_id.in_(db.query(models.SlotHold.id).filter(expired).scalar_subquery())
+    ).delete(synchronize_session=False)
+    return db.query(models.SlotHold).filter(expired).delete(synchronize_session=False)
+
+
+def get_active_hold(db: Session, hold_id: int, user: models.User, object_id: int) -> models.SlotHold:
+    """The caller's unexpired hold on `object_id`, with its slots loaded."""
+    hold = (
+        db.query(models.SlotHold)
+        .options(selectinload(models.SlotHold.hold_slots).joinedload(models.SlotHoldTimeSlot.time_slot))
+        .filter(models.SlotHold.id == hold_id, models.SlotHold.user_id == user.id)
+        .first()
+    )
+    if not hold or hold.object_id != object_id:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    if hold.expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Hold has expired")
+    return hold
@@ -0,0 +1,102 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+IDEMPOTENCY_TTL = timedelta(hours=24)
+MAX_KEY_LENGTH = 255
+
+
+def request_hash(*parts) -> str:
+    """SHA-256 over the request parts (bytes, or anything JSON-encodable)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = json.dumps(jsonable_encoder(part), sort_keys=True, ensure_ascii=False).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def upload_hash(upload, *parts) -> str:
+    """request_hash() of `parts` plus the uploaded file, read in chunks and rewound."""
+    digest = hashlib.sha256(request_hash(*parts).encode("ascii"))
+    stream = upload.file
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def find_replay(db: Session, user: models.User, scope: str, key: Optional[str], fingerprint: str) -> Optional[JSONResponse]:
+    """
+    The stored response for a retried request, or None when the key is new.
+
+    One lookup on the (user, scope, key) unique index. Reusing a key for a
+    different request is rejected with 422.
+    """
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+    row = db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user.id,
+        models.IdempotencyKey.scope == scope,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.expires_at > datetime.utcnow(),
+    ).first()
+    if row is None:
+        return None
+    if row.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return JSONResponse(
+        content=json.loads(row.response_body),
+        status_code=row.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def remember(db: Session, user: models.User, scope: str, key: Optional[str], fingerprint: str, response, status_code: int = 200) -> None:
+    """
+    Store the response of a write under its key; call before the write's commit
+    so both land in the same transaction. Expired keys are swept on the way.
+    """
+    if not key:
+        return
+    now = datetime.utcnow()
+    # Range delete over the expires_at index; also frees an expired row with the same key.
+    db.query(models.IdempotencyKey).filter(models.IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+    db.add(models.IdempotencyKey(
+        user_id=user.id,
+        scope=scope,
+        key=key,
+        request_hash=fingerprint,
+        status_code=status_code,
+        response_body=json.dumps(jsonable_encoder(response), ensure_ascii=False),
+        expires_at=now + IDEMPOTENCY_TTL,
+    ))
+
+
+def commit_remembered(db: Session, user: models.User, scope: str, key: Optional[str], fingerprint: str) -> Optional[JSONResponse]:
+    """
+    Commit a write stored with remember(). If a concurrent retry with the same
+    key committed first, roll back and return that request's response instead.
+    """
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        replay = find_replay(db, user, scope, key, fingerprint) if key else None
+        if replay is None:
+            raise
+        return replay
+    return None
@@ -0,0 +1,188 @@
+import codecs
+import csv
+import io
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from fastapi import UploadFile
+
+IMPORT_EXTENSIONS = (".xlsx", ".xlsm", ".csv")
+
+# CSV files are checked for UTF-8 in chunks of this size before being parsed.
+_ENCODING_CHUNK_BYTES = 64 * 1024
+
+# Date cells of CSV files: ISO, or what Russian Excel writes.
+CSV_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y")
+
+
+class ImportFileError(ValueError):
+    """Uploaded file cannot be opened as a spreadsheet."""
+
+
+def is_import_file(filename: Optional[str]) -> bool:
+    return (filename or "").lower().endswith(IMPORT_EXTENSIONS)
+
+
+def _header_value(value) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def cell_number(value) -> Optional[float]:
+    """
+    Number in a cell, or None when it is empty.
+
+    XLSX cells hold numbers already; CSV cells are text and may use a decimal
+    comma and spaces between thousands ("1 234,5"). Raises ValueError otherwise.
+    """
+    if _is_blank(value):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"not a number: {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(str(value).strip().replace("\u00a0", "").replace(" ", "").replace(",", "."))
+
+
+def cell_date(value) -> Optional[date]:
+    """Date in a cell (XLSX date or datetime, or text in CSV_DATE_FORMATS), or None when it is empty."""
+    if _is_blank(value):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"not a date: {text!r}")
+
+
+class ImportSheet:
+    """One sheet of an upload: the header row is read eagerly, data rows lazily and only once."""
+
+    def __init__(self, title: str, raw_rows: Iterable[Sequence]):
+        self.title = title
+        self._raw_rows = iter(raw_rows)
+        first = next(self._raw_rows, None)
+        self.headers: Optional[list[str]] = [_header_value(v) for v in first] if first is not None else None
+
+    @property
+    def is_empty(self) -> bool:
+        return self.headers is None
+
+    def has_headers(self, expected: Sequence[str], prefix: bool = False) -> bool:
+        """Case-insensitive header check; `prefix` allows extra columns after the expected ones."""
+        if self.headers is None:
+            return False
+        headers = list(self.headers)
+        if prefix:
+            headers = headers[: len(expected)]
+        else:
+            while headers and not headers[-1]:
+                headers.pop()
+        return headers == list(expected)
+
+    def rows(self, fields: Sequence[str]) -> Iterator[tuple[int, tuple]]:
+        """
+        Yield (row_number, row) for every non-empty data row.
+
+        Rows are namedtuples over `fields`, padded or truncated to that width,
+        so they still unpack positionally. Empty CSV cells come back as None.
+        """
+        row_type = namedtuple("ImportRow", fields)
+        width = len(fields)
+        for row_number, values in enumerate(self._raw_rows, start=2):
+            values = tuple(None if v == "" else v for v in values[:width])
+            if all(_is_blank(v) for v in values):
+                continue
+            yield row_number, row_type._make(values + (None,) * (width - len(values)))
+
+
+class ImportSource:
+    """Sheets of an uploaded workbook, or the single table of a CSV file."""
+
+    def __init__(
+        self,
+        sheets: dict[str, Callable[[], Iterable[Sequence]]],
+        active: str,
+        named_sheets: bool = True,
+    ):
+        self._sheets = sheets
+        self._active = active
+        self._named_sheets = named_sheets
+
+    def sheet(self, name: str) -> Optional[ImportSheet]:
+        """Sheet by case-insensitive name, or None. CSV files have no named sheets."""
+        if not self._named_sheets:
+            return None
+        wanted = name.strip().lower()
+        for title, raw_rows in self._sheets.items():
+            if title.strip().lower() == wanted:
+                return ImportSheet(title, raw_rows())
+        return None
+
+    def active_sheet(self) -> ImportSheet:
+        return ImportSheet(self._active, self._sheets[self._active]())
+
+
+def _open_xlsx(stream) -> ImportSource:
+    from openpyxl import load_workbook
+
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFileError("Failed to read Excel file") from exc
+    sheets = {ws.title: (lambda ws=ws: ws.iter_rows(values_only=True)) for ws in wb.worksheets}
+    return ImportSource(sheets, wb.active.title)
+
+
+def _detect_csv_encoding(stream) -> str:
+    """
+    UTF-8 when the whole file decodes as such, else the cp1251 that Russian Excel writes.
+
+    The whole file is checked, chunk by chunk, so a bad byte deep in the file
+    cannot fail the parse halfway.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        while chunk := stream.read(_ENCODING_CHUNK_BYTES):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "cp1251"
+    finally:
+        stream.seek(0)
+    return "utf-8-sig"
+
+
+def _open_csv(stream) -> ImportSource:
+    # cp1251 leaves one byte (0x98) undefined; it becomes U+FFFD rather than an error mid-parse.
+    text = io.TextIOWrapper(stream, encoding=_detect_csv_encoding(stream), errors="replace", newline="")
+    header_line = text.readline()
+    text.seek(0)
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    return ImportSource({"csv": lambda: csv.reader(text, delimiter=delimiter)}, "csv", named_sheets=False)
+
+
+def open_import_file(upload: UploadFile) -> ImportSource:
+    """
+    Open an uploaded .xlsx/.xlsm/.csv for streaming reads.
+
+    Workbooks are read straight from the upload's spooled temporary file in
+    read-only mode with cached formula values, instead of being copied into
+    memory and fully materialized. Nothing needs closing: the readers only
+    hold that file, which Starlette closes after the request.
+    """
+    stream = upload.file
+    stream.seek(0)
+    if (upload.filename or "").lower().endswith(".csv"):
+        return _open_csv(stream)
+    return _open_xlsx(stream)
@@ -1,7 +1,17 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .db import engine, Base
-from .routers import docks, vehicle_types, auth, work_schedules, time_slots, bookings, transport_types, zones, suppliers, analytics, objects, prr_limits, backups, volume_quotas
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
+from .db import is_statement_timeout
+from .routers import docks, vehicle_types, auth, work_schedules, time_slots, bookings, transport_types, zones, suppliers, analytics, objects, prr_limits, backups, volume_quotas, availability, holds, simulation, debug, prometheus, health
+from .metrics import MetricsMiddleware
+from .query_stats import query_stats_middleware
+from .profiling import ProfilingMiddleware
+from .tracing import TracingMiddleware
+from . import startup
 
 import logging
 
@@ -10,9 +20,20 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
-logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
+# SQL statements are not logged; per-route query counts and DB time are at /api/_debug/metrics.
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No create_all here: the schema is Alembic's, and importing the app must not need the database.
+    if startup.DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(startup.upgrade_schema)
+    stop = startup.start_warmup(app)
+    yield
+    stop.set()
+
 
-app = FastAPI(title="YMS Backend")
+app = FastAPI(title="YMS Backend", lifespan=lifespan)
 
 # CORS for frontend dev
 # CORS: ограничиваемся понятными фронт-источниками, чтобы не блокировало preflight с credentials
@@ -32,8 +53,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create tables on startup (simple bootstrap; replace with migrations in production)
-Base.metadata.create_all(bind=engine)
+
+@app.exception_handler(DBAPIError)
+async def statement_timeout_handler(request: Request, exc: DBAPIError):
+    # A statement that ran past its route's statement_timeout; anything else stays a 500.
+    if not is_statement_timeout(exc):
+        raise exc
+    return JSONResponse(status_code=503, content={"detail": "Database query timed out, try again later"})
+
+
+app.middleware("http")(query_stats_middleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(docks.router, prefix="/api/docks", tags=["docks"])
@@ -48,4 +80,10 @@ app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"]
 app.include_router(objects.router, prefix="/api/objects", tags=["objects"])
 app.include_router(prr_limits.router, prefix="/api/prr-limits", tags=["prr_limits"])
 app.include_router(volume_quotas.router, prefix="/api/volume-quotas", tags=["volume_quotas"])
+app.include_router(availability.router, prefix="/api/availability", tags=["availability"])
+app.include_router(holds.router, prefix="/api/holds", tags=["holds"])
+app.include_router(simulation.router, prefix="/api/simulation", tags=["simulation"])
+app.include_router(debug.router, prefix="/api/_debug", tags=["debug"])
+app.include_router(prometheus.router, tags=["metrics"])
 app.include_router(backups.router)
+app.include_router(health.router, tags=["health"])
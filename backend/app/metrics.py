@@ -0,0 +1,237 @@
+"""
+In-process metrics in the Prometheus text exposition format, served at /metrics.
+
+Counters and histograms live in this process and start empty on every start;
+gauges are read when /metrics is scraped. With several workers every worker
+reports its own numbers, so scrape each one or sum in the query.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+from . import db as app_db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(_Metric):
+    """A value read at scrape time; `read` returns None when it does not apply (the sample is left out)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Optional[float]]):
+        super().__init__(name, documentation)
+        self.read = read
+
+    def samples(self) -> list[str]:
+        value = self.read()
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (not cumulative, last one is +Inf), sum.
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the seconds the block took, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def _pool_value(name: str) -> Callable[[], Optional[float]]:
+    def read() -> Optional[float]:
+        method = getattr(getattr(app_db.engine, "pool", None), name, None)
+        return method() if callable(method) else None
+    return read
+
+
+# HTTP
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "yms_http_request_duration_seconds", "Request latency by router and method.", ("router", "method"),
+)
+HTTP_REQUESTS = Counter(
+    "yms_http_requests_total", "Requests by router, method and response status.", ("router", "method", "status"),
+)
+
+
+def route_label(scope: dict) -> str:
+    """The first tag of the matched route (the router), else its first path segment."""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    tags = getattr(route, "tags", None)
+    if tags:
+        return str(tags[0])
+    segments = [part for part in route.path.split("/") if part and part != "api"]
+    return segments[0] if segments else "root"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request into HTTP_REQUEST_SECONDS and counts it by status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            router = route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, router=router, method=scope["method"])
+            HTTP_REQUESTS.inc(router=router, method=scope["method"], status=str(status))
+
+
+# Bookings
+
+BOOKING_PHASE_SECONDS = Histogram(
+    "yms_booking_phase_seconds",
+    "Time per booking write phase: validation, duration, allocation and quota of every allocation; "
+    "object_capacity and commit of create_booking.",
+    ("phase",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+# Imports and exports
+
+BATCH_ROWS = Counter("yms_batch_rows_total", "Rows processed by imports and exports.", ("operation",))
+BATCH_SECONDS = Histogram("yms_batch_duration_seconds", "Duration of imports and exports.", ("operation",), buckets=BATCH_BUCKETS)
+
+
+class BatchTimer:
+    """Started where an import or export starts; done() records its rows and duration."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._started = time.perf_counter()
+
+    def done(self, rows: int) -> None:
+        BATCH_ROWS.inc(rows, operation=self.operation)
+        BATCH_SECONDS.observe(time.perf_counter() - self._started, operation=self.operation)
+
+
+# Database pool
+
+Gauge("yms_db_pool_checked_out", "Connections of the main pool currently checked out.", _pool_value("checkedout"))
+Gauge("yms_db_pool_size", "Configured size of the main pool.", _pool_value("size"))
+Gauge("yms_db_pool_overflow", "Connections opened beyond the pool size (negative while below it).", _pool_value("overflow"))
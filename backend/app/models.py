@@ -101,6 +101,23 @@ class Dock(Base):
     
     available_zones: Mapped[list["Zone"]] = relationship("Zone", secondary=dock_zone_association, back_populates="docks")
     available_transport_types: Mapped[list["TransportTypeRef"]] = relationship("TransportTypeRef", secondary=dock_transport_type_association, back_populates="docks")
+    maintenance_windows: Mapped[list["DockMaintenanceWindow"]] = relationship(
+        "DockMaintenanceWindow", back_populates="dock", cascade="all, delete-orphan"
+    )
+
+
+class DockMaintenanceWindow(Base):
+    """Dates (both inclusive) on which a dock offers no slots; its status stays as set on the dock."""
+    __tablename__ = "dock_maintenance_windows"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    dock_id: Mapped[int] = mapped_column(ForeignKey("docks.id", ondelete="CASCADE"), nullable=False, index=True)
+    status: Mapped[DockStatus] = mapped_column(Enum(DockStatus), default=DockStatus.maintenance, nullable=False)
+    from_date: Mapped[date] = mapped_column(Date, nullable=False)
+    to_date: Mapped[date] = mapped_column(Date, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    dock: Mapped["Dock"] = relationship("Dock", back_populates="maintenance_windows")
 
 
 class VehicleType(Base):
@@ -303,7 +320,8 @@ class BookingTimeSlot(Base):
     __tablename__ = "booking_time_slots"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     booking_id: Mapped[int] = mapped_column(ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False)
-    time_slot_id: Mapped[int] = mapped_column(ForeignKey("time_slots.id", ondelete="CASCADE"), nullable=False)
+    # Slot occupancy and the calendar look links up by slot; the unique key leads with booking_id.
+    time_slot_id: Mapped[int] = mapped_column(ForeignKey("time_slots.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Связи
     booking: Mapped["Booking"] = relationship("Booking", back_populates="booking_slots")
@@ -314,6 +332,83 @@ class BookingTimeSlot(Base):
     )
 
 
+# Tentative reservation of a slot chain while the booking form is being filled in.
+class SlotHold(Base):
+    __tablename__ = "slot_holds"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    object_id: Mapped[int] = mapped_column(ForeignKey("objects.id", ondelete="CASCADE"), nullable=False)
+    booking_type: Mapped[BookingDirection] = mapped_column(
+        Enum(
+            BookingDirection,
+            values_callable=lambda enum: [e.value for e in enum],
+            name="bookingdirection",
+        ),
+        nullable=False,
+    )
+    # Expired holds are ignored by every capacity check and swept by range over this index.
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    hold_slots: Mapped[list["SlotHoldTimeSlot"]] = relationship(
+        "SlotHoldTimeSlot", back_populates="hold", cascade="all, delete-orphan"
+    )
+
+
+class SlotHoldTimeSlot(Base):
+    __tablename__ = "slot_hold_time_slots"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hold_id: Mapped[int] = mapped_column(ForeignKey("slot_holds.id", ondelete="CASCADE"), nullable=False)
+    time_slot_id: Mapped[int] = mapped_column(ForeignKey("time_slots.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    hold: Mapped["SlotHold"] = relationship("SlotHold", back_populates="hold_slots")
+    time_slot: Mapped["TimeSlot"] = relationship("TimeSlot")
+
+    __table_args__ = (
+        UniqueConstraint("hold_id", "time_slot_id", name="uq_slot_hold_time_slot"),
+    )
+
+
+# Responses of writes made with an Idempotency-Key header, replayed on retries.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    scope: Mapped[str] = mapped_column(String(32), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_body: Mapped[str] = mapped_column(Text, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_user_scope_key"),
+    )
+
+
+# Confirmed bookings per object capacity class and slot time, kept in step with booking writes.
+class ObjectOccupancy(Base):
+    __tablename__ = "object_occupancy"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    object_id: Mapped[int] = mapped_column(ForeignKey("objects.id", ondelete="CASCADE"), nullable=False)
+    capacity_class: Mapped[BookingDirection] = mapped_column(
+        Enum(
+            BookingDirection,
+            values_callable=lambda enum: [e.value for e in enum],
+            name="bookingdirection",
+        ),
+        nullable=False,
+    )
+    slot_date: Mapped[date] = mapped_column(Date, nullable=False)
+    start_time: Mapped[time] = mapped_column(Time, nullable=False)
+    end_time: Mapped[time] = mapped_column(Time, nullable=False)
+    bookings: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("object_id", "capacity_class", "slot_date", "start_time", "end_time", name="uq_object_occupancy_key"),
+    )
+
+
 class PrrLimit(Base):
     __tablename__ = 'prr_limits'
 
@@ -0,0 +1,254 @@
+from collections import Counter
+from datetime import date, datetime, time
+from typing import Iterable, Optional
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from . import models
+from .availability import CAPACITY_CLASS_DOCK_TYPES, capacity_class
+from .bulk_utils import chunked, upsert_statement
+from .holds import active_hold_counts
+
+# (object_id, capacity class, slot_date, start_time, end_time) of one object_occupancy row.
+OccupancyKey = tuple[int, models.BookingDirection, date, time, time]
+
+OCCUPANCY_KEY_COLUMNS = ("object_id", "capacity_class", "slot_date", "start_time", "end_time")
+
+
+def occupancy_keys(
+    db: Session,
+    slot_ids: Iterable[int],
+    direction: Optional[models.BookingDirection] = None,
+) -> Counter:
+    """
+    Counter rows confirmed bookings on `slot_ids` add to, with multiplicity.
+
+    A slot on a universal dock counts for both capacity classes. With
+    `direction` only the class such a booking is checked against is kept.
+    """
+    per_slot = Counter(slot_ids)
+    keys: Counter = Counter()
+    for batch in chunked(per_slot):
+        rows = db.query(
+            models.TimeSlot.id,
+            models.Dock.object_id,
+            models.Dock.dock_type,
+            models.TimeSlot.slot_date,
+            models.TimeSlot.start_time,
+            models.TimeSlot.end_time,
+        ).join(models.Dock, models.Dock.id == models.TimeSlot.dock_id).filter(
+            models.TimeSlot.id.in_(batch),
+            models.Dock.object_id.isnot(None),
+        ).all()
+        for slot_id, object_id, dock_type, day, start, end in rows:
+            if direction is not None:
+                classes = [capacity_class(dock_type, direction)]
+            else:
+                classes = [cls for cls, types in CAPACITY_CLASS_DOCK_TYPES.items() if dock_type in types]
+            for cls in classes:
+                keys[(object_id, cls, day, start, end)] += per_slot[slot_id]
+    return keys
+
+
+def _key_order(key: OccupancyKey):
+    object_id, cls, day, start, end = key
+    return object_id, cls.value, day, start, end
+
+
+# Keys per row-value IN list: 5 bound parameters each, well under SQLite's variable limit.
+KEY_BATCH_SIZE = 200
+
+
+def _locked_counts(db: Session, keys: Iterable[OccupancyKey]) -> dict:
+    """
+    Lock the counter rows of `keys` and return their bookings by key.
+
+    Keys are looked up in sorted batches with a row-value IN list rather than
+    one OR per key, which SQLite refuses past ~1000 keys ("Expression tree is
+    too large"); batches and rows are locked in key order.
+    """
+    table = models.ObjectOccupancy
+    columns = [getattr(table, name) for name in OCCUPANCY_KEY_COLUMNS]
+    current = {}
+    for batch in chunked(sorted(keys, key=_key_order), KEY_BATCH_SIZE):
+        rows = db.query(table).filter(tuple_(*columns).in_(batch)).order_by(*columns).with_for_update().populate_existing()
+        for row in rows:
+            current[(row.object_id, row.capacity_class, row.slot_date, row.start_time, row.end_time)] = row.bookings
+    return current
+
+
+def _held_counts(db: Session, keys: Iterable[OccupancyKey], exclude_hold_ids: Iterable[int] = ()) -> Counter:
+    """
+    Unexpired holds on the counter rows of `keys`, which the counters themselves leave out.
+
+    A held slot counts for every capacity class of its dock, like in
+    AvailabilityIndex, except the holds being consumed.
+    """
+    keys = set(keys)
+    if not keys:
+        return Counter()
+    query = db.query(
+        models.Dock.object_id,
+        models.Dock.dock_type,
+        models.TimeSlot.slot_date,
+        models.TimeSlot.start_time,
+        models.TimeSlot.end_time,
+        func.count(models.SlotHoldTimeSlot.id),
+    ).join(
+        models.TimeSlot, models.TimeSlot.id == models.SlotHoldTimeSlot.time_slot_id
+    ).join(
+        models.Dock, models.Dock.id == models.TimeSlot.dock_id
+    ).join(
+        models.SlotHold, models.SlotHold.id == models.SlotHoldTimeSlot.hold_id
+    ).filter(
+        models.Dock.object_id.in_({key[0] for key in keys}),
+        models.TimeSlot.slot_date.in_({key[2] for key in keys}),
+        models.SlotHold.expires_at > datetime.utcnow(),
+    )
+    exclude_hold_ids = list(exclude_hold_ids)
+    if exclude_hold_ids:
+        query = query.filter(models.SlotHold.id.notin_(exclude_hold_ids))
+    rows = query.group_by(
+        models.Dock.object_id, models.Dock.dock_type, models.TimeSlot.slot_date, models.TimeSlot.start_time, models.TimeSlot.end_time
+    ).all()
+    held: Counter = Counter()
+    for object_id, dock_type, day, start, end, count in rows:
+        for cls, types in CAPACITY_CLASS_DOCK_TYPES.items():
+            key = (object_id, cls, day, start, end)
+            if dock_type in types and key in keys:
+                held[key] += count
+    return held
+
+
+def change_object_occupancy(db: Session, keys: Counter, sign: int = 1) -> None:
+    """Add `sign` times the counts in `keys` to the counter rows, creating missing ones."""
+    rows = [
+        dict(zip(OCCUPANCY_KEY_COLUMNS, key), bookings=sign * count)
+        for key, count in sorted(keys.items(), key=lambda item: _key_order(item[0]))
+    ]
+    stmt = upsert_statement(
+        db,
+        models.ObjectOccupancy.__table__,
+        index_elements=OCCUPANCY_KEY_COLUMNS,
+        update_columns=["bookings"],
+        constraint="uq_object_occupancy_key",
+        increment=True,
+    )
+    for batch in chunked(rows):
+        db.execute(stmt, batch)
+
+
+def reserve_object_capacity(
+    db: Session,
+    slot_ids: Iterable[int],
+    direction: models.BookingDirection,
+    record: bool = True,
+    exclude_hold_ids: Iterable[int] = (),
+) -> bool:
+    """
+    Count confirmed bookings of `direction` on `slot_ids` against the object limits.
+
+    The counter rows checked are created when missing and locked until the
+    transaction ends, so concurrent writers to the same object slots queue up
+    here. Unexpired holds on those rows count too, except the holds being
+    consumed. Returns False without changing anything when a limit would be
+    exceeded; the caller rolls back. With `record=False` the rows are only
+    locked and checked (holds, which are not counted).
+    """
+    slot_ids = list(slot_ids)
+    checked = occupancy_keys(db, slot_ids, direction)
+    if not checked:
+        return True
+
+    # Missing rows are created first, in key order like every counter write,
+    # so two writers never wait on each other crosswise.
+    change_object_occupancy(db, Counter(dict.fromkeys(checked, 0)))
+    current = Counter(_locked_counts(db, checked))
+    # Read once the rows are locked: every hold is placed under the same lock.
+    current.update(_held_counts(db, checked, exclude_hold_ids))
+    objects = {
+        o.id: o
+        for o in db.query(models.Object).filter(models.Object.id.in_({key[0] for key in checked})).all()
+    }
+    for key, count in checked.items():
+        obj = objects.get(key[0])
+        if obj is None:
+            continue
+        limit = obj.capacity_in if key[1] == models.BookingDirection.inbound else obj.capacity_out
+        if limit and limit > 0 and current.get(key, 0) + count > limit:
+            return False
+
+    if record:
+        change_object_occupancy(db, occupancy_keys(db, slot_ids))
+    return True
+
+
+def lock_free_slots(
+    db: Session,
+    slot_ids: Iterable[int],
+    exclude_booking_id: Optional[int] = None,
+    exclude_hold_ids: Iterable[int] = (),
+) -> bool:
+    """
+    Lock `slot_ids` (FOR UPDATE) and check they still have room for one more use per occurrence.
+
+    Bookings and unexpired holds already on the slots count, except the
+    booking being moved and the holds being consumed. Call it after
+    reserve_object_capacity: the allocation was made from a snapshot, and only
+    once the counters are locked (on SQLite, once the write lock is taken) do
+    concurrent writers to the same slots see each other.
+    """
+    needed = Counter(slot_ids)
+    capacities = {}
+    taken: Counter = Counter()
+    for batch in chunked(sorted(needed)):
+        capacities.update(
+            db.query(models.TimeSlot.id, models.TimeSlot.capacity)
+            .filter(models.TimeSlot.id.in_(batch))
+            .order_by(models.TimeSlot.id)
+            .with_for_update()
+        )
+        links = db.query(models.BookingTimeSlot.time_slot_id, func.count(models.BookingTimeSlot.id)).filter(
+            models.BookingTimeSlot.time_slot_id.in_(batch)
+        )
+        if exclude_booking_id is not None:
+            links = links.filter(models.BookingTimeSlot.booking_id != exclude_booking_id)
+        taken.update(dict(links.group_by(models.BookingTimeSlot.time_slot_id)))
+        taken.update(active_hold_counts(db, batch, exclude_hold_ids=exclude_hold_ids))
+    return all(taken[slot_id] + count <= capacities.get(slot_id, 0) for slot_id, count in needed.items())
+
+
+def release_object_capacity(db: Session, slot_ids: Iterable[int]) -> None:
+    """Take a confirmed booking on `slot_ids` off the counters (cancel, reschedule)."""
+    keys = occupancy_keys(db, slot_ids)
+    if keys:
+        change_object_occupancy(db, keys, sign=-1)
+
+
+def rebuild_object_occupancy(db: Session, object_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recount the counters of `object_ids` (all objects when None) from confirmed bookings.
+
+    Used after dock changes that move slots between objects or capacity
+    classes, and to repair counters written around the booking endpoints.
+    Returns the number of counter rows written.
+    """
+    links = db.query(models.BookingTimeSlot.time_slot_id).join(
+        models.Booking, models.Booking.id == models.BookingTimeSlot.booking_id
+    ).join(
+        models.TimeSlot, models.TimeSlot.id == models.BookingTimeSlot.time_slot_id
+    ).join(
+        models.Dock, models.Dock.id == models.TimeSlot.dock_id
+    ).filter(models.Booking.status == "confirmed")
+    stale = db.query(models.ObjectOccupancy)
+    if object_ids is not None:
+        object_ids = list(set(object_ids))
+        links = links.filter(models.Dock.object_id.in_(object_ids))
+        stale = stale.filter(models.ObjectOccupancy.object_id.in_(object_ids))
+
+    stale.delete(synchronize_session=False)
+    keys = occupancy_keys(db, [slot_id for slot_id, in links])
+    if keys:
+        change_object_occupancy(db, keys)
+    return len(keys)
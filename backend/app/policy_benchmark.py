@@ -0,0 +1,98 @@
+"""
+Allocation policy benchmark: bookings accepted per day on synthetic demand.
+
+Builds a layout of universal docks working 08:00-20:00 every day and a seeded
+stream of bookings at random 30-minute starts, then replays the same stream
+through the simulator once per allocation policy. Nothing touches the database.
+
+Run:
+    python -m app.policy_benchmark [--days 30] [--docks 8] [--bookings-per-day 120] [--seed 1]
+"""
+
+import argparse
+import json
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from . import models
+from .availability import BATCH_POLICIES
+from .simulation import Demand, Layout, Shift, SimDock, SimObject, simulate
+
+WORK_START = time(8, 0)
+WORK_END = time(20, 0)
+DURATIONS = (30, 60, 90, 120)
+
+
+def synthetic_layout(docks: int, capacity_in: Optional[int] = None) -> Layout:
+    shift = Shift(WORK_START, WORK_END)
+    return Layout(
+        object=SimObject(id=1, capacity_in=capacity_in),
+        docks=[
+            SimDock(
+                id=number,
+                name=f"Dock {number}",
+                object_id=1,
+                dock_type=models.DockType.universal,
+                schedules={weekday: shift for weekday in range(7)},
+            )
+            for number in range(1, docks + 1)
+        ],
+    )
+
+
+def synthetic_demand(from_date: date, days: int, per_day: int, seed: int) -> List[Demand]:
+    """`per_day` inbound bookings a day at random starts that end by WORK_END, in random arrival order."""
+    rng = random.Random(seed)
+    demand = []
+    for offset in range(days):
+        day = from_date + timedelta(days=offset)
+        for _ in range(per_day):
+            duration = rng.choice(DURATIONS)
+            latest = (WORK_END.hour * 60 - duration - WORK_START.hour * 60) // 30
+            start = datetime.combine(day, WORK_START) + timedelta(minutes=30 * rng.randint(0, latest))
+            demand.append(Demand(
+                booking_id=len(demand) + 1,
+                booking_date=day,
+                start_time=start.time(),
+                duration_minutes=duration,
+                direction=models.BookingDirection.inbound,
+            ))
+    return demand
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare allocation policies on synthetic demand.")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--docks", type=int, default=8)
+    parser.add_argument("--bookings-per-day", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--policy", action="append", choices=BATCH_POLICIES, help="Policies to run (default: all)")
+    parser.add_argument("--json", action="store_true", help="Print full results as JSON")
+    args = parser.parse_args(argv)
+
+    from_date = date(2026, 1, 5)
+    to_date = from_date + timedelta(days=args.days - 1)
+    layout = synthetic_layout(args.docks)
+    demand = synthetic_demand(from_date, args.days, args.bookings_per_day, args.seed)
+
+    results = []
+    for policy in args.policy or BATCH_POLICIES:
+        started = timer.perf_counter()
+        result = simulate(layout, demand, from_date, to_date, name=policy, policy=policy)
+        results.append((result, timer.perf_counter() - started))
+
+    if args.json:
+        print(json.dumps([dict(r.model_dump(exclude={"rejections"}), seconds=round(s, 3)) for r, s in results], indent=2))
+        return
+    print(f"{'policy':<12} {'bookings':>8} {'placed':>8} {'per day':>8} {'util':>7} {'stranded':>8} {'seconds':>8}")
+    for r, seconds in results:
+        print(
+            f"{r.policy:<12} {r.bookings:>8} {r.placed:>8} {r.placed / args.days:>8.1f} "
+            f"{r.utilization:>7.1%} {r.fragmentation.ratio:>8.1%} {seconds:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when an active admin sends it with the X-Profile: 1
+header (checked against the bearer token), or when it is picked by
+PROFILE_SAMPLE_RATE (0..1, default 0). Any other request only pays for one
+header lookup.
+
+Sync endpoints run in threadpool workers, out of reach of a cProfile started
+in the middleware, so the profiler samples the stacks of all threads every
+PROFILE_INTERVAL_MS instead and keeps the ones running through the matched
+endpoint, cut to start there. Concurrent requests to the same endpoint end up
+in the same profile.
+
+Each profile is a folded-stack file (one "frame;frame;... count" line per
+stack, readable by flamegraph.pl and speedscope) plus a JSON file with the
+route, method, status, duration and sample count, stored in PROFILE_DIR under
+the id returned in X-Profile-Id. The newest MAX_PROFILES are kept. Admins list
+and download them at /api/_debug/profiles.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from . import db as app_db
+from . import models
+from .security import decode_token
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "yms-profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_PROFILES = 200
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}T\d{12}_[0-9a-f]{8}$")
+
+
+class StackSampler:
+    """Counts the stacks of every other thread, sampled from a daemon thread until stop()."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or PROFILE_INTERVAL_SECONDS
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="yms-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+
+    def folded(self, root) -> tuple[list[str], int]:
+        """Folded lines of the stacks running through code object `root`, starting there, and their sample count."""
+        lines: Counter = Counter()
+        for stack, count in self.samples.items():
+            if root not in stack:
+                continue
+            frames = stack[stack.index(root):]
+            lines[";".join(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})" for code in frames)] += count
+        return [f"{stack} {count}" for stack, count in lines.most_common()], sum(lines.values())
+
+
+def _is_admin(headers: dict) -> bool:
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    payload = decode_token(token) if scheme.lower() == "bearer" and token else None
+    if not payload or "sub" not in payload:
+        return False
+    db = app_db.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == payload["sub"]).first()
+        return bool(user and user.is_active and user.role == models.UserRole.admin)
+    finally:
+        db.close()
+
+
+def _save(profile_id: str, lines: list[str], meta: dict) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + ("\n" if lines else ""))
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    for stale in list_profiles()[MAX_PROFILES:]:
+        for suffix in (".folded", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, stale["id"] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> list[dict]:
+    """Stored profile metadata, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        profile_id, ext = os.path.splitext(name)
+        if ext != ".json" or not PROFILE_ID_PATTERN.match(profile_id):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p["id"], reverse=True)
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """The folded-stack file of `profile_id`, or None for unknown (or malformed) ids."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        if not sampled and (b"x-profile", b"1") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+        if not sampled and not await run_in_threadpool(_is_admin, dict(scope["headers"])):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            seconds = time.perf_counter() - started
+            route = scope.get("route")
+            if route is not None:
+                lines, samples = sampler.folded(getattr(route.endpoint, "__code__", None))
+                await run_in_threadpool(_save, profile_id, lines, {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "route": route.path,
+                    "status": status,
+                    "duration_ms": round(seconds * 1000, 1),
+                    "samples": samples,
+                    "trigger": "sample" if sampled else "header",
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                })
@@ -0,0 +1,63 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+# Fallback order used to resolve a PRR duration, most specific rule first.
+# Each flag says whether supplier / transport type / vehicle type must match (False means the rule has NULL there).
+_DURATION_PRECEDENCE = (
+    (True, True, True),
+    (True, True, False),
+    (True, False, True),
+    (False, True, True),
+    (True, False, False),
+    (False, True, False),
+    (False, False, True),
+    (False, False, False),
+)
+
+
+class PrrDurationLookup:
+    """PRR rules keyed by (object, supplier, transport type, vehicle type), loaded with one query."""
+
+    def __init__(self, rules: Iterable):
+        self._rules: Dict[Tuple[int, Optional[int], Optional[int], Optional[int]], object] = {}
+        for rule in rules:
+            key = (rule.object_id, rule.supplier_id, rule.transport_type_id, rule.vehicle_type_id)
+            # NULL columns do not collide in the unique constraint, so keep the oldest row like .first() did.
+            self._rules.setdefault(key, rule)
+
+    @classmethod
+    def load(cls, db: Session, object_ids: Optional[Iterable[int]] = None) -> "PrrDurationLookup":
+        query = db.query(
+            models.PrrLimit.id,
+            models.PrrLimit.object_id,
+            models.PrrLimit.supplier_id,
+            models.PrrLimit.transport_type_id,
+            models.PrrLimit.vehicle_type_id,
+            models.PrrLimit.duration_minutes,
+        )
+        if object_ids is not None:
+            query = query.filter(models.PrrLimit.object_id.in_(list(object_ids)))
+        return cls(query.order_by(models.PrrLimit.id).all())
+
+    def get(self, object_id: int, supplier_id: Optional[int], transport_type_id: Optional[int], vehicle_type_id: Optional[int]):
+        return self._rules.get((object_id, supplier_id, transport_type_id, vehicle_type_id))
+
+    def resolve(self, object_id: int, supplier_id: Optional[int], transport_type_id: Optional[int], vehicle_type_id: Optional[int]):
+        for use_supplier, use_transport, use_vehicle in _DURATION_PRECEDENCE:
+            rule = self._rules.get((
+                object_id,
+                supplier_id if use_supplier else None,
+                transport_type_id if use_transport else None,
+                vehicle_type_id if use_vehicle else None,
+            ))
+            if rule is not None:
+                return rule
+        return None
+
+    def resolve_minutes(self, object_id: int, supplier_id: Optional[int], transport_type_id: Optional[int], vehicle_type_id: Optional[int]) -> Optional[int]:
+        rule = self.resolve(object_id, supplier_id, transport_type_id, vehicle_type_id)
+        return rule.duration_minutes if rule is not None else None
@@ -0,0 +1,125 @@
+"""
+Per-request SQL query counts and database time.
+
+Cursor events of every engine add to the QueryStats of the current request
+(a context variable, so the sync endpoints running in the threadpool count
+too); the middleware folds each request into per-route totals, served by
+/api/_debug/metrics. With QUERY_STATS_HEADERS=1 every response also carries
+its own numbers:
+
+    X-DB-Query-Count, X-DB-Time-Ms
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "").lower() in ("1", "true", "yes")
+
+# Statements are cut to this length in the slowest-statement reports.
+STATEMENT_PREVIEW_CHARS = 300
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str = ""
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement[:STATEMENT_PREVIEW_CHARS]
+
+
+@dataclass
+class RouteQueryStats:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    db_seconds: float = 0.0
+    request_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str = ""
+
+    def add(self, stats: QueryStats, request_seconds: float) -> None:
+        self.requests += 1
+        self.queries += stats.count
+        self.max_queries = max(self.max_queries, stats.count)
+        self.db_seconds += stats.seconds
+        self.request_seconds += request_seconds
+        if stats.slowest_seconds > self.slowest_seconds:
+            self.slowest_seconds = stats.slowest_seconds
+            self.slowest_statement = stats.slowest_statement
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_routes: dict[str, RouteQueryStats] = {}
+_routes_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_stats_started")
+    if stats is not None and started:
+        stats.add(statement, time.perf_counter() - started.pop())
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements executed in this context (and in threads started from it)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def route_key(request: Request) -> str:
+    """'METHOD /path/{template}' of the matched route; unmatched requests share one key."""
+    route = request.scope.get("route")
+    return f"{request.method} {route.path if route is not None else '<unmatched>'}"
+
+
+def record_route(key: str, stats: QueryStats, request_seconds: float) -> None:
+    with _routes_lock:
+        _routes.setdefault(key, RouteQueryStats()).add(stats, request_seconds)
+
+
+def route_stats(reset: bool = False) -> dict[str, RouteQueryStats]:
+    """A copy of the per-route totals, optionally clearing them."""
+    with _routes_lock:
+        snapshot = {key: RouteQueryStats(**vars(value)) for key, value in _routes.items()}
+        if reset:
+            _routes.clear()
+    return snapshot
+
+
+async def query_stats_middleware(request: Request, call_next):
+    started = time.perf_counter()
+    with track_queries() as stats:
+        response = await call_next(request)
+    record_route(route_key(request), stats, time.perf_counter() - started)
+    if QUERY_STATS_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.1f}"
+    return response
@@ -1,5 +1,5 @@
-from datetime import date
-from typing import Dict, Iterable, Tuple
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
@@ -137,6 +137,184 @@ def used_volume_by_date(
     return {row.slot_date: float(row.used or 0.0) for row in rows}
 
 
+class QuotaLedger:
+    """
+    Quota totals and used volume per (object, transport type, direction, date) for one request.
+
+    Lookups are memoized; preload() fills a whole date window for several objects
+    with two queries. Volume booked during the request is added with consume(),
+    so later allocations in the same request see it. Request-scoped like
+    AvailabilityIndex: other workers book against the same quotas.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._quotas: dict[tuple, Tuple[models.VolumeQuota | None, float | None]] = {}
+        self._used: dict[tuple, float] = {}
+
+    def preload(
+        self,
+        object_ids: Iterable[int],
+        transport_type_id: int | None,
+        direction: str | models.BookingDirection,
+        start_date: date,
+        end_date: date,
+    ) -> None:
+        object_ids = list(object_ids)
+        direction_enum = _resolve_direction(direction)
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        if not transport_type_id or not object_ids or not days:
+            for object_id in object_ids:
+                for day in days:
+                    self._quotas[(object_id, transport_type_id, direction_enum, day)] = (None, None)
+                    self._used[(object_id, transport_type_id, direction_enum, day)] = 0.0
+            return
+
+        quotas = (
+            self.db.query(models.VolumeQuota)
+            .join(models.VolumeQuota.transport_types)
+            .options(joinedload(models.VolumeQuota.overrides))
+            .filter(
+                models.VolumeQuota.object_id.in_(object_ids),
+                models.VolumeQuota.direction == direction_enum,
+                models.VolumeQuota.year.in_({d.year for d in days}),
+                models.TransportTypeRef.id == transport_type_id,
+            )
+            .order_by(models.VolumeQuota.id)
+            .all()
+        )
+        by_key: dict[tuple[int, int, int, int], models.VolumeQuota] = {}
+        for quota in quotas:
+            by_key.setdefault((quota.object_id, quota.year, quota.month, quota.day_of_week), quota)
+
+        booking_sub = (
+            self.db.query(
+                models.BookingTimeSlot.booking_id.label("booking_id"),
+                models.Dock.object_id.label("object_id"),
+                models.TimeSlot.slot_date.label("slot_date"),
+            )
+            .join(models.TimeSlot, models.BookingTimeSlot.time_slot_id == models.TimeSlot.id)
+            .join(models.Dock, models.TimeSlot.dock_id == models.Dock.id)
+            .join(models.Booking, models.Booking.id == models.BookingTimeSlot.booking_id)
+            .filter(
+                models.TimeSlot.slot_date >= start_date,
+                models.TimeSlot.slot_date <= end_date,
+                models.Dock.object_id.in_(object_ids),
+                models.Booking.transport_type_id == transport_type_id,
+                models.Booking.status == "confirmed",
+                models.Booking.booking_type == direction_enum,
+            )
+            .distinct()
+            .subquery()
+        )
+        used_rows = (
+            self.db.query(
+                booking_sub.c.object_id,
+                booking_sub.c.slot_date,
+                func.coalesce(func.sum(func.coalesce(models.Booking.cubes, 0.0)), 0.0),
+            )
+            .join(models.Booking, models.Booking.id == booking_sub.c.booking_id)
+            .group_by(booking_sub.c.object_id, booking_sub.c.slot_date)
+            .all()
+        )
+        used = {(object_id, slot_date): float(volume or 0.0) for object_id, slot_date, volume in used_rows}
+
+        for object_id in object_ids:
+            for day in days:
+                key = (object_id, transport_type_id, direction_enum, day)
+                quota = by_key.get((object_id, day.year, day.month, day.weekday()))
+                if quota is None:
+                    self._quotas[key] = (None, None)
+                else:
+                    override = next((ov for ov in quota.overrides if ov.override_date == day), None)
+                    self._quotas[key] = (quota, override.volume if override else quota.volume)
+                self._used[key] = used.get((object_id, day), 0.0)
+
+    def quota(
+        self,
+        object_id: int,
+        transport_type_id: int | None,
+        target_date: date,
+        direction: str | models.BookingDirection,
+    ) -> Tuple[models.VolumeQuota | None, float | None]:
+        key = (object_id, transport_type_id, _resolve_direction(direction), target_date)
+        if key not in self._quotas:
+            self._quotas[key] = get_quota_for_date(self.db, object_id, transport_type_id, target_date, key[2])
+        return self._quotas[key]
+
+    def used_volume(
+        self,
+        object_id: int,
+        transport_type_id: int | None,
+        target_date: date,
+        direction: str | models.BookingDirection,
+    ) -> float:
+        key = (object_id, transport_type_id, _resolve_direction(direction), target_date)
+        if key not in self._used:
+            self._used[key] = calculate_used_volume(self.db, object_id, transport_type_id, target_date, key[2])
+        return self._used[key]
+
+    def remaining(
+        self,
+        object_id: int,
+        transport_type_id: int | None,
+        target_date: date,
+        direction: str | models.BookingDirection,
+    ) -> Optional[float]:
+        """Volume left under the quota, or None when no quota applies."""
+        quota, total_volume = self.quota(object_id, transport_type_id, target_date, direction)
+        if not quota or total_volume is None:
+            return None
+        return total_volume - self.used_volume(object_id, transport_type_id, target_date, direction)
+
+    def consume(
+        self,
+        object_id: int,
+        transport_type_id: int | None,
+        target_date: date,
+        direction: str | models.BookingDirection,
+        cubes: float,
+    ) -> None:
+        key = (object_id, transport_type_id, _resolve_direction(direction), target_date)
+        self._used[key] = self.used_volume(object_id, transport_type_id, target_date, direction) + cubes
+
+
+QuotaKey = Tuple[int, Optional[int], date, models.BookingDirection]
+
+# Slack for comparing float volume sums added up in different orders.
+VOLUME_EPSILON = 1e-9
+
+
+def recheck_strict_quotas(db: Session, keys: Iterable[QuotaKey]) -> bool:
+    """
+    Lock the strict quotas behind the keys and recheck them against the volume booked.
+
+    A key is (object_id, transport_type_id, date, direction). Call it after the
+    transaction's own bookings are flushed: the quota rows without overbooking
+    are locked FOR UPDATE in id order, so writers on one quota take turns and
+    each counts the volume the earlier ones committed (SQLite holds the write
+    lock already). False if any of them is exceeded now.
+    """
+    strict: dict[QuotaKey, Tuple[int, float]] = {}
+    for key in set(keys):
+        quota, total_volume = get_quota_for_date(db, *key)
+        if quota is not None and total_volume is not None and not quota.allow_overbooking:
+            strict[key] = (quota.id, total_volume)
+    if not strict:
+        return True
+    (
+        db.query(models.VolumeQuota.id)
+        .filter(models.VolumeQuota.id.in_({quota_id for quota_id, _ in strict.values()}))
+        .order_by(models.VolumeQuota.id)
+        .with_for_update()
+        .all()
+    )
+    return all(
+        calculate_used_volume(db, *key) <= total_volume + VOLUME_EPSILON
+        for key, (_, total_volume) in strict.items()
+    )
+
+
 def first_by_predicate(items: Iterable[models.VolumeQuota], predicate) -> models.VolumeQuota | None:
     for item in items:
         if predicate(item):
@@ -0,0 +1,117 @@
+"""
+Concurrency benchmark of the read-heavy endpoints against a running server.
+
+Fires the read scenarios of app.benchmark (slot calendar, booking pages,
+analytics) from N concurrent clients for each --concurrency level and
+reports throughput and p50/p99 latency per level. Compare a server started
+with ASYNC_DB=0 against one started with ASYNC_DB=1 on the same database to
+see what the async read path buys under load.
+
+Run:
+    python -m app.seed_data --database-url sqlite:///yms-bench.db --scale small
+    DATABASE_URL=sqlite:///yms-bench.db ASYNC_DB=1 uvicorn app.main:app --port 8000
+    python -m app.read_concurrency --base-url http://localhost:8000 \\
+        --database-url sqlite:///yms-bench.db --concurrency 1 --concurrency 16 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time as timer
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .benchmark import SCENARIOS, BenchmarkContext, _percentile
+
+READ_SCENARIOS = ["list_time_slots", "bookings_page_first", "analytics_by_zone", "analytics_by_hour"]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+DEFAULT_REQUESTS = 200
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    requests: int
+    errors: int
+    per_second: float
+    p50_ms: float
+    p99_ms: float
+
+
+async def run_level(client_factory: Callable, ctx: BenchmarkContext, concurrency: int, requests: int, names: list[str], seed: int = 1) -> LevelResult:
+    """`requests` calls spread over `concurrency` workers, each cycling through the scenarios."""
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(number: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed * 1000 + number)
+        for call_number in remaining:
+            scenario = SCENARIOS[names[(number + call_number) % len(names)]]
+            started = timer.perf_counter()
+            response = await scenario.call(client, ctx, rng)
+            latencies.append((timer.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    async with client_factory() as client:
+        # One round before the clock starts, so connection setup is not measured.
+        await asyncio.gather(*(SCENARIOS[name].call(client, ctx, random.Random(seed)) for name in names))
+        started = timer.perf_counter()
+        await asyncio.gather(*(worker(number) for number in range(concurrency)))
+        seconds = timer.perf_counter() - started
+
+    return LevelResult(
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        per_second=round(len(latencies) / seconds, 1),
+        p50_ms=round(statistics.median(latencies), 1),
+        p99_ms=round(_percentile(latencies, 0.99), 1),
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput of the read endpoints under concurrent load.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database-url", required=True, help="SQLAlchemy URL of the server's database, filled by app.seed_data")
+    parser.add_argument("--concurrency", type=int, action="append", help=f"Concurrent clients; repeatable (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Requests per concurrency level")
+    parser.add_argument("--scenario", action="append", choices=READ_SCENARIOS, help="Scenarios to mix (default: all)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    with sessionmaker(bind=engine)() as db:
+        ctx = BenchmarkContext.load(db)
+    engine.dispose()
+
+    levels = args.concurrency or DEFAULT_CONCURRENCY
+    results = [
+        asyncio.run(run_level(
+            lambda: httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=httpx.Limits(max_connections=level)),
+            ctx, level, args.requests, args.scenario or READ_SCENARIOS, args.seed,
+        ))
+        for level in levels
+    ]
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(f"{'clients':>7} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for r in results:
+            print(f"{r.concurrency:>7} {r.requests:>8} {r.per_second:>8.1f} {r.p50_ms:>8.1f} {r.p99_ms:>8.1f} {r.errors:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from . import models
+from .allocation import Allocation, BookingAllocator, move_request
+from .occupancy import lock_free_slots, release_object_capacity, reserve_object_capacity
+
+
+@dataclass
+class Relocation:
+    booking: models.Booking
+    old_slots: List[models.TimeSlot]
+    allocation: Optional[Allocation] = None
+    detail: Optional[str] = None
+
+
+def plan_relocation(db: Session, dock: models.Dock, from_date: date, to_date: date) -> List[Relocation]:
+    """
+    New slots for the confirmed bookings on `dock` between the dates, on other docks of its object.
+
+    The maintenance window over the dates must already be on `dock` (unflushed
+    is fine), so the allocator finds no slots there. Every booking keeps its date and start time and goes
+    through the create_booking rules. Bookings are tried in start order through
+    one allocator; the ones that did not fit are retried while others keep
+    moving, as a moved booking may free object capacity. Booking rows are locked
+    until the transaction ends; nothing is written.
+    """
+    booking_ids = [
+        booking_id
+        for booking_id, in db.query(models.BookingTimeSlot.booking_id).join(
+            models.TimeSlot, models.TimeSlot.id == models.BookingTimeSlot.time_slot_id
+        ).join(
+            models.Booking, models.Booking.id == models.BookingTimeSlot.booking_id
+        ).filter(
+            models.TimeSlot.dock_id == dock.id,
+            models.TimeSlot.slot_date >= from_date,
+            models.TimeSlot.slot_date <= to_date,
+            models.Booking.status == "confirmed",
+        ).distinct()
+    ]
+    if not booking_ids:
+        return []
+
+    bookings = db.query(models.Booking).filter(models.Booking.id.in_(booking_ids)).with_for_update().populate_existing().all()
+    slots_by_booking: dict[int, list[models.TimeSlot]] = defaultdict(list)
+    for booking_id, slot in db.query(models.BookingTimeSlot.booking_id, models.TimeSlot).join(
+        models.TimeSlot, models.TimeSlot.id == models.BookingTimeSlot.time_slot_id
+    ).filter(
+        models.BookingTimeSlot.booking_id.in_(booking_ids)
+    ).order_by(models.TimeSlot.slot_date, models.TimeSlot.start_time):
+        slots_by_booking[booking_id].append(slot)
+
+    plans = sorted(
+        (Relocation(booking=b, old_slots=slots_by_booking[b.id]) for b in bookings),
+        key=lambda plan: (plan.old_slots[0].slot_date, plan.old_slots[0].start_time, plan.booking.id),
+    )
+    requests = {
+        plan.booking.id: move_request(
+            plan.booking,
+            dock.object_id,
+            plan.old_slots[0].slot_date.isoformat(),
+            plan.old_slots[0].start_time.strftime("%H:%M"),
+        )
+        for plan in plans
+    }
+    allocator = BookingAllocator(db)
+    allocator.preload(list(requests.values()))
+
+    pending = plans
+    while pending:
+        for plan in pending:
+            allocator.release_booking(plan.booking, dock.object_id, plan.old_slots)
+            try:
+                plan.allocation = allocator.allocate(requests[plan.booking.id])
+                plan.detail = None
+            except HTTPException as exc:
+                allocator.restore_booking(plan.booking, dock.object_id, plan.old_slots)
+                plan.detail = str(exc.detail)
+        still_pending = [plan for plan in pending if plan.allocation is None]
+        if len(still_pending) == len(pending):
+            break
+        pending = still_pending
+    return plans
+
+
+def apply_relocation(db: Session, plans: List[Relocation]) -> bool:
+    """
+    Move the links and object capacity counters of the placed bookings.
+
+    The new slots are locked and rechecked once the old links are gone, like
+    every booking write. Returns False when object or slot capacity was taken
+    concurrently; the caller rolls back.
+    """
+    moved = [plan for plan in plans if plan.allocation is not None]
+    if not moved:
+        return True
+
+    release_object_capacity(db, [s.id for plan in moved for s in plan.old_slots])
+    reserved: dict[models.BookingDirection, list[int]] = defaultdict(list)
+    for plan in moved:
+        reserved[plan.allocation.direction].extend(plan.allocation.chain.slot_ids)
+    for direction, slot_ids in reserved.items():
+        if not reserve_object_capacity(db, slot_ids, direction):
+            return False
+
+    db.query(models.BookingTimeSlot).filter(
+        models.BookingTimeSlot.booking_id.in_([plan.booking.id for plan in moved])
+    ).delete(synchronize_session=False)
+    if not lock_free_slots(db, [slot_id for plan in moved for slot_id in plan.allocation.chain.slot_ids]):
+        return False
+    now = datetime.utcnow()
+    for plan in moved:
+        db.add_all([models.BookingTimeSlot(booking_id=plan.booking.id, time_slot_id=slot_id) for slot_id in plan.allocation.chain.slot_ids])
+        plan.booking.updated_at = now
+    return True
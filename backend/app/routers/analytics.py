@@ -3,13 +3,14 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, cast, Date
 from datetime import date, datetime, time, timedelta
 from .. import models
-from ..db import get_db
-from ..deps import get_current_user
+from ..db import get_reports_db
+from ..deps import get_current_user, read_endpoint
 
 router = APIRouter()
 
 
 @router.get("/bookings-by-day")
+@read_endpoint
 def get_bookings_by_day(
     start_date: date,
     end_date: date,
@@ -18,7 +19,7 @@ def get_bookings_by_day(
     supplier_ids: list[int] | None = Query(default=None),
     object_id: int = None,
     dock_type: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """РџРѕР»СѓС‡РµРЅРёРµ СЃС‚Р°С‚РёСЃС‚РёРєРё РїРѕ РєРѕР»РёС‡РµСЃС‚РІСѓ Р·Р°РїРёСЃРµР№ Рё РєСѓР±РѕРІ РїРѕ РґРЅСЏРј"""
@@ -82,6 +83,7 @@ def get_bookings_by_day(
 
 
 @router.get("/bookings-by-zone")
+@read_endpoint
 def get_bookings_by_zone(
     start_date: date,
     end_date: date,
@@ -90,7 +92,7 @@ def get_bookings_by_zone(
     supplier_ids: list[int] | None = Query(default=None),
     object_id: int = None,
     dock_type: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """РџРѕР»СѓС‡РµРЅРёРµ СЃС‚Р°С‚РёСЃС‚РёРєРё РїРѕ РєРѕР»РёС‡РµСЃС‚РІСѓ Р·Р°РїРёСЃРµР№ Рё РєСѓР±РѕРІ РїРѕ Р·РѕРЅР°Рј"""
@@ -152,6 +154,7 @@ def get_bookings_by_zone(
 
 
 @router.get("/bookings-by-supplier")
+@read_endpoint
 def get_bookings_by_supplier(
     start_date: date,
     end_date: date,
@@ -160,7 +163,7 @@ def get_bookings_by_supplier(
     supplier_ids: list[int] | None = Query(default=None),
     object_id: int = None,
     dock_type: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Получение статистики по поставщикам (кол-во, кубы, доля)."""
@@ -228,6 +231,7 @@ def get_bookings_by_supplier(
 
 
 @router.get("/shift-dynamics")
+@read_endpoint
 def get_shift_dynamics(
     start_date: date,
     end_date: date,
@@ -236,7 +240,7 @@ def get_shift_dynamics(
     supplier_ids: list[int] | None = Query(default=None),
     object_id: int = None,
     dock_type: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Динамика записей и кубов по дневной и ночной сменам.
@@ -338,6 +342,7 @@ def get_shift_dynamics(
 
 
 @router.get("/bookings-by-hour")
+@read_endpoint
 def get_bookings_by_hour(
     start_date: date,
     end_date: date,
@@ -346,7 +351,7 @@ def get_bookings_by_hour(
     supplier_ids: list[int] | None = Query(default=None),
     object_id: int = None,
     dock_type: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Почасовая статистика в разрезе дата+час.
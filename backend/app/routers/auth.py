@@ -9,8 +9,8 @@ from ..db import get_db
 from .. import models, schemas
 from ..security import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from ..deps import get_current_user, get_current_admin
+from ..import_utils import ImportFileError, is_import_file, open_import_file
 from typing import List
-from openpyxl import Workbook, load_workbook
 
 router = APIRouter()
 
@@ -133,6 +133,7 @@ def delete_user_admin(user_id: int, db: Session = Depends(get_db), _: models.Use
 @router.get("/users/template")
 def download_user_template(_: models.User = Depends(get_current_admin)):
     """Provide Excel template for bulk user creation."""
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "users"
@@ -160,30 +161,27 @@ def import_users_from_excel(
     db: Session = Depends(get_db),
     _: models.User = Depends(get_current_admin),
 ):
-    if not file.filename.lower().endswith((".xlsx", ".xlsm")):
-        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an .xlsx file")
+    if not is_import_file(file.filename):
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an .xlsx or .csv file")
 
     try:
-        wb = load_workbook(filename=BytesIO(file.file.read()))
-    except Exception:
+        ws = open_import_file(file).active_sheet()
+    except ImportFileError:
         raise HTTPException(status_code=400, detail="Failed to read Excel file")
 
-    ws = wb.active
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
+    if ws.is_empty:
         raise HTTPException(status_code=400, detail="Excel file is empty")
 
-    headers = [str(h).strip().lower() if h else "" for h in rows[0]]
     expected = ["email", "password", "full_name", "role"]
-    if headers[: len(expected)] != expected:
+    if not ws.has_headers(expected, prefix=True):
         raise HTTPException(status_code=400, detail=f"Invalid headers. Expected {expected}")
 
     created = 0
     skipped = 0
     errors: List[str] = []
 
-    for idx, row in enumerate(rows[1:], start=2):
-        email, password, full_name, role_raw = row[:4]
+    for idx, row in ws.rows(expected):
+        email, password, full_name, role_raw = row
         if not email or not password or not full_name:
             skipped += 1
             errors.append(f"Row {idx}: missing required fields")
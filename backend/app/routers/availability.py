@@ -0,0 +1,121 @@
+from datetime import date, time, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
+
+from .. import models, schemas
+from ..availability import AvailabilityIndex, ChainFilters
+from ..db import get_db
+from ..deps import get_current_user
+from ..prr_utils import PrrDurationLookup
+from ..quota_utils import QuotaLedger
+
+router = APIRouter()
+
+MAX_SEARCH_DAYS = 31
+
+
+@router.get("/search", response_model=List[schemas.AvailabilityOption])
+def search_availability(
+    object_ids: List[int] = Query(..., description="Object ids to search; repeat the parameter for several objects"),
+    vehicle_type_id: int = Query(...),
+    from_date: date = Query(...),
+    to_date: Optional[date] = Query(None, description="Last date of the window, defaults to from_date"),
+    booking_type: str = Query("in", description="in|out"),
+    supplier_id: Optional[int] = None,
+    transport_type_id: Optional[int] = None,
+    cubes: Optional[float] = None,
+    not_before: Optional[time] = Query(None, description="Earliest start on from_date (HH:MM)"),
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    The `limit` earliest starts a booking with these parameters could get, with their dock.
+
+    Applies the rules of create_booking (PRR duration, supplier zone, dock
+    transport types, slot and object capacity, volume quotas) to occupancy and
+    quotas preloaded for the whole window, instead of trying bookings one by one.
+    Days where a quota applies are skipped when `cubes` is not given, as
+    create_booking would reject such a booking.
+    """
+    to_date = to_date or from_date
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date must be before to_date")
+    if (to_date - from_date).days >= MAX_SEARCH_DAYS:
+        raise HTTPException(status_code=400, detail=f"Search window is limited to {MAX_SEARCH_DAYS} days")
+    try:
+        direction = models.BookingDirection(booking_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="booking_type must be 'in' or 'out'")
+
+    object_ids = list(dict.fromkeys(object_ids))
+    objects = {o.id: o for o in db.query(models.Object).filter(models.Object.id.in_(object_ids)).all()}
+    if len(objects) != len(object_ids):
+        raise HTTPException(status_code=404, detail="Object not found")
+
+    vehicle_type = db.query(models.VehicleType).filter(models.VehicleType.id == vehicle_type_id).first()
+    if not vehicle_type:
+        raise HTTPException(status_code=404, detail="Vehicle type not found")
+
+    supplier_zone_id: int | None = None
+    if supplier_id:
+        supplier = db.query(models.Supplier).options(
+            joinedload(models.Supplier.vehicle_types),
+        ).filter(models.Supplier.id == supplier_id).first()
+        if not supplier:
+            raise HTTPException(status_code=404, detail="Supplier not found")
+        supplier_zone_id = supplier.zone_id
+        if supplier.vehicle_types and vehicle_type_id not in {vt.id for vt in supplier.vehicle_types}:
+            raise HTTPException(status_code=400, detail="Selected vehicle type is not allowed for this supplier")
+
+    durations = PrrDurationLookup.load(db, object_ids=object_ids)
+    filters = ChainFilters(direction=direction, supplier_zone_id=supplier_zone_id, transport_type_id=transport_type_id)
+    days = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+
+    index = AvailabilityIndex(db)
+    quotas = QuotaLedger(db)
+    quotas.preload(object_ids, transport_type_id, direction, from_date, to_date)
+    for object_id in object_ids:
+        # Chains may run past midnight into the day after the window.
+        index.ensure_loaded(object_id, days + [to_date + timedelta(days=1)])
+
+    options: list[schemas.AvailabilityOption] = []
+    for day in days:
+        day_options = []
+        for object_rank, object_id in enumerate(object_ids):
+            duration = durations.resolve_minutes(object_id, supplier_id, transport_type_id, vehicle_type_id)
+            if duration is None:
+                duration = vehicle_type.duration_minutes
+            if not duration or duration <= 0:
+                continue
+
+            quota, _ = quotas.quota(object_id, transport_type_id, day, direction)
+            remaining = quotas.remaining(object_id, transport_type_id, day, direction)
+            if quota is not None and remaining is not None:
+                if cubes is None:
+                    continue
+                if not quota.allow_overbooking and cubes > remaining:
+                    continue
+
+            start = not_before if (not_before and day == from_date) else time(0, 0)
+            chains = index.earliest_chains(object_id, day, start, duration, filters, limit=limit)
+            for chain_rank, chain in enumerate(chains):
+                day_options.append(((chain.slots[0].start_time, object_rank, chain_rank), schemas.AvailabilityOption(
+                    object_id=object_id,
+                    object_name=objects[object_id].name,
+                    dock_id=chain.dock.id,
+                    dock_name=chain.dock.name,
+                    booking_date=day.isoformat(),
+                    start_time=chain.slots[0].start_time.strftime("%H:%M"),
+                    end_time=chain.slots[-1].end_time.strftime("%H:%M"),
+                    duration_minutes=duration,
+                    time_slot_ids=chain.slot_ids,
+                    quota_remaining=remaining,
+                )))
+        day_options.sort(key=lambda item: item[0])
+        options.extend(option for _, option in day_options[: limit - len(options)])
+        if len(options) >= limit:
+            break
+    return options
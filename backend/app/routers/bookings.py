@@ -1,30 +1,54 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Body
+﻿from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Body, Header
 from fastapi.responses import StreamingResponse
 from dataclasses import dataclass, field
 from fastapi import Query
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, and_
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
+from functools import lru_cache
 from collections import defaultdict
 from datetime import date, datetime, timedelta, time, timezone
 import uuid
 import logging
 from .. import models, schemas
-from ..db import get_db
-from ..deps import get_current_user
-from .prr_limits import get_duration
-from ..quota_utils import calculate_used_volume, get_quota_for_date
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill
+from ..db import get_booking_write_db, get_db, get_reports_db
+from ..deps import get_current_user, read_endpoint
+from ..prr_utils import PrrDurationLookup
+from ..quota_utils import QuotaLedger, recheck_strict_quotas
+from ..import_utils import ImportFileError, cell_date, cell_number, is_import_file, open_import_file
+from ..availability import BATCH_POLICIES, AvailabilityIndex, ChainFilters, batch_policy
+from ..allocation import Allocation, BookingAllocator, move_request
+from ..holds import get_active_hold
+from ..idempotency import commit_remembered, find_replay, remember, request_hash, upload_hash
+from ..occupancy import lock_free_slots, release_object_capacity, reserve_object_capacity
+from ..metrics import BOOKING_PHASE_SECONDS, BatchTimer
+from ..tracing import capture_for, trace
 from io import BytesIO
 
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill
+
 router = APIRouter()
+OBJECT_CAPACITY_RACE_DETAIL = "Object capacity was taken by a concurrent booking, try again"
+SLOT_RACE_DETAIL = "Selected slots were taken by another booking, try again"
+QUOTA_RACE_DETAIL = "Quota volume was taken by a concurrent booking, try again"
 MSK_TZ = timezone(timedelta(hours=3))
 NOON_MSK = time(15, 0)
-EXPORT_RED_FILL = PatternFill(fill_type="solid", fgColor="FFFEE2E2")
-EXPORT_ORANGE_FILL = PatternFill(fill_type="solid", fgColor="FFFED7AA")
-EXPORT_YELLOW_FILL = PatternFill(fill_type="solid", fgColor="FFFEF9C3")
-EXPORT_SUMMARY_HEADER_FILL = PatternFill(fill_type="solid", fgColor="FFE0F2FE")
+EXPORT_RED_FILL = "FFFEE2E2"
+EXPORT_ORANGE_FILL = "FFFED7AA"
+EXPORT_YELLOW_FILL = "FFFEF9C3"
+EXPORT_SUMMARY_HEADER_FILL = "FFE0F2FE"
+
+
+@lru_cache(maxsize=None)
+def _export_fill(color: str) -> "PatternFill":
+    # openpyxl is imported by the export and import endpoints on first use, not at worker start.
+    from openpyxl.styles import PatternFill
+
+    return PatternFill(fill_type="solid", fgColor=color)
+
+
 OWN_PRODUCTION_REPORT_ROWS = [
     "Лопатина",
     "Почаевский",
@@ -108,9 +132,11 @@ def _append_report_matrix_table(ws, column_labels: list[str], values_by_date_and
     ordered_dates = sorted(values_by_date_and_column)
     header = ["Дата", *column_labels, "Общий итог"]
     ws.append(header)
+    from openpyxl.styles import Font
+
     for cell in ws[1]:
         cell.font = Font(bold=True)
-        cell.fill = EXPORT_SUMMARY_HEADER_FILL
+        cell.fill = _export_fill(EXPORT_SUMMARY_HEADER_FILL)
 
     grand_total_by_column = defaultdict(float)
     for report_date in ordered_dates:
@@ -137,7 +163,7 @@ def _append_report_matrix_table(ws, column_labels: list[str], values_by_date_and
         ws.column_dimensions[ws.cell(row=1, column=idx).column_letter].width = 18
 
 
-def _append_bookings_report_sheets(wb: Workbook, serialized_rows: list[dict]) -> None:
+def _append_bookings_report_sheets(wb: "Workbook", serialized_rows: list[dict]) -> None:
     report_columns = [*OWN_PRODUCTION_REPORT_ROWS, "Закупная"]
     values_by_date_and_column: dict[date, dict[str, float]] = defaultdict(lambda: defaultdict(float))
 
@@ -215,14 +241,6 @@ def get_booking_list_params(
         only_owner=only_owner,
     )
 
-def _dock_matches_supplier_zone(dock: models.Dock, supplier_zone_id: int | None) -> bool:
-    if supplier_zone_id is None:
-        return True
-    if not dock.available_zones:
-        return True
-    return any(zone.id == supplier_zone_id for zone in dock.available_zones)
-
-
 def _to_msk(created_at: datetime) -> datetime:
     if created_at.tzinfo is None:
         created_utc = created_at.replace(tzinfo=timezone.utc)
@@ -516,14 +534,14 @@ def _build_paginated_bookings_response(
     }
 
 
-def _resolve_export_row_fill(serialized: dict) -> PatternFill | None:
+def _resolve_export_row_fill(serialized: dict) -> "PatternFill | None":
     # Keep same priority as UI: red > orange > yellow.
     if bool(serialized.get("is_post_factum_msk")):
-        return EXPORT_RED_FILL
+        return _export_fill(EXPORT_RED_FILL)
     if bool(serialized.get("is_created_today_for_today_msk")):
-        return EXPORT_ORANGE_FILL
+        return _export_fill(EXPORT_ORANGE_FILL)
     if bool(serialized.get("is_after_noon_for_next_day_msk")):
-        return EXPORT_YELLOW_FILL
+        return _export_fill(EXPORT_YELLOW_FILL)
     return None
 
 
@@ -542,394 +560,9 @@ def _format_export_date(value: date | datetime | str | None) -> str:
         except ValueError:
             return value
 
-@router.post("/", response_model=schemas.Booking)
-def create_booking(booking: schemas.BookingCreateUpdated, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    """РЎРѕР·РґР°РЅРёРµ РЅРѕРІРѕР№ Р·Р°РїРёСЃРё РЅР° РџР Р  (РѕР±РЅРѕРІР»РµРЅРЅР°СЏ РІРµСЂСЃРёСЏ)"""
-    logging.info(f"--- create_booking START for user {current_user.id} ---")
-    logging.info(f"Received booking data: {booking.dict()}")
-
-    # Р’Р°Р»РёРґР°С†РёСЏ С‚РёРїР° С‚СЂР°РЅСЃРїРѕСЂС‚Р°
-    vehicle_type = db.query(models.VehicleType).filter(models.VehicleType.id == booking.vehicle_type_id).first()
-    if not vehicle_type:
-        raise HTTPException(status_code=404, detail="Vehicle type not found")
-    
-    obj = db.query(models.Object).filter(models.Object.id == booking.object_id).first()
-    if not obj:
-        raise HTTPException(status_code=404, detail="Object not found")
-
-    supplier_zone_id: int | None = None
-    if booking.supplier_id:
-        supplier = db.query(models.Supplier).options(
-            joinedload(models.Supplier.vehicle_types),
-            joinedload(models.Supplier.zone),
-        ).filter(models.Supplier.id == booking.supplier_id).first()
-        if not supplier:
-            raise HTTPException(status_code=404, detail="Supplier not found")
-        supplier_zone_id = supplier.zone_id
-
-        if booking.zone_id is not None and booking.zone_id != supplier_zone_id:
-            raise HTTPException(status_code=400, detail="Booking zone must match supplier zone")
-
-        if supplier.vehicle_types:
-            allowed_ids = {vt.id for vt in supplier.vehicle_types}
-            if booking.vehicle_type_id not in allowed_ids:
-                raise HTTPException(status_code=400, detail="Selected vehicle type is not allowed for this supplier")
-    
-    try:
-        duration = get_duration(
-            object_id=booking.object_id,
-            supplier_id=booking.supplier_id,
-            transport_type_id=booking.transport_type_id,
-            vehicle_type_id=booking.vehicle_type_id,
-            db=db
-        ).duration_minutes
-    except HTTPException as e:
-        if e.status_code == 404:
-            duration = vehicle_type.duration_minutes
-        else:
-            raise e
-
-    if duration <= 0:
-        raise HTTPException(status_code=400, detail="Invalid duration")
-    
-    # Р’С‹С‡РёСЃР»СЏРµРј С‚СЂРµР±СѓРµРјРѕРµ РєРѕР»РёС‡РµСЃС‚РІРѕ СЃР»РѕС‚РѕРІ
-    required_slots = duration // 30 + (1 if duration % 30 != 0 else 0)
-    logging.info(f"Calculated duration: {duration} mins, required_slots: {required_slots}")
-    
-    # РџР°СЂСЃРёРј РґР°С‚Сѓ Рё РІСЂРµРјСЏ РЅР°С‡Р°Р»Р°
-    booking_date = datetime.strptime(booking.booking_date, "%Y-%m-%d").date()
-    start_time = datetime.strptime(booking.start_time, "%H:%M").time()
-    next_date = booking_date + timedelta(days=1)  # РґРѕРїСѓСЃРєР°РµРј РїРµСЂРµС‚РµРєР°РЅРёРµ РЅР° СЃР»РµРґСѓСЋС‰РёР№ РґРµРЅСЊ
-    logging.info(f"Parsed booking_date: {booking_date}, start_time: {start_time}")
-
-    try:
-        booking_direction = models.BookingDirection(booking.booking_type or "in")
-    except Exception:
-        raise HTTPException(status_code=400, detail="booking_type must be 'in' or 'out'")
-
-    # РЎРЅР°С‡Р°Р»Р° РїСЂРѕРІРµСЂРёРј РІС‹Р±СЂР°РЅРЅС‹Р№ СЃР»РѕС‚, РµСЃР»Рё РїРµСЂРµРґР°РЅ
-    chosen_slots = None
-    if booking.time_slot_id:
-        logging.info(f"Attempting to book with specific time_slot_id: {booking.time_slot_id}")
-        initial_slot = db.query(models.TimeSlot).filter(models.TimeSlot.id == booking.time_slot_id).first()
-        
-        if initial_slot:
-            logging.info(f"Initial slot found: id={initial_slot.id}, available={initial_slot.is_available}, date={initial_slot.slot_date}, time={initial_slot.start_time}")
-        else:
-            logging.info("Initial slot not found.")
-
-        if initial_slot and initial_slot.is_available and initial_slot.slot_date == booking_date and initial_slot.start_time == start_time:
-            logging.info("Initial slot checks passed.")
-            # РџРѕР»СѓС‡Р°РµРј СЃР»РѕС‚С‹ РґР»СЏ СЌС‚РѕРіРѕ РґРѕРєР° РЅР°С‡РёРЅР°СЏ СЃ РІС‹Р±СЂР°РЅРЅРѕРіРѕ (СЂР°Р·СЂРµС€Р°РµРј СЃР»РµРґСѓСЋС‰РёР№ РґРµРЅСЊ)
-            dock_slots = db.query(models.TimeSlot).join(models.Dock).filter(
-                models.TimeSlot.dock_id == initial_slot.dock_id,
-                models.TimeSlot.slot_date.in_([booking_date, next_date]),
-                models.TimeSlot.is_available == True,
-                models.Dock.object_id == booking.object_id
-            ).order_by(models.TimeSlot.slot_date, models.TimeSlot.start_time).all()
-            logging.info(f"Found {len(dock_slots)} subsequent slots for the same dock (can span to next day).")
-
-            # РќР°Р№РґРµРј РёРЅРґРµРєСЃ РЅР°С‡Р°Р»СЊРЅРѕРіРѕ СЃР»РѕС‚Р°
-            start_index = None
-            for idx, slot in enumerate(dock_slots):
-                if slot.id == initial_slot.id:
-                    start_index = idx
-                    break
-            logging.info(f"Found start_index: {start_index}")
-
-            if start_index is not None and start_index + required_slots <= len(dock_slots):
-                logging.info("Sufficient subsequent slots found.")
-                candidate_chain = dock_slots[start_index:start_index + required_slots]
-                logging.info(f"Candidate chain of {len(candidate_chain)} slots: {[s.id for s in candidate_chain]}")
-
-                # РџСЂРѕРІРµСЂРёРј РЅРµРїСЂРµСЂС‹РІРЅРѕСЃС‚СЊ РїРѕ datetime (СѓС‡РёС‚С‹РІР°СЏ РїРµСЂРµС…РѕРґ РЅР° СЃР»РµРґСѓСЋС‰РёР№ РґРµРЅСЊ)
-                is_continuous = True
-                for j in range(len(candidate_chain) - 1):
-                    current_end = datetime.combine(candidate_chain[j].slot_date, candidate_chain[j].end_time)
-                    next_start = datetime.combine(candidate_chain[j + 1].slot_date, candidate_chain[j + 1].start_time)
-                    if current_end != next_start:
-                        is_continuous = False
-                        logging.info(
-                            f"Chain is not continuous at index {j}. Slot {candidate_chain[j].id} "
-                            f"ends at {current_end}, next slot {candidate_chain[j+1].id} starts at {next_start}"
-                        )
-                        break
-                
-                if is_continuous:
-                    logging.info("Chain is continuous.")
-                    # РџСЂРѕРІРµСЂРёРј Р»РёРјРёС‚С‹ РїСЂРѕРїСѓСЃРєРЅРѕР№ СЃРїРѕСЃРѕР±РЅРѕСЃС‚Рё РѕР±СЉРµРєС‚Р°
-                    dock = db.query(models.Dock).options(
-                        joinedload(models.Dock.available_zones)
-                    ).filter(models.Dock.id == initial_slot.dock_id).first()
-                    obj_for_check = dock.object if dock else None
-
-                    capacity_block = False
-                    if dock and obj_for_check:
-                        if not _dock_matches_supplier_zone(dock, supplier_zone_id):
-                            logging.info(
-                                f"Initial slot dock {dock.id} is not allowed for supplier zone {supplier_zone_id}."
-                            )
-                            capacity_block = True
-                        logging.info(f"Checking object capacity for object_id: {obj_for_check.id}")
-                        limits_to_check = []
-                        if dock.dock_type == models.DockType.entrance:
-                            limits_to_check.append(("in", obj_for_check.capacity_in, [models.DockType.entrance, models.DockType.universal]))
-                        elif dock.dock_type == models.DockType.exit:
-                            limits_to_check.append(("out", obj_for_check.capacity_out, [models.DockType.exit, models.DockType.universal]))
-                        else:  # universal -> РїСЂРѕРІРµСЂСЏРµРј Р»РёРјРёС‚ РІ Р·Р°РІРёСЃРёРјРѕСЃС‚Рё РѕС‚ С‚РёРїР° Р±СЂРѕРЅРёСЂРѕРІР°РЅРёСЏ
-                            if booking_direction == models.BookingDirection.inbound:
-                                limits_to_check.append(("in", obj_for_check.capacity_in, [models.DockType.entrance, models.DockType.universal]))
-                            elif booking_direction == models.BookingDirection.outbound:
-                                limits_to_check.append(("out", obj_for_check.capacity_out, [models.DockType.exit, models.DockType.universal]))
-                        
-                        logging.info(f"Limits to check: {limits_to_check}")
-
-                        for direction, cap_limit, types_to_use in limits_to_check:
-                            if not cap_limit or cap_limit <= 0:
-                                logging.info("No capacity limit set or limit is zero. Skipping check.")
-                                continue
-                            logging.info(f"Checking {direction} capacity. Limit: {cap_limit}")
-                            for slot in candidate_chain:
-                                occupancy_obj = db.query(func.count(models.BookingTimeSlot.id)).join(models.Booking, models.BookingTimeSlot.booking_id == models.Booking.id).join(
-                                    models.TimeSlot, models.BookingTimeSlot.time_slot_id == models.TimeSlot.id
-                                ).join(
-                                    models.Dock, models.TimeSlot.dock_id == models.Dock.id
-                                ).filter(
-                                    models.Dock.object_id == obj_for_check.id,
-                                    models.Dock.dock_type.in_(types_to_use),
-                                    models.TimeSlot.slot_date == slot.slot_date,
-                                    models.TimeSlot.start_time == slot.start_time,
-                                    models.TimeSlot.end_time == slot.end_time,
-                                    models.Booking.status == "confirmed"
-                                ).scalar() or 0
-                                logging.info(f"Slot {slot.id} ({slot.start_time}): Object occupancy is {occupancy_obj}")
-                                if occupancy_obj >= cap_limit:
-                                    capacity_block = True
-                                    logging.warning(f"Object capacity limit reached for slot {slot.id}. Occupancy ({occupancy_obj}) >= Limit ({cap_limit})")
-                                    break
-                            if capacity_block:
-                                break
-
-                    if not capacity_block:
-                        logging.info("Object capacity check passed.")
-                        # РџСЂРѕРІРµСЂРёРј РґРѕСЃС‚СѓРїРЅРѕСЃС‚СЊ
-                        all_available = True
-                        for slot in candidate_chain:
-                            current_occupancy = db.query(func.count(models.BookingTimeSlot.id)).filter(
-                                models.BookingTimeSlot.time_slot_id == slot.id
-                            ).scalar() or 0
-                            logging.info(f"Slot {slot.id}: current_occupancy={current_occupancy}, capacity={slot.capacity}")
-                            if current_occupancy >= slot.capacity:
-                                all_available = False
-                                logging.warning(f"Slot capacity limit reached for slot {slot.id}. Occupancy ({current_occupancy}) >= Capacity ({slot.capacity})")
-                                break
-
-                        if all_available:
-                            logging.info("Slot capacity check passed. Setting chosen_slots.")
-                            chosen_slots = candidate_chain
-                        else:
-                            logging.warning("Slot capacity check failed.")
-                    else:
-                        logging.warning("Object capacity check failed.")
-                else:
-                    logging.warning("Continuity check failed.")
-            else:
-                logging.warning("Not enough subsequent slots available in dock_slots.")
-        else:
-            logging.warning("Initial slot check failed (is_available, date, or time mismatch).")
-
-    logging.info(f"Value of chosen_slots after specific slot check: {[s.id for s in chosen_slots] if chosen_slots else 'None'}")
-
-    # Р•СЃР»Рё РІС‹Р±СЂР°РЅРЅС‹Р№ СЃР»РѕС‚ РЅРµ РїРѕРґРѕС€РµР», РёС‰РµРј Р»СЋР±РѕР№ РґРѕСЃС‚СѓРїРЅС‹Р№
-    if not chosen_slots:
-        logging.info("Specific slot not booked. Searching for any available slot.")
-        # РќР°С…РѕРґРёРј РґРѕСЃС‚СѓРїРЅС‹Рµ СЃР»РѕС‚С‹
-        available_slots = db.query(models.TimeSlot).join(models.Dock).filter(
-            models.TimeSlot.slot_date.in_([booking_date, next_date]),
-            models.TimeSlot.is_available == True,
-            models.Dock.object_id == booking.object_id
-        ).filter(
-            (models.TimeSlot.slot_date > booking_date) | (models.TimeSlot.start_time >= start_time)
-        ).order_by(models.TimeSlot.slot_date, models.TimeSlot.start_time).all()
-        logging.info(f"Found {len(available_slots)} total available slots for the object (spanning start and next day).")
-    else:
-        available_slots = []
-
-    # Р“СЂСѓРїРїРёСЂСѓРµРј СЃР»РѕС‚С‹ РїРѕ РґРѕРєР°Рј
-    slots_by_dock = {}
-    for slot in available_slots:
-        if slot.dock_id not in slots_by_dock:
-            slots_by_dock[slot.dock_id] = []
-        slots_by_dock[slot.dock_id].append(slot)
-
-    dock_ids = list(slots_by_dock.keys())
-    docks_from_db = (
-        db.query(models.Dock).options(
-            joinedload(models.Dock.available_transport_types),
-            joinedload(models.Dock.available_zones),
-        ).filter(models.Dock.id.in_(dock_ids)).all() if dock_ids else []
-    )
-    dock_map = {d.id: d for d in docks_from_db}
-
-    # РЎРѕСЂС‚РёСЂСѓРµРј РґРѕРєРё РїРѕ РїСЂРёРѕСЂРёС‚РµС‚Сѓ РІ Р·Р°РІРёСЃРёРјРѕСЃС‚Рё РѕС‚ С‚РёРїР° Р±СЂРѕРЅРёСЂРѕРІР°РЅРёСЏ
-    def sort_key(dock_id):
-        dock = dock_map.get(dock_id)
-        if not dock:
-            return 3 # Should not happen
-        
-        if booking_direction == models.BookingDirection.outbound:
-            if dock.dock_type == models.DockType.exit:
-                return 0
-            if dock.dock_type == models.DockType.universal:
-                return 1
-        elif booking_direction == models.BookingDirection.inbound:
-            if dock.dock_type == models.DockType.entrance:
-                return 0
-            if dock.dock_type == models.DockType.universal:
-                return 1
-        return 2 # Other types last
-
-    sorted_dock_ids = sorted(dock_ids, key=sort_key)
-    logging.info(f"Searching docks in order: {sorted_dock_ids}")
-    
-    # РС‰РµРј РїРѕРґС…РѕРґСЏС‰СѓСЋ С†РµРїРѕС‡РєСѓ СЃР»РѕС‚РѕРІ
-    if not chosen_slots: # Ensure chosen_slots is explicitly reset if the first block failed
-        chosen_slots = None 
-    for dock_id in sorted_dock_ids:
-        logging.info(f"--- Checking Dock ID: {dock_id} ---")
-        dock_slots = slots_by_dock[dock_id]
-        # РЎРѕСЂС‚РёСЂСѓРµРј СЃР»РѕС‚С‹ РїРѕ РґР°С‚Рµ Рё РІСЂРµРјРµРЅРё, С‡С‚РѕР±С‹ РєРѕСЂСЂРµРєС‚РЅРѕ РѕР±СЂР°Р±Р°С‚С‹РІР°С‚СЊ РїРµСЂРµС…РѕРґ С‡РµСЂРµР· СЃСѓС‚РєРё
-        dock_slots.sort(key=lambda x: (x.slot_date, x.start_time))
-        
-        dock = dock_map.get(dock_id)
-        obj = dock.object if dock else None
-
-        # РџСЂРѕРїСѓСЃРєР°РµРј РґРѕРєРё РЅРµРїРѕРґС…РѕРґСЏС‰РµРіРѕ С‚РёРїР°
-        if booking_direction == models.BookingDirection.inbound and dock and dock.dock_type == models.DockType.exit:
-            logging.info(f"Skipping dock {dock_id}: type is 'exit' for an 'in' booking.")
-            continue
-        if booking_direction == models.BookingDirection.outbound and dock and dock.dock_type == models.DockType.entrance:
-            logging.info(f"Skipping dock {dock_id}: type is 'entrance' for an 'out' booking.")
-            continue
-        if dock and not _dock_matches_supplier_zone(dock, supplier_zone_id):
-            logging.info(f"Skipping dock {dock_id}: not allowed for supplier zone {supplier_zone_id}.")
-            continue
-        
-        # РџСЂРѕРІРµСЂСЏРµРј, СЂР°Р·СЂРµС€РµРЅ Р»Рё С‚РёРї РїРµСЂРµРІРѕР·РєРё РґР»СЏ СЌС‚РѕРіРѕ РґРѕРєР°
-        if booking.transport_type_id and dock and dock.available_transport_types:
-            allowed_transport_ids = {t.id for t in dock.available_transport_types}
-            if booking.transport_type_id not in allowed_transport_ids:
-                logging.info(f"Skipping dock {dock_id}: transport_type_id {booking.transport_type_id} not allowed.")
-                continue # РџРµСЂРµС…РѕРґРёРј Рє СЃР»РµРґСѓСЋС‰РµРјСѓ РґРѕРєСѓ
-
-        # РС‰РµРј СЃР»РѕС‚С‹ СЃС‚СЂРѕРіРѕ РЅР°С‡РёРЅР°СЏ СЃ Р·Р°РїСЂРѕС€РµРЅРЅРѕРіРѕ РІСЂРµРјРµРЅРё; РґРѕРїСѓСЃРєР°РµРј РїРµСЂРµСЂС‹РІС‹ РІ СЂР°СЃРїРёСЃР°РЅРёРё,
-        # РЅРѕ РЅРµ РґРѕРїСѓСЃРєР°РµРј Р·Р°РЅСЏС‚С‹Рµ СЃР»РѕС‚С‹ (capacity) РІ СЃРµСЂРµРґРёРЅРµ С†РµРїРѕС‡РєРё.
-        start_idx = next((idx for idx, s in enumerate(dock_slots) if s.slot_date == booking_date and s.start_time == start_time), None)
-        if start_idx is None:
-            logging.info(f"No starting slot at {start_time} in dock {dock_id}. Skipping dock.")
-            continue
-
-        accumulated_minutes = 0
-        candidate_chain = []
-        valid_dock = True
-
-        for slot in dock_slots[start_idx:]:
-            # РџСЂРѕРІРµСЂСЏРµРј Р»РёРјРёС‚С‹ РїСЂРѕРїСѓСЃРєРЅРѕР№ СЃРїРѕСЃРѕР±РЅРѕСЃС‚Рё РѕР±СЉРµРєС‚Р° РїРѕ РЅР°РїСЂР°РІР»РµРЅРёСЋ
-            if dock and obj:
-                limits_to_check = []
-                if dock.dock_type == models.DockType.entrance:
-                    limits_to_check.append(("in", obj.capacity_in, [models.DockType.entrance, models.DockType.universal]))
-                elif dock.dock_type == models.DockType.exit:
-                    limits_to_check.append(("out", obj.capacity_out, [models.DockType.exit, models.DockType.universal]))
-                else:  # universal
-                    if booking_direction == models.BookingDirection.inbound:
-                        limits_to_check.append(("in", obj.capacity_in, [models.DockType.entrance, models.DockType.universal]))
-                    elif booking_direction == models.BookingDirection.outbound:
-                        limits_to_check.append(("out", obj.capacity_out, [models.DockType.exit, models.DockType.universal]))
-
-                capacity_block = False
-                for _, cap_limit, types_to_use in limits_to_check:
-                    if not cap_limit or cap_limit <= 0:
-                        continue
-                    occupancy_obj = db.query(func.count(models.BookingTimeSlot.id)).join(models.Booking, models.BookingTimeSlot.booking_id == models.Booking.id).join(
-                        models.TimeSlot, models.BookingTimeSlot.time_slot_id == models.TimeSlot.id
-                    ).join(
-                        models.Dock, models.TimeSlot.dock_id == models.Dock.id
-                    ).filter(
-                        models.Dock.object_id == obj.id,
-                        models.Dock.dock_type.in_(types_to_use),
-                        models.TimeSlot.slot_date == slot.slot_date,
-                        models.TimeSlot.start_time == slot.start_time,
-                        models.TimeSlot.end_time == slot.end_time,
-                        models.Booking.status == "confirmed"
-                    ).scalar() or 0
-                    if occupancy_obj >= cap_limit:
-                        capacity_block = True
-                        break
-                if capacity_block:
-                    logging.info(f"Object capacity block for slot {slot.id} in dock {dock_id}.")
-                    valid_dock = False
-                    break
-
-            # РџСЂРѕРІРµСЂСЏРµРј Р·Р°РЅСЏС‚РѕСЃС‚СЊ СЃР»РѕС‚Р°
-            current_occupancy = db.query(func.count(models.BookingTimeSlot.id)).filter(
-                models.BookingTimeSlot.time_slot_id == slot.id
-            ).scalar() or 0
-            if current_occupancy >= slot.capacity:
-                logging.info(f"Slot {slot.id} in dock {dock_id} is fully occupied. Dock rejected.")
-                valid_dock = False
-                break
-
-            candidate_chain.append(slot)
-            slot_minutes = int((datetime.combine(slot.slot_date, slot.end_time) - datetime.combine(slot.slot_date, slot.start_time)).total_seconds() // 60)
-            accumulated_minutes += slot_minutes
-
-            if accumulated_minutes >= duration:
-                chosen_slots = candidate_chain
-                logging.info(f"Accumulated required duration in dock {dock_id}. Slots: {[s.id for s in candidate_chain]}")
-                break
-
-        if chosen_slots:
-            break
-        if not valid_dock:
-            logging.info(f"Dock {dock_id} rejected due to occupied slot or capacity block.")
-            continue
-    
-    if not chosen_slots:
-        logging.error("--- No suitable slots found. Raising 409 Conflict. ---")
-        raise HTTPException(
-            status_code=409, 
-            detail="РќР° Р·Р°РїСЂРѕС€РµРЅРЅС‹Р№ РїРµСЂРёРѕРґ РЅРµ РЅР°Р№РґРµРЅРѕ РґРѕСЃС‚СѓРїРЅС‹С… РІСЂРµРјРµРЅРЅС‹С… СЃР»РѕС‚РѕРІ"
-        )
-
-    quota, total_quota_volume = get_quota_for_date(
-        db=db,
-        object_id=booking.object_id,
-        transport_type_id=booking.transport_type_id,
-        target_date=booking_date,
-        direction=booking_direction,
-    )
-    if quota and total_quota_volume is not None:
-        if booking.cubes is None:
-            raise HTTPException(status_code=400, detail="Volume (cubes) is required because a quota applies on this date")
-        used_volume = calculate_used_volume(
-            db=db,
-            object_id=booking.object_id,
-            transport_type_id=booking.transport_type_id,
-            target_date=booking_date,
-            direction=booking_direction,
-        )
-        remaining_volume = total_quota_volume - used_volume
-        if not quota.allow_overbooking and booking.cubes > remaining_volume:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Quota exceeded for {booking_date}. Remaining: {remaining_volume}, requested: {booking.cubes}",
-            )
-    
-    logging.info(f"--- Booking successful. Creating booking with slots: {[s.id for s in chosen_slots]} ---")
-    # РЎРѕР·РґР°РµРј Р·Р°РїРёСЃСЊ
-    new_booking = models.Booking(
-        user_id=current_user.id,
+def _new_booking(booking: schemas.BookingCreateUpdated, allocation: Allocation, user: models.User) -> models.Booking:
+    return models.Booking(
+        user_id=user.id,
         vehicle_type_id=booking.vehicle_type_id,
         vehicle_plate=booking.vehicle_plate or "",
         driver_full_name=booking.driver_full_name or "",
@@ -940,26 +573,155 @@ def create_booking(booking: schemas.BookingCreateUpdated, db: Session = Depends(
         transport_type_id=booking.transport_type_id,
         cubes=booking.cubes,
         transport_sheet=booking.transport_sheet,
-        booking_type=booking_direction,
+        booking_type=allocation.direction,
+        booking_slots=[models.BookingTimeSlot(time_slot_id=slot.id) for slot in allocation.chain.slots],
     )
-    db.add(new_booking)
-    db.flush()  # РџРѕР»СѓС‡Р°РµРј ID
-    
-    # РЎРѕР·РґР°РµРј СЃРІСЏР·Рё СЃ РІСЂРµРјРµРЅРЅС‹РјРё СЃР»РѕС‚Р°РјРё
-    for slot in chosen_slots:
-        booking_slot = models.BookingTimeSlot(
-            booking_id=new_booking.id,
-            time_slot_id=slot.id
+
+
+@router.post("/", response_model=schemas.Booking)
+def create_booking(
+    booking: schemas.BookingCreateUpdated,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_booking_write_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """РЎРѕР·РґР°РЅРёРµ РЅРѕРІРѕР№ Р·Р°РїРёСЃРё РЅР° РџР Р  (РѕР±РЅРѕРІР»РµРЅРЅР°СЏ РІРµСЂСЃРёСЏ)"""
+    capture_for(current_user)
+    trace("create_booking.start", user_id=current_user.id, booking=booking.model_dump)
+
+    fingerprint = request_hash(booking) if idempotency_key else ""
+    replay = find_replay(db, current_user, "booking_create", idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+
+    hold = get_active_hold(db, booking.hold_id, current_user, booking.object_id) if booking.hold_id else None
+    allocation = BookingAllocator(db).allocate(booking, hold=hold)
+
+    trace("create_booking.allocated", dock_id=allocation.chain.dock.id, slot_ids=lambda: allocation.chain.slot_ids)
+    with BOOKING_PHASE_SECONDS.time(phase="object_capacity"):
+        reserved = reserve_object_capacity(
+            db, allocation.chain.slot_ids, allocation.direction, exclude_hold_ids=[hold.id] if hold is not None else [],
         )
-        db.add(booking_slot)
-    
-    db.commit()
-    db.refresh(new_booking)
+    if not reserved:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=OBJECT_CAPACITY_RACE_DETAIL)
+    if not lock_free_slots(db, allocation.chain.slot_ids, exclude_hold_ids=[hold.id] if hold is not None else []):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=SLOT_RACE_DETAIL)
+    with BOOKING_PHASE_SECONDS.time(phase="commit"):
+        new_booking = _new_booking(booking, allocation, current_user)
+        if hold is not None:
+            db.delete(hold)
+        db.add(new_booking)
+        db.flush()
+        quota_key = (booking.object_id, booking.transport_type_id, allocation.booking_date, allocation.direction)
+        if allocation.quota_applies and not recheck_strict_quotas(db, [quota_key]):
+            db.rollback()
+            raise HTTPException(status_code=409, detail=QUOTA_RACE_DETAIL)
+        if idempotency_key:
+            remember(db, current_user, "booking_create", idempotency_key, fingerprint, schemas.Booking.model_validate(new_booking))
+        replay = commit_remembered(db, current_user, "booking_create", idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+        db.refresh(new_booking)
     return new_booking
+
+
+MAX_BATCH_BOOKINGS = 500
+
+
+@router.post("/batch", response_model=schemas.BookingBatchResult)
+def create_bookings_batch(
+    payload: schemas.BookingBatchCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_booking_write_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Create many bookings in one transaction.
+
+    Every item goes through the create_booking rules against one shared
+    snapshot, in request order, so later items see the slots and quota volume
+    taken by earlier ones. In `atomic` mode nothing is written if any item
+    fails; in `best_effort` mode the items that fit are created.
+    """
+    if payload.mode not in ("atomic", "best_effort"):
+        raise HTTPException(status_code=400, detail="mode must be 'atomic' or 'best_effort'")
+    if not payload.bookings:
+        raise HTTPException(status_code=400, detail="No bookings given")
+    if len(payload.bookings) > MAX_BATCH_BOOKINGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_BOOKINGS} bookings per batch")
+
+    fingerprint = request_hash(payload) if idempotency_key else ""
+    replay = find_replay(db, current_user, "booking_batch", idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+
+    capture_for(current_user)
+    allocator = BookingAllocator(db)
+    allocator.preload(payload.bookings)
+
+    results: list[schemas.BookingBatchItemResult] = []
+    placed: list[tuple[schemas.BookingBatchItemResult, models.Booking]] = []
+    consumed_holds: list[models.SlotHold] = []
+    reserved: dict[models.BookingDirection, list[int]] = defaultdict(list)
+    quota_keys = set()
+    for index, item in enumerate(payload.bookings):
+        try:
+            hold = get_active_hold(db, item.hold_id, current_user, item.object_id) if item.hold_id else None
+            if hold is not None and any(h.id == hold.id for h in consumed_holds):
+                raise HTTPException(status_code=409, detail="Hold is already used by another item of this batch")
+            allocation = allocator.allocate(item, hold=hold)
+        except HTTPException as exc:
+            results.append(schemas.BookingBatchItemResult(index=index, status="failed", status_code=exc.status_code, detail=str(exc.detail)))
+            continue
+        result = schemas.BookingBatchItemResult(index=index, status="created", status_code=200, time_slot_ids=allocation.chain.slot_ids)
+        results.append(result)
+        placed.append((result, _new_booking(item, allocation, current_user)))
+        reserved[allocation.direction].extend(allocation.chain.slot_ids)
+        if allocation.quota_applies:
+            quota_keys.add((item.object_id, item.transport_type_id, allocation.booking_date, allocation.direction))
+        if hold is not None:
+            consumed_holds.append(hold)
+
+    failed = len(results) - len(placed)
+    if payload.mode == "atomic" and failed:
+        for result, _ in placed:
+            result.status = "not_created"
+            result.status_code = None
+        return schemas.BookingBatchResult(mode=payload.mode, created=0, failed=failed, results=results)
+
+    if placed:
+        consumed_hold_ids = [hold.id for hold in consumed_holds]
+        for direction, slot_ids in reserved.items():
+            if not reserve_object_capacity(db, slot_ids, direction, exclude_hold_ids=consumed_hold_ids):
+                db.rollback()
+                raise HTTPException(status_code=409, detail=OBJECT_CAPACITY_RACE_DETAIL)
+        batch_slot_ids = [slot_id for slot_ids in reserved.values() for slot_id in slot_ids]
+        if not lock_free_slots(db, batch_slot_ids, exclude_hold_ids=consumed_hold_ids):
+            db.rollback()
+            raise HTTPException(status_code=409, detail=SLOT_RACE_DETAIL)
+        for hold in consumed_holds:
+            db.delete(hold)
+        db.add_all([booking for _, booking in placed])
+        db.flush()
+        if not recheck_strict_quotas(db, quota_keys):
+            db.rollback()
+            raise HTTPException(status_code=409, detail=QUOTA_RACE_DETAIL)
+        for result, booking in placed:
+            result.booking_id = booking.id
+    response = schemas.BookingBatchResult(mode=payload.mode, created=len(placed), failed=failed, results=results)
+    if placed:
+        # Only batches that wrote something are replayed; the others may succeed on retry.
+        remember(db, current_user, "booking_batch", idempotency_key, fingerprint, response)
+        replay = commit_remembered(db, current_user, "booking_batch", idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+    return response
 @router.put("/{booking_id}/cancel")
 def cancel_booking(
     booking_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_booking_write_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """РћС‚РјРµРЅРёС‚СЊ Р·Р°РїРёСЃСЊ"""
@@ -976,6 +738,10 @@ def cancel_booking(
     
     booking.status = "cancelled"
     booking.updated_at = datetime.utcnow()
+    release_object_capacity(db, [
+        link.time_slot_id
+        for link in db.query(models.BookingTimeSlot.time_slot_id).filter(models.BookingTimeSlot.booking_id == booking_id)
+    ])
     
     # РЈРґР°Р»СЏРµРј СЃРІСЏР·Рё СЃ РІСЂРµРјРµРЅРЅС‹РјРё СЃР»РѕС‚Р°РјРё, С‡С‚РѕР±С‹ РѕРЅРё СЃРЅРѕРІР° СЃС‚Р°Р»Рё РґРѕСЃС‚СѓРїРЅС‹
     db.query(models.BookingTimeSlot).filter(
@@ -987,6 +753,7 @@ def cancel_booking(
     return {"message": "Booking cancelled successfully"}
 
 @router.get("/all", response_model=schemas.BookingListPage)
+@read_endpoint
 def get_all_bookings(
     params: BookingListParams = Depends(get_booking_list_params),
     db: Session = Depends(get_db),
@@ -1001,6 +768,7 @@ def get_all_bookings(
 
 
 @router.get("/my", response_model=schemas.BookingListPage)
+@read_endpoint
 def get_my_bookings(
     params: BookingListParams = Depends(get_booking_list_params),
     db: Session = Depends(get_db),
@@ -1015,12 +783,13 @@ def export_bookings_xlsx(
     booking_ids: Optional[List[int]] = Body(None),
     variant: str = "default",
     params: BookingListParams = Depends(get_booking_list_params),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """Р­РєСЃРїРѕСЂС‚ РІС‹Р±СЂР°РЅРЅС‹С… Р±СЂРѕРЅРёСЂРѕРІР°РЅРёР№ РІ XLSX."""
     if variant not in {"default", "start-end"}:
         raise HTTPException(status_code=400, detail="Unsupported export variant")
+    timer = BatchTimer("booking_export")
 
     if booking_ids:
         unique_ids = list(dict.fromkeys(booking_ids))
@@ -1049,6 +818,8 @@ def export_bookings_xlsx(
     booking_by_id = {b.id: b for b in bookings}
     serialized_by_id = _serialize_bookings_bulk(db, bookings, include_user=True)
 
+    from openpyxl import Workbook
+
     wb = Workbook()
     ws = wb.active
     ws.title = "bookings"
@@ -1167,9 +938,9 @@ def export_bookings_xlsx(
         for col_idx, value in enumerate(row, start=1):
             legend_ws.cell(row=row_idx, column=col_idx, value=value)
 
-    legend_ws.cell(row=2, column=1).fill = EXPORT_RED_FILL
-    legend_ws.cell(row=3, column=1).fill = EXPORT_ORANGE_FILL
-    legend_ws.cell(row=4, column=1).fill = EXPORT_YELLOW_FILL
+    legend_ws.cell(row=2, column=1).fill = _export_fill(EXPORT_RED_FILL)
+    legend_ws.cell(row=3, column=1).fill = _export_fill(EXPORT_ORANGE_FILL)
+    legend_ws.cell(row=4, column=1).fill = _export_fill(EXPORT_YELLOW_FILL)
 
     if variant_headers:
         ws.delete_cols(12, 3)
@@ -1177,6 +948,7 @@ def export_bookings_xlsx(
     buf = BytesIO()
     wb.save(buf)
     buf.seek(0)
+    timer.done(ws.max_row - 1)
 
     filename_prefix = "my_bookings_start_end_export" if variant == "start-end" else "my_bookings_export"
     filename = f"{filename_prefix}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
@@ -1190,7 +962,7 @@ def export_bookings_xlsx(
 def update_transport_sheet(
     booking_id: int,
     payload: schemas.BookingTransportSheetUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_booking_write_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """РћР±РЅРѕРІРёС‚СЊ С‚СЂР°РЅСЃРїРѕСЂС‚РЅС‹Р№ Р»РёСЃС‚ РґР»СЏ Р±СЂРѕРЅРё"""
@@ -1221,6 +993,77 @@ def update_transport_sheet(
     
     return serialized
 
+@router.put("/{booking_id}/reschedule", response_model=schemas.BookingWithDetails)
+def reschedule_booking(
+    booking_id: int,
+    payload: schemas.BookingReschedule,
+    db: Session = Depends(get_booking_write_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Move a confirmed booking to another start time of the same object in one transaction.
+
+    The booking's own slots and quota volume are released in memory before the
+    new chain is allocated, so it can move within its current window and keeps
+    its share of the day's quota. The booking row and the new slots are locked
+    before the links are swapped; on any failure the booking is left as it was.
+    """
+    query = db.query(models.Booking).filter(models.Booking.id == booking_id)
+    if current_user.role != models.UserRole.admin:
+        query = query.filter(models.Booking.user_id == current_user.id)
+    booking = query.with_for_update().populate_existing().first()
+
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if booking.status != "confirmed":
+        raise HTTPException(status_code=400, detail="Booking is not in confirmed status")
+
+    old_slots = (
+        db.query(models.TimeSlot)
+        .join(models.BookingTimeSlot, models.BookingTimeSlot.time_slot_id == models.TimeSlot.id)
+        .filter(models.BookingTimeSlot.booking_id == booking.id)
+        .order_by(models.TimeSlot.slot_date, models.TimeSlot.start_time)
+        .all()
+    )
+    if not old_slots:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Booking has no time slots")
+    object_id = db.query(models.Dock.object_id).filter(models.Dock.id == old_slots[0].dock_id).scalar()
+
+    request = move_request(booking, object_id, payload.booking_date, payload.start_time, payload.time_slot_id)
+    allocator = BookingAllocator(db)
+    allocator.release_booking(booking, object_id, old_slots)
+
+    try:
+        allocation = allocator.allocate(request)
+    except HTTPException:
+        db.rollback()
+        raise
+    release_object_capacity(db, [s.id for s in old_slots])
+    if not reserve_object_capacity(db, allocation.chain.slot_ids, booking.booking_type):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=OBJECT_CAPACITY_RACE_DETAIL)
+    if not lock_free_slots(db, allocation.chain.slot_ids, exclude_booking_id=booking.id):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=SLOT_RACE_DETAIL)
+
+    db.query(models.BookingTimeSlot).filter(models.BookingTimeSlot.booking_id == booking.id).delete()
+    db.add_all([models.BookingTimeSlot(booking_id=booking.id, time_slot_id=slot.id) for slot in allocation.chain.slots])
+    db.flush()
+    quota_key = (object_id, booking.transport_type_id, allocation.booking_date, booking.booking_type)
+    if allocation.quota_applies and not recheck_strict_quotas(db, [quota_key]):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=QUOTA_RACE_DETAIL)
+    booking.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(booking)
+
+    serialized = _serialize_booking(db, booking, include_user=True)
+    is_owner = booking.user_id == current_user.id
+    serialized["is_owner"] = is_owner
+    serialized["can_modify"] = is_owner or current_user.role == models.UserRole.admin
+    return serialized
+
 @router.get("/{booking_id}/slots")
 def get_booking_slots(
     booking_id: int,
@@ -1257,7 +1100,7 @@ def get_booking_slots(
 @router.delete("/{booking_id}")
 def delete_booking(
     booking_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_booking_write_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """РЈРґР°Р»РёС‚СЊ Р·Р°РїРёСЃСЊ (С‚РѕР»СЊРєРѕ РµСЃР»Рё РѕРЅР° РѕС‚РјРµРЅРµРЅР°)"""
@@ -1299,6 +1142,8 @@ def download_booking_import_template(
     except Exception:
         raise HTTPException(status_code=400, detail="direction must be 'in' or 'out'")
 
+    from openpyxl import Workbook
+
     wb = Workbook()
     ws = wb.active
     ws.title = "bookings"
@@ -1336,39 +1181,98 @@ def download_booking_import_template(
     )
 
 
+class _BookingImportSnapshot:
+    """
+    Read-only view of slot availability and quota usage for one import run.
+
+    Availability comes from an AvailabilityIndex and quota usage from a QuotaLedger.
+    Rows placed during the run are applied in memory, so later rows see them and
+    a dry run never writes or locks.
+    """
+
+    def __init__(self, db: Session, direction: models.BookingDirection):
+        self.db = db
+        self.direction = direction
+        self.availability = AvailabilityIndex(db)
+        self.quotas = QuotaLedger(db)
+
+    def quota(self, object_id: int, transport_type_id: int, target_date: date):
+        return self.quotas.quota(object_id, transport_type_id, target_date, self.direction)
+
+    def used_volume(self, object_id: int, transport_type_id: int, target_date: date) -> float:
+        return self.quotas.used_volume(object_id, transport_type_id, target_date, self.direction)
+
+    def consume_volume(self, object_id: int, transport_type_id: int, target_date: date, cubes: float) -> None:
+        self.quotas.consume(object_id, transport_type_id, target_date, self.direction, cubes)
+
+
+@dataclass
+class _PendingImportRow:
+    """A parsed import row waiting for its dock and slots."""
+
+    row_number: int
+    supplier: Optional[models.Supplier]
+    zone_id: Optional[int]
+    obj: models.Object
+    transport_type: models.TransportTypeRef
+    vehicle_type: models.VehicleType
+    booking_date: date
+    start_time: time
+    duration: int
+    cubes: Optional[float]
+    transport_sheet: str
+    driver_name: str
+    driver_phone: str
+
+
 @router.post("/import", response_model=schemas.BookingImportResult)
 def import_bookings_from_excel(
     direction: str,
+    dry_run: bool = False,
+    policy: str = "first_fit",
     file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """
     РРјРїРѕСЂС‚ Р±СЂРѕРЅРёСЂРѕРІР°РЅРёР№ РёР· Excel. direction: in|out. Р’Р°Р»РёРґРЅС‹Рµ СЃС‚СЂРѕРєРё СЃРѕР·РґР°СЋС‚СЃСЏ, РѕС€РёР±РєРё РІРѕР·РІСЂР°С‰Р°СЋС‚СЃСЏ.
+    dry_run=true plans every row against the same snapshot and returns the would-be dock and slots without writing anything.
+    policy: first_fit|best_fit|optimized, how docks are picked for the rows (see availability.BATCH_POLICIES).
     """
     dir_normalized = direction.lower()
     if dir_normalized not in ("in", "out"):
         raise HTTPException(status_code=400, detail="direction must be 'in' or 'out'")
 
+    if policy not in BATCH_POLICIES:
+        raise HTTPException(status_code=400, detail=f"policy must be one of: {', '.join(BATCH_POLICIES)}")
+
     # Normalize and validate direction to enum once, reuse below
     try:
         direction_enum = models.BookingDirection(dir_normalized)
     except Exception:
         raise HTTPException(status_code=400, detail="direction must be 'in' or 'out'")
 
-    if not file.filename.lower().endswith((".xlsx", ".xlsm")):
-        raise HTTPException(status_code=400, detail="РћР¶РёРґР°РµС‚СЃСЏ Excel С„Р°Р№Р» (.xlsx)")
+    if not is_import_file(file.filename):
+        raise HTTPException(status_code=400, detail="Ожидается Excel (.xlsx) или CSV файл")
+
+    # A dry run writes nothing, so it is never replayed.
+    if dry_run:
+        idempotency_key = None
+    fingerprint = upload_hash(file, direction_enum.value, policy) if idempotency_key else ""
+    replay = find_replay(db, current_user, "booking_import", idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
 
+    timer = BatchTimer("booking_import")
     try:
-        wb = load_workbook(BytesIO(file.file.read()))
-        ws = wb.active
-    except Exception:
-        raise HTTPException(status_code=400, detail="РќРµ СѓРґР°Р»РѕСЃСЊ РїСЂРѕС‡РёС‚Р°С‚СЊ Excel С„Р°Р№Р»")
+        ws = open_import_file(file).active_sheet()
+    except ImportFileError:
+        raise HTTPException(status_code=400, detail="Не удалось прочитать Excel файл")
 
     expected_headers = ["transport_sheet", "supplier_name", "cubes", "booking_date", "start_time", "transport_type", "vehicle_type", "object_name", "driver_full_name", "driver_phone"]
-    headers = [str(cell.value).strip() if cell.value is not None else "" for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-    if [h.lower() for h in headers] != expected_headers:
-        raise HTTPException(status_code=400, detail=f"РћР¶РёРґР°РµС‚СЃСЏ Р·Р°РіРѕР»РѕРІРѕРє: {', '.join(expected_headers)}")
+    if not ws.has_headers(expected_headers):
+        raise HTTPException(status_code=400, detail=f"Ожидается заголовок: {', '.join(expected_headers)}")
 
     suppliers = db.query(models.Supplier).options(joinedload(models.Supplier.zone)).all()
     supplier_map = {s.name.strip().lower(): s for s in suppliers}
@@ -1382,30 +1286,20 @@ def import_bookings_from_excel(
     vehicle_types = db.query(models.VehicleType).all()
     vehicle_type_map = {v.name.strip().lower(): v for v in vehicle_types}
 
-    docks = db.query(models.Dock).options(joinedload(models.Dock.available_zones)).all()
-    allowed_types = [models.DockType.universal]
-    if dir_normalized == "in":
-        allowed_types.append(models.DockType.entrance)
-    else:
-        allowed_types.append(models.DockType.exit)
-
-    docks_by_object = {}
-    for d in docks:
-        if d.dock_type not in allowed_types:
-            continue
-        docks_by_object.setdefault(d.object_id, []).append(d)
-    for lst in docks_by_object.values():
-        lst.sort(key=lambda x: x.name or "")
+    duration_lookup = PrrDurationLookup.load(db)
+    snapshot = _BookingImportSnapshot(db, direction_enum)
 
     errors: list[schemas.BookingImportError] = []
+    placements: list[schemas.BookingImportPlacement] = []
+    new_bookings: list[models.Booking] = []
+    quota_keys = set()
+    pending: list[_PendingImportRow] = []
     created = 0
-    provisional_usage: dict[tuple[int, int, str, datetime.date], float] = {}
 
-    for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+    for idx, row in ws.rows(expected_headers):
         raw_transport_sheet, raw_supplier, raw_cubes, raw_date, raw_time, raw_transport_type, raw_vehicle_type, raw_object, raw_driver_name, raw_driver_phone = row
         transport_sheet = (raw_transport_sheet or "").strip()
         supplier_name = (raw_supplier or "").strip()
-        cubes = None if raw_cubes in (None, "") else float(raw_cubes)
         booking_date_str = (raw_date or "").strip() if isinstance(raw_date, str) else (raw_date.strftime("%Y-%m-%d") if hasattr(raw_date, "strftime") else "")
         start_time_str = (raw_time or "").strip() if isinstance(raw_time, str) else (raw_time.strftime("%H:%M") if hasattr(raw_time, "strftime") else "")
         transport_type_name = (raw_transport_type or "").strip()
@@ -1416,197 +1310,190 @@ def import_bookings_from_excel(
 
         row_errors = []
         if not transport_sheet:
-            row_errors.append("transport_sheet РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("transport_sheet обязателен")
         if not supplier_name:
-            row_errors.append("supplier_name РѕР±СЏР·Р°С‚РµР»РµРЅ")
-        if cubes is None:
-            row_errors.append("cubes РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("supplier_name обязателен")
+        try:
+            cubes = cell_number(raw_cubes)
+            if cubes is None:
+                row_errors.append("cubes обязателен")
+        except ValueError:
+            row_errors.append(f"cubes '{raw_cubes}' некорректен")
+            cubes = None
         if not booking_date_str:
-            row_errors.append("booking_date РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("booking_date обязателен")
         if not start_time_str:
-            row_errors.append("start_time РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("start_time обязателен")
         if not transport_type_name:
-            row_errors.append("transport_type РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("transport_type обязателен")
         if not vehicle_type_name:
-            row_errors.append("vehicle_type РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("vehicle_type обязателен")
         if not object_name:
-            row_errors.append("object_name РѕР±СЏР·Р°С‚РµР»РµРЅ")
+            row_errors.append("object_name обязателен")
 
         supplier = supplier_map.get(supplier_name.lower()) if supplier_name else None
         if supplier is None:
-            row_errors.append(f"supplier '{supplier_name}' РЅРµ РЅР°Р№РґРµРЅ")
+            row_errors.append(f"supplier '{supplier_name}' не найден")
         zone_id = supplier.zone_id if supplier else None
 
         obj = object_map.get(object_name.lower()) if object_name else None
         if obj is None:
-            row_errors.append(f"object '{object_name}' РЅРµ РЅР°Р№РґРµРЅ")
+            row_errors.append(f"object '{object_name}' не найден")
 
         transport_type = transport_type_map.get(transport_type_name.lower()) if transport_type_name else None
         if transport_type is None:
-            row_errors.append(f"transport_type '{transport_type_name}' РЅРµ РЅР°Р№РґРµРЅ")
+            row_errors.append(f"transport_type '{transport_type_name}' не найден")
 
         vehicle_type = vehicle_type_map.get(vehicle_type_name.lower()) if vehicle_type_name else None
         if vehicle_type is None:
-            row_errors.append(f"vehicle_type '{vehicle_type_name}' РЅРµ РЅР°Р№РґРµРЅ")
+            row_errors.append(f"vehicle_type '{vehicle_type_name}' не найден")
 
         try:
-            booking_date = datetime.strptime(booking_date_str, "%Y-%m-%d").date()
-        except Exception:
-            row_errors.append(f"booking_date '{booking_date_str}' РЅРµРєРѕСЂСЂРµРєС‚РµРЅ")
+            booking_date = cell_date(raw_date)
+        except ValueError:
+            row_errors.append(f"booking_date '{booking_date_str}' некорректен")
             booking_date = None
 
         try:
             start_time = datetime.strptime(start_time_str, "%H:%M").time()
         except Exception:
-            row_errors.append(f"start_time '{start_time_str}' РЅРµРєРѕСЂСЂРµРєС‚РµРЅ")
+            row_errors.append(f"start_time '{start_time_str}' некорректен")
             start_time = None
 
         if row_errors:
             errors.append(schemas.BookingImportError(row_number=idx, message="; ".join(row_errors)))
             continue
 
-        # duration
-        try:
-            duration = get_duration(
-                object_id=obj.id,
-                supplier_id=supplier.id if supplier else None,
-                transport_type_id=transport_type.id if transport_type else None,
-                vehicle_type_id=vehicle_type.id if vehicle_type else None,
-                db=db
-            ).duration_minutes
-        except HTTPException as e:
-            if e.status_code == 404:
-                duration = vehicle_type.duration_minutes
-            else:
-                errors.append(schemas.BookingImportError(row_number=idx, message=e.detail or "РќРµ СѓРґР°Р»РѕСЃСЊ РІС‹С‡РёСЃР»РёС‚СЊ РґР»РёС‚РµР»СЊРЅРѕСЃС‚СЊ"))
-                continue
+        # duration: PRR rule first, vehicle type default otherwise
+        duration = duration_lookup.resolve_minutes(
+            obj.id,
+            supplier.id if supplier else None,
+            transport_type.id if transport_type else None,
+            vehicle_type.id if vehicle_type else None,
+        )
+        if duration is None:
+            duration = vehicle_type.duration_minutes
 
         if duration <= 0:
-            errors.append(schemas.BookingImportError(row_number=idx, message="Р”Р»РёС‚РµР»СЊРЅРѕСЃС‚СЊ РґРѕР»Р¶РЅР° Р±С‹С‚СЊ Р±РѕР»СЊС€Рµ 0"))
+            errors.append(schemas.BookingImportError(row_number=idx, message="Длительность должна быть больше 0"))
             continue
 
-        required_slots = duration // 30 + (1 if duration % 30 != 0 else 0)
-        candidate_docks = docks_by_object.get(obj.id, [])
-        chosen_chain = None
-        chosen_dock_id = None
-
-        for dock in candidate_docks:
-            # zone check
-            if dock.available_zones:
-                zone_ids = {z.id for z in dock.available_zones}
-                if zone_id not in zone_ids:
-                    continue
-
-            slots = db.query(models.TimeSlot).filter(
-                models.TimeSlot.dock_id == dock.id,
-                models.TimeSlot.slot_date == booking_date
-            ).order_by(models.TimeSlot.start_time).all()
-
-            start_idx = next((i for i, s in enumerate(slots) if s.start_time == start_time), None)
-            if start_idx is None:
-                continue
-
-            accumulated_minutes = 0
-            chain: list[models.TimeSlot] = []
-            dock_ok = True
-
-            for s in slots[start_idx:]:
-                occ = db.query(func.count(models.BookingTimeSlot.id)).join(
-                    models.Booking, models.BookingTimeSlot.booking_id == models.Booking.id
-                ).filter(
-                    models.BookingTimeSlot.time_slot_id == s.id,
-                    models.Booking.status == "confirmed"
-                ).scalar() or 0
-                if occ >= s.capacity:
-                    dock_ok = False
-                    break
-
-                chain.append(s)
-                slot_minutes = int((datetime.combine(s.slot_date, s.end_time) - datetime.combine(s.slot_date, s.start_time)).total_seconds() // 60)
-                accumulated_minutes += slot_minutes
-
-                if accumulated_minutes >= duration:
-                    chosen_chain = chain
-                    chosen_dock_id = dock.id
-                    break
-
-            if not dock_ok:
-                continue
-            if chosen_chain:
-                break
+        pending.append(_PendingImportRow(
+            row_number=idx,
+            supplier=supplier,
+            zone_id=zone_id,
+            obj=obj,
+            transport_type=transport_type,
+            vehicle_type=vehicle_type,
+            booking_date=booking_date,
+            start_time=start_time,
+            duration=duration,
+            cubes=cubes,
+            transport_sheet=transport_sheet,
+            driver_name=driver_name,
+            driver_phone=driver_phone,
+        ))
+
+    # Rows are placed in file order; "optimized" places each day's rows in
+    # start order, shortest first at equal starts, which leaves the fewest
+    # rows without a dock.
+    if policy == "optimized":
+        pending.sort(key=lambda r: (r.booking_date, r.start_time, r.duration, r.row_number))
+    row_policy = batch_policy(policy)
+
+    for row in pending:
+        chosen = snapshot.availability.choose_chain(
+            row.obj.id,
+            row.booking_date,
+            row.start_time,
+            row.duration,
+            ChainFilters(direction=direction_enum, supplier_zone_id=row.zone_id, transport_type_id=row.transport_type.id),
+            row_policy,
+        )
+        chosen_chain = chosen.slots if chosen else None
 
         if not chosen_chain:
-            errors.append(schemas.BookingImportError(row_number=idx, message="РќРµС‚ СЃРІРѕР±РѕРґРЅРѕРіРѕ СЃР»РѕС‚Р° РЅР° РѕР±СЉРµРєС‚Рµ РґР»СЏ СЌС‚РѕР№ Р·РѕРЅС‹/РІСЂРµРјРµРЅРё"))
+            errors.append(schemas.BookingImportError(row_number=row.row_number, message="Нет свободного слота на объекте для этой зоны/времени"))
             continue
 
 
         quota = None
         total_quota_volume = None
-        if transport_type:
-            quota, total_quota_volume = get_quota_for_date(
-                db=db,
-                object_id=obj.id,
-                transport_type_id=transport_type.id,
-                target_date=booking_date,
-                direction=direction_enum,
-            )
+        if row.transport_type:
+            quota, total_quota_volume = snapshot.quota(row.obj.id, row.transport_type.id, row.booking_date)
         if quota and total_quota_volume is not None:
-            if cubes is None:
-                errors.append(schemas.BookingImportError(row_number=idx, message="cubes ?????????? ??? ??? ? ??????"))
+            if row.cubes is None:
+                errors.append(schemas.BookingImportError(row_number=row.row_number, message="cubes обязателен для дат с квотой"))
                 continue
-            key = (obj.id, transport_type.id, direction_enum.value, booking_date)
-            extra_used = provisional_usage.get(key, 0.0)
-            used_volume = calculate_used_volume(
-                db=db,
-                object_id=obj.id,
-                transport_type_id=transport_type.id,
-                target_date=booking_date,
-                direction=direction_enum,
-            ) + extra_used
-            remaining_volume = total_quota_volume - used_volume
-            if not quota.allow_overbooking and cubes > remaining_volume:
+            remaining_volume = total_quota_volume - snapshot.used_volume(row.obj.id, row.transport_type.id, row.booking_date)
+            if not quota.allow_overbooking and row.cubes > remaining_volume:
                 errors.append(
                     schemas.BookingImportError(
-                        row_number=idx,
-                        message=f"РџСЂРµРІС‹С€РµРЅР° РєРІРѕС‚Р° РЅР° {booking_date}. РћСЃС‚Р°С‚РѕРє {remaining_volume}, Р·Р°СЏРІР»РµРЅРѕ {cubes}",
+                        row_number=row.row_number,
+                        message=f"Превышена квота на {row.booking_date}. Остаток {remaining_volume}, заявлено {row.cubes}",
                     )
                 )
                 continue
 
-        new_booking = models.Booking(
+        # Later rows of the same file must see this placement.
+        snapshot.availability.occupy(chosen_chain)
+        if quota and total_quota_volume is not None:
+            snapshot.consume_volume(row.obj.id, row.transport_type.id, row.booking_date, row.cubes)
+            quota_keys.add((row.obj.id, row.transport_type.id, row.booking_date, direction_enum))
+
+        placements.append(schemas.BookingImportPlacement(
+            row_number=row.row_number,
+            dock_id=chosen.dock.id,
+            dock_name=chosen.dock.name,
+            booking_date=row.booking_date.strftime("%Y-%m-%d"),
+            start_time=chosen_chain[0].start_time.strftime("%H:%M"),
+            end_time=chosen_chain[-1].end_time.strftime("%H:%M"),
+            time_slot_ids=[s.id for s in chosen_chain],
+        ))
+        created += 1
+
+        if dry_run:
+            continue
+
+        new_bookings.append(models.Booking(
             user_id=current_user.id,
-            vehicle_type_id=vehicle_type.id,
+            vehicle_type_id=row.vehicle_type.id,
             vehicle_plate="",
-            driver_full_name=driver_name or "",
-            driver_phone=driver_phone or "",
+            driver_full_name=row.driver_name or "",
+            driver_phone=row.driver_phone or "",
             status="confirmed",
-            supplier_id=supplier.id if supplier else None,
-            zone_id=zone_id,
-            transport_type_id=transport_type.id if transport_type else None,
-            cubes=cubes,
-            transport_sheet=transport_sheet,
+            supplier_id=row.supplier.id if row.supplier else None,
+            zone_id=row.zone_id,
+            transport_type_id=row.transport_type.id if row.transport_type else None,
+            cubes=row.cubes,
+            transport_sheet=row.transport_sheet,
             booking_type=direction_enum,
-        )
-        db.add(new_booking)
-        db.flush()
-
-        for s in chosen_chain:
-            db.add(models.BookingTimeSlot(booking_id=new_booking.id, time_slot_id=s.id))
-
-        # Flush immediately so subsequent rows in the same import see the newly occupied slots
-        # when they calculate availability/capacity.
+            booking_slots=[models.BookingTimeSlot(time_slot_id=s.id) for s in chosen_chain],
+        ))
+
+    errors.sort(key=lambda e: e.row_number)
+    placements.sort(key=lambda p: p.row_number)
+    result = schemas.BookingImportResult(created=created, errors=errors, dry_run=dry_run, placements=placements)
+    timer.done(created + len(errors))
+    if new_bookings:
+        slot_ids = [link.time_slot_id for b in new_bookings for link in b.booking_slots]
+        if not reserve_object_capacity(db, slot_ids, direction_enum):
+            db.rollback()
+            raise HTTPException(status_code=409, detail=OBJECT_CAPACITY_RACE_DETAIL)
+        if not lock_free_slots(db, slot_ids):
+            db.rollback()
+            raise HTTPException(status_code=409, detail=SLOT_RACE_DETAIL)
+        db.add_all(new_bookings)
         db.flush()
-
-        if quota and total_quota_volume is not None and cubes is not None and transport_type:
-            key = (obj.id, transport_type.id, direction_enum.value, booking_date)
-            provisional_usage[key] = provisional_usage.get(key, 0.0) + cubes
-
-        created += 1
-
-    if created:
-        db.commit()
+        if not recheck_strict_quotas(db, quota_keys):
+            db.rollback()
+            raise HTTPException(status_code=409, detail=QUOTA_RACE_DETAIL)
+        remember(db, current_user, "booking_import", idempotency_key, fingerprint, result)
+        replay = commit_remembered(db, current_user, "booking_import", idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
     else:
         db.rollback()
 
-    return schemas.BookingImportResult(created=created, errors=errors)
+    return result
 
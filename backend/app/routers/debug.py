@@ -0,0 +1,66 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from .. import models, schemas
+from ..deps import require_admin
+from ..profiling import list_profiles, profile_path
+from ..query_stats import route_stats
+from ..tracing import captured_trace
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=List[schemas.RouteQueryMetrics])
+def query_metrics(
+    reset: bool = False,
+    _: models.User = Depends(require_admin),
+):
+    """SQL query counts and database time per route since start (or the last reset), most DB time first."""
+    metrics = [
+        schemas.RouteQueryMetrics(
+            route=route,
+            requests=s.requests,
+            queries=s.queries,
+            avg_queries=round(s.queries / s.requests, 2),
+            max_queries=s.max_queries,
+            db_ms=round(s.db_seconds * 1000, 1),
+            avg_db_ms=round(s.db_seconds * 1000 / s.requests, 2),
+            avg_request_ms=round(s.request_seconds * 1000 / s.requests, 2),
+            slowest_ms=round(s.slowest_seconds * 1000, 1),
+            slowest_statement=s.slowest_statement,
+        )
+        for route, s in route_stats(reset=reset).items()
+    ]
+    return sorted(metrics, key=lambda m: m.db_ms, reverse=True)
+
+
+@router.get("/traces/{trace_id}")
+def get_trace(
+    trace_id: str,
+    _: models.User = Depends(require_admin),
+):
+    """Events of a request an admin sent with X-Debug-Trace: 1 (the last 100 such requests are kept)."""
+    events = captured_trace(trace_id)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "events": events}
+
+
+@router.get("/profiles")
+def get_profiles(_: models.User = Depends(require_admin)):
+    """Stored request profiles, newest first (see app.profiling)."""
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+    profile_id: str,
+    _: models.User = Depends(require_admin),
+):
+    """One profile as folded stacks, for flamegraph.pl or speedscope."""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=f"{profile_id}.folded")
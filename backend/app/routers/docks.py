@@ -1,15 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from datetime import date, timedelta
+from typing import List, Optional
 
 from ..db import get_db
 from .. import models, schemas
-from ..deps import require_admin, get_current_user
+from ..deps import require_admin, get_current_user, read_endpoint
+from ..occupancy import rebuild_object_occupancy
+from ..relocation import apply_relocation, plan_relocation
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.Dock])
+@read_endpoint
 def list_docks(db: Session = Depends(get_db)):
     return db.query(models.Dock).options(
         joinedload(models.Dock.object),
@@ -63,6 +67,7 @@ def update_dock(dock_id: int, payload: schemas.DockCreate, db: Session = Depends
     dock = db.query(models.Dock).get(dock_id)
     if not dock:
         raise HTTPException(status_code=404, detail="Dock not found")
+    counted_as = (dock.object_id, dock.dock_type)
 
     dock.name = payload.name
     dock.status = payload.status
@@ -86,6 +91,11 @@ def update_dock(dock_id: int, payload: schemas.DockCreate, db: Session = Depends
     else:
         dock.available_transport_types = []
 
+    # Booked slots of the dock now count for another object or capacity class.
+    if counted_as != (dock.object_id, models.DockType(dock.dock_type)):
+        db.flush()
+        rebuild_object_occupancy(db, [oid for oid in (counted_as[0], dock.object_id) if oid is not None])
+
     db.commit()
     db.refresh(dock)
     return dock
@@ -170,11 +180,106 @@ def update_dock_transport_types(dock_id: int, payload: schemas.DockTransportType
     return dock_with_relations
 
 
+@router.post("/{dock_id}/maintenance", response_model=schemas.DockRelocationReport)
+def start_dock_maintenance(dock_id: int, payload: schemas.DockMaintenance, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
+    """
+    Take a dock out of service between the dates and move its bookings there to other docks of its object.
+
+    The dates are stored as a maintenance window: the dock offers no slots on
+    them and keeps its status for the other days. Bookings keep their date and
+    start time; the ones that fit nowhere stay on the dock and are reported as
+    unplaceable. With dry_run nothing is changed.
+    """
+    dock = db.query(models.Dock).get(dock_id)
+    if not dock:
+        raise HTTPException(status_code=404, detail="Dock not found")
+    if payload.from_date > payload.to_date:
+        raise HTTPException(status_code=400, detail="from_date must be before to_date")
+    if payload.status not in (models.DockStatus.maintenance.value, models.DockStatus.inactive.value):
+        raise HTTPException(status_code=400, detail="status must be 'maintenance' or 'inactive'")
+
+    window = models.DockMaintenanceWindow(status=models.DockStatus(payload.status), from_date=payload.from_date, to_date=payload.to_date)
+    dock.maintenance_windows.append(window)
+    plans = plan_relocation(db, dock, payload.from_date, payload.to_date)
+    results = [
+        schemas.DockRelocationItem(
+            booking_id=plan.booking.id,
+            status="moved" if plan.allocation else "unplaceable",
+            detail=plan.detail,
+            booking_date=plan.old_slots[0].slot_date.isoformat(),
+            start_time=plan.old_slots[0].start_time.strftime("%H:%M"),
+            from_time_slot_ids=[s.id for s in plan.old_slots],
+            dock_id=plan.allocation.chain.dock.id if plan.allocation else None,
+            time_slot_ids=plan.allocation.chain.slot_ids if plan.allocation else [],
+        )
+        for plan in plans
+    ]
+    moved = sum(1 for plan in plans if plan.allocation)
+    report = schemas.DockRelocationReport(
+        dock_id=dock_id,
+        status=payload.status,
+        dry_run=payload.dry_run,
+        moved=moved,
+        unplaceable=len(plans) - moved,
+        results=results,
+    )
+
+    if payload.dry_run:
+        db.rollback()
+        return report
+    if not apply_relocation(db, plans):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Capacity was taken by a concurrent booking, try again")
+    db.commit()
+    report.window_id = window.id
+    return report
+
+
+@router.get("/{dock_id}/maintenance", response_model=List[schemas.DockMaintenanceWindow])
+def list_dock_maintenance(dock_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+    return db.query(models.DockMaintenanceWindow).filter(
+        models.DockMaintenanceWindow.dock_id == dock_id
+    ).order_by(models.DockMaintenanceWindow.from_date, models.DockMaintenanceWindow.id).all()
+
+
+@router.delete("/{dock_id}/maintenance/{window_id}")
+def end_dock_maintenance(
+    dock_id: int,
+    window_id: int,
+    on_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_admin),
+):
+    """
+    End a maintenance window: the dock offers its slots again from `on_date` (today by default).
+
+    Days of the window before `on_date` stay recorded; a window that had not
+    started yet is removed. Bookings moved away when it began are not moved back.
+    """
+    window = db.query(models.DockMaintenanceWindow).filter(
+        models.DockMaintenanceWindow.id == window_id,
+        models.DockMaintenanceWindow.dock_id == dock_id,
+    ).first()
+    if not window:
+        raise HTTPException(status_code=404, detail="Maintenance window not found")
+    on_date = on_date or date.today()
+    if window.from_date >= on_date:
+        db.delete(window)
+    elif window.to_date >= on_date:
+        window.to_date = on_date - timedelta(days=1)
+    db.commit()
+    return {"message": "Maintenance ended"}
+
+
 @router.delete("/{dock_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_dock(dock_id: int, db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
     dock = db.query(models.Dock).get(dock_id)
     if not dock:
         raise HTTPException(status_code=404, detail="Dock not found")
+    object_id = dock.object_id
     db.delete(dock)
+    if object_id is not None:
+        db.flush()
+        rebuild_object_occupancy(db, [object_id])
     db.commit()
     return None
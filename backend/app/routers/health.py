@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from .. import startup
+
+router = APIRouter()
+
+
+@router.get("/health", include_in_schema=False)
+def health():
+    """Liveness: the process serves requests."""
+    return {"status": "ok"}
+
+
+@router.get("/ready", include_in_schema=False)
+def ready():
+    """Readiness: 200 once the warm-up (app.startup) is done, 503 with the pending steps before."""
+    report = startup.state.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
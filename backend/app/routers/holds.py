@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..allocation import BookingAllocator
+from ..db import get_db
+from ..deps import get_current_user
+from ..holds import (
+    DEFAULT_HOLD_SECONDS,
+    MAX_ACTIVE_HOLDS_PER_USER,
+    MAX_HOLD_SECONDS,
+    purge_expired_holds,
+    user_active_hold_count,
+)
+from ..occupancy import lock_free_slots, reserve_object_capacity
+from .bookings import OBJECT_CAPACITY_RACE_DETAIL, SLOT_RACE_DETAIL
+
+router = APIRouter()
+
+
+def _serialize_hold(hold: models.SlotHold, slots: list[models.TimeSlot]) -> schemas.SlotHold:
+    return schemas.SlotHold(
+        id=hold.id,
+        object_id=hold.object_id,
+        booking_type=hold.booking_type.value,
+        expires_at=hold.expires_at,
+        dock_id=slots[0].dock_id,
+        booking_date=slots[0].slot_date.isoformat(),
+        start_time=slots[0].start_time.strftime("%H:%M"),
+        end_time=slots[-1].end_time.strftime("%H:%M"),
+        time_slot_ids=[s.id for s in slots],
+    )
+
+
+@router.post("/", response_model=schemas.SlotHold)
+def create_hold(
+    payload: schemas.SlotHoldCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Reserve the slot chain create_booking would pick for `ttl_seconds`.
+
+    Until it expires the hold takes slot and object capacity in every
+    availability check; passing its id as `hold_id` to create_booking turns it
+    into the booking. Holds do not reserve quota volume. The chain is rechecked
+    under the same locks as a booking, and a user keeps at most
+    MAX_ACTIVE_HOLDS_PER_USER unexpired holds.
+    """
+    ttl = payload.ttl_seconds or DEFAULT_HOLD_SECONDS
+    if not 0 < ttl <= MAX_HOLD_SECONDS:
+        raise HTTPException(status_code=400, detail=f"ttl_seconds must be between 1 and {MAX_HOLD_SECONDS}")
+
+    request = schemas.BookingCreateUpdated(
+        vehicle_plate="",
+        driver_full_name="",
+        driver_phone="",
+        **payload.dict(exclude={"ttl_seconds"}),
+    )
+    allocator = BookingAllocator(db)
+    allocation = allocator.allocate(request)
+
+    purge_expired_holds(db)
+    # The user row serializes one user's concurrent holds, so the limit holds under a race too.
+    db.query(models.User.id).filter(models.User.id == current_user.id).with_for_update().scalar()
+    if MAX_ACTIVE_HOLDS_PER_USER and user_active_hold_count(db, current_user.id) >= MAX_ACTIVE_HOLDS_PER_USER:
+        raise HTTPException(status_code=409, detail=f"At most {MAX_ACTIVE_HOLDS_PER_USER} active holds per user")
+    if not reserve_object_capacity(db, allocation.chain.slot_ids, allocation.direction, record=False):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=OBJECT_CAPACITY_RACE_DETAIL)
+    if not lock_free_slots(db, allocation.chain.slot_ids):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=SLOT_RACE_DETAIL)
+
+    hold = models.SlotHold(
+        user_id=current_user.id,
+        object_id=payload.object_id,
+        booking_type=allocation.direction,
+        expires_at=allocator.availability.now + timedelta(seconds=ttl),
+        hold_slots=[models.SlotHoldTimeSlot(time_slot_id=slot.id) for slot in allocation.chain.slots],
+    )
+    db.add(hold)
+    db.commit()
+    db.refresh(hold)
+    return _serialize_hold(hold, allocation.chain.slots)
+
+
+@router.delete("/{hold_id}")
+def release_hold(
+    hold_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    query = db.query(models.SlotHold).filter(models.SlotHold.id == hold_id)
+    if current_user.role != models.UserRole.admin:
+        query = query.filter(models.SlotHold.user_id == current_user.id)
+    hold = query.first()
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    db.delete(hold)
+    db.commit()
+    return {"message": "Hold released"}
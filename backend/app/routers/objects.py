@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app import models, schemas
-from app.deps import get_db
+from app.deps import get_db, read_endpoint
 
 router = APIRouter()
 
@@ -16,6 +16,7 @@ def create_object(object: schemas.ObjectCreate, db: Session = Depends(get_db)):
     return db_object
 
 @router.get("/", response_model=List[schemas.Object])
+@read_endpoint
 def read_objects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     objects = db.query(models.Object).offset(skip).limit(limit).all()
     return objects
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ..metrics import CONTENT_TYPE, render
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """In-process metrics (app.metrics) in the Prometheus text exposition format."""
+    return Response(render(), media_type=CONTENT_TYPE)
@@ -4,11 +4,15 @@ from typing import Optional, List, Dict, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
+from sqlalchemy import literal, select, union_all, update
 from sqlalchemy.orm import Session, joinedload
-from openpyxl import Workbook, load_workbook
 
 from app import models, schemas
+from app.bulk_utils import chunked, upsert_statement
+from app.db import get_reports_db
 from app.deps import get_db
+from app.import_utils import ImportFileError, is_import_file, open_import_file
+from app.prr_utils import PrrDurationLookup
 
 router = APIRouter()
 
@@ -25,10 +29,64 @@ def _normalize(value: Optional[str]) -> str:
     return (value or "").strip().lower()
 
 
+def _load_reference_name_map(db: Session) -> Dict[Tuple[str, str], int]:
+    """Map (kind, normalized name) -> id for every reference the import file can mention."""
+    rows = db.execute(union_all(
+        select(literal("object").label("kind"), models.Object.id, models.Object.name),
+        select(literal("supplier"), models.Supplier.id, models.Supplier.name),
+        select(literal("transport_type"), models.TransportTypeRef.id, models.TransportTypeRef.name),
+        select(literal("vehicle_type"), models.VehicleType.id, models.VehicleType.name),
+    )).all()
+    return {(kind, _normalize(name)): ref_id for kind, ref_id, name in rows}
+
+
+def _write_prr_limits(
+    db: Session,
+    existing_lookup: PrrDurationLookup,
+    pending_rows: Dict[Tuple[int, Optional[int], Optional[int], Optional[int]], int],
+) -> Tuple[int, int]:
+    """Apply resolved import rows in batches. Returns (created, updated)."""
+    updates: List[dict] = []
+    inserts: List[dict] = []
+    updated = 0
+    for (obj_id, supplier_id, tt_id, vt_id), duration in pending_rows.items():
+        existing = existing_lookup.get(obj_id, supplier_id, tt_id, vt_id)
+        if existing is not None:
+            updated += 1
+            if existing.duration_minutes != duration:
+                updates.append({"id": existing.id, "duration_minutes": duration})
+            continue
+        inserts.append({
+            "object_id": obj_id,
+            "supplier_id": supplier_id,
+            "transport_type_id": tt_id,
+            "vehicle_type_id": vt_id,
+            "duration_minutes": duration,
+        })
+
+    # Known rows are updated by primary key: NULL key columns never trigger ON CONFLICT in PostgreSQL.
+    for batch in chunked(updates):
+        db.execute(update(models.PrrLimit), batch)
+
+    if inserts:
+        stmt = upsert_statement(
+            db,
+            models.PrrLimit.__table__,
+            index_elements=["object_id", "supplier_id", "transport_type_id", "vehicle_type_id"],
+            update_columns=["duration_minutes"],
+            constraint="_object_supplier_transport_vehicle_uc",
+        )
+        for batch in chunked(inserts):
+            db.execute(stmt, batch)
+
+    return len(inserts), updated
+
+
 @router.get("/template")
 def download_prr_limits_template(
     db: Session = Depends(get_db),
 ):
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "prr_limits"
@@ -68,8 +126,9 @@ def download_prr_limits_template(
 
 @router.get("/export")
 def export_prr_limits(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
 ):
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "prr_limits"
@@ -108,35 +167,22 @@ def import_prr_limits(
     resolutions: Optional[str] = Form(None),
     db: Session = Depends(get_db),
 ):
-    if not file.filename.lower().endswith((".xlsx", ".xlsm")):
-        raise HTTPException(status_code=400, detail="Only Excel .xlsx/.xlsm files are supported")
+    if not is_import_file(file.filename):
+        raise HTTPException(status_code=400, detail="Only .xlsx/.xlsm or .csv files are supported")
 
     try:
-        wb = load_workbook(BytesIO(file.file.read()))
-    except Exception:
+        source = open_import_file(file)
+    except ImportFileError:
         raise HTTPException(status_code=400, detail="Failed to read Excel file")
 
-    if "prr_limits" in wb.sheetnames:
-        ws = wb["prr_limits"]
-    else:
-        ws = wb.active
+    ws = source.sheet("prr_limits") or source.active_sheet()
 
     expected_headers = ["object_name", "supplier_name", "transport_type", "vehicle_type", "duration_minutes"]
-    header_row = [str(cell.value).strip() if cell.value is not None else "" for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-    if [h.lower() for h in header_row] != expected_headers:
+    if not ws.has_headers(expected_headers):
         raise HTTPException(status_code=400, detail=f"Invalid headers. Expected: {', '.join(expected_headers)}")
 
-    # Maps for lookup
-    object_map = {_normalize(o.name): o.id for o in db.query(models.Object).all()}
-    supplier_map = {_normalize(s.name): s.id for s in db.query(models.Supplier).all()}
-    transport_type_map = {_normalize(t.name): t.id for t in db.query(models.TransportTypeRef).all()}
-    vehicle_type_map = {_normalize(v.name): v.id for v in db.query(models.VehicleType).all()}
-
-    existing_limits = db.query(models.PrrLimit).all()
-    key_to_limit = {
-        (lim.object_id, lim.supplier_id, lim.transport_type_id, lim.vehicle_type_id): lim
-        for lim in existing_limits
-    }
+    name_map = _load_reference_name_map(db)
+    existing_lookup = PrrDurationLookup.load(db)
 
     resolution_map: Dict[Tuple[str, str, str, str], str] = {}
     if resolutions:
@@ -163,9 +209,9 @@ def import_prr_limits(
     conflicts: List[schemas.PrrLimitImportConflict] = []
     unresolved_conflict = False
 
-    pending_rows: Dict[Tuple[int, Optional[int], Optional[int], Optional[int]], Dict] = {}
+    pending_rows: Dict[Tuple[int, Optional[int], Optional[int], Optional[int]], int] = {}
 
-    for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+    for idx, row in ws.rows(expected_headers):
         raw_obj, raw_supplier, raw_tt, raw_vt, raw_duration = row
         obj_name = (raw_obj or "").strip()
         supplier_name = (raw_supplier or "").strip()
@@ -173,25 +219,25 @@ def import_prr_limits(
         vt_name = (raw_vt or "").strip()
 
         row_errors = []
-        obj_id = object_map.get(_normalize(obj_name))
+        obj_id = name_map.get(("object", _normalize(obj_name)))
         if not obj_id:
             row_errors.append(f"object '{obj_name}' not found")
 
         supplier_id = None
         if supplier_name:
-            supplier_id = supplier_map.get(_normalize(supplier_name))
+            supplier_id = name_map.get(("supplier", _normalize(supplier_name)))
             if supplier_id is None:
                 row_errors.append(f"supplier '{supplier_name}' not found")
 
         tt_id = None
         if tt_name:
-            tt_id = transport_type_map.get(_normalize(tt_name))
+            tt_id = name_map.get(("transport_type", _normalize(tt_name)))
             if tt_id is None:
                 row_errors.append(f"transport_type '{tt_name}' not found")
 
         vt_id = None
         if vt_name:
-            vt_id = vehicle_type_map.get(_normalize(vt_name))
+            vt_id = name_map.get(("vehicle_type", _normalize(vt_name)))
             if vt_id is None:
                 row_errors.append(f"vehicle_type '{vt_name}' not found")
 
@@ -214,83 +260,30 @@ def import_prr_limits(
         action = resolution_map.get(key_names)
 
         if key_ids in pending_rows:
-            if action == "replace_with_new":
-                pending_rows[key_ids] = {
-                    "object_id": obj_id,
-                    "supplier_id": supplier_id,
-                    "transport_type_id": tt_id,
-                    "vehicle_type_id": vt_id,
-                    "duration": duration,
-                }
-            elif action == "keep_existing":
-                pass
-            else:
-                conflicts.append(schemas.PrrLimitImportConflict(
-                    row_number=idx,
-                    object_name=obj_name,
-                    supplier_name=supplier_name or None,
-                    transport_type=tt_name or None,
-                    vehicle_type=vt_name or None,
-                    existing_duration=pending_rows[key_ids]["duration"],
-                    new_duration=duration,
-                    source="file",
-                ))
-                unresolved_conflict = True
-            continue
-
-        existing = key_to_limit.get(key_ids)
-        if existing:
-            if action == "replace_with_new":
-                pending_rows[key_ids] = {
-                    "object_id": obj_id,
-                    "supplier_id": supplier_id,
-                    "transport_type_id": tt_id,
-                    "vehicle_type_id": vt_id,
-                    "duration": duration,
-                }
-            elif action == "keep_existing":
-                pass
-            else:
-                conflicts.append(schemas.PrrLimitImportConflict(
-                    row_number=idx,
-                    object_name=obj_name,
-                    supplier_name=supplier_name or None,
-                    transport_type=tt_name or None,
-                    vehicle_type=vt_name or None,
-                    existing_duration=existing.duration_minutes,
-                    new_duration=duration,
-                    source="database",
-                ))
-                unresolved_conflict = True
-            continue
-
-        pending_rows[key_ids] = {
-            "object_id": obj_id,
-            "supplier_id": supplier_id,
-            "transport_type_id": tt_id,
-            "vehicle_type_id": vt_id,
-            "duration": duration,
-        }
+            existing_duration, source = pending_rows[key_ids], "file"
+        else:
+            existing = existing_lookup.get(*key_ids)
+            existing_duration, source = (existing.duration_minutes, "database") if existing else (None, None)
+
+        if source is None or action == "replace_with_new":
+            pending_rows[key_ids] = duration
+        elif action != "keep_existing":
+            conflicts.append(schemas.PrrLimitImportConflict(
+                row_number=idx,
+                object_name=obj_name,
+                supplier_name=supplier_name or None,
+                transport_type=tt_name or None,
+                vehicle_type=vt_name or None,
+                existing_duration=existing_duration,
+                new_duration=duration,
+                source=source,
+            ))
+            unresolved_conflict = True
 
     if unresolved_conflict:
         return schemas.PrrLimitImportResult(created=0, updated=0, errors=errors, conflicts=conflicts)
 
-    created = 0
-    updated = 0
-    for key, payload in pending_rows.items():
-        existing = key_to_limit.get(key)
-        if existing:
-            existing.duration_minutes = payload["duration"]
-            updated += 1
-        else:
-            db.add(models.PrrLimit(
-                object_id=payload["object_id"],
-                supplier_id=payload["supplier_id"],
-                transport_type_id=payload["transport_type_id"],
-                vehicle_type_id=payload["vehicle_type_id"],
-                duration_minutes=payload["duration"],
-            ))
-            created += 1
+    created, updated = _write_prr_limits(db, existing_lookup, pending_rows)
 
     if created or updated:
         db.commit()
@@ -313,96 +306,12 @@ def get_duration(
     vehicle_type_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    # 1. Exact match
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == supplier_id,
-        models.PrrLimit.transport_type_id == transport_type_id,
-        models.PrrLimit.vehicle_type_id == vehicle_type_id
-    )
-    result = query.first()
-    if result:
-        return result
-
-    # 2. Less specific rules
-    # object + supplier + transport
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == supplier_id,
-        models.PrrLimit.transport_type_id == transport_type_id,
-        models.PrrLimit.vehicle_type_id == None
-    )
-    result = query.first()
-    if result:
-        return result
-
-    # object + supplier + vehicle
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == supplier_id,
-        models.PrrLimit.transport_type_id == None,
-        models.PrrLimit.vehicle_type_id == vehicle_type_id
-    )
-    result = query.first()
-    if result:
-        return result
-
-    # object + transport + vehicle
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == None,
-        models.PrrLimit.transport_type_id == transport_type_id,
-        models.PrrLimit.vehicle_type_id == vehicle_type_id
-    )
-    result = query.first()
-    if result:
-        return result
-
-    # object + supplier
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == supplier_id,
-        models.PrrLimit.transport_type_id == None,
-        models.PrrLimit.vehicle_type_id == None
+    result = PrrDurationLookup.load(db, object_ids=[object_id]).resolve(
+        object_id, supplier_id, transport_type_id, vehicle_type_id
     )
-    result = query.first()
-    if result:
-        return result
-
-    # object + transport
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == None,
-        models.PrrLimit.transport_type_id == transport_type_id,
-        models.PrrLimit.vehicle_type_id == None
-    )
-    result = query.first()
-    if result:
-        return result
-
-    # object + vehicle
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == None,
-        models.PrrLimit.transport_type_id == None,
-        models.PrrLimit.vehicle_type_id == vehicle_type_id
-    )
-    result = query.first()
-    if result:
-        return result
-
-    # object only
-    query = db.query(models.PrrLimit).filter(
-        models.PrrLimit.object_id == object_id,
-        models.PrrLimit.supplier_id == None,
-        models.PrrLimit.transport_type_id == None,
-        models.PrrLimit.vehicle_type_id == None
-    )
-    result = query.first()
-    if result:
-        return result
-
-    raise HTTPException(status_code=404, detail="No matching PRR limit found")
+    if result is None:
+        raise HTTPException(status_code=404, detail="No matching PRR limit found")
+    return result
 
 
 @router.post("/", response_model=schemas.PrrLimit)
@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..db import get_db
+from ..deps import require_admin
+from ..simulation import run_scenarios
+
+router = APIRouter()
+
+MAX_SIMULATION_DAYS = 92
+MAX_SCENARIOS = 50
+
+
+@router.post("/", response_model=List[schemas.SimulationResult])
+def simulate_scenarios(
+    payload: schemas.SimulationRequest,
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_admin),
+):
+    """
+    How many of the period's bookings would have fit under each scenario.
+
+    Replays the bookings in memory against the current docks and work
+    schedules (unless include_current is false) and against every scenario;
+    nothing is written.
+    """
+    if payload.from_date > payload.to_date:
+        raise HTTPException(status_code=400, detail="from_date must be before to_date")
+    if (payload.to_date - payload.from_date).days >= MAX_SIMULATION_DAYS:
+        raise HTTPException(status_code=400, detail=f"Simulation period is limited to {MAX_SIMULATION_DAYS} days")
+    if len(payload.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios per request")
+    if payload.max_shift_minutes < 0:
+        raise HTTPException(status_code=400, detail="max_shift_minutes must not be negative")
+    if not db.get(models.Object, payload.object_id):
+        raise HTTPException(status_code=404, detail="Object not found")
+
+    try:
+        return run_scenarios(
+            db,
+            payload.object_id,
+            payload.from_date,
+            payload.to_date,
+            payload.scenarios,
+            include_current=payload.include_current,
+            max_shift_minutes=payload.max_shift_minutes,
+            policy=payload.policy,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -15,13 +15,14 @@ from ..schemas import (
     SupplierImportResult,
     SupplierImportError,
 )
-from ..deps import get_current_user
-from openpyxl import Workbook, load_workbook
+from ..deps import get_current_user, read_endpoint
+from ..import_utils import ImportFileError, is_import_file, open_import_file
 
 router = APIRouter(prefix="/api/suppliers", tags=["suppliers"])
 
 
 @router.get("/", response_model=List[SupplierWithZone])
+@read_endpoint
 def get_suppliers(db: Session = Depends(get_db)):
     return (
         db.query(Supplier)
@@ -178,6 +179,7 @@ def download_import_template(
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
 
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "suppliers"
@@ -222,19 +224,16 @@ def import_suppliers(
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
 
-    if not file.filename.lower().endswith((".xlsx", ".xlsm")):
-        raise HTTPException(status_code=400, detail="Ожидается Excel файл (.xlsx)")
+    if not is_import_file(file.filename):
+        raise HTTPException(status_code=400, detail="Ожидается Excel (.xlsx) или CSV файл")
 
     try:
-        content = BytesIO(file.file.read())
-        wb = load_workbook(content)
-        ws = wb.active
-    except Exception:
+        ws = open_import_file(file).active_sheet()
+    except ImportFileError:
         raise HTTPException(status_code=400, detail="Не удалось прочитать Excel файл")
 
     expected_headers = ["name", "zone_name", "vehicle_types", "transport_types", "comment"]
-    headers = [str(cell.value).strip() if cell.value is not None else "" for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-    if [h.lower() for h in headers] != expected_headers:
+    if not ws.has_headers(expected_headers):
         raise HTTPException(status_code=400, detail=f"Ожидается заголовок: {', '.join(expected_headers)}")
 
     zone_map = {z.name.strip().lower(): z for z in db.query(Zone).all()}
@@ -246,7 +245,7 @@ def import_suppliers(
     created = 0
     names_in_file: set[str] = set()
 
-    for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+    for idx, row in ws.rows(expected_headers):
         raw_name, raw_zone_name, raw_vehicle_types, raw_transport_types, raw_comment = row
         name = (raw_name or "").strip()
         zone_name = (raw_zone_name or "").strip()
@@ -1,17 +1,21 @@
 from datetime import date, time, datetime, timedelta
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, NamedTuple, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 
-from ..db import get_db
+from ..db import get_db, get_reports_db
 from .. import models, schemas
-from ..deps import require_admin
+from ..deps import read_endpoint, require_admin
+from ..holds import active_hold_counts
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.TimeSlotWithBookings])
+@read_endpoint
 def list_time_slots(
     from_date: date,
     to_date: date,
@@ -20,11 +24,86 @@ def list_time_slots(
     transport_type_id: Optional[int] = None,
     booking_type: Optional[str] = Query(None, description="in|out to auto-filter dock types"),
     dock_types: Optional[str] = Query(None, description="Comma-separated list of dock types (e.g., 'exit,universal')"),
+    response_format: str = Query("rows", alias="format", pattern="^(rows|columnar)$", description="rows | columnar (parallel arrays, see _columnar_calendar)"),
     db: Session = Depends(get_db),
 ):
     """Получить список свободных временных слотов (календарь бронирований)"""
+    calendar = _load_calendar(db, from_date, to_date, object_id, supplier_id, transport_type_id, booking_type, dock_types)
+    if response_format == "columnar":
+        return _columnar_calendar(calendar, from_date)
+    if calendar is None:
+        return []
+    slots, occupancy_map, booking_rows, first_slot_by_booking = calendar
+
+    bookings_map: dict[int, list[schemas.TimeSlotBookingInfo]] = {}
+    for row in booking_rows:
+        is_start = False
+        first_entry = first_slot_by_booking.get(row.booking_id)
+        if first_entry and first_entry[1] == row.time_slot_id:
+            is_start = True
 
-    docks_query = db.query(models.Dock.id)
+        bookings_map.setdefault(row.time_slot_id, []).append(
+            schemas.TimeSlotBookingInfo(
+                id=row.booking_id,
+                supplier_name=row.supplier_name,
+                cubes=row.cubes,
+                transport_sheet=row.transport_sheet,
+                user_full_name=row.user_full_name,
+                user_email=row.user_email,
+                is_start=is_start,
+            )
+        )
+
+    result = []
+    for slot in slots:
+        occupancy = occupancy_map.get(slot.id, 0)
+        
+        status = "free"
+        if occupancy == 0:
+            status = "free"
+        elif occupancy < slot.capacity:
+            status = "partial"
+        else:
+            status = "full"
+        
+        result.append(
+            schemas.TimeSlotWithBookings(
+                id=slot.id,
+                day_of_week=slot.slot_date.weekday(),
+                start_time=slot.start_time.strftime("%H:%M"),
+                end_time=slot.end_time.strftime("%H:%M"),
+                capacity=slot.capacity,
+                dock_id=slot.dock_id,
+                occupancy=occupancy,
+                status=status,
+                bookings=bookings_map.get(slot.id, [])
+            )
+        )
+
+    return result
+
+
+class _Calendar(NamedTuple):
+    slots: list[models.TimeSlot]
+    occupancy_map: dict[int, int]
+    booking_rows: list
+    # booking id -> (start datetime, id of its first slot)
+    first_slot_by_booking: dict[int, tuple[datetime, int]]
+
+
+def _load_calendar(
+    db: Session,
+    from_date: date,
+    to_date: date,
+    object_id: Optional[int],
+    supplier_id: Optional[int],
+    transport_type_id: Optional[int],
+    booking_type: Optional[str],
+    dock_types: Optional[str],
+) -> Optional[_Calendar]:
+    """Slots, occupancy and confirmed bookings of the calendar; None when no dock or slot matches."""
+    # Docks in maintenance or switched off offer no slots.
+    docks_query = db.query(models.Dock.id).filter(models.Dock.status == models.DockStatus.active)
 
     if object_id:
         docks_query = docks_query.filter(models.Dock.object_id == object_id)
@@ -77,7 +156,7 @@ def list_time_slots(
 
     # Fallback: If no docks match the specific transport type, show all docks for the given object and dock types
     if not dock_ids and transport_type_id:
-        fallback_query = db.query(models.Dock.id)
+        fallback_query = db.query(models.Dock.id).filter(models.Dock.status == models.DockStatus.active)
         if object_id:
             fallback_query = fallback_query.filter(models.Dock.object_id == object_id)
         if types:
@@ -86,17 +165,24 @@ def list_time_slots(
         dock_ids = [d[0] for d in fallback_query.all()]
 
     if not dock_ids:
-        return []
+        return None
 
+    window = models.DockMaintenanceWindow
     slots = db.query(models.TimeSlot).filter(
         models.TimeSlot.slot_date >= from_date,
         models.TimeSlot.slot_date <= to_date,
         models.TimeSlot.is_available == True,
-        models.TimeSlot.dock_id.in_(dock_ids)
+        models.TimeSlot.dock_id.in_(dock_ids),
+        # Nor on the days of a maintenance window.
+        ~db.query(window.id).filter(
+            window.dock_id == models.TimeSlot.dock_id,
+            window.from_date <= models.TimeSlot.slot_date,
+            window.to_date >= models.TimeSlot.slot_date,
+        ).exists(),
     ).all()
 
     if not slots:
-        return []
+        return None
 
     slot_ids = [slot.id for slot in slots]
 
@@ -107,6 +193,9 @@ def list_time_slots(
         .all()
     )
     occupancy_map = {row[0]: row[1] for row in occupancy_rows}
+    # Unexpired holds take capacity until they turn into bookings or expire.
+    for slot_id, held in active_hold_counts(db, slot_ids).items():
+        occupancy_map[slot_id] = occupancy_map.get(slot_id, 0) + held
 
     booking_rows = (
         db.query(
@@ -142,52 +231,69 @@ def list_time_slots(
             if current_start < existing_dt:
                 first_slot_by_booking[row.booking_id] = (current_start, row.time_slot_id)
 
-    bookings_map: dict[int, list[schemas.TimeSlotBookingInfo]] = {}
-    for row in booking_rows:
-        is_start = False
-        first_entry = first_slot_by_booking.get(row.booking_id)
-        if first_entry and first_entry[1] == row.time_slot_id:
-            is_start = True
+    return _Calendar(slots, occupancy_map, booking_rows, first_slot_by_booking)
 
-        bookings_map.setdefault(row.time_slot_id, []).append(
-            schemas.TimeSlotBookingInfo(
-                id=row.booking_id,
-                supplier_name=row.supplier_name,
-                cubes=row.cubes,
-                transport_sheet=row.transport_sheet,
-                user_full_name=row.user_full_name,
-                user_email=row.user_email,
-                is_start=is_start,
-            )
-        )
 
-    result = []
-    for slot in slots:
-        occupancy = occupancy_map.get(slot.id, 0)
-        
-        status = "free"
-        if occupancy == 0:
-            status = "free"
-        elif occupancy < slot.capacity:
-            status = "partial"
-        else:
-            status = "full"
-        
-        result.append(
-            schemas.TimeSlotWithBookings(
-                id=slot.id,
-                day_of_week=slot.slot_date.weekday(),
-                start_time=slot.start_time.strftime("%H:%M"),
-                end_time=slot.end_time.strftime("%H:%M"),
-                capacity=slot.capacity,
-                dock_id=slot.dock_id,
-                occupancy=occupancy,
-                status=status,
-                bookings=bookings_map.get(slot.id, [])
-            )
-        )
+SLOT_STATUS_CODES = ["free", "partial", "full"]
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _columnar_calendar(calendar: Optional[_Calendar], from_date: date) -> Response:
+    """The calendar as parallel arrays, serialized by orjson without response-model validation.
+
+    "slots" holds one array per field, index i of each describing slot i: its day
+    as an offset from from_date, start/end as minutes since midnight and a status
+    code indexing "status_codes". Each booking appears once in "bookings",
+    however many slots it covers; "links" pairs slot and booking indexes, and a
+    link starts its booking when the slot is the booking's start_slot_id.
+    """
+    slots = {key: [] for key in ("id", "dock_id", "day", "start_minute", "end_minute", "capacity", "occupancy", "status")}
+    bookings = {key: [] for key in ("id", "supplier_name", "cubes", "transport_sheet", "user_full_name", "user_email", "start_slot_id")}
+    links = {"slot": [], "booking": []}
+
+    if calendar is not None:
+        slot_index = {}
+        for index, slot in enumerate(calendar.slots):
+            occupancy = calendar.occupancy_map.get(slot.id, 0)
+            slot_index[slot.id] = index
+            slots["id"].append(slot.id)
+            slots["dock_id"].append(slot.dock_id)
+            slots["day"].append((slot.slot_date - from_date).days)
+            slots["start_minute"].append(_minutes(slot.start_time))
+            slots["end_minute"].append(_minutes(slot.end_time))
+            slots["capacity"].append(slot.capacity)
+            slots["occupancy"].append(occupancy)
+            slots["status"].append(0 if occupancy == 0 else 1 if occupancy < slot.capacity else 2)
+
+        booking_index = {}
+        for row in calendar.booking_rows:
+            if row.time_slot_id not in slot_index:
+                continue
+            if row.booking_id not in booking_index:
+                booking_index[row.booking_id] = len(bookings["id"])
+                bookings["id"].append(row.booking_id)
+                bookings["supplier_name"].append(row.supplier_name)
+                bookings["cubes"].append(row.cubes)
+                bookings["transport_sheet"].append(row.transport_sheet)
+                bookings["user_full_name"].append(row.user_full_name)
+                bookings["user_email"].append(row.user_email)
+                bookings["start_slot_id"].append(calendar.first_slot_by_booking[row.booking_id][1])
+            links["slot"].append(slot_index[row.time_slot_id])
+            links["booking"].append(booking_index[row.booking_id])
+
+    payload = {
+        "format": "columnar",
+        "from_date": from_date,
+        "status_codes": SLOT_STATUS_CODES,
+        "slots": slots,
+        "bookings": bookings,
+        "links": links,
+    }
+    return Response(orjson.dumps(payload), media_type="application/json")
 
-    return result
 
 @router.get("/journal")
 def get_time_slots_journal(
@@ -200,7 +306,7 @@ def get_time_slots_journal(
     start_time_from: Optional[time] = Query(None, description="Время начала слота с (HH:MM)"),
     start_time_to: Optional[time] = Query(None, description="Время начала слота по (HH:MM)"),
     weekday: Optional[int] = Query(None, ge=0, le=6, description="0=Monday, 6=Sunday"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_reports_db),
     _: models.User = Depends(require_admin)
 ):
     """Журнал временных слотов с возможностью фильтрации"""
@@ -5,12 +5,13 @@ from typing import List
 from ..db import get_db
 from ..models import TransportTypeRef
 from ..schemas import TransportType, TransportTypeCreate
-from ..deps import require_admin
+from ..deps import read_endpoint, require_admin
 
 router = APIRouter(prefix="/api/transport-types", tags=["transport-types"])
 
 
 @router.get("/", response_model=List[TransportType])
+@read_endpoint
 def get_transport_types(db: Session = Depends(get_db)):
     """Получить типы перевозок."""
     return db.query(TransportTypeRef).all()
@@ -4,12 +4,13 @@ from typing import List
 
 from ..db import get_db
 from .. import models, schemas
-from ..deps import require_admin
+from ..deps import read_endpoint, require_admin
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.VehicleType])
+@read_endpoint
 def list_vehicle_types(db: Session = Depends(get_db)):
     return db.query(models.VehicleType).all()
 
@@ -1,16 +1,20 @@
 from collections import defaultdict
-from datetime import date, timedelta
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
 from io import BytesIO
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from fastapi.responses import StreamingResponse
-from openpyxl import Workbook, load_workbook
+from sqlalchemy import delete, insert, update
 from sqlalchemy.orm import Session, joinedload
 
 from .. import models, schemas
+from ..bulk_utils import PhaseTimer, chunked, upsert_statement
 from ..db import get_db
 from ..deps import require_admin
+from ..import_utils import ImportFileError, cell_date, cell_number, is_import_file, open_import_file
+from ..metrics import BatchTimer
 from ..quota_utils import get_quota_for_date, resolve_direction, used_volume_by_date
 
 router = APIRouter()
@@ -125,6 +129,149 @@ def _parse_transport_types(raw: str, tt_map: dict[str, int]) -> List[int]:
     return result
 
 
+@dataclass
+class _ExistingQuotaIndex:
+    values: dict[int, tuple[float, bool]] = field(default_factory=dict)
+    exact: dict[tuple, int] = field(default_factory=dict)
+    tt_owners: dict[tuple, list[int]] = field(default_factory=lambda: defaultdict(list))
+    overrides: dict[int, dict[date, tuple[int, float]]] = field(default_factory=lambda: defaultdict(dict))
+
+
+def _load_existing_quota_index(db: Session, years: set[int]) -> _ExistingQuotaIndex:
+    """Load existing quotas for the given years as plain tuples keyed for O(1) diffing."""
+    index = _ExistingQuotaIndex()
+    if not years:
+        return index
+
+    base_keys: dict[int, tuple] = {}
+    quota_rows = db.query(
+        models.VolumeQuota.id,
+        models.VolumeQuota.object_id,
+        models.VolumeQuota.direction,
+        models.VolumeQuota.year,
+        models.VolumeQuota.month,
+        models.VolumeQuota.day_of_week,
+        models.VolumeQuota.volume,
+        models.VolumeQuota.allow_overbooking,
+    ).filter(models.VolumeQuota.year.in_(years))
+    for row in quota_rows:
+        base_keys[row.id] = (row.object_id, row.direction, row.year, row.month, row.day_of_week)
+        index.values[row.id] = (row.volume, row.allow_overbooking)
+
+    tt_by_quota: dict[int, set[int]] = defaultdict(set)
+    link_rows = (
+        db.query(models.volume_quota_transport_types.c.quota_id, models.volume_quota_transport_types.c.transport_type_id)
+        .join(models.VolumeQuota, models.VolumeQuota.id == models.volume_quota_transport_types.c.quota_id)
+        .filter(models.VolumeQuota.year.in_(years))
+    )
+    for quota_id, tt_id in link_rows:
+        tt_by_quota[quota_id].add(tt_id)
+
+    for quota_id, base_key in base_keys.items():
+        tt_set = frozenset(tt_by_quota.get(quota_id, ()))
+        index.exact.setdefault((base_key, tt_set), quota_id)
+        for tt_id in tt_set:
+            index.tt_owners[(base_key, tt_id)].append(quota_id)
+
+    override_rows = (
+        db.query(
+            models.VolumeQuotaOverride.id,
+            models.VolumeQuotaOverride.quota_id,
+            models.VolumeQuotaOverride.override_date,
+            models.VolumeQuotaOverride.volume,
+        )
+        .join(models.VolumeQuota, models.VolumeQuota.id == models.VolumeQuotaOverride.quota_id)
+        .filter(models.VolumeQuota.year.in_(years))
+    )
+    for row in override_rows:
+        index.overrides[row.quota_id][row.override_date] = (row.id, row.volume)
+
+    return index
+
+
+def _apply_quota_import(
+    db: Session,
+    existing: _ExistingQuotaIndex,
+    pending: dict[tuple, dict],
+    existing_override_updates: dict[int, dict[date, float]],
+) -> tuple[int, int]:
+    """Persist the import diff with bulk statements. Returns (created, updated)."""
+    to_create = [payload for payload in pending.values() if payload["existing_id"] is None]
+    to_update = [payload for payload in pending.values() if payload["existing_id"] is not None]
+
+    override_upserts: list[dict] = []
+    stale_override_ids: list[int] = []
+
+    for batch in chunked(to_create):
+        new_ids = db.execute(
+            insert(models.VolumeQuota).returning(models.VolumeQuota.id, sort_by_parameter_order=True),
+            [
+                {
+                    "object_id": p["base_key"][0],
+                    "direction": p["base_key"][1],
+                    "year": p["base_key"][2],
+                    "month": p["base_key"][3],
+                    "day_of_week": p["base_key"][4],
+                    "volume": p["volume"],
+                    "allow_overbooking": p["allow_overbooking"],
+                }
+                for p in batch
+            ],
+        ).scalars().all()
+        links = [
+            {"quota_id": quota_id, "transport_type_id": tt_id}
+            for quota_id, p in zip(new_ids, batch)
+            for tt_id in sorted(p["tt_set"])
+        ]
+        if links:
+            db.execute(insert(models.volume_quota_transport_types), links)
+        override_upserts.extend(
+            {"quota_id": quota_id, "override_date": d, "volume": v}
+            for quota_id, p in zip(new_ids, batch)
+            for d, v in p["overrides"].items()
+        )
+
+    # Quotas present in the file replace their overrides entirely.
+    value_updates: list[dict] = []
+    for p in to_update:
+        quota_id = p["existing_id"]
+        if existing.values.get(quota_id) != (p["volume"], p["allow_overbooking"]):
+            value_updates.append({"id": quota_id, "volume": p["volume"], "allow_overbooking": p["allow_overbooking"]})
+        current = existing.overrides.get(quota_id, {})
+        stale_override_ids.extend(ov_id for d, (ov_id, _) in current.items() if d not in p["overrides"])
+        override_upserts.extend(
+            {"quota_id": quota_id, "override_date": d, "volume": v}
+            for d, v in p["overrides"].items()
+            if d not in current or current[d][1] != v
+        )
+
+    # Quotas touched only from the Overrides sheet keep their other overrides.
+    for quota_id, overrides in existing_override_updates.items():
+        current = existing.overrides.get(quota_id, {})
+        override_upserts.extend(
+            {"quota_id": quota_id, "override_date": d, "volume": v}
+            for d, v in overrides.items()
+            if d not in current or current[d][1] != v
+        )
+
+    for batch in chunked(value_updates):
+        db.execute(update(models.VolumeQuota), batch)
+    for batch in chunked(stale_override_ids):
+        db.execute(delete(models.VolumeQuotaOverride).where(models.VolumeQuotaOverride.id.in_(batch)))
+    if override_upserts:
+        stmt = upsert_statement(
+            db,
+            models.VolumeQuotaOverride.__table__,
+            index_elements=["quota_id", "override_date"],
+            update_columns=["volume"],
+            constraint="uq_quota_override_date",
+        )
+        for batch in chunked(override_upserts):
+            db.execute(stmt, batch)
+
+    return len(to_create), len(to_update) + len(existing_override_updates)
+
+
 @router.get("/", response_model=List[schemas.VolumeQuota])
 def list_volume_quotas(db: Session = Depends(get_db), _: models.User = Depends(require_admin)):
     quotas = (
@@ -140,6 +287,7 @@ def download_volume_quota_template(
     db: Session = Depends(get_db),
     _: models.User = Depends(require_admin),
 ):
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "Quotas"
@@ -177,65 +325,43 @@ def import_volume_quotas(
     db: Session = Depends(get_db),
     _: models.User = Depends(require_admin),
 ):
-    if not file.filename.lower().endswith((".xlsx", ".xlsm")):
-        raise HTTPException(status_code=400, detail="Only Excel .xlsx/.xlsm files are supported")
+    if not is_import_file(file.filename):
+        raise HTTPException(status_code=400, detail="Only .xlsx/.xlsm or .csv files are supported")
 
+    timer = PhaseTimer()
+    batch_timer = BatchTimer("volume_quota_import")
+    rows_read = 0
     try:
-        wb = load_workbook(BytesIO(file.file.read()))
-    except Exception:
+        source = open_import_file(file)
+    except ImportFileError:
         raise HTTPException(status_code=400, detail="Failed to read Excel file")
 
-    quotas_sheet = None
-    overrides_sheet = None
-    for name in wb.sheetnames:
-        normalized = name.strip().lower()
-        if normalized == "quotas" and not quotas_sheet:
-            quotas_sheet = wb[name]
-        if normalized == "overrides" and not overrides_sheet:
-            overrides_sheet = wb[name]
-    if quotas_sheet is None:
-        quotas_sheet = wb.active
-    if overrides_sheet is None and "Overrides" in wb.sheetnames:
-        overrides_sheet = wb["Overrides"]
+    # A CSV upload carries only the Quotas table.
+    quotas_sheet = source.sheet("quotas") or source.active_sheet()
+    overrides_sheet = source.sheet("overrides")
 
     expected_quota_headers = ["object", "direction", "year", "month", "day_of_week", "transport_types", "volume", "allow_overbooking"]
-    header_row = [str(cell.value).strip() if cell.value is not None else "" for cell in next(quotas_sheet.iter_rows(min_row=1, max_row=1))]
-    if [h.lower() for h in header_row] != expected_quota_headers:
+    if not quotas_sheet.has_headers(expected_quota_headers):
         raise HTTPException(status_code=400, detail=f"Invalid 'Quotas' headers. Expected: {', '.join(expected_quota_headers)}")
 
     expected_override_headers = ["object", "direction", "date", "transport_types", "volume"]
-    if overrides_sheet:
-        header_row_ov = [str(cell.value).strip() if cell.value is not None else "" for cell in next(overrides_sheet.iter_rows(min_row=1, max_row=1))]
-        if [h.lower() for h in header_row_ov] != expected_override_headers:
-            raise HTTPException(status_code=400, detail=f"Invalid 'Overrides' headers. Expected: {', '.join(expected_override_headers)}")
+    if overrides_sheet and not overrides_sheet.has_headers(expected_override_headers):
+        raise HTTPException(status_code=400, detail=f"Invalid 'Overrides' headers. Expected: {', '.join(expected_override_headers)}")
+    timer.mark("read")
 
     # Reference maps
-    object_map = {_normalize_lower(o.name): o.id for o in db.query(models.Object).all()}
-    tt_map = {_normalize_lower(t.name): t.id for t in db.query(models.TransportTypeRef).all()}
-
-    # Existing quotas grouped by (object, direction, year, month, day_of_week)
-    existing_quotas = db.query(models.VolumeQuota).options(
-        joinedload(models.VolumeQuota.transport_types),
-        joinedload(models.VolumeQuota.overrides),
-    ).all()
-    existing_by_key: dict[tuple, list] = defaultdict(list)
-    existing_by_id: dict[int, models.VolumeQuota] = {}
-    for q in existing_quotas:
-        key = (q.object_id, q.direction, q.year, q.month, q.day_of_week)
-        tt_ids = {t.id for t in q.transport_types}
-        existing_by_key[key].append((q, tt_ids))
-        existing_by_id[q.id] = q
+    object_map = {_normalize_lower(name): obj_id for obj_id, name in db.query(models.Object.id, models.Object.name).all()}
+    tt_map = {_normalize_lower(name): tt_id for tt_id, name in db.query(models.TransportTypeRef.id, models.TransportTypeRef.name).all()}
 
     errors: list[schemas.VolumeQuotaImportError] = []
-    pending: dict[tuple, dict] = {}
-    base_key_to_pending: dict[tuple, list] = defaultdict(list)
-    existing_override_updates: dict[int, dict[date, float]] = defaultdict(dict)
 
     def add_error(sheet: str, row_number: int, message: str):
         errors.append(schemas.VolumeQuotaImportError(sheet=sheet, row_number=row_number, message=message))
 
-    # Parse base quotas
-    for idx, row in enumerate(quotas_sheet.iter_rows(min_row=2, values_only=True), start=2):
+    # Parse and validate both sheets first; conflicts are resolved against the DB afterwards.
+    quota_rows: list[tuple[int, tuple, frozenset, float, bool]] = []
+    for idx, row in quotas_sheet.rows(expected_quota_headers):
+        rows_read += 1
         raw_object, raw_dir, raw_year, raw_month, raw_dow, raw_tt, raw_volume, raw_over = row
         obj_name = _normalize(raw_object)
         obj_id = object_map.get(_normalize_lower(obj_name))
@@ -276,7 +402,9 @@ def import_volume_quotas(
             transport_type_ids = []
 
         try:
-            volume = float(raw_volume)
+            volume = cell_number(raw_volume)
+            if volume is None:
+                raise ValueError("empty volume")
             if volume <= 0:
                 row_errors.append("volume must be greater than 0")
         except Exception:
@@ -289,53 +417,13 @@ def import_volume_quotas(
             add_error("Quotas", idx, "; ".join(row_errors))
             continue
 
-        key = (obj_id, direction_enum, year, month, day_of_week, frozenset(transport_type_ids))
         base_key = (obj_id, direction_enum, year, month, day_of_week)
+        quota_rows.append((idx, base_key, frozenset(transport_type_ids), volume, allow_overbooking))
 
-        if key in pending:
-            add_error("Quotas", idx, "Duplicate quota for same object/direction/date/transport types within file")
-            continue
-
-        # Check conflicts with pending in the same base key
-        for other in base_key_to_pending.get(base_key, []):
-            if other["tt_set"].intersection(set(transport_type_ids)):
-                add_error("Quotas", idx, "Conflicts with another quota in file for overlapping transport types")
-                break
-        else:
-            # Check conflicts with existing DB quotas
-            matching_existing = existing_by_key.get(base_key, [])
-            conflict = False
-            existing_match_id: int | None = None
-            for q, tt_ids in matching_existing:
-                if tt_ids == set(transport_type_ids):
-                    existing_match_id = q.id
-                    continue
-                if tt_ids.intersection(transport_type_ids):
-                    add_error("Quotas", idx, f"Conflicts with existing quota #{q.id} (overlapping transport types)")
-                    conflict = True
-                    break
-            if conflict:
-                continue
-
-            pending[key] = {
-                "object_id": obj_id,
-                "direction": direction_enum,
-                "year": year,
-                "month": month,
-                "day_of_week": day_of_week,
-                "volume": volume,
-                "allow_overbooking": allow_overbooking,
-                "transport_type_ids": transport_type_ids,
-                "tt_set": set(transport_type_ids),
-                "kind": "update" if existing_match_id else "create",
-                "existing_id": existing_match_id,
-                "overrides": {},
-            }
-            base_key_to_pending[base_key].append(pending[key])
-
-    # Parse overrides (optional sheet)
+    override_rows: list[tuple[int, tuple, frozenset, date, float]] = []
     if overrides_sheet:
-        for idx, row in enumerate(overrides_sheet.iter_rows(min_row=2, values_only=True), start=2):
+        for idx, row in overrides_sheet.rows(expected_override_headers):
+            rows_read += 1
             raw_object, raw_dir, raw_date, raw_tt, raw_volume = row
             obj_name = _normalize(raw_object)
             obj_id = object_map.get(_normalize_lower(obj_name))
@@ -350,9 +438,11 @@ def import_volume_quotas(
                 direction_enum = None
 
             try:
-                override_date = raw_date if isinstance(raw_date, date) else date.fromisoformat(str(raw_date))
+                override_date = cell_date(raw_date)
+                if override_date is None:
+                    raise ValueError("empty date")
             except Exception:
-                row_errors.append("date must be ISO (YYYY-MM-DD)")
+                row_errors.append("date must be YYYY-MM-DD or DD.MM.YYYY")
                 override_date = None
 
             try:
@@ -362,7 +452,9 @@ def import_volume_quotas(
                 transport_type_ids = []
 
             try:
-                volume = float(raw_volume)
+                volume = cell_number(raw_volume)
+                if volume is None:
+                    raise ValueError("empty volume")
                 if volume <= 0:
                     row_errors.append("volume must be greater than 0")
             except Exception:
@@ -374,98 +466,82 @@ def import_volume_quotas(
                 continue
 
             base_key = (obj_id, direction_enum, override_date.year, override_date.month, override_date.weekday())
-            target = None
-
-            for candidate in base_key_to_pending.get(base_key, []):
-                if candidate["tt_set"] == set(transport_type_ids):
-                    target = candidate
-                    break
-
-            existing_match: Optional[models.VolumeQuota] = None
-            if target is None:
-                for q, tt_ids in existing_by_key.get(base_key, []):
-                    if tt_ids == set(transport_type_ids):
-                        existing_match = q
-                        break
-
-            if target is None and existing_match is None:
-                add_error("Overrides", idx, "Base quota not found for this override (add it to 'Quotas' sheet first)")
-                continue
+            override_rows.append((idx, base_key, frozenset(transport_type_ids), override_date, volume))
+    timer.mark("parse")
 
-            # Date consistency check
-            if target:
-                if override_date.year != target["year"] or override_date.month != target["month"] or override_date.weekday() != target["day_of_week"]:
-                    add_error("Overrides", idx, "Override date does not match quota year/month/day_of_week")
-                    continue
-                if override_date in target["overrides"]:
-                    add_error("Overrides", idx, "Duplicate override date for the same quota in file")
-                    continue
-                target["overrides"][override_date] = volume
-            else:
-                # Existing quota only touched by overrides
-                existing_updates = existing_override_updates[existing_match.id]
-                if override_date in existing_updates:
-                    add_error("Overrides", idx, "Duplicate override date for the same quota in file")
-                    continue
-                existing_updates[override_date] = volume
-
-    created = 0
-    updated = 0
-
-    # Apply changes for quotas present in file
-    for payload in pending.values():
-        if payload["kind"] == "create":
-            quota = models.VolumeQuota(
-                object_id=payload["object_id"],
-                direction=payload["direction"],
-                year=payload["year"],
-                month=payload["month"],
-                day_of_week=payload["day_of_week"],
-                volume=payload["volume"],
-                allow_overbooking=payload["allow_overbooking"],
-            )
-            quota.transport_types = _load_transport_types(db, payload["transport_type_ids"])
-            quota.overrides = [models.VolumeQuotaOverride(override_date=d, volume=v) for d, v in payload["overrides"].items()]
-            db.add(quota)
-            created += 1
-        else:
-            quota = existing_by_id.get(payload["existing_id"])
-            if not quota:
-                add_error("Quotas", 0, f"Quota #{payload['existing_id']} not found during update")
-                continue
-            quota.object_id = payload["object_id"]
-            quota.direction = payload["direction"]
-            quota.year = payload["year"]
-            quota.month = payload["month"]
-            quota.day_of_week = payload["day_of_week"]
-            quota.volume = payload["volume"]
-            quota.allow_overbooking = payload["allow_overbooking"]
-            quota.transport_types = _load_transport_types(db, payload["transport_type_ids"])
-            quota.overrides.clear()
-            for d, v in payload["overrides"].items():
-                quota.overrides.append(models.VolumeQuotaOverride(override_date=d, volume=v))
-            updated += 1
-
-    # Apply overrides-only updates for existing quotas not touched in base sheet
-    for quota_id, overrides in existing_override_updates.items():
-        quota = existing_by_id.get(quota_id)
-        if not quota:
+    existing = _load_existing_quota_index(db, {key[2] for _, key, *_ in quota_rows} | {key[2] for _, key, *_ in override_rows})
+    timer.mark("load_existing")
+
+    # Diff file rows against existing quotas using hashed keys.
+    pending: dict[tuple, dict] = {}
+    pending_tt_owner: dict[tuple, tuple] = {}
+
+    for idx, base_key, tt_set, volume, allow_overbooking in quota_rows:
+        key = (base_key, tt_set)
+        if key in pending:
+            add_error("Quotas", idx, "Duplicate quota for same object/direction/date/transport types within file")
             continue
-        # Replace overrides for the given dates; keep others
-        existing_map = {ov.override_date: ov for ov in list(quota.overrides)}
-        for d, v in overrides.items():
-            if d in existing_map:
-                existing_map[d].volume = v
-            else:
-                quota.overrides.append(models.VolumeQuotaOverride(override_date=d, volume=v))
-        updated += 1
 
+        if any((base_key, tt_id) in pending_tt_owner for tt_id in tt_set):
+            add_error("Quotas", idx, "Conflicts with another quota in file for overlapping transport types")
+            continue
+
+        existing_match_id = existing.exact.get(key)
+        conflict_id = next(
+            (
+                quota_id
+                for tt_id in sorted(tt_set)
+                for quota_id in existing.tt_owners.get((base_key, tt_id), ())
+                if quota_id != existing_match_id
+            ),
+            None,
+        )
+        if conflict_id is not None:
+            add_error("Quotas", idx, f"Conflicts with existing quota #{conflict_id} (overlapping transport types)")
+            continue
+
+        pending[key] = {
+            "base_key": base_key,
+            "tt_set": tt_set,
+            "volume": volume,
+            "allow_overbooking": allow_overbooking,
+            "existing_id": existing_match_id,
+            "overrides": {},
+        }
+        for tt_id in tt_set:
+            pending_tt_owner[(base_key, tt_id)] = key
+
+    existing_override_updates: dict[int, dict[date, float]] = defaultdict(dict)
+    for idx, base_key, tt_set, override_date, volume in override_rows:
+        key = (base_key, tt_set)
+        target = pending.get(key)
+        existing_match_id = None if target else existing.exact.get(key)
+
+        if target is None and existing_match_id is None:
+            add_error("Overrides", idx, "Base quota not found for this override (add it to 'Quotas' sheet first)")
+            continue
+
+        # The base key is derived from the override date, so a matched quota always shares its year/month/weekday.
+        overrides = target["overrides"] if target else existing_override_updates[existing_match_id]
+        if override_date in overrides:
+            add_error("Overrides", idx, "Duplicate override date for the same quota in file")
+            continue
+        overrides[override_date] = volume
+    timer.mark("diff")
+
+    created, updated = _apply_quota_import(db, existing, pending, existing_override_updates)
     db.commit()
+    timer.mark("write")
+    batch_timer.done(rows_read)
+
+    sheet_order = {"Quotas": 0, "Overrides": 1}
+    errors.sort(key=lambda err: (sheet_order.get(err.sheet, 2), err.row_number))
 
     return schemas.VolumeQuotaImportResult(
         created=created,
         updated=updated,
         errors=errors,
+        timings=timer.finish(),
     )
 
 
@@ -6,6 +6,7 @@ from typing import List
 from ..db import get_db
 from .. import models, schemas
 from ..deps import require_admin
+from ..schedule_utils import schedule_slot_times
 
 router = APIRouter()
 
@@ -168,16 +169,9 @@ def generate_time_slots(
                 schedule.work_start and 
                 schedule.work_end):
                 
-                current_time = schedule.work_start
-                while current_time < schedule.work_end:
-                    next_time = (datetime.combine(current_date, current_time) + timedelta(minutes=30)).time()
-                    
-                    # Пропускаем слоты, пересекающиеся с перерывом
-                    if (schedule.break_start and schedule.break_end and 
-                        current_time < schedule.break_end and next_time > schedule.break_start):
-                        current_time = schedule.break_end
-                        continue
-                    
+                for current_time, next_time in schedule_slot_times(
+                    schedule.work_start, schedule.work_end, schedule.break_start, schedule.break_end
+                ):
                     # Проверяем, не существует ли уже такой слот
                     existing = db.query(models.TimeSlot).filter(
                         models.TimeSlot.dock_id == schedule.dock_id,
@@ -197,8 +191,6 @@ def generate_time_slots(
                         )
                         db.add(new_slot)
                         slots_created += 1
-                    
-                    current_time = next_time
         
         current_date += timedelta(days=1)
     
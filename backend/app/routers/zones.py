@@ -5,12 +5,13 @@ from typing import List
 from ..db import get_db
 from ..models import Zone
 from ..schemas import Zone as ZoneSchema, ZoneCreate
-from ..deps import require_admin
+from ..deps import read_endpoint, require_admin
 
 router = APIRouter(prefix="/api/zones", tags=["zones"])
 
 
 @router.get("/", response_model=List[ZoneSchema])
+@read_endpoint
 def get_zones(db: Session = Depends(get_db)):
     """Получить список зон."""
     return db.query(Zone).all()
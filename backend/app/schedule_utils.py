@@ -0,0 +1,25 @@
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional
+
+
+def schedule_slot_times(
+    work_start: time,
+    work_end: time,
+    break_start: Optional[time] = None,
+    break_end: Optional[time] = None,
+) -> Iterator[tuple[time, time]]:
+    """30-minute slot (start, end) pairs of one working day, skipping slots that overlap the break."""
+    current_time = work_start
+    while current_time < work_end:
+        next_time = (datetime.combine(date.min, current_time) + timedelta(minutes=30)).time()
+        if next_time <= current_time:
+            # A day ending at midnight: the last slot would wrap around.
+            return
+
+        # Пропускаем слоты, пересекающиеся с перерывом
+        if break_start and break_end and current_time < break_end and next_time > break_start:
+            current_time = break_end
+            continue
+
+        yield current_time, next_time
+        current_time = next_time
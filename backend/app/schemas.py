@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date, time, datetime
 
 # User schemas
@@ -124,6 +124,45 @@ class Dock(DockBase):
     class Config:
         from_attributes = True
 
+
+class DockMaintenance(BaseModel):
+    from_date: date
+    to_date: date
+    status: str = "maintenance"  # maintenance | inactive
+    dry_run: bool = False
+
+
+class DockRelocationItem(BaseModel):
+    booking_id: int
+    status: str  # moved | unplaceable
+    detail: Optional[str] = None
+    booking_date: str
+    start_time: str
+    from_time_slot_ids: List[int]
+    dock_id: Optional[int] = None
+    time_slot_ids: List[int] = []
+
+
+class DockMaintenanceWindow(BaseModel):
+    id: int
+    dock_id: int
+    status: str
+    from_date: date
+    to_date: date
+
+    class Config:
+        from_attributes = True
+
+
+class DockRelocationReport(BaseModel):
+    dock_id: int
+    status: str
+    dry_run: bool
+    window_id: Optional[int] = None
+    moved: int
+    unplaceable: int
+    results: List[DockRelocationItem]
+
 class DockZoneUpdate(BaseModel):
     zone_ids: List[int]
 
@@ -350,6 +389,7 @@ class BookingCreateUpdated(BookingBaseUpdated):
     object_id: int
     booking_type: str = "in"
     time_slot_id: Optional[int] = None
+    hold_id: Optional[int] = None
 
 class BookingUpdated(BookingBaseUpdated):
     id: int
@@ -372,6 +412,11 @@ class BookingWithDetailsUpdated(BookingWithDetails):
 class BookingTransportSheetUpdate(BaseModel):
     transport_sheet: Optional[str] = None
 
+class BookingReschedule(BaseModel):
+    booking_date: str
+    start_time: str
+    time_slot_id: Optional[int] = None
+
 # PrrLimit schemas
 class PrrLimitBase(BaseModel):
     object_id: int
@@ -472,6 +517,7 @@ class VolumeQuotaImportResult(BaseModel):
     created: int
     updated: int
     errors: List[VolumeQuotaImportError] = []
+    timings: Dict[str, float] = {}
 
 
 # Booking import schemas
@@ -480,6 +526,154 @@ class BookingImportError(BaseModel):
     message: str
 
 
+class BookingImportPlacement(BaseModel):
+    row_number: int
+    dock_id: int
+    dock_name: str
+    booking_date: str
+    start_time: str
+    end_time: str
+    time_slot_ids: List[int]
+
+
 class BookingImportResult(BaseModel):
-    created: int
+    created: int  # with dry_run: bookings that would be created
     errors: List[BookingImportError] = []
+    dry_run: bool = False
+    placements: List[BookingImportPlacement] = []
+
+
+class SlotHoldCreate(BaseModel):
+    object_id: int
+    booking_date: str
+    start_time: str
+    vehicle_type_id: int
+    booking_type: str = "in"
+    supplier_id: Optional[int] = None
+    zone_id: Optional[int] = None
+    transport_type_id: Optional[int] = None
+    cubes: Optional[float] = None
+    time_slot_id: Optional[int] = None
+    ttl_seconds: Optional[int] = None
+
+
+class SlotHold(BaseModel):
+    id: int
+    object_id: int
+    booking_type: str
+    expires_at: datetime
+    dock_id: int
+    booking_date: str
+    start_time: str
+    end_time: str
+    time_slot_ids: List[int]
+
+
+class BookingBatchCreate(BaseModel):
+    mode: str = "atomic"  # atomic | best_effort
+    bookings: List[BookingCreateUpdated]
+
+
+class BookingBatchItemResult(BaseModel):
+    index: int
+    status: str  # created | failed | not_created (atomic batch with failures)
+    status_code: Optional[int] = None
+    detail: Optional[str] = None
+    booking_id: Optional[int] = None
+    time_slot_ids: List[int] = []
+
+
+class BookingBatchResult(BaseModel):
+    mode: str
+    created: int
+    failed: int
+    results: List[BookingBatchItemResult]
+
+
+class AvailabilityOption(BaseModel):
+    object_id: int
+    object_name: str
+    dock_id: int
+    dock_name: str
+    booking_date: str
+    start_time: str
+    end_time: str
+    duration_minutes: int
+    time_slot_ids: List[int]
+    quota_remaining: Optional[float] = None  # None when no quota applies
+
+
+class SimulationDock(BaseModel):
+    name: str
+    dock_type: str = "universal"
+    copy_of: Optional[int] = None  # existing dock whose zones, transport types and schedules are copied
+    available_zone_ids: Optional[List[int]] = None
+    available_transport_type_ids: Optional[List[int]] = None
+
+
+class SimulationScenario(BaseModel):
+    name: str
+    # Replace the (dock, weekday) schedule; dock ids -1, -2, ... refer to add_docks.
+    schedules: List[WorkScheduleCreate] = []
+    add_docks: List[SimulationDock] = []
+    remove_dock_ids: List[int] = []
+    capacity_in: Optional[int] = None
+    capacity_out: Optional[int] = None
+
+
+class SimulationRequest(BaseModel):
+    object_id: int
+    from_date: date
+    to_date: date
+    scenarios: List[SimulationScenario] = []
+    include_current: bool = True
+    max_shift_minutes: int = 0
+    policy: str = "first_fit"  # first_fit | best_fit | optimized
+
+
+class SimulationRejection(BaseModel):
+    booking_id: int
+    booking_date: str
+    start_time: str
+    reason: str
+
+
+class SimulationDockUsage(BaseModel):
+    dock_id: int
+    dock_name: str
+    available_minutes: int
+    booked_minutes: int
+    utilization: float
+
+
+class SimulationFragmentation(BaseModel):
+    free_minutes: int
+    stranded_minutes: int  # free minutes in runs shorter than the median booking
+    largest_run_minutes: int
+    ratio: float
+
+
+class SimulationResult(BaseModel):
+    scenario: str
+    policy: str = "first_fit"
+    bookings: int
+    placed: int
+    shifted: int
+    rejected: int
+    utilization: float
+    fragmentation: Optional[SimulationFragmentation] = None
+    docks: List[SimulationDockUsage]
+    rejections: List[SimulationRejection]
+
+
+class RouteQueryMetrics(BaseModel):
+    route: str
+    requests: int
+    queries: int
+    avg_queries: float
+    max_queries: int
+    db_ms: float
+    avg_db_ms: float
+    avg_request_ms: float
+    slowest_ms: float
+    slowest_statement: str
@@ -0,0 +1,341 @@
+"""
+Seeded synthetic data at production scale, for benchmarks and load tests.
+
+Fills an empty database with objects, docks, work schedules, 30-minute time
+slots over several months, suppliers, carriers and confirmed or cancelled
+bookings placed within slot capacity. The same scale, seed and start date
+always give the same rows. Rows are written with bulk inserts and the object occupancy
+counters are rebuilt at the end, so the data looks as if it was booked
+through the API.
+
+Run:
+    python -m app.seed_data --database-url sqlite:///yms-bench.db [--scale medium] [--seed 1]
+
+Every user gets the password SEED_PASSWORD; the admin is SEED_ADMIN_EMAIL.
+"""
+
+import argparse
+import random
+import time as timer
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import models
+from .bulk_utils import chunked
+from .db import Base
+from .occupancy import rebuild_object_occupancy
+from .security import get_password_hash
+from .startup import stamp_schema
+
+SEED_ADMIN_EMAIL = "bench-admin@example.com"
+SEED_PASSWORD = "benchmark"
+
+SLOT_MINUTES = 30
+WORK_START = time(8, 0)
+WORK_END = time(20, 0)
+# Sundays are days off.
+WORKING_WEEKDAYS = range(6)
+OPEN_DAYS = 7
+OPEN_DAYS_FILL = 0.25
+
+ZONES = ("Север", "Юг", "Запад", "Восток", "Центр", "Область")
+TRANSPORT_TYPES = (
+    ("Собственное производство", models.TransportType.own_production),
+    ("Закупка", models.TransportType.purchased),
+    ("Контейнер", models.TransportType.container),
+    ("Возврат", models.TransportType.return_goods),
+)
+VEHICLE_TYPES = (("Газель", 30), ("Фура 10т", 60), ("Фура 20т", 90), ("Контейнер 40'", 120))
+DOCK_TYPES = (models.DockType.universal, models.DockType.universal, models.DockType.entrance, models.DockType.exit)
+
+
+@dataclass(frozen=True)
+class Scale:
+    objects: int
+    docks_per_object: int
+    months: int
+    suppliers: int
+    carriers: int
+    bookings: int
+
+
+SCALES = {
+    "tiny": Scale(objects=1, docks_per_object=3, months=1, suppliers=5, carriers=3, bookings=200),
+    "small": Scale(objects=2, docks_per_object=4, months=1, suppliers=40, carriers=20, bookings=1_200),
+    "medium": Scale(objects=6, docks_per_object=10, months=6, suppliers=300, carriers=120, bookings=50_000),
+    "large": Scale(objects=10, docks_per_object=16, months=12, suppliers=1_500, carriers=500, bookings=300_000),
+}
+
+
+@dataclass
+class SeedSummary:
+    scale: str
+    seed: int
+    from_date: date
+    to_date: date
+    objects: int = 0
+    docks: int = 0
+    time_slots: int = 0
+    suppliers: int = 0
+    users: int = 0
+    bookings: int = 0
+    confirmed: int = 0
+    occupancy_rows: int = 0
+    seconds: float = 0.0
+
+
+def _slot_starts() -> list[time]:
+    starts, minutes = [], WORK_START.hour * 60 + WORK_START.minute
+    while minutes + SLOT_MINUTES <= WORK_END.hour * 60 + WORK_END.minute:
+        starts.append(time(minutes // 60, minutes % 60))
+        minutes += SLOT_MINUTES
+    return starts
+
+
+def _add_minutes(value: time, minutes: int) -> time:
+    total = value.hour * 60 + value.minute + minutes
+    return time(total // 60, total % 60)
+
+
+def _insert(db: Session, model, rows: list[dict]) -> list[int]:
+    """Insert `rows` in batches and return their ids in order."""
+    ids: list[int] = []
+    for batch in chunked(rows):
+        result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), batch)
+        ids.extend(result.scalars().all())
+    return ids
+
+
+def _insert_links(db: Session, table, rows: Iterable[dict]) -> None:
+    for batch in chunked(rows):
+        db.execute(insert(table), batch)
+
+
+def seed(db: Session, scale: str = "small", seed: int = 1, from_date: Optional[date] = None) -> SeedSummary:
+    """
+    Fill the empty database behind `db` with the `scale` preset and commit.
+
+    Bookings start on `from_date` (the first day of the current month by
+    default) and run for 30 days per month of the preset. Raises ValueError
+    when the database already has objects or bookings.
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale {scale!r}, expected one of: {', '.join(SCALES)}")
+    if db.query(models.Object.id).first() is not None or db.query(models.Booking.id).first() is not None:
+        raise ValueError("The database already has objects or bookings; seed an empty one")
+
+    preset = SCALES[scale]
+    rng = random.Random(seed)
+    started = timer.perf_counter()
+    from_date = from_date or date.today().replace(day=1)
+    to_date = from_date + timedelta(days=30 * preset.months - 1)
+    summary = SeedSummary(scale=scale, seed=seed, from_date=from_date, to_date=to_date)
+    now = datetime.utcnow()
+
+    # Reference data
+    zone_ids = _insert(db, models.Zone, [{"name": name} for name in ZONES])
+    transport_type_ids = _insert(db, models.TransportTypeRef, [{"name": name, "enum_value": value} for name, value in TRANSPORT_TYPES])
+    vehicle_durations = dict(zip(
+        _insert(db, models.VehicleType, [{"name": name, "duration_minutes": minutes} for name, minutes in VEHICLE_TYPES]),
+        (minutes for _, minutes in VEHICLE_TYPES),
+    ))
+
+    object_ids = _insert(db, models.Object, [
+        {"name": f"Склад {number:02d}", "object_type": models.ObjectType.warehouse, "address": f"Промзона, стр. {number}"}
+        for number in range(1, preset.objects + 1)
+    ])
+    summary.objects = len(object_ids)
+
+    dock_rows, dock_zones = [], []
+    for object_number, object_id in enumerate(object_ids, start=1):
+        for number in range(1, preset.docks_per_object + 1):
+            # A third of the docks take every zone, the others two of them.
+            zones = [] if number % 3 == 0 else rng.sample(zone_ids, 2)
+            dock_rows.append({
+                "name": f"Склад {object_number:02d} / Док {number:02d}",
+                "object_id": object_id,
+                "dock_type": DOCK_TYPES[(number - 1) % len(DOCK_TYPES)],
+                "status": models.DockStatus.active,
+            })
+            dock_zones.append(zones)
+    dock_ids = _insert(db, models.Dock, dock_rows)
+    summary.docks = len(dock_ids)
+    docks = [dict(row, id=dock_id, zones=zones) for row, dock_id, zones in zip(dock_rows, dock_ids, dock_zones)]
+    _insert_links(db, models.dock_zone_association, (
+        {"dock_id": dock["id"], "zone_id": zone_id} for dock in docks for zone_id in dock["zones"]
+    ))
+
+    _insert(db, models.WorkSchedule, [
+        {
+            "day_of_week": weekday,
+            "dock_id": dock_id,
+            "work_start": WORK_START if weekday in WORKING_WEEKDAYS else None,
+            "work_end": WORK_END if weekday in WORKING_WEEKDAYS else None,
+            "is_working_day": weekday in WORKING_WEEKDAYS,
+            "capacity": 1,
+        }
+        for dock_id in dock_ids
+        for weekday in range(7)
+    ])
+
+    # Time slots: (dock_id, day) -> slot ids in start order.
+    starts = _slot_starts()
+    days = [from_date + timedelta(days=offset) for offset in range((to_date - from_date).days + 1)]
+    working_days = [day for day in days if day.weekday() in WORKING_WEEKDAYS]
+    slot_rows = [
+        {
+            "dock_id": dock_id,
+            "slot_date": day,
+            "start_time": start,
+            "end_time": _add_minutes(start, SLOT_MINUTES),
+            "capacity": 1,
+            "is_available": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for dock_id in dock_ids
+        for day in working_days
+        for start in starts
+    ]
+    slot_ids = _insert(db, models.TimeSlot, slot_rows)
+    summary.time_slots = len(slot_ids)
+    day_slots: dict[tuple[int, date], list[int]] = defaultdict(list)
+    for row, slot_id in zip(slot_rows, slot_ids):
+        day_slots[(row["dock_id"], row["slot_date"])].append(slot_id)
+    del slot_rows
+
+    # Suppliers and users
+    supplier_rows = [
+        {"name": f"ООО Поставщик {number:04d}", "zone_id": rng.choice(zone_ids)}
+        for number in range(1, preset.suppliers + 1)
+    ]
+    supplier_zone = {
+        supplier_id: row["zone_id"] for supplier_id, row in zip(_insert(db, models.Supplier, supplier_rows), supplier_rows)
+    }
+    supplier_ids = list(supplier_zone)
+    summary.suppliers = len(supplier_ids)
+    supplier_vehicle_types = {supplier_id: rng.sample(list(vehicle_durations), 2) for supplier_id in supplier_ids}
+    supplier_transport_type = {supplier_id: rng.choice(transport_type_ids) for supplier_id in supplier_ids}
+    _insert_links(db, models.supplier_vehicle_type_association, (
+        {"supplier_id": supplier_id, "vehicle_type_id": vehicle_type_id}
+        for supplier_id, vehicle_type_ids in supplier_vehicle_types.items()
+        for vehicle_type_id in vehicle_type_ids
+    ))
+    _insert_links(db, models.supplier_transport_type_association, (
+        {"supplier_id": supplier_id, "transport_type_id": transport_type_id}
+        for supplier_id, transport_type_id in supplier_transport_type.items()
+    ))
+
+    # One bcrypt hash for everybody: hashing per user would dominate the run.
+    password_hash = get_password_hash(SEED_PASSWORD)
+    user_ids = _insert(db, models.User, [
+        {"email": SEED_ADMIN_EMAIL, "full_name": "Benchmark Admin", "password_hash": password_hash, "role": models.UserRole.admin, "is_active": True, "created_at": now},
+        *(
+            {"email": f"carrier{number:04d}@example.com", "full_name": f"Перевозчик {number:04d}", "password_hash": password_hash, "role": models.UserRole.carrier, "is_active": True, "created_at": now}
+            for number in range(1, preset.carriers + 1)
+        ),
+    ])
+    summary.users = len(user_ids)
+    carrier_suppliers = {
+        user_id: rng.sample(supplier_ids, min(3, len(supplier_ids))) for user_id in user_ids[1:]
+    }
+    _insert(db, models.UserSupplier, [
+        {"user_id": user_id, "supplier_id": supplier_id}
+        for user_id, suppliers in carrier_suppliers.items()
+        for supplier_id in suppliers
+    ])
+
+    # Bookings, placed within slot capacity: a booking that does not fit where
+    # it was drawn is dropped, so busy days end up close to full. The last
+    # OPEN_DAYS are still open for booking and get a fraction of the others.
+    # Cancelled bookings keep no slot links, as after PUT /bookings/{id}/cancel.
+    docks_by_object: dict[int, list[dict]] = defaultdict(list)
+    for dock in docks:
+        docks_by_object[dock["object_id"]].append(dock)
+    carriers = list(carrier_suppliers)
+    used: set[int] = set()
+    booking_rows, booking_slots = [], []
+    for _ in range(preset.bookings * 4):
+        if len(booking_rows) == preset.bookings:
+            break
+        user_id = rng.choice(carriers)
+        supplier_id = rng.choice(carrier_suppliers[user_id])
+        object_id = rng.choice(object_ids)
+        dock = rng.choice([
+            d for d in docks_by_object[object_id] if not d["zones"] or supplier_zone[supplier_id] in d["zones"]
+        ] or docks_by_object[object_id])
+        vehicle_type_id = rng.choice(supplier_vehicle_types[supplier_id])
+        length = vehicle_durations[vehicle_type_id] // SLOT_MINUTES
+        day = rng.choice(working_days)
+        if day > to_date - timedelta(days=OPEN_DAYS) and rng.random() > OPEN_DAYS_FILL:
+            continue
+        first = rng.randrange(len(starts) - length + 1)
+        chain = day_slots[(dock["id"], day)][first:first + length]
+        if used.intersection(chain):
+            continue
+        confirmed = rng.random() < 0.9
+        if confirmed:
+            used.update(chain)
+        if dock["dock_type"] == models.DockType.universal:
+            direction = rng.choice(list(models.BookingDirection))
+        else:
+            direction = models.BookingDirection.outbound if dock["dock_type"] == models.DockType.exit else models.BookingDirection.inbound
+        created_at = datetime.combine(day, starts[first]) - timedelta(minutes=rng.randint(60, 7 * 24 * 60))
+        booking_rows.append({
+            "user_id": user_id,
+            "vehicle_type_id": vehicle_type_id,
+            "vehicle_plate": f"А{rng.randint(0, 999):03d}АА{rng.randint(1, 199)}",
+            "driver_full_name": f"Водитель {rng.randint(1, 5000):04d}",
+            "driver_phone": f"+7 9{rng.randint(0, 10**9 - 1):09d}",
+            "supplier_id": supplier_id,
+            "zone_id": supplier_zone[supplier_id],
+            "transport_type_id": supplier_transport_type[supplier_id],
+            "cubes": round(rng.uniform(5, 90), 1),
+            "transport_sheet": f"TS-{len(booking_rows) + 1:07d}",
+            "status": "confirmed" if confirmed else "cancelled",
+            "booking_type": direction,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        booking_slots.append(chain)
+    booking_ids = _insert(db, models.Booking, booking_rows)
+    summary.bookings = len(booking_ids)
+    summary.confirmed = sum(1 for row in booking_rows if row["status"] == "confirmed")
+    _insert_links(db, models.BookingTimeSlot, (
+        {"booking_id": booking_id, "time_slot_id": slot_id}
+        for booking_id, row, chain in zip(booking_ids, booking_rows, booking_slots)
+        if row["status"] == "confirmed"
+        for slot_id in chain
+    ))
+
+    summary.occupancy_rows = rebuild_object_occupancy(db)
+    db.commit()
+    summary.seconds = round(timer.perf_counter() - started, 2)
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fill an empty database with seeded synthetic YMS data.")
+    parser.add_argument("--database-url", required=True, help="SQLAlchemy URL of the database to fill")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--from-date", type=date.fromisoformat, help="First day with slots (default: first day of this month)")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    # Built from the models like setup_database: at the Alembic head, so workers report ready.
+    stamp_schema(args.database_url)
+    with sessionmaker(bind=engine)() as db:
+        summary = seed(db, args.scale, args.seed, args.from_date)
+    for name, value in asdict(summary).items():
+        print(f"{name:<15} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from datetime import time, datetime, date, timedelta
 from .db import SessionLocal, engine, Base
 from . import models
 from .security import get_password_hash
+from .startup import stamp_schema
 from .models import TransportType, DockType, ObjectType
 
 # Configure logging
@@ -17,7 +18,9 @@ def create_schema(db: Session):
     """Creates the full database schema."""
     logger.info("Creating all tables from Base metadata...")
     Base.metadata.create_all(bind=engine)
-    logger.info("Tables from metadata created.")
+    # The tables already match the latest migration; later deploys run only newer ones.
+    stamp_schema()
+    logger.info("Tables from metadata created and stamped at the Alembic head.")
 
 
 def create_admin_user(db: Session):
@@ -0,0 +1,447 @@
+"""
+What-if capacity simulation: replay historical bookings against another dock layout.
+
+The bookings of a period are replayed in the order they were made through the
+allocation rules of create_booking (dock type, supplier zone, dock transport
+types, slot and object capacity, PRR duration), against slots generated from
+a hypothetical set of docks and work schedules. Nothing is read from
+time_slots and nothing is written; volume quotas are not part of the replay.
+
+Run:
+    python -m app.simulation --object-id 1 --from 2026-09-01 --to 2026-09-30 [--scenario scenario.json ...] [--policy best_fit]
+
+A scenario file holds one SimulationScenario or a list of them.
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from . import models, schemas
+from .availability import BATCH_POLICIES, AvailabilityIndex, ChainFilters, DockDay, Fragmentation, batch_policy, slot_minutes
+from .db import SessionLocal
+from .prr_utils import PrrDurationLookup
+from .schedule_utils import schedule_slot_times
+
+
+@dataclass(frozen=True)
+class Demand:
+    """What a historical booking asked for."""
+
+    booking_id: int
+    booking_date: date
+    start_time: time
+    duration_minutes: int
+    direction: models.BookingDirection
+    supplier_zone_id: Optional[int] = None
+    transport_type_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Shift:
+    work_start: time
+    work_end: time
+    break_start: Optional[time] = None
+    break_end: Optional[time] = None
+    capacity: int = 1
+
+
+@dataclass(frozen=True)
+class _Ref:
+    id: int
+
+
+@dataclass
+class SimDock:
+    """A dock of the hypothetical layout; stands in for models.Dock in the index."""
+
+    id: int
+    name: str
+    object_id: int
+    dock_type: models.DockType
+    available_zones: List[_Ref] = field(default_factory=list)
+    available_transport_types: List[_Ref] = field(default_factory=list)
+    # Working hours per weekday (0=Mon); days without an entry are off.
+    schedules: dict[int, Shift] = field(default_factory=dict)
+    status: models.DockStatus = models.DockStatus.active
+
+
+@dataclass
+class SimObject:
+    id: int
+    capacity_in: Optional[int] = None
+    capacity_out: Optional[int] = None
+
+
+@dataclass
+class Layout:
+    object: SimObject
+    docks: List[SimDock]
+
+
+@dataclass(slots=True)
+class _SimSlot:
+    """Stands in for models.TimeSlot in the index."""
+
+    id: int
+    dock_id: int
+    slot_date: date
+    start_time: time
+    end_time: time
+    capacity: int
+
+
+class SimulatedAvailability(AvailabilityIndex):
+    """AvailabilityIndex over a Layout: slots come from the work schedules, starting empty."""
+
+    def __init__(self, layout: Layout):
+        super().__init__(db=None)
+        self.layout = layout
+        self._next_slot_id = 0
+        for dock in layout.docks:
+            self._dock_by_id[dock.id] = dock
+        self._docks[layout.object.id] = sorted(layout.docks, key=lambda d: d.id)
+
+    def docks(self, object_id: int) -> list:
+        return self._docks.get(object_id, [])
+
+    def _object(self, object_id: int):
+        return self.layout.object if object_id == self.layout.object.id else None
+
+    def _load_days(self, object_id: int, days: list[date]) -> None:
+        self._loaded.update((object_id, day) for day in days)
+        for dock in self.docks(object_id):
+            for day in days:
+                shift = dock.schedules.get(day.weekday())
+                slots = []
+                if shift is not None:
+                    for start, end in schedule_slot_times(shift.work_start, shift.work_end, shift.break_start, shift.break_end):
+                        self._next_slot_id += 1
+                        slot = _SimSlot(self._next_slot_id, dock.id, day, start, end, shift.capacity)
+                        self._slot_by_id[slot.id] = slot
+                        slots.append(slot)
+                self._days[(dock.id, day)] = DockDay(slots)
+
+    def day_slots(self, dock_id: int, day: date) -> list:
+        return self._days[(dock_id, day)].slots
+
+
+def _parse_time(value: Optional[str]) -> Optional[time]:
+    return datetime.strptime(value, "%H:%M").time() if value else None
+
+
+def load_layout(db: Session, object_id: int) -> Layout:
+    """The docks in service of the object with their work schedules, zones and transport types."""
+    obj = db.get(models.Object, object_id)
+    if obj is None:
+        raise ValueError(f"Object {object_id} not found")
+    docks = db.query(models.Dock).options(
+        joinedload(models.Dock.available_zones),
+        joinedload(models.Dock.available_transport_types),
+    ).filter(
+        models.Dock.object_id == object_id,
+        models.Dock.status == models.DockStatus.active,
+    ).order_by(models.Dock.id).all()
+
+    shifts: dict[int, dict[int, Shift]] = defaultdict(dict)
+    for ws in db.query(models.WorkSchedule).filter(models.WorkSchedule.dock_id.in_([d.id for d in docks])):
+        if ws.is_working_day and ws.work_start and ws.work_end:
+            shifts[ws.dock_id][ws.day_of_week] = Shift(ws.work_start, ws.work_end, ws.break_start, ws.break_end, ws.capacity)
+
+    return Layout(
+        object=SimObject(obj.id, obj.capacity_in, obj.capacity_out),
+        docks=[
+            SimDock(
+                id=d.id,
+                name=d.name,
+                object_id=object_id,
+                dock_type=models.DockType(d.dock_type),
+                available_zones=[_Ref(z.id) for z in d.available_zones],
+                available_transport_types=[_Ref(t.id) for t in d.available_transport_types],
+                schedules=shifts[d.id],
+            )
+            for d in docks
+        ],
+    )
+
+
+def apply_scenario(layout: Layout, scenario: schemas.SimulationScenario) -> Layout:
+    """
+    A copy of `layout` with the scenario's changes.
+
+    Added docks get ids -1, -2, ... in order, so schedule entries can refer to
+    them. Schedule entries replace the (dock, weekday) shift; a non-working
+    entry takes the day off.
+    """
+    docks = {d.id: replace(d, schedules=dict(d.schedules)) for d in layout.docks}
+    for dock_id in scenario.remove_dock_ids:
+        if docks.pop(dock_id, None) is None:
+            raise ValueError(f"Dock {dock_id} is not part of the layout")
+
+    for number, added in enumerate(scenario.add_docks, start=1):
+        template = None
+        if added.copy_of is not None:
+            template = next((d for d in layout.docks if d.id == added.copy_of), None)
+            if template is None:
+                raise ValueError(f"Dock {added.copy_of} to copy is not part of the layout")
+        zones = [_Ref(z) for z in added.available_zone_ids] if added.available_zone_ids is not None else None
+        transport_types = (
+            [_Ref(t) for t in added.available_transport_type_ids] if added.available_transport_type_ids is not None else None
+        )
+        docks[-number] = SimDock(
+            id=-number,
+            name=added.name,
+            object_id=layout.object.id,
+            dock_type=models.DockType(added.dock_type),
+            available_zones=zones if zones is not None else list(template.available_zones if template else []),
+            available_transport_types=(
+                transport_types if transport_types is not None else list(template.available_transport_types if template else [])
+            ),
+            schedules=dict(template.schedules) if template else {},
+        )
+
+    for entry in scenario.schedules:
+        dock = docks.get(entry.dock_id)
+        if dock is None:
+            raise ValueError(f"Dock {entry.dock_id} is not part of the scenario")
+        if entry.is_working_day and entry.work_start and entry.work_end:
+            dock.schedules[entry.day_of_week] = Shift(
+                _parse_time(entry.work_start),
+                _parse_time(entry.work_end),
+                _parse_time(entry.break_start),
+                _parse_time(entry.break_end),
+                entry.capacity,
+            )
+        else:
+            dock.schedules.pop(entry.day_of_week, None)
+
+    obj = replace(
+        layout.object,
+        capacity_in=scenario.capacity_in if scenario.capacity_in is not None else layout.object.capacity_in,
+        capacity_out=scenario.capacity_out if scenario.capacity_out is not None else layout.object.capacity_out,
+    )
+    return Layout(object=obj, docks=list(docks.values()))
+
+
+def load_demand(db: Session, object_id: int, from_date: date, to_date: date) -> List[Demand]:
+    """Bookings of the object arriving between the dates (cancelled ones excluded), in the order they were made."""
+    first_slot: dict[int, tuple[date, time]] = {}
+    rows = db.query(
+        models.BookingTimeSlot.booking_id,
+        models.TimeSlot.slot_date,
+        models.TimeSlot.start_time,
+    ).join(
+        models.TimeSlot, models.TimeSlot.id == models.BookingTimeSlot.time_slot_id
+    ).join(
+        models.Dock, models.Dock.id == models.TimeSlot.dock_id
+    ).filter(
+        models.Dock.object_id == object_id,
+        models.TimeSlot.slot_date >= from_date,
+        # A booking starting on to_date may run into the next day.
+        models.TimeSlot.slot_date <= to_date + timedelta(days=1),
+    )
+    for booking_id, slot_date, start_time in rows:
+        current = first_slot.get(booking_id)
+        if current is None or (slot_date, start_time) < current:
+            first_slot[booking_id] = (slot_date, start_time)
+    first_slot = {booking_id: start for booking_id, start in first_slot.items() if start[0] <= to_date}
+    if not first_slot:
+        return []
+
+    bookings = db.query(models.Booking).options(
+        joinedload(models.Booking.vehicle_type),
+        joinedload(models.Booking.supplier),
+    ).filter(
+        models.Booking.id.in_(list(first_slot)),
+        models.Booking.status != "cancelled",
+    ).order_by(models.Booking.created_at, models.Booking.id).all()
+    durations = PrrDurationLookup.load(db, object_ids=[object_id])
+
+    demand = []
+    for booking in bookings:
+        duration = durations.resolve_minutes(object_id, booking.supplier_id, booking.transport_type_id, booking.vehicle_type_id)
+        if duration is None:
+            duration = booking.vehicle_type.duration_minutes if booking.vehicle_type else 0
+        booking_date, start_time = first_slot[booking.id]
+        demand.append(Demand(
+            booking_id=booking.id,
+            booking_date=booking_date,
+            start_time=start_time,
+            duration_minutes=duration,
+            direction=booking.booking_type or models.BookingDirection.inbound,
+            supplier_zone_id=booking.supplier.zone_id if booking.supplier else None,
+            transport_type_id=booking.transport_type_id,
+        ))
+    return demand
+
+
+def simulate(
+    layout: Layout,
+    demand: Iterable[Demand],
+    from_date: date,
+    to_date: date,
+    name: str = "",
+    max_shift_minutes: int = 0,
+    policy: str = "first_fit",
+) -> schemas.SimulationResult:
+    """
+    Replay `demand` against `layout` and report placements, rejections and utilization.
+
+    A booking is placed at its original start like create_booking would place
+    it, the dock picked by `policy` (see availability.BATCH_POLICIES); with
+    `max_shift_minutes` it may also take the earliest start up to that much
+    later on the same day. Fragmentation is measured on the slots left free:
+    runs shorter than the median booking of the demand count as stranded.
+    """
+    if policy not in BATCH_POLICIES:
+        raise ValueError(f"Unknown allocation policy: {policy}")
+    index = SimulatedAvailability(layout)
+    days = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+    index.ensure_loaded(layout.object.id, days + [to_date + timedelta(days=1)])
+
+    booked_minutes: dict[int, int] = defaultdict(int)
+    placed = shifted = 0
+    rejections: list[schemas.SimulationRejection] = []
+    demand = list(demand)
+    if policy == "optimized":
+        demand.sort(key=lambda d: (d.booking_date, d.start_time, d.duration_minutes, d.booking_id))
+    item_policy = batch_policy(policy)
+    for item in demand:
+        reason = None
+        chain = None
+        if item.duration_minutes <= 0:
+            reason = "invalid_duration"
+        else:
+            filters = ChainFilters(item.direction, item.supplier_zone_id, item.transport_type_id)
+            chain = index.choose_chain(layout.object.id, item.booking_date, item.start_time, item.duration_minutes, filters, item_policy)
+            if chain is None and max_shift_minutes > 0:
+                latest = datetime.combine(item.booking_date, item.start_time) + timedelta(minutes=max_shift_minutes)
+                not_after = latest.time() if latest.date() == item.booking_date else None
+                chain = index.earliest_fit(
+                    layout.object.id, item.booking_date, item.start_time, item.duration_minutes, filters, not_after=not_after,
+                )
+                if chain is not None:
+                    shifted += 1
+            if chain is None:
+                reason = "no_free_slots"
+
+        if chain is None:
+            rejections.append(schemas.SimulationRejection(
+                booking_id=item.booking_id,
+                booking_date=item.booking_date.isoformat(),
+                start_time=item.start_time.strftime("%H:%M"),
+                reason=reason,
+            ))
+            continue
+        index.occupy(chain.slots)
+        booked_minutes[chain.dock.id] += sum(slot_minutes(s) for s in chain.slots)
+        placed += 1
+
+    usage = []
+    for dock in index.docks(layout.object.id):
+        available = sum(
+            slot_minutes(s) * s.capacity
+            for day in days
+            for s in index.day_slots(dock.id, day)
+        )
+        usage.append(schemas.SimulationDockUsage(
+            dock_id=dock.id,
+            dock_name=dock.name,
+            available_minutes=available,
+            booked_minutes=booked_minutes[dock.id],
+            utilization=round(booked_minutes[dock.id] / available, 4) if available else 0.0,
+        ))
+    total_available = sum(u.available_minutes for u in usage)
+
+    fragmentation = Fragmentation()
+    durations = sorted(d.duration_minutes for d in demand if d.duration_minutes > 0)
+    min_minutes = durations[len(durations) // 2] if durations else 0
+    for direction in sorted({d.direction for d in demand}, key=lambda d: d.value):
+        for day in days:
+            found = index.fragmentation(layout.object.id, day, direction, min_minutes)
+            fragmentation.free_minutes += found.free_minutes
+            fragmentation.stranded_minutes += found.stranded_minutes
+            fragmentation.largest_run_minutes = max(fragmentation.largest_run_minutes, found.largest_run_minutes)
+
+    return schemas.SimulationResult(
+        scenario=name,
+        policy=policy,
+        bookings=len(demand),
+        placed=placed,
+        shifted=shifted,
+        rejected=len(rejections),
+        utilization=round(sum(booked_minutes.values()) / total_available, 4) if total_available else 0.0,
+        fragmentation=schemas.SimulationFragmentation(
+            free_minutes=fragmentation.free_minutes,
+            stranded_minutes=fragmentation.stranded_minutes,
+            largest_run_minutes=fragmentation.largest_run_minutes,
+            ratio=round(fragmentation.ratio, 4),
+        ),
+        docks=usage,
+        rejections=rejections,
+    )
+
+
+def run_scenarios(
+    db: Session,
+    object_id: int,
+    from_date: date,
+    to_date: date,
+    scenarios: List[schemas.SimulationScenario],
+    include_current: bool = True,
+    max_shift_minutes: int = 0,
+    policy: str = "first_fit",
+) -> List[schemas.SimulationResult]:
+    """Load the layout and the demand once and simulate every scenario against them."""
+    layout = load_layout(db, object_id)
+    demand = load_demand(db, object_id, from_date, to_date)
+    results = []
+    if include_current:
+        results.append(simulate(layout, demand, from_date, to_date, name="current", max_shift_minutes=max_shift_minutes, policy=policy))
+    for scenario in scenarios:
+        results.append(simulate(
+            apply_scenario(layout, scenario), demand, from_date, to_date,
+            name=scenario.name, max_shift_minutes=max_shift_minutes, policy=policy,
+        ))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay historical bookings against alternative dock layouts.")
+    parser.add_argument("--object-id", type=int, required=True)
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat, required=True)
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat, required=True)
+    parser.add_argument("--scenario", action="append", default=[], help="JSON file with a scenario or a list of scenarios")
+    parser.add_argument("--max-shift-minutes", type=int, default=0)
+    parser.add_argument("--policy", choices=BATCH_POLICIES, default="first_fit")
+    parser.add_argument("--json", action="store_true", help="Print full results as JSON")
+    args = parser.parse_args(argv)
+
+    scenarios: list[schemas.SimulationScenario] = []
+    for path in args.scenario:
+        with open(path, encoding="utf-8") as f:
+            loaded = json.load(f)
+        for item in loaded if isinstance(loaded, list) else [loaded]:
+            scenarios.append(schemas.SimulationScenario.model_validate(item))
+
+    db = SessionLocal()
+    try:
+        results = run_scenarios(db, args.object_id, args.from_date, args.to_date, scenarios, max_shift_minutes=args.max_shift_minutes, policy=args.policy)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps([r.model_dump() for r in results], ensure_ascii=False, indent=2))
+        return
+    print(f"{'scenario':<24} {'bookings':>8} {'placed':>8} {'shifted':>8} {'rejected':>8} {'util':>7} {'stranded':>8}")
+    for r in results:
+        print(f"{r.scenario:<24} {r.bookings:>8} {r.placed:>8} {r.shifted:>8} {r.rejected:>8} {r.utilization:>7.1%} {r.fragmentation.ratio:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
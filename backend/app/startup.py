@@ -0,0 +1,184 @@
+"""
+Worker startup: optional migrations, then warm-up in the background.
+
+Importing app.main touches neither the database nor openpyxl, so a worker (or
+a --reload) boots even while the database is briefly down. The schema is
+managed by Alembic only:
+
+    DB_MIGRATE_ON_STARTUP=1   run `alembic upgrade head` before serving
+                              (a failure stops the worker, as it should)
+
+On PostgreSQL the workers of a deployment take turns on an advisory lock, so
+one migrates and the others find the schema at the head. On other databases
+migrate from a single process.
+
+A fresh database is created with python -m app.setup_database, which stamps
+it at the Alembic head.
+
+Warm-up runs in a thread once the worker serves: it configures the ORM
+mappers, builds the OpenAPI schema behind /docs, waits until the database
+answers and then until its schema is at the Alembic head (another worker may
+still be migrating), retrying every WARMUP_RETRY_SECONDS. GET /ready answers
+503 with the pending steps until all are done; GET /health only says the
+process is up.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.pool import StaticPool
+
+logger = logging.getLogger(__name__)
+
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "0").lower() in ("1", "true", "yes")
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+
+WARMUP_STEPS = ("mappers", "openapi", "database", "schema")
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# pg_advisory_lock key serializing `alembic upgrade` between workers.
+MIGRATION_LOCK_KEY = 7_301_945_117
+
+
+@dataclass
+class WarmupState:
+    started_at: float = field(default_factory=time.monotonic)
+    done: dict[str, float] = field(default_factory=dict)  # step -> seconds after start
+    last_error: Optional[str] = None
+
+    def mark(self, step: str) -> None:
+        self.done[step] = round(time.monotonic() - self.started_at, 3)
+
+    @property
+    def ready(self) -> bool:
+        return all(step in self.done for step in WARMUP_STEPS)
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "done": self.done,
+            "pending": [step for step in WARMUP_STEPS if step not in self.done],
+            "last_error": None if self.ready else self.last_error,
+        }
+
+
+state = WarmupState()
+
+
+def alembic_config(database_url: Optional[str] = None):
+    """alembic.ini with the application's (or the given) database URL instead of the one written in the file."""
+    from alembic.config import Config
+
+    from .db import SQLALCHEMY_DATABASE_URL
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.set_main_option("sqlalchemy.url", (database_url or SQLALCHEMY_DATABASE_URL).replace("%", "%%"))
+    return config
+
+
+def upgrade_schema() -> None:
+    from alembic import command
+
+    from . import db as app_db
+
+    bind = app_db.engine
+    if bind.dialect.name != "postgresql":
+        logger.info("Migrating the database to the Alembic head...")
+        command.upgrade(alembic_config(), "head")
+        return
+    # A session-level lock on a connection of its own: Alembic migrates on another
+    # connection, and the lock outlives its transactions. Released explicitly, as
+    # the connection goes back to the pool.
+    with bind.connect() as connection:
+        connection.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_KEY})")
+        try:
+            logger.info("Migrating the database to the Alembic head...")
+            command.upgrade(alembic_config(), "head")
+        finally:
+            connection.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_KEY})")
+
+
+def stamp_schema(database_url: Optional[str] = None) -> None:
+    """Mark a schema built from the models as being at the Alembic head."""
+    from alembic import command
+
+    command.stamp(alembic_config(database_url), "head")
+
+
+def schema_revision_error(connection, heads) -> Optional[str]:
+    """Why the database is not at the Alembic heads, or None when it is."""
+    from alembic.runtime.migration import MigrationContext
+
+    current = set(MigrationContext.configure(connection).get_current_heads())
+    if current == set(heads):
+        return None
+    return (
+        f"Database schema at revision {', '.join(sorted(current)) or 'none'}, "
+        f"expected Alembic head {', '.join(sorted(heads))}"
+    )
+
+
+def warm_up(app, stop: threading.Event) -> None:
+    try:
+        _warm_up(app, stop)
+    except Exception as exc:
+        # Not a database outage but a bug or misconfiguration: stay unready and say why.
+        state.last_error = repr(exc)
+        logger.exception("Warm-up failed")
+
+
+def _warm_up(app, stop: threading.Event) -> None:
+    from alembic.script import ScriptDirectory
+
+    from . import db as app_db
+
+    configure_mappers()
+    state.mark("mappers")
+    app.openapi()
+    state.mark("openapi")
+    bind = app_db.engine
+    if not isinstance(bind, Engine) or isinstance(bind.pool, StaticPool):
+        # One shared, already open connection (in-memory SQLite, tests): checking it out
+        # from this thread would roll back whatever its owner has in flight.
+        state.mark("database")
+        state.mark("schema")
+        return
+    heads = ScriptDirectory.from_config(alembic_config()).get_heads()
+    while not stop.is_set():
+        try:
+            with bind.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+                if "database" not in state.done:
+                    state.mark("database")
+                error = schema_revision_error(connection, heads)
+        except DBAPIError as exc:
+            state.last_error = str(exc.orig)
+            logger.warning("Database not reachable yet, retrying in %ss: %s", WARMUP_RETRY_SECONDS, exc.orig)
+            stop.wait(WARMUP_RETRY_SECONDS)
+            continue
+        if error is not None:
+            # Not ready to serve on an old schema; a migrating worker may bring it to the head.
+            state.last_error = error
+            logger.warning("%s, retrying in %ss", error, WARMUP_RETRY_SECONDS)
+            stop.wait(WARMUP_RETRY_SECONDS)
+            continue
+        state.mark("schema")
+        logger.info("Worker warm after %.2fs", state.done["schema"])
+        return
+
+
+def start_warmup(app) -> threading.Event:
+    """Reset the warm-up state and run warm_up in a daemon thread; set the returned event to stop it."""
+    global state
+    state = WarmupState()
+    stop = threading.Event()
+    threading.Thread(target=warm_up, args=(app, stop), name="warmup", daemon=True).start()
+    return stop
@@ -0,0 +1,112 @@
+"""
+Structured, level-gated tracing for the booking hot path.
+
+trace() events go to the "yms.trace" logger as one JSON line each, only when
+that logger is enabled for DEBUG; otherwise a call costs a context variable
+lookup and a level check. Field values may be callables, which are only
+called when the event is emitted, so slot lists and request dumps are never
+built for nothing.
+
+Every HTTP request gets a trace id (the incoming X-Request-ID, else a new
+one), returned as X-Trace-Id and carried by its events. An admin can ask for
+one request's full trace with the X-Debug-Trace: 1 header: its events are
+then logged at INFO whatever the level and kept in memory for
+GET /api/_debug/traces/{trace_id}.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from . import models
+
+logger = logging.getLogger("yms.trace")
+
+TRACE_REQUEST_HEADER = "x-debug-trace"
+# Captured traces kept for the debug endpoint, oldest dropped first.
+MAX_CAPTURED_TRACES = 100
+
+
+@dataclass
+class Trace:
+    id: str
+    requested: bool = False
+    capturing: bool = False
+    events: list[dict] = field(default_factory=list)
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_captured: "OrderedDict[str, list[dict]]" = OrderedDict()
+_captured_lock = threading.Lock()
+
+
+def trace(event: str, **fields: Any) -> None:
+    current = _current.get()
+    capturing = current is not None and current.capturing
+    if not capturing and not logger.isEnabledFor(logging.DEBUG):
+        return
+    record = {"event": event, "trace_id": current.id if current is not None else None}
+    for name, value in fields.items():
+        record[name] = value() if callable(value) else value
+    if capturing:
+        current.events.append(record)
+    logger.log(logging.INFO if capturing else logging.DEBUG, "%s", json.dumps(record, default=str, ensure_ascii=False))
+
+
+def capture_for(user: models.User) -> None:
+    """Capture this request's full trace when it asked for one and `user` is an admin."""
+    current = _current.get()
+    if current is not None and current.requested and user.role == models.UserRole.admin:
+        current.capturing = True
+
+
+def captured_trace(trace_id: str) -> Optional[list[dict]]:
+    with _captured_lock:
+        return _captured.get(trace_id)
+
+
+def _keep(current: Trace) -> None:
+    with _captured_lock:
+        _captured[current.id] = current.events
+        while len(_captured) > MAX_CAPTURED_TRACES:
+            _captured.popitem(last=False)
+
+
+class TracingMiddleware:
+    """Gives every HTTP request a trace id and keeps the captured traces."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        incoming = headers.get(b"x-request-id", b"").decode("latin-1")[:64]
+        current = Trace(
+            id=incoming or uuid.uuid4().hex[:16],
+            requested=headers.get(TRACE_REQUEST_HEADER.encode()) == b"1",
+        )
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-trace-id", current.id.encode("latin-1"))]
+                if current.capturing:
+                    message["headers"].append((b"x-trace-captured", b"1"))
+            await send(message)
+
+        token = _current.set(current)
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            _current.reset(token)
+            if current.capturing:
+                _keep(current)
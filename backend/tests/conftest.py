@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(n): client.get(...)` fails when the block runs more than n SQL statements.
+
+    Counts on every engine and thread, so it sees what the endpoint runs behind
+    the TestClient; the statements are listed when the budget is exceeded.
+    """
+
+    @contextmanager
+    def budget(max_queries: int):
+        statements: list[str] = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", count)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", count)
+        assert len(statements) <= max_queries, (
+            f"{len(statements)} queries, budget {max_queries}:\n" + "\n".join(s.split("\n")[0][:200] for s in statements)
+        )
+
+    return budget
@@ -6,7 +6,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app import models
-from app.db import Base, get_db
+from app.db import Base, get_db, get_reports_db
 from app.deps import get_current_user
 
 
@@ -58,10 +58,12 @@ def test_client(db_session, admin_user):
     from app.main import app
 
     app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_reports_db] = lambda: db_session
     app.dependency_overrides[get_current_user] = lambda: admin_user
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_reports_db)
     app.dependency_overrides.pop(get_current_user)
 
 
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.benchmark import BenchmarkContext
+from app.db import Base, async_database_url, get_async_db, get_db, get_reports_db, run_read
+from app.deps import get_current_user, get_current_user_async
+from app.seed_data import seed
+
+
+FROM_DATE = date(2026, 3, 2)  # Monday
+READ_PATHS = [
+    ("/api/time-slots/", {"from_date": "2026-03-23", "to_date": "2026-03-29"}),
+    ("/api/bookings/all", {"page": 2, "page_size": 20}),
+    ("/api/bookings/my", {"page": 1, "page_size": 20}),
+    ("/api/analytics/bookings-by-zone", {"start_date": "2026-03-02", "end_date": "2026-03-31"}),
+    ("/api/analytics/bookings-by-hour", {"start_date": "2026-03-02", "end_date": "2026-03-31"}),
+    ("/api/docks/", {}),
+    ("/api/suppliers/", {}),
+    ("/api/vehicle-types/", {}),
+    ("/api/objects/", {}),
+]
+
+
+@pytest.fixture(scope="module")
+def db_url(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('async') / 'read.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        seed(db, "tiny", seed=7, from_date=FROM_DATE)
+    yield url
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def sync_factory(db_url):
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def async_factory(db_url):
+    engine = create_async_engine(async_database_url(db_url))
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture(scope="module")
+def client(sync_factory):
+    import app.db as app_db
+    app_db.engine = sync_factory.kw["bind"]
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _read_all(client, headers):
+    responses = [client.get(path, params=params, headers=headers) for path, params in READ_PATHS]
+    assert [r.status_code for r in responses] == [200] * len(READ_PATHS)
+    return [r.json() for r in responses]
+
+
+def test_read_endpoints_answer_the_same_on_the_async_session(client, sync_factory, async_factory):
+    with sync_factory() as db:
+        headers = BenchmarkContext.load(db).headers
+
+    def sync_db():
+        with sync_factory() as db:
+            yield db
+
+    async def async_db():
+        async with async_factory() as db:
+            yield db
+
+    app = client.app
+    app.dependency_overrides.update({get_db: sync_db, get_reports_db: sync_db})
+    try:
+        expected = _read_all(client, headers)
+        # What ASYNC_DB=1 wires up: read routes and the user lookup share one AsyncSession.
+        app.dependency_overrides.update({
+            get_db: async_db, get_async_db: async_db, get_reports_db: async_db, get_current_user: get_current_user_async,
+        })
+        assert _read_all(client, headers) == expected
+        assert client.get("/api/bookings/all", headers={"Authorization": "Bearer nope"}).status_code == 401
+    finally:
+        for dependency in (get_db, get_async_db, get_reports_db, get_current_user):
+            app.dependency_overrides.pop(dependency, None)
+
+
+def test_run_read_runs_the_same_function_on_either_session(sync_factory, async_factory):
+    def count_docks(db, object_id):
+        return db.query(models.Dock).filter(models.Dock.object_id == object_id).count()
+
+    async def both():
+        with sync_factory() as db:
+            object_id = db.query(models.Object.id).scalar()
+            on_thread = await run_read(db, count_docks, object_id)
+        async with async_factory() as db:
+            on_loop = await run_read(db, count_docks, object_id=object_id)
+        return on_thread, on_loop
+
+    assert asyncio.run(both()) == (3, 3)
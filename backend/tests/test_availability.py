@@ -0,0 +1,100 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.availability import AvailabilityIndex, ChainFilters
+from app.db import Base
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+DAY = date(2026, 4, 6)
+INBOUND = ChainFilters(direction=models.BookingDirection.inbound)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+def add_slots(db, dock, hours):
+    slots = [
+        models.TimeSlot(dock_id=dock.id, slot_date=DAY, start_time=time(h, m), end_time=time(h, m + 30) if m == 0 else time(h + 1, 0), capacity=1)
+        for h, m in hours
+    ]
+    db.add_all(slots)
+    db.commit()
+    return slots
+
+
+@pytest.fixture(scope="function")
+def docks(db_session):
+    obj = models.Object(name="Index Object", object_type=models.ObjectType.warehouse, capacity_in=1)
+    db_session.add(obj)
+    db_session.commit()
+    universal = models.Dock(name="Universal", dock_type=models.DockType.universal, object_id=obj.id)
+    entrance = models.Dock(name="Entrance", dock_type=models.DockType.entrance, object_id=obj.id)
+    exit_dock = models.Dock(name="Exit", dock_type=models.DockType.exit, object_id=obj.id)
+    db_session.add_all([universal, entrance, exit_dock])
+    db_session.commit()
+    for dock in (universal, entrance, exit_dock):
+        add_slots(db_session, dock, [(9, 0), (9, 30), (10, 0), (10, 30)])
+    return obj, universal, entrance, exit_dock
+
+
+def test_find_chains_prefers_dedicated_docks(db_session, docks):
+    obj, universal, entrance, _ = docks
+    index = AvailabilityIndex(db_session)
+
+    chains = index.find_chains(obj.id, DAY, time(9, 0), 60, INBOUND)
+    assert [c.dock.id for c in chains] == [entrance.id, universal.id]
+    assert [s.start_time for s in chains[0].slots] == [time(9, 0), time(9, 30)]
+
+
+def test_object_capacity_and_write_through(db_session, docks):
+    obj, universal, entrance, exit_dock = docks
+    index = AvailabilityIndex(db_session)
+
+    first = index.find_chains(obj.id, DAY, time(9, 0), 60, INBOUND, limit=1)[0]
+    index.occupy(first.slots)
+
+    # capacity_in=1 is now used up at 09:00-10:00 for entrance and universal docks alike.
+    assert index.find_chains(obj.id, DAY, time(9, 0), 60, INBOUND) == []
+    outbound = ChainFilters(direction=models.BookingDirection.outbound)
+    assert [c.dock.id for c in index.find_chains(obj.id, DAY, time(9, 0), 60, outbound)] == [exit_dock.id, universal.id]
+
+    fit = index.earliest_fit(obj.id, DAY, time(9, 0), 60, INBOUND)
+    assert (fit.dock.id, fit.slots[0].start_time) == (entrance.id, time(10, 0))
+
+    index.release(first.slots)
+    assert len(index.find_chains(obj.id, DAY, time(9, 0), 60, INBOUND)) == 2
+
+
+def test_chain_from_slot_requires_back_to_back_slots(db_session, docks):
+    obj, universal, entrance, _ = docks
+    gap_dock = models.Dock(name="Gap", dock_type=models.DockType.entrance, object_id=obj.id)
+    db_session.add(gap_dock)
+    db_session.commit()
+    gap_slots = add_slots(db_session, gap_dock, [(9, 0), (10, 0)])
+
+    index = AvailabilityIndex(db_session)
+    assert index.chain_from_slot(gap_slots[0].id, obj.id, DAY, time(9, 0), 2, INBOUND) is None
+    # The open search allows gaps in the schedule.
+    chains = index.find_chains(obj.id, DAY, time(9, 0), 60, INBOUND)
+    assert gap_dock.id in [c.dock.id for c in chains]
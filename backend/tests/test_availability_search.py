@@ -0,0 +1,140 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+DAY_1 = date(2026, 3, 2)  # Monday
+DAY_2 = date(2026, 3, 4)  # not adjacent: chains may run into the next day's slots
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    user = models.User(email="search@example.com", password_hash="hash", full_name="Search User", role=models.UserRole.carrier)
+    db_session.add(user)
+    db_session.commit()
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: user
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def search_setup(db_session):
+    obj = models.Object(name="Search Object", object_type=models.ObjectType.warehouse)
+    transport_type = models.TransportTypeRef(name="Purchased", enum_value=models.TransportType.purchased)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    owner = models.User(email="owner@example.com", password_hash="hash", full_name="Owner", role=models.UserRole.carrier)
+    db_session.add_all([obj, transport_type, vehicle_type, owner])
+    db_session.commit()
+
+    docks = [models.Dock(name=name, dock_type=models.DockType.entrance, object_id=obj.id) for name in ("Dock A", "Dock B")]
+    db_session.add_all(docks)
+    db_session.commit()
+    slots = {}
+    for dock in docks:
+        for day in (DAY_1, DAY_2):
+            for start, end in ((time(9, 0), time(9, 30)), (time(9, 30), time(10, 0)), (time(10, 0), time(10, 30)), (time(10, 30), time(11, 0))):
+                slot = models.TimeSlot(dock_id=dock.id, slot_date=day, start_time=start, end_time=end, capacity=1)
+                db_session.add(slot)
+                slots[(dock.id, day, start)] = slot
+    db_session.commit()
+
+    # Dock A is busy 09:00-10:00 on the first day.
+    booking = models.Booking(user_id=owner.id, vehicle_type_id=vehicle_type.id, status="confirmed", cubes=10, transport_type_id=transport_type.id)
+    db_session.add(booking)
+    db_session.flush()
+    for start in (time(9, 0), time(9, 30)):
+        db_session.add(models.BookingTimeSlot(booking_id=booking.id, time_slot_id=slots[(docks[0].id, DAY_1, start)].id))
+    db_session.commit()
+    return obj, docks, transport_type, vehicle_type
+
+
+def search(client, obj, vehicle_type, **params):
+    params = {"object_ids": [obj.id], "vehicle_type_id": vehicle_type.id, "from_date": DAY_1.isoformat(), "to_date": DAY_2.isoformat(), "limit": 3, **params}
+    response = client.get("/api/availability/search", params=params)
+    assert response.status_code == 200, response.text
+    return [(o["booking_date"], o["start_time"], o["dock_id"]) for o in response.json()]
+
+
+def test_search_returns_earliest_starts_across_docks(test_client, search_setup):
+    obj, (dock_a, dock_b), _, vehicle_type = search_setup
+
+    assert search(test_client, obj, vehicle_type) == [
+        ("2026-03-02", "09:00", dock_b.id),
+        ("2026-03-02", "09:30", dock_b.id),
+        ("2026-03-02", "10:00", dock_a.id),
+    ]
+    assert search(test_client, obj, vehicle_type, not_before="10:00", limit=5) == [
+        ("2026-03-02", "10:00", dock_a.id),
+        ("2026-03-02", "10:00", dock_b.id),
+        ("2026-03-04", "09:00", dock_a.id),
+        ("2026-03-04", "09:00", dock_b.id),
+        ("2026-03-04", "09:30", dock_a.id),
+    ]
+
+
+def test_search_applies_prr_duration_and_quota(test_client, db_session, search_setup):
+    obj, (dock_a, dock_b), transport_type, vehicle_type = search_setup
+    db_session.add(models.PrrLimit(object_id=obj.id, transport_type_id=transport_type.id, duration_minutes=90))
+    quota = models.VolumeQuota(
+        object_id=obj.id,
+        direction=models.BookingDirection.inbound,
+        year=DAY_1.year,
+        month=DAY_1.month,
+        day_of_week=DAY_1.weekday(),
+        volume=15,
+        allow_overbooking=False,
+    )
+    quota.transport_types = [transport_type]
+    db_session.add(quota)
+    db_session.commit()
+
+    params = {"transport_type_id": transport_type.id}
+    # 10 of 15 cubes are used on the first day, so 10 more only fit on the second.
+    assert search(test_client, obj, vehicle_type, cubes=10, **params) == [
+        ("2026-03-04", "09:00", dock_a.id),
+        ("2026-03-04", "09:00", dock_b.id),
+        ("2026-03-04", "09:30", dock_a.id),
+    ]
+    options = test_client.get("/api/availability/search", params={
+        "object_ids": [obj.id], "vehicle_type_id": vehicle_type.id, "from_date": DAY_1.isoformat(), "cubes": 5, **params,
+    }).json()
+    # 90 minutes need three slots: only 09:00 and 09:30 on dock B remain.
+    assert [(o["start_time"], o["end_time"], o["dock_id"]) for o in options] == [("09:00", "10:30", dock_b.id), ("09:30", "11:00", dock_b.id)]
+    assert options[0]["quota_remaining"] == 5
+    assert options[0]["duration_minutes"] == 90
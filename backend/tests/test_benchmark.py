@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import benchmark, models
+from app.db import Base, get_db
+from app.seed_data import seed
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+FROM_DATE = date(2026, 3, 2)  # Monday
+
+
+@pytest.fixture(scope="module")
+def db_session():
+    # One seeded database for the module: the benchmark scenarios leave it as they found it.
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    seed(session, "tiny", seed=7, from_date=FROM_DATE)
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def test_client(db_session):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+
+
+def test_seed_places_bookings_within_slot_capacity(db_session):
+    assert db_session.query(func.count(models.Booking.id)).scalar() == 200
+    assert db_session.query(func.min(models.TimeSlot.slot_date)).scalar() == FROM_DATE
+
+    booked = db_session.query(
+        models.TimeSlot.capacity, func.count(models.BookingTimeSlot.id)
+    ).join(models.BookingTimeSlot, models.BookingTimeSlot.time_slot_id == models.TimeSlot.id).join(
+        models.Booking, models.Booking.id == models.BookingTimeSlot.booking_id
+    ).filter(models.Booking.status == "confirmed").group_by(models.TimeSlot.id).all()
+    assert booked and all(count <= capacity for capacity, count in booked)
+    assert db_session.query(func.sum(models.ObjectOccupancy.bookings)).scalar() > 0
+
+    with pytest.raises(ValueError):
+        seed(db_session, "tiny")
+
+
+def test_benchmark_runs_scenarios_against_seeded_data(test_client, db_session):
+    ctx = benchmark.BenchmarkContext.load(db_session)
+    bookings = db_session.query(func.count(models.Booking.id)).scalar()
+
+    results = {r.name: r for r in benchmark.run(test_client, ctx, ["create_booking", "list_time_slots", "bookings_page_first"], repeat=2)}
+
+    assert all(r.errors == 0 and r.queries > 0 and r.p50_ms > 0 for r in results.values())
+    # create_booking deletes what it booked.
+    assert db_session.query(func.count(models.Booking.id)).scalar() == bookings
+
+
+def test_compare_flags_regressions_beyond_tolerance_and_noise():
+    def result(p50_ms, queries, peak_memory_kb):
+        return benchmark.ScenarioResult("list_time_slots", 5, 0, p50_ms, p50_ms, p50_ms, queries, 1.0, peak_memory_kb)
+
+    baseline = {"scenarios": {"list_time_slots": vars(result(100.0, 5, 4000.0))}}
+
+    assert benchmark.compare([result(120.0, 5, 4800.0)], baseline) == []
+    assert benchmark.compare([result(10.0, 5, 4000.0)], {"scenarios": {"list_time_slots": vars(result(8.5, 5, 4000.0))}}) == []
+    regressions = benchmark.compare([result(140.0, 6, 9000.0)], baseline)
+    assert [r.metric for r in regressions] == ["p50_ms", "queries", "peak_memory_kb"]
+    assert benchmark.compare([result(140.0, 6, 9000.0)], {"scenarios": {}}) == []
@@ -293,3 +293,65 @@ def test_create_booking_does_not_fallback_to_dock_from_other_supplier_zone(test_
 
     assert response.status_code == 409
     assert "не найдено доступных временных слотов" in response.json()["detail"].lower()
+
+
+def _batch_setup(db_session):
+    test_object = models.Object(name="Batch Object", object_type="warehouse")
+    db_session.add(test_object)
+    db_session.commit()
+    dock = models.Dock(name="Batch Dock", dock_type="entrance", object_id=test_object.id)
+    vehicle_type = models.VehicleType(name="Batch Vehicle", duration_minutes=30)
+    db_session.add_all([dock, vehicle_type])
+    db_session.commit()
+    db_session.add_all([
+        models.TimeSlot(dock_id=dock.id, slot_date=date.today(), start_time=time(8, 0), end_time=time(8, 30), capacity=1),
+        models.TimeSlot(dock_id=dock.id, slot_date=date.today(), start_time=time(8, 30), end_time=time(9, 0), capacity=1),
+    ])
+    db_session.commit()
+
+    def item(start_time, **overrides):
+        return {
+            "vehicle_type_id": vehicle_type.id,
+            "booking_date": str(date.today()),
+            "start_time": start_time,
+            "object_id": test_object.id,
+            "vehicle_plate": "BATCH",
+            "driver_full_name": "Batch Driver",
+            "driver_phone": "70000000000",
+            **overrides,
+        }
+
+    return item
+
+
+def test_create_bookings_batch_best_effort(test_client, db_session):
+    item = _batch_setup(db_session)
+
+    # The second item wants the slot the first one takes within the same batch.
+    response = test_client.post("/api/bookings/batch", json={
+        "mode": "best_effort",
+        "bookings": [item("08:00"), item("08:00"), item("08:30"), item("08:30", vehicle_type_id=999999)],
+    })
+    assert response.status_code == 200
+    payload = response.json()
+    assert (payload["created"], payload["failed"]) == (2, 2)
+    assert [(r["status"], r["status_code"]) for r in payload["results"]] == [
+        ("created", 200), ("failed", 409), ("created", 200), ("failed", 404),
+    ]
+    created_ids = [r["booking_id"] for r in payload["results"] if r["status"] == "created"]
+    assert db_session.query(models.Booking).filter(models.Booking.id.in_(created_ids)).count() == 2
+
+
+def test_create_bookings_batch_atomic_writes_nothing_on_failure(test_client, db_session):
+    item = _batch_setup(db_session)
+
+    response = test_client.post("/api/bookings/batch", json={"mode": "atomic", "bookings": [item("08:00"), item("08:00")]})
+    assert response.status_code == 200
+    payload = response.json()
+    assert (payload["created"], payload["failed"]) == (0, 1)
+    assert [r["status"] for r in payload["results"]] == ["not_created", "failed"]
+    assert db_session.query(models.Booking).count() == 0
+
+    response = test_client.post("/api/bookings/batch", json={"mode": "atomic", "bookings": [item("08:00"), item("08:30")]})
+    assert response.json()["created"] == 2
+    assert db_session.query(models.Booking).count() == 2
@@ -7,7 +7,7 @@ from openpyxl import load_workbook, Workbook
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.db import Base, get_db
+from app.db import Base, get_db, get_reports_db
 from app import models
 from app.deps import get_current_user
 
@@ -54,10 +54,12 @@ def test_client(db_session, test_user_fixture):
     from app.main import app
 
     app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_reports_db] = lambda: db_session
     app.dependency_overrides[get_current_user] = lambda: test_user_fixture
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_reports_db)
     app.dependency_overrides.pop(get_current_user)
 
 
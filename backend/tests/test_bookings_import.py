@@ -0,0 +1,207 @@
+from datetime import date, time
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+IMPORT_HEADERS = ["transport_sheet", "supplier_name", "cubes", "booking_date", "start_time", "transport_type", "vehicle_type", "object_name", "driver_full_name", "driver_phone"]
+BOOKING_DATE = date(2026, 3, 2)  # Monday
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    # A fresh database per test: the import commits or rolls back on its own.
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    admin = models.User(email="import-admin@example.com", password_hash="hash", full_name="Import Admin", role=models.UserRole.admin)
+    db_session.add(admin)
+    db_session.commit()
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def import_setup(db_session):
+    zone = models.Zone(name="Import Zone")
+    obj = models.Object(name="Import Object", object_type=models.ObjectType.warehouse)
+    supplier = models.Supplier(name="Import Supplier", zone=zone)
+    transport_type = models.TransportTypeRef(name="Purchased", enum_value=models.TransportType.purchased)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([zone, obj, supplier, transport_type, vehicle_type])
+    db_session.commit()
+
+    docks = [
+        models.Dock(name=name, dock_type=models.DockType.entrance, object_id=obj.id)
+        for name in ("Dock A", "Dock B")
+    ]
+    db_session.add_all(docks)
+    db_session.commit()
+    for dock in docks:
+        db_session.add_all([
+            models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(9, 0), end_time=time(9, 30), capacity=1),
+            models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(9, 30), end_time=time(10, 0), capacity=1),
+        ])
+
+    quota = models.VolumeQuota(
+        object_id=obj.id,
+        direction=models.BookingDirection.inbound,
+        year=BOOKING_DATE.year,
+        month=BOOKING_DATE.month,
+        day_of_week=BOOKING_DATE.weekday(),
+        volume=15,
+        allow_overbooking=False,
+    )
+    quota.transport_types = [transport_type]
+    db_session.add(quota)
+    db_session.commit()
+    return docks
+
+
+def import_file(rows) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(IMPORT_HEADERS)
+    for row in rows:
+        ws.append(list(row))
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def post_import(client, rows, dry_run=False, headers=None, content=None, policy="first_fit", filename="bookings.xlsx"):
+    return client.post(
+        "/api/bookings/import",
+        params={"direction": "in", "dry_run": dry_run, "policy": policy},
+        files={"file": (filename, BytesIO(content or import_file(rows)), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+        headers=headers,
+    )
+
+
+IMPORT_ROWS = [
+    ["TS-1", "Import Supplier", 10, "2026-03-02", "09:00", "Purchased", "Truck", "Import Object", "Driver 1", "+7"],
+    ["TS-2", "Import Supplier", 10, "2026-03-02", "09:00", "Purchased", "Truck", "Import Object", "Driver 2", "+7"],
+    ["TS-3", "Import Supplier", 5, "2026-03-02", "09:00", "Purchased", "Truck", "Import Object", "Driver 3", "+7"],
+    ["TS-4", "Import Supplier", 1, "2026-03-02", "09:00", "Purchased", "Truck", "Import Object", "Driver 4", "+7"],
+]
+
+
+def test_import_dry_run_plans_without_writing(test_client, db_session, import_setup):
+    dock_a, dock_b = import_setup
+
+    response = post_import(test_client, IMPORT_ROWS, dry_run=True)
+    assert response.status_code == 200
+    payload = response.json()
+
+    assert payload["dry_run"] is True
+    assert payload["created"] == 2
+    # Row 3 exceeds the quota left after row 2; row 5 finds both docks taken.
+    assert [e["row_number"] for e in payload["errors"]] == [3, 5]
+    assert [(p["row_number"], p["dock_id"], p["start_time"], p["end_time"]) for p in payload["placements"]] == [
+        (2, dock_a.id, "09:00", "10:00"),
+        (4, dock_b.id, "09:00", "10:00"),
+    ]
+    assert len(payload["placements"][0]["time_slot_ids"]) == 2
+    assert db_session.query(models.Booking).count() == 0
+
+
+def test_csv_import_reads_decimal_commas_and_russian_dates(test_client, db_session, import_setup):
+    planned = post_import(test_client, IMPORT_ROWS, dry_run=True).json()
+    # What Russian Excel saves as CSV: semicolons, cp1251, "10,0" and "02.03.2026".
+    lines = [";".join(IMPORT_HEADERS)] + [
+        ";".join([sheet, supplier, f"{cubes},0", "02.03.2026", *rest])
+        for sheet, supplier, cubes, _, *rest in IMPORT_ROWS
+    ]
+    content = "\r\n".join(lines).encode("cp1251")
+
+    response = post_import(test_client, IMPORT_ROWS, dry_run=True, content=content, filename="bookings.csv")
+    assert response.status_code == 200, response.text
+    assert response.json() == planned
+
+    bad = "\r\n".join([lines[0], lines[1].replace("10,0", "ten")]).encode("cp1251")
+    errors = post_import(test_client, IMPORT_ROWS, dry_run=True, content=bad, filename="bookings.csv").json()["errors"]
+    assert [e["row_number"] for e in errors] == [2]
+    assert errors[0]["message"] == "cubes 'ten' некорректен"
+
+
+def test_import_writes_the_same_plan_as_dry_run(test_client, db_session, import_setup):
+    planned = post_import(test_client, IMPORT_ROWS, dry_run=True).json()
+    response = post_import(test_client, IMPORT_ROWS)
+    assert response.status_code == 200
+    payload = response.json()
+
+    assert payload["dry_run"] is False
+    assert payload["created"] == planned["created"]
+    assert payload["placements"] == planned["placements"]
+
+    bookings = db_session.query(models.Booking).order_by(models.Booking.id).all()
+    assert [b.transport_sheet for b in bookings] == ["TS-1", "TS-3"]
+    assert sorted(bts.time_slot_id for bts in bookings[1].booking_slots) == planned["placements"][1]["time_slot_ids"]
+
+
+def test_import_retry_with_idempotency_key_is_replayed(test_client, db_session, import_setup):
+    headers = {"Idempotency-Key": "import-1"}
+    # A retry sends the same bytes; a rebuilt workbook would carry a new timestamp.
+    content = import_file(IMPORT_ROWS)
+    first = post_import(test_client, IMPORT_ROWS, headers=headers, content=content)
+    retry = post_import(test_client, IMPORT_ROWS, headers=headers, content=content)
+
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert db_session.query(models.Booking).count() == first.json()["created"] == 2
+
+
+def test_import_best_fit_keeps_room_for_longer_rows(test_client, db_session, import_setup):
+    dock_a, dock_b = import_setup
+    db_session.add_all([
+        models.VehicleType(name="Trailer", duration_minutes=90),
+        models.TimeSlot(dock_id=dock_a.id, slot_date=BOOKING_DATE, start_time=time(10, 0), end_time=time(10, 30), capacity=1),
+    ])
+    db_session.commit()
+    rows = [
+        ["TS-1", "Import Supplier", 1, "2026-03-02", "09:00", "Purchased", "Truck", "Import Object", "Driver 1", "+7"],
+        ["TS-2", "Import Supplier", 1, "2026-03-02", "09:00", "Purchased", "Trailer", "Import Object", "Driver 2", "+7"],
+    ]
+
+    # First fit puts the truck on the longer Dock A, and the trailer no longer fits anywhere.
+    first_fit = post_import(test_client, rows, dry_run=True).json()
+    assert [e["row_number"] for e in first_fit["errors"]] == [3]
+
+    for policy in ("best_fit", "optimized"):
+        payload = post_import(test_client, rows, dry_run=True, policy=policy).json()
+        assert [(p["row_number"], p["dock_id"], p["end_time"]) for p in payload["placements"]] == [
+            (2, dock_b.id, "10:00"),
+            (3, dock_a.id, "10:30"),
+        ]
+
+    assert post_import(test_client, rows, dry_run=True, policy="worst_fit").status_code == 400
+
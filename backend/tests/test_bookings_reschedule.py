@@ -0,0 +1,124 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)  # Monday
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    # A fresh database per test: a failed reschedule rolls back on its own.
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def user(db_session):
+    user = models.User(email="move@example.com", password_hash="hash", full_name="Move User", role=models.UserRole.carrier)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, user):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: user
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def booked(db_session, user):
+    """One dock with four 30-minute slots; a 60-minute booking holds 09:00-10:00 and the whole quota."""
+    obj = models.Object(name="Move Object", object_type=models.ObjectType.warehouse)
+    transport_type = models.TransportTypeRef(name="Purchased", enum_value=models.TransportType.purchased)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, transport_type, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Move Dock", dock_type=models.DockType.entrance, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    slots = [
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(h, m), end_time=time(h, m + 30) if m == 0 else time(h + 1, 0), capacity=1)
+        for h, m in ((9, 0), (9, 30), (10, 0), (10, 30))
+    ]
+    db_session.add_all(slots)
+
+    quota = models.VolumeQuota(
+        object_id=obj.id,
+        direction=models.BookingDirection.inbound,
+        year=BOOKING_DATE.year,
+        month=BOOKING_DATE.month,
+        day_of_week=BOOKING_DATE.weekday(),
+        volume=10,
+        allow_overbooking=False,
+    )
+    quota.transport_types = [transport_type]
+    booking = models.Booking(
+        user_id=user.id,
+        vehicle_type_id=vehicle_type.id,
+        vehicle_plate="A001AA",
+        driver_full_name="Driver",
+        driver_phone="70000000000",
+        transport_type_id=transport_type.id,
+        cubes=10,
+        status="confirmed",
+    )
+    db_session.add_all([quota, booking])
+    db_session.flush()
+    db_session.add_all([models.BookingTimeSlot(booking_id=booking.id, time_slot_id=s.id) for s in slots[:2]])
+    db_session.commit()
+    return booking, slots
+
+
+def linked_slot_ids(db_session, booking):
+    return sorted(
+        link.time_slot_id
+        for link in db_session.query(models.BookingTimeSlot).filter(models.BookingTimeSlot.booking_id == booking.id)
+    )
+
+
+def test_reschedule_overlapping_its_own_slots_keeps_quota(test_client, db_session, booked):
+    booking, slots = booked
+
+    # 09:30-10:30 overlaps the booking's current window, and the quota is already full with its own cubes.
+    response = test_client.put(f"/api/bookings/{booking.id}/reschedule", json={"booking_date": "2026-03-02", "start_time": "09:30"})
+    assert response.status_code == 200, response.text
+    assert (response.json()["start_time"], response.json()["end_time"]) == ("09:30:00", "10:30:00")
+    assert linked_slot_ids(db_session, booking) == [slots[1].id, slots[2].id]
+
+
+def test_failed_reschedule_leaves_booking_untouched(test_client, db_session, booked):
+    booking, slots = booked
+
+    response = test_client.put(f"/api/bookings/{booking.id}/reschedule", json={"booking_date": "2026-03-02", "start_time": "10:30"})
+    assert response.status_code == 409
+    response = test_client.put(f"/api/bookings/{booking.id}/reschedule", json={"booking_date": "2026-03-02", "start_time": "07:00"})
+    assert response.status_code == 409
+
+    db_session.expire_all()
+    assert linked_slot_ids(db_session, booking) == [slots[0].id, slots[1].id]
+    assert db_session.get(models.Booking, booking.id).status == "confirmed"
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, get_booking_write_db, get_reports_db, is_statement_timeout
+from app.deps import get_current_user
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__("canceling statement")
+        self.pgcode = pgcode
+
+
+@pytest.fixture(scope="module")
+def client():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    import app.db as app_db
+    app_db.engine = engine
+
+    from app.main import app
+
+    def failing_reports_db(pgcode):
+        def dependency():
+            raise OperationalError("SELECT 1", {}, _PgError(pgcode))
+            yield
+        return dependency
+
+    app.dependency_overrides[get_current_user] = lambda: models.User(id=1, email="a@example.com", role=models.UserRole.admin, is_active=True)
+    with TestClient(app, raise_server_exceptions=False) as test_client:
+        yield test_client, app, failing_reports_db
+    app.dependency_overrides.pop(get_current_user)
+    app.dependency_overrides.pop(get_reports_db, None)
+    engine.dispose()
+
+
+def test_statement_timeout_is_a_503_and_other_db_errors_stay_500(client):
+    test_client, app, failing_reports_db = client
+    params = {"start_date": "2026-03-02", "end_date": "2026-03-31"}
+
+    app.dependency_overrides[get_reports_db] = failing_reports_db("57014")
+    response = test_client.get("/api/analytics/bookings-by-zone", params=params)
+    assert response.status_code == 503
+
+    app.dependency_overrides[get_reports_db] = failing_reports_db("40P01")
+    assert test_client.get("/api/analytics/bookings-by-zone", params=params).status_code == 500
+
+
+def test_timeouts_are_postgres_only():
+    engine = create_engine("sqlite:///:memory:")
+    with sessionmaker(bind=engine)() as db:
+        # SQLite has no statement_timeout; the session is handed over untouched.
+        assert get_booking_write_db(db) is db
+        assert not db.in_transaction()
+    assert is_statement_timeout(OperationalError("SELECT 1", {}, _PgError("57014")))
+    assert not is_statement_timeout(OperationalError("SELECT 1", {}, _PgError(None)))
@@ -0,0 +1,208 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+from app.occupancy import rebuild_object_occupancy
+from app.routers import docks as docks_router
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+LATER_DATE = date(2026, 3, 20)
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    # A fresh database per test: a dry run rolls back on its own.
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def admin(db_session):
+    admin = models.User(email="dock-admin@example.com", password_hash="hash", full_name="Dock Admin", role=models.UserRole.admin)
+    db_session.add(admin)
+    db_session.commit()
+    return admin
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, admin):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def two_docks(db_session, admin):
+    """Docks A and B with 09:00-11:00 in 30-minute slots; A has bookings at 09:00 and 10:00, B is busy at 09:00."""
+    obj = models.Object(name="Maintenance Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock_a = models.Dock(name="Dock A", dock_type=models.DockType.entrance, object_id=obj.id)
+    dock_b = models.Dock(name="Dock B", dock_type=models.DockType.entrance, object_id=obj.id)
+    db_session.add_all([dock_a, dock_b])
+    db_session.commit()
+
+    slots = {}
+    for dock in (dock_a, dock_b):
+        for day in (BOOKING_DATE, LATER_DATE):
+            for start, end in ((time(9, 0), time(9, 30)), (time(9, 30), time(10, 0)), (time(10, 0), time(10, 30)), (time(10, 30), time(11, 0))):
+                slot = models.TimeSlot(dock_id=dock.id, slot_date=day, start_time=start, end_time=end, capacity=1)
+                db_session.add(slot)
+                slots[(dock.name, day, start)] = slot
+    db_session.commit()
+
+    bookings = {}
+    for name, dock, day, starts in (
+        ("blocked", dock_a, BOOKING_DATE, (time(9, 0), time(9, 30))),
+        ("movable", dock_a, BOOKING_DATE, (time(10, 0), time(10, 30))),
+        ("out_of_range", dock_a, LATER_DATE, (time(9, 0), time(9, 30))),
+        ("on_b", dock_b, BOOKING_DATE, (time(9, 0), time(9, 30))),
+    ):
+        booking = models.Booking(user_id=admin.id, vehicle_type_id=vehicle_type.id, status="confirmed", booking_type=models.BookingDirection.inbound)
+        booking.booking_slots = [models.BookingTimeSlot(time_slot_id=slots[(dock.name, day, start)].id) for start in starts]
+        db_session.add(booking)
+        bookings[name] = booking
+    db_session.commit()
+    rebuild_object_occupancy(db_session, [obj.id])
+    db_session.commit()
+    return obj, vehicle_type, dock_a, dock_b, slots, bookings
+
+
+def linked_slot_ids(db_session, booking):
+    return sorted(
+        link.time_slot_id
+        for link in db_session.query(models.BookingTimeSlot).filter(models.BookingTimeSlot.booking_id == booking.id)
+    )
+
+
+def test_maintenance_moves_bookings_and_reports_unplaceable(test_client, db_session, two_docks):
+    obj, vehicle_type, dock_a, dock_b, slots, bookings = two_docks
+    payload = {"from_date": BOOKING_DATE.isoformat(), "to_date": BOOKING_DATE.isoformat()}
+
+    dry_run = test_client.post(f"/api/docks/{dock_a.id}/maintenance", json={**payload, "dry_run": True})
+    assert dry_run.status_code == 200, dry_run.text
+    db_session.expire_all()
+    assert db_session.get(models.Dock, dock_a.id).status == models.DockStatus.active
+    assert linked_slot_ids(db_session, bookings["movable"]) == [slots[("Dock A", BOOKING_DATE, time(10, 0))].id, slots[("Dock A", BOOKING_DATE, time(10, 30))].id]
+
+    response = test_client.post(f"/api/docks/{dock_a.id}/maintenance", json=payload)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report == {**dry_run.json(), "dry_run": False, "window_id": report["window_id"]}
+    assert dry_run.json()["window_id"] is None
+    assert (report["moved"], report["unplaceable"]) == (1, 1)
+    assert [(r["booking_id"], r["status"], r["dock_id"]) for r in report["results"]] == [
+        (bookings["blocked"].id, "unplaceable", None),
+        (bookings["movable"].id, "moved", dock_b.id),
+    ]
+
+    db_session.expire_all()
+    # The dock keeps its status; the dates are a window of its own.
+    assert db_session.get(models.Dock, dock_a.id).status == models.DockStatus.active
+    window = db_session.get(models.DockMaintenanceWindow, report["window_id"])
+    assert (window.dock_id, window.status, window.from_date, window.to_date) == (dock_a.id, models.DockStatus.maintenance, BOOKING_DATE, BOOKING_DATE)
+    assert linked_slot_ids(db_session, bookings["movable"]) == [slots[("Dock B", BOOKING_DATE, time(10, 0))].id, slots[("Dock B", BOOKING_DATE, time(10, 30))].id]
+    assert linked_slot_ids(db_session, bookings["blocked"]) == [slots[("Dock A", BOOKING_DATE, time(9, 0))].id, slots[("Dock A", BOOKING_DATE, time(9, 30))].id]
+    assert linked_slot_ids(db_session, bookings["out_of_range"]) == [slots[("Dock A", LATER_DATE, time(9, 0))].id, slots[("Dock A", LATER_DATE, time(9, 30))].id]
+
+
+def test_docks_out_of_service_are_not_offered(test_client, db_session, two_docks):
+    obj, vehicle_type, dock_a, dock_b, slots, _ = two_docks
+    dock_b.status = models.DockStatus.inactive
+    db_session.commit()
+
+    listed = test_client.get("/api/time-slots/", params={"from_date": LATER_DATE, "to_date": LATER_DATE, "object_id": obj.id}).json()
+    assert {s["dock_id"] for s in listed} == {dock_a.id}
+
+    booking = {
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": LATER_DATE.isoformat(),
+        "start_time": "10:00",
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    }
+    assert test_client.post("/api/bookings/", json={**booking, "time_slot_id": slots[("Dock B", LATER_DATE, time(10, 0))].id}).status_code == 200
+    created = db_session.query(models.Booking).order_by(models.Booking.id.desc()).first()
+    assert linked_slot_ids(db_session, created) == [slots[("Dock A", LATER_DATE, time(10, 0))].id, slots[("Dock A", LATER_DATE, time(10, 30))].id]
+
+
+def test_maintenance_window_closes_only_its_dates_until_ended(test_client, db_session, two_docks):
+    obj, vehicle_type, dock_a, dock_b, slots, _ = two_docks
+    started = test_client.post(f"/api/docks/{dock_a.id}/maintenance", json={"from_date": BOOKING_DATE.isoformat(), "to_date": BOOKING_DATE.isoformat()})
+    window_id = started.json()["window_id"]
+
+    def offered_docks(day):
+        listed = test_client.get("/api/time-slots/", params={"from_date": day, "to_date": day, "object_id": obj.id})
+        return {s["dock_id"] for s in listed.json()}
+
+    assert offered_docks(BOOKING_DATE) == {dock_b.id}
+    assert offered_docks(LATER_DATE) == {dock_a.id, dock_b.id}
+    # The allocator skips the closed day only: dock B took the moved booking at 10:00, so nothing is left then.
+    booking = {
+        "vehicle_type_id": vehicle_type.id,
+        "start_time": "10:00",
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    }
+    picked = {**booking, "booking_date": BOOKING_DATE.isoformat(), "time_slot_id": slots[("Dock A", BOOKING_DATE, time(10, 0))].id}
+    refused = test_client.post("/api/bookings/", json=picked)
+    assert refused.status_code == 409, refused.text
+    later = {**booking, "booking_date": LATER_DATE.isoformat(), "time_slot_id": slots[("Dock A", LATER_DATE, time(10, 0))].id}
+    assert test_client.post("/api/bookings/", json=later).status_code == 200
+
+    assert [w["id"] for w in test_client.get(f"/api/docks/{dock_a.id}/maintenance").json()] == [window_id]
+    ended = test_client.delete(f"/api/docks/{dock_a.id}/maintenance/{window_id}", params={"on_date": BOOKING_DATE.isoformat()})
+    assert ended.status_code == 200, ended.text
+    assert test_client.get(f"/api/docks/{dock_a.id}/maintenance").json() == []
+    assert offered_docks(BOOKING_DATE) == {dock_a.id, dock_b.id}
+    assert test_client.delete(f"/api/docks/{dock_a.id}/maintenance/{window_id}").status_code == 404
+
+
+def test_relocation_rechecks_target_slots_under_the_lock(test_client, db_session, two_docks, admin, monkeypatch):
+    obj, vehicle_type, dock_a, dock_b, slots, bookings = two_docks
+    plan = docks_router.plan_relocation
+
+    def plan_then_lose_the_target(*args, **kwargs):
+        # A booking lands on dock B at 10:00 after the plan picked it and before it is applied.
+        plans = plan(*args, **kwargs)
+        db_session.add(models.Booking(
+            user_id=admin.id, vehicle_type_id=vehicle_type.id, status="confirmed", booking_type=models.BookingDirection.inbound,
+            booking_slots=[models.BookingTimeSlot(time_slot_id=slots[("Dock B", BOOKING_DATE, time(10, 0))].id)],
+        ))
+        db_session.flush()
+        return plans
+
+    monkeypatch.setattr(docks_router, "plan_relocation", plan_then_lose_the_target)
+    response = test_client.post(f"/api/docks/{dock_a.id}/maintenance", json={"from_date": BOOKING_DATE.isoformat(), "to_date": BOOKING_DATE.isoformat()})
+    assert response.status_code == 409, response.text
+
+    db_session.expire_all()
+    assert linked_slot_ids(db_session, bookings["movable"]) == [slots[("Dock A", BOOKING_DATE, time(10, 0))].id, slots[("Dock A", BOOKING_DATE, time(10, 30))].id]
+    assert db_session.query(models.DockMaintenanceWindow).count() == 0
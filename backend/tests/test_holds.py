@@ -0,0 +1,156 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+from app.holds import purge_expired_holds
+from app.routers import holds as holds_router
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def users(db_session):
+    holder = models.User(email="holder@example.com", password_hash="hash", full_name="Holder", role=models.UserRole.carrier)
+    other = models.User(email="other@example.com", password_hash="hash", full_name="Other", role=models.UserRole.carrier)
+    db_session.add_all([holder, other])
+    db_session.commit()
+    return {"holder": holder, "other": other, "current": holder}
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, users):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: users["current"]
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def single_slot(db_session):
+    obj = models.Object(name="Hold Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Van", duration_minutes=30)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Hold Dock", dock_type=models.DockType.entrance, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    slot = models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(9, 0), end_time=time(9, 30), capacity=1)
+    db_session.add(slot)
+    db_session.commit()
+    return obj, vehicle_type, slot
+
+
+def booking_payload(obj, vehicle_type, **extra):
+    return {
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": BOOKING_DATE.isoformat(),
+        "start_time": "09:00",
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+        **extra,
+    }
+
+
+def test_hold_blocks_others_until_consumed(test_client, db_session, users, single_slot):
+    obj, vehicle_type, slot = single_slot
+
+    response = test_client.post("/api/holds/", json={
+        "object_id": obj.id, "vehicle_type_id": vehicle_type.id, "booking_date": BOOKING_DATE.isoformat(), "start_time": "09:00",
+    })
+    assert response.status_code == 200, response.text
+    hold = response.json()
+    assert hold["time_slot_ids"] == [slot.id]
+
+    slots = test_client.get("/api/time-slots/", params={"from_date": BOOKING_DATE, "to_date": BOOKING_DATE, "object_id": obj.id}).json()
+    assert [(s["id"], s["status"]) for s in slots] == [(slot.id, "full")]
+
+    users["current"] = users["other"]
+    assert test_client.post("/api/bookings/", json=booking_payload(obj, vehicle_type)).status_code == 409
+    assert test_client.post("/api/bookings/", json=booking_payload(obj, vehicle_type, hold_id=hold["id"])).status_code == 404
+
+    users["current"] = users["holder"]
+    response = test_client.post("/api/bookings/", json=booking_payload(obj, vehicle_type, hold_id=hold["id"]))
+    assert response.status_code == 200, response.text
+    assert db_session.query(models.SlotHold).count() == 0
+    assert [bts.time_slot_id for bts in db_session.get(models.Booking, response.json()["id"]).booking_slots] == [slot.id]
+
+
+def test_expired_holds_are_ignored_and_purged(test_client, db_session, users, single_slot):
+    obj, vehicle_type, slot = single_slot
+    expired = models.SlotHold(
+        user_id=users["other"].id,
+        object_id=obj.id,
+        booking_type=models.BookingDirection.inbound,
+        expires_at=datetime.utcnow() - timedelta(seconds=1),
+        hold_slots=[models.SlotHoldTimeSlot(time_slot_id=slot.id)],
+    )
+    db_session.add(expired)
+    db_session.commit()
+
+    users["current"] = users["other"]
+    response = test_client.post("/api/bookings/", json=booking_payload(obj, vehicle_type, hold_id=expired.id))
+    assert response.status_code == 410
+
+    users["current"] = users["holder"]
+    assert test_client.post("/api/bookings/", json=booking_payload(obj, vehicle_type)).status_code == 200
+    assert purge_expired_holds(db_session) == 1
+    assert db_session.query(models.SlotHoldTimeSlot).count() == 0
+
+
+def hold_payload(obj, vehicle_type):
+    return {"object_id": obj.id, "vehicle_type_id": vehicle_type.id, "booking_date": BOOKING_DATE.isoformat(), "start_time": "09:00"}
+
+
+def test_active_holds_per_user_are_limited(test_client, db_session, users, single_slot, monkeypatch):
+    obj, vehicle_type, slot = single_slot
+    slot.capacity = 5
+    db_session.commit()
+    monkeypatch.setattr(holds_router, "MAX_ACTIVE_HOLDS_PER_USER", 2)
+
+    assert [test_client.post("/api/holds/", json=hold_payload(obj, vehicle_type)).status_code for _ in range(2)] == [200, 200]
+    response = test_client.post("/api/holds/", json=hold_payload(obj, vehicle_type))
+    assert response.status_code == 409
+    assert response.json()["detail"] == "At most 2 active holds per user"
+
+    # Expired holds do not count, and the limit is per user.
+    db_session.query(models.SlotHold).filter(models.SlotHold.user_id == users["holder"].id).first().expires_at = datetime.utcnow()
+    db_session.commit()
+    assert test_client.post("/api/holds/", json=hold_payload(obj, vehicle_type)).status_code == 200
+    users["current"] = users["other"]
+    assert test_client.post("/api/holds/", json=hold_payload(obj, vehicle_type)).status_code == 200
@@ -0,0 +1,116 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def user(db_session):
+    user = models.User(email="retry@example.com", password_hash="hash", full_name="Retry User", role=models.UserRole.carrier)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, user):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: user
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def booking_payload(db_session):
+    obj = models.Object(name="Retry Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Van", duration_minutes=30)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Retry Dock", dock_type=models.DockType.entrance, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    db_session.add_all([
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(9, 0), end_time=time(9, 30), capacity=2),
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(9, 30), end_time=time(10, 0), capacity=2),
+    ])
+    db_session.commit()
+    return {
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": BOOKING_DATE.isoformat(),
+        "start_time": "09:00",
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    }
+
+
+def test_create_booking_retry_replays_the_first_response(test_client, db_session, booking_payload):
+    headers = {"Idempotency-Key": "create-1"}
+    first = test_client.post("/api/bookings/", json=booking_payload, headers=headers)
+    assert first.status_code == 200, first.text
+    retry = test_client.post("/api/bookings/", json=booking_payload, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db_session.query(models.Booking).count() == 1
+
+    changed = test_client.post("/api/bookings/", json={**booking_payload, "start_time": "09:30"}, headers=headers)
+    assert changed.status_code == 422
+    # Without a key every request is a new booking.
+    assert test_client.post("/api/bookings/", json=booking_payload).json()["id"] != first.json()["id"]
+
+
+def test_batch_retry_and_expired_keys(test_client, db_session, user, booking_payload):
+    db_session.add(models.IdempotencyKey(
+        user_id=user.id, scope="booking_batch", key="batch-1", request_hash="stale",
+        status_code=200, response_body="{}", expires_at=datetime.utcnow() - timedelta(minutes=1),
+    ))
+    db_session.commit()
+
+    body = {"mode": "best_effort", "bookings": [booking_payload, {**booking_payload, "start_time": "09:30"}]}
+    first = test_client.post("/api/bookings/batch", json=body, headers={"Idempotency-Key": "batch-1"})
+    assert first.status_code == 200, first.text
+    assert first.json()["created"] == 2
+    retry = test_client.post("/api/bookings/batch", json=body, headers={"Idempotency-Key": "batch-1"})
+    assert retry.json() == first.json()
+    assert db_session.query(models.Booking).count() == 2
+    # The expired row was swept when the new response was stored.
+    assert [k.request_hash != "stale" for k in db_session.query(models.IdempotencyKey).all()] == [True]
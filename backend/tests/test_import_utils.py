@@ -0,0 +1,94 @@
+from datetime import date, datetime
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from openpyxl import Workbook
+from starlette.datastructures import UploadFile
+
+from app.import_utils import ImportFileError, cell_date, cell_number, is_import_file, open_import_file
+
+
+def make_upload(filename: str, payload: bytes) -> UploadFile:
+    spooled = SpooledTemporaryFile(max_size=1024)
+    spooled.write(payload)
+    return UploadFile(file=spooled, filename=filename)
+
+
+def xlsx_bytes(sheets: dict) -> bytes:
+    wb = Workbook()
+    wb.remove(wb.active)
+    for title, rows in sheets.items():
+        ws = wb.create_sheet(title)
+        for row in rows:
+            ws.append(list(row))
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_xlsx_sheets_headers_and_rows():
+    payload = xlsx_bytes({
+        "Quotas": [["Object", "Volume"], ["A", 10], [None, None], ["B", "=1+1"]],
+        "Overrides": [["object", "date"]],
+    })
+    source = open_import_file(make_upload("quotas.xlsx", payload))
+
+    quotas = source.sheet("quotas")
+    assert quotas.has_headers(["object", "volume"])
+    assert not quotas.has_headers(["object"])
+    assert quotas.has_headers(["object"], prefix=True)
+
+    rows = list(quotas.rows(["object", "volume"]))
+    # Blank rows are skipped but row numbers follow the spreadsheet.
+    assert [number for number, _ in rows] == [2, 4]
+    assert rows[0][1].object == "A"
+    obj, volume = rows[0][1]
+    assert (obj, volume) == ("A", 10)
+
+    assert source.sheet("overrides") is not None
+    assert source.sheet("missing") is None
+
+
+def test_csv_semicolon_cp1251_and_empty_cells():
+    payload = "name;zone_name;comment\r\nПоставщик;Зона;\r\n;;\r\nВторой;Зона\r\n".encode("cp1251")
+    source = open_import_file(make_upload("suppliers.csv", payload))
+
+    assert source.sheet("suppliers") is None
+    sheet = source.active_sheet()
+    assert sheet.has_headers(["name", "zone_name", "comment"])
+    rows = list(sheet.rows(["name", "zone_name", "comment"]))
+    assert [(number, tuple(row)) for number, row in rows] == [
+        (2, ("Поставщик", "Зона", None)),
+        (4, ("Второй", "Зона", None)),
+    ]
+
+
+def test_csv_with_a_cp1251_byte_past_the_first_chunk():
+    # UTF-8-clean for well over 64 KB, then one cp1251 "ё": the whole file is read as cp1251.
+    payload = b"name;comment\r\n" + b"plain;row\r\n" * 10_000 + "ёлка;last\r\n".encode("cp1251")
+    rows = list(open_import_file(make_upload("big.csv", payload)).active_sheet().rows(["name", "comment"]))
+    assert len(rows) == 10_001
+    assert tuple(rows[-1][1]) == ("ёлка", "last")
+
+
+def test_cells_parse_alike_from_csv_text_and_xlsx_values():
+    assert cell_number("12,5") == cell_number("12.5") == cell_number(12.5) == 12.5
+    assert cell_number("1 234,5") == 1234.5
+    assert cell_number("") is None and cell_number(None) is None
+    with pytest.raises(ValueError):
+        cell_number("twelve")
+
+    assert cell_date("25.03.2026") == cell_date("2026-03-25") == cell_date(datetime(2026, 3, 25, 0, 0)) == date(2026, 3, 25)
+    assert cell_date("  ") is None
+    with pytest.raises(ValueError):
+        cell_date("03/25/2026")
+
+
+def test_rejects_unreadable_files():
+    assert is_import_file("data.XLSX")
+    assert is_import_file("data.csv")
+    assert not is_import_file("data.xls")
+    with pytest.raises(ImportFileError):
+        open_import_file(make_upload("broken.xlsx", b"not a zip"))
+    assert open_import_file(make_upload("empty.csv", b"")).active_sheet().is_empty
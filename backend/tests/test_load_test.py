@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.load_test import check_invariants, prepare_limits, run_load_test
+from app.seed_data import seed
+
+
+FROM_DATE = date(2026, 3, 2)  # Monday
+TARGET_DATE = date(2026, 3, 25)
+
+
+@pytest.fixture(scope="function")
+def session_factory(tmp_path):
+    # A file database: the rush runs requests from several threadpool workers at once.
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        seed(db, "tiny", seed=7, from_date=FROM_DATE)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def asgi_app(session_factory, monkeypatch):
+    import app.db as app_db
+    app_db.engine = session_factory.kw["bind"]
+    # get_db opens a session per request, as in production.
+    monkeypatch.setattr(app_db, "SessionLocal", session_factory)
+
+    from app.main import app
+
+    return app
+
+
+def _book(db, slot, transport_type_id, cubes, tag="MANUAL"):
+    carrier = db.query(models.User).filter(models.User.role == models.UserRole.carrier).first()
+    db.add(models.Booking(
+        user_id=carrier.id,
+        vehicle_type_id=db.query(models.VehicleType.id).first()[0],
+        transport_type_id=transport_type_id,
+        cubes=cubes,
+        transport_sheet=tag,
+        booking_type=models.BookingDirection.inbound,
+        booking_slots=[models.BookingTimeSlot(time_slot_id=slot.id)],
+    ))
+    db.commit()
+
+
+def test_invariants_flag_overbooked_slot_quota_and_counters(session_factory):
+    with session_factory() as db:
+        object_id = db.query(models.Object.id).scalar()
+        assert check_invariants(db, object_id, TARGET_DATE, "LOAD-none", 0) == []
+
+        prepare_limits(db, object_id, TARGET_DATE, quota_volume=50, object_capacity=None)
+        transport_type_id = db.query(models.TransportTypeRef.id).first()[0]
+        slot = db.query(models.TimeSlot).join(models.Dock).filter(
+            models.Dock.object_id == object_id,
+            models.Dock.dock_type == models.DockType.entrance,
+            models.TimeSlot.slot_date == TARGET_DATE,
+            ~models.TimeSlot.booking_slots.any(),
+        ).order_by(models.TimeSlot.start_time).first()
+        slot_id = slot.id
+        _book(db, slot, transport_type_id, 40, tag="LOAD-run")
+        _book(db, slot, transport_type_id, 40)
+
+        violations = check_invariants(db, object_id, TARGET_DATE, "LOAD-run", 0)
+
+    assert f"slot {slot_id}: 2 confirmed bookings, capacity 1" in violations
+    assert any(v.startswith("quota in ") and "80.0 used of 50" in v for v in violations)
+    # The bookings went around the API, so the counters were never told.
+    assert any(v.startswith("object occupancy in ") for v in violations)
+    assert "1 bookings stored for the run, 0 acknowledged" in violations
+
+
+def test_rush_reports_latency_and_statuses_per_endpoint(asgi_app, session_factory):
+    report = asyncio.run(run_load_test(
+        lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://test"),
+        session_factory,
+        carriers=3,
+        day=TARGET_DATE,
+        think_ms=0,
+        ramp_ms=0,
+        max_attempts=2,
+    ))
+
+    assert report.carriers == 3
+    assert report.booked + report.gave_up == 3 and report.booked > 0
+    polls, bookings = report.endpoints["GET /api/time-slots/"], report.endpoints["POST /api/bookings/"]
+    assert polls.statuses["200"] == polls.requests
+    assert bookings.statuses["200"] == report.booked
+    assert 0 < bookings.p50_ms <= bookings.p99_ms
+    # Carriers racing for the same first slots: the losers get 409, no slot ends up over capacity.
+    assert report.violations == []
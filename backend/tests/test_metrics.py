@@ -0,0 +1,129 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import metrics, models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def admin(db_session):
+    admin = models.User(email="metrics-admin@example.com", password_hash="hash", full_name="Metrics Admin", role=models.UserRole.admin)
+    db_session.add(admin)
+    db_session.commit()
+    return admin
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, admin):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def dock_slots(db_session):
+    obj = models.Object(name="Metrics Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Dock A", dock_type=models.DockType.universal, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    db_session.add_all([
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(hour, minute), end_time=time(hour + (minute + 30) // 60, (minute + 30) % 60), capacity=1)
+        for hour in range(8, 12)
+        for minute in (0, 30)
+    ])
+    db_session.commit()
+    return obj, vehicle_type
+
+
+def book(client, obj, vehicle_type, start_time):
+    return client.post("/api/bookings/", json={
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": BOOKING_DATE.isoformat(),
+        "start_time": start_time,
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    })
+
+
+def sample(text, line_prefix):
+    return next(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(line_prefix))
+
+
+def test_metrics_cover_booking_phases_and_statuses(test_client, dock_slots):
+    obj, vehicle_type = dock_slots
+    before = metrics.HTTP_REQUESTS.value(router="bookings", method="POST", status="409")
+    commits = metrics.BOOKING_PHASE_SECONDS.count(phase="commit")
+
+    assert book(test_client, obj, vehicle_type, "09:00").status_code == 200
+    assert book(test_client, obj, vehicle_type, "09:00").status_code == 409
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE yms_booking_phase_seconds histogram" in text
+    for phase in ("validation", "duration", "allocation", "quota", "object_capacity", "commit"):
+        assert f'yms_booking_phase_seconds_bucket{{phase="{phase}",le="+Inf"}}' in text
+    assert sample(text, 'yms_booking_phase_seconds_count{phase="commit"}') == commits + 1
+    assert sample(text, 'yms_http_requests_total{router="bookings",method="POST",status="409"}') == before + 1
+    assert 'yms_http_request_duration_seconds_bucket{router="bookings",method="POST",le="0.005"}' in text
+
+
+def test_histogram_exposition():
+    histogram = metrics.Histogram("test_histogram_seconds", "Test.", ("kind",), buckets=(0.1, 1.0))
+    try:
+        histogram.observe(0.05, kind='a"b')
+        histogram.observe(0.5, kind='a"b')
+        histogram.observe(3, kind='a"b')
+        assert histogram.render() == [
+            "# HELP test_histogram_seconds Test.",
+            "# TYPE test_histogram_seconds histogram",
+            'test_histogram_seconds_bucket{kind="a\\"b",le="0.1"} 1',
+            'test_histogram_seconds_bucket{kind="a\\"b",le="1"} 2',
+            'test_histogram_seconds_bucket{kind="a\\"b",le="+Inf"} 3',
+            'test_histogram_seconds_sum{kind="a\\"b"} 3.55',
+            'test_histogram_seconds_count{kind="a\\"b"} 3',
+        ]
+    finally:
+        metrics.REGISTRY.remove(histogram)
@@ -0,0 +1,293 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.allocation import BookingAllocator
+from app.db import Base, get_db
+from app.deps import get_current_user
+from app.occupancy import rebuild_object_occupancy, reserve_object_capacity
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+INBOUND = models.BookingDirection.inbound
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    user = models.User(email="counter@example.com", password_hash="hash", full_name="Counter User", role=models.UserRole.carrier)
+    db_session.add(user)
+    db_session.commit()
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: user
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def universal_dock(db_session):
+    obj = models.Object(name="Counter Object", object_type=models.ObjectType.warehouse, capacity_in=2)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Universal", dock_type=models.DockType.universal, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    slots = [
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=start, end_time=end, capacity=3)
+        for start, end in ((time(9, 0), time(9, 30)), (time(9, 30), time(10, 0)), (time(10, 0), time(10, 30)))
+    ]
+    db_session.add_all(slots)
+    db_session.commit()
+    return obj, vehicle_type, dock, slots
+
+
+def counters(db_session, obj):
+    db_session.expire_all()
+    return sorted(
+        (row.capacity_class.value, row.start_time.strftime("%H:%M"), row.bookings)
+        for row in db_session.query(models.ObjectOccupancy).filter(models.ObjectOccupancy.object_id == obj.id)
+        if row.bookings
+    )
+
+
+def book(client, obj, vehicle_type, start_time, path="/api/bookings/"):
+    return client.post(path, json={
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": BOOKING_DATE.isoformat(),
+        "start_time": start_time,
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    })
+
+
+def test_counters_follow_booking_writes(test_client, db_session, universal_dock):
+    obj, vehicle_type, dock, slots = universal_dock
+
+    first = book(test_client, obj, vehicle_type, "09:00")
+    second = book(test_client, obj, vehicle_type, "09:00")
+    assert (first.status_code, second.status_code) == (200, 200)
+    # A universal dock counts for both classes; capacity_in=2 is used up at 09:00-10:00.
+    assert counters(db_session, obj) == [("in", "09:00", 2), ("in", "09:30", 2), ("out", "09:00", 2), ("out", "09:30", 2)]
+    assert book(test_client, obj, vehicle_type, "09:30").status_code == 409
+
+    moved = test_client.put(f"/api/bookings/{second.json()['id']}/reschedule", json={"booking_date": "2026-03-02", "start_time": "09:30"})
+    assert moved.status_code == 200, moved.text
+    assert counters(db_session, obj) == [
+        ("in", "09:00", 1), ("in", "09:30", 2), ("in", "10:00", 1),
+        ("out", "09:00", 1), ("out", "09:30", 2), ("out", "10:00", 1),
+    ]
+
+    assert test_client.put(f"/api/bookings/{first.json()['id']}/cancel").status_code == 200
+    expected = [("in", "09:30", 1), ("in", "10:00", 1), ("out", "09:30", 1), ("out", "10:00", 1)]
+    assert counters(db_session, obj) == expected
+
+    rebuild_object_occupancy(db_session, [obj.id])
+    assert counters(db_session, obj) == expected
+
+
+def test_reserve_refuses_full_counters_and_leaves_them_unchanged(db_session, universal_dock):
+    obj, _, dock, slots = universal_dock
+    db_session.add(models.ObjectOccupancy(
+        object_id=obj.id, capacity_class=INBOUND, slot_date=BOOKING_DATE, start_time=time(9, 30), end_time=time(10, 0), bookings=2,
+    ))
+    db_session.commit()
+
+    assert reserve_object_capacity(db_session, [slots[0].id, slots[1].id], INBOUND) is False
+    assert counters(db_session, obj) == [("in", "09:30", 2)]
+    # Outbound bookings on the universal dock are checked against capacity_out, which is unlimited.
+    assert reserve_object_capacity(db_session, [slots[0].id, slots[1].id], models.BookingDirection.outbound) is True
+    assert counters(db_session, obj) == [("in", "09:00", 1), ("in", "09:30", 3), ("out", "09:00", 1), ("out", "09:30", 1)]
+
+
+def test_reserve_counts_unexpired_holds_on_the_counters(db_session, universal_dock):
+    obj, _, dock, slots = universal_dock
+    user = models.User(email="holder@example.com", password_hash="hash", full_name="Holder", role=models.UserRole.carrier)
+    db_session.add(user)
+    db_session.commit()
+    hold = models.SlotHold(
+        user_id=user.id, object_id=obj.id, booking_type=INBOUND, expires_at=datetime.utcnow() + timedelta(minutes=2),
+        hold_slots=[models.SlotHoldTimeSlot(time_slot_id=slots[0].id)],
+    )
+    expired = models.SlotHold(
+        user_id=user.id, object_id=obj.id, booking_type=INBOUND, expires_at=datetime.utcnow() - timedelta(seconds=1),
+        hold_slots=[models.SlotHoldTimeSlot(time_slot_id=slots[0].id)],
+    )
+    db_session.add_all([hold, expired])
+    db_session.commit()
+
+    # capacity_in=2: one booking and the live hold fill 09:00; the expired hold does not count.
+    assert reserve_object_capacity(db_session, [slots[0].id], INBOUND) is True
+    assert reserve_object_capacity(db_session, [slots[0].id], INBOUND, record=False) is False
+    assert reserve_object_capacity(db_session, [slots[0].id], INBOUND) is False
+    # Consuming the hold frees its place.
+    assert reserve_object_capacity(db_session, [slots[0].id], INBOUND, exclude_hold_ids=[hold.id]) is True
+    assert counters(db_session, obj) == [("in", "09:00", 2), ("out", "09:00", 2)]
+
+
+def test_reserve_locks_more_keys_than_one_expression_allows(db_session, universal_dock):
+    obj, _, dock, _ = universal_dock
+    # 45 days x 24 half-hour slots: 1080 inbound counter keys in one reservation (an import or relocation).
+    slots = [
+        models.TimeSlot(
+            dock_id=dock.id, slot_date=date(2026, 4, 1) + timedelta(days=day),
+            start_time=time(hour, 0), end_time=time(hour, 30), capacity=3,
+        )
+        for day in range(45)
+        for hour in range(24)
+    ]
+    db_session.add_all(slots)
+    db_session.commit()
+    slot_ids = [slot.id for slot in slots]
+
+    assert reserve_object_capacity(db_session, slot_ids, INBOUND) is True
+    assert reserve_object_capacity(db_session, slot_ids, INBOUND) is True
+    # capacity_in=2 is reached on every key now.
+    assert reserve_object_capacity(db_session, slot_ids, INBOUND) is False
+    db_session.expire_all()
+    inbound = db_session.query(models.ObjectOccupancy).filter(
+        models.ObjectOccupancy.object_id == obj.id, models.ObjectOccupancy.capacity_class == INBOUND,
+    ).all()
+    assert len(inbound) == 1080
+    assert {row.bookings for row in inbound} == {2}
+
+
+@pytest.fixture(scope="function")
+def racing_client(tmp_path, monkeypatch):
+    # A file database and a session per request: the racing requests must not share a connection.
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory(expire_on_commit=False) as db:
+        user = models.User(email="race@example.com", password_hash="hash", full_name="Race User", role=models.UserRole.carrier)
+        obj = models.Object(name="Race Object", object_type=models.ObjectType.warehouse)
+        vehicle_type = models.VehicleType(name="Truck", duration_minutes=30)
+        db.add_all([user, obj, vehicle_type])
+        db.commit()
+        dock = models.Dock(name="Universal", dock_type=models.DockType.universal, object_id=obj.id)
+        db.add(dock)
+        db.commit()
+        slot = models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(9, 0), end_time=time(9, 30), capacity=1)
+        db.add(slot)
+        db.commit()
+
+    import app.db as app_db
+    app_db.engine = engine
+    monkeypatch.setattr(app_db, "SessionLocal", factory)
+
+    from app.main import app
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    with TestClient(app) as client:
+        yield client, factory, obj, vehicle_type, slot
+    app.dependency_overrides.pop(get_current_user)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("path,counted", [("/api/bookings/", 1), ("/api/holds/", 0)])
+def test_concurrent_writers_recheck_the_slot_under_the_lock(racing_client, monkeypatch, path, counted):
+    client, factory, obj, vehicle_type, slot = racing_client
+    # Both requests allocate from a snapshot in which the slot (capacity 1) is free.
+    both_allocated = threading.Barrier(2, timeout=10)
+    allocate = BookingAllocator.allocate
+
+    def allocate_then_wait(self, *args, **kwargs):
+        allocation = allocate(self, *args, **kwargs)
+        both_allocated.wait()
+        return allocation
+
+    monkeypatch.setattr(BookingAllocator, "allocate", allocate_then_wait)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(pool.map(lambda _: book(client, obj, vehicle_type, "09:00", path=path), range(2)))
+
+    assert sorted(r.status_code for r in responses) == [200, 409]
+    assert "taken by another booking" in next(r for r in responses if r.status_code == 409).json()["detail"]
+    with factory() as db:
+        taken = db.query(models.BookingTimeSlot).filter(models.BookingTimeSlot.time_slot_id == slot.id).count()
+        held = db.query(models.SlotHoldTimeSlot).filter(models.SlotHoldTimeSlot.time_slot_id == slot.id).count()
+        assert taken + held == 1
+        # The loser rolled back its counter increments too; holds only lock the counters.
+        inbound = db.query(models.ObjectOccupancy).filter(models.ObjectOccupancy.capacity_class == INBOUND).one()
+        assert inbound.bookings == counted
+
+
+def test_concurrent_writers_recheck_a_strict_quota_under_the_lock(racing_client, monkeypatch):
+    client, factory, obj, vehicle_type, slot = racing_client
+    with factory() as db:
+        db.get(models.TimeSlot, slot.id).capacity = 2
+        transport_type = models.TransportTypeRef(name="Purchased", enum_value=models.TransportType.purchased)
+        quota = models.VolumeQuota(
+            object_id=obj.id, direction=INBOUND, year=BOOKING_DATE.year, month=BOOKING_DATE.month,
+            day_of_week=BOOKING_DATE.weekday(), volume=10, allow_overbooking=False,
+        )
+        quota.transport_types = [transport_type]
+        db.add(quota)
+        db.commit()
+        transport_type_id = transport_type.id
+    # Both requests see the whole quota free; 6 + 6 cubes fit the slot but not the quota.
+    both_allocated = threading.Barrier(2, timeout=10)
+    allocate = BookingAllocator.allocate
+
+    def allocate_then_wait(self, *args, **kwargs):
+        allocation = allocate(self, *args, **kwargs)
+        both_allocated.wait()
+        return allocation
+
+    def book_cubes(_):
+        return client.post("/api/bookings/", json={
+            "vehicle_type_id": vehicle_type.id,
+            "transport_type_id": transport_type_id,
+            "cubes": 6,
+            "booking_date": BOOKING_DATE.isoformat(),
+            "start_time": "09:00",
+            "object_id": obj.id,
+            "vehicle_plate": "A001AA",
+            "driver_full_name": "Driver",
+            "driver_phone": "70000000000",
+        })
+
+    monkeypatch.setattr(BookingAllocator, "allocate", allocate_then_wait)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(pool.map(book_cubes, range(2)))
+
+    assert sorted(r.status_code for r in responses) == [200, 409]
+    assert "Quota volume was taken" in next(r for r in responses if r.status_code == 409).json()["detail"]
+    with factory() as db:
+        assert db.query(models.Booking).count() == 1
+        inbound = db.query(models.ObjectOccupancy).filter(models.ObjectOccupancy.capacity_class == INBOUND).one()
+        assert inbound.bookings == 1
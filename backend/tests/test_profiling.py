@@ -0,0 +1,104 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, profiling
+from app.db import Base, get_db
+from app.deps import get_current_user
+from app.security import create_access_token
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def users(db_session):
+    admin = models.User(email="profile-admin@example.com", password_hash="hash", full_name="Profile Admin", role=models.UserRole.admin)
+    carrier = models.User(email="profile-carrier@example.com", password_hash="hash", full_name="Profile Carrier", role=models.UserRole.carrier)
+    db_session.add_all([admin, carrier])
+    db_session.commit()
+    return admin, carrier
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, users, tmp_path, monkeypatch):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+    # The admin check of the X-Profile header reads users through SessionLocal.
+    monkeypatch.setattr(app_db, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind()))
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_SECONDS", 0.001)
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: users[0]
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+def auth(user, profile=True):
+    headers = {"Authorization": f"Bearer {create_access_token(user.email)}"}
+    if profile:
+        headers["X-Profile"] = "1"
+    return headers
+
+
+def test_admin_requests_are_profiled_on_demand(test_client, db_session, users):
+    admin, carrier = users
+    obj = models.Object(name="Profile Object", object_type=models.ObjectType.warehouse)
+    db_session.add(obj)
+    db_session.commit()
+    dock = models.Dock(name="Dock A", dock_type=models.DockType.universal, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    db_session.add_all([
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(h, 0), end_time=time(h, 30), capacity=1)
+        for h in range(0, 24)
+    ])
+    db_session.commit()
+    params = {"from_date": BOOKING_DATE, "to_date": BOOKING_DATE, "object_id": obj.id}
+
+    assert "X-Profile-Id" not in test_client.get("/api/time-slots/", params=params, headers=auth(admin, profile=False)).headers
+    assert "X-Profile-Id" not in test_client.get("/api/time-slots/", params=params, headers=auth(carrier)).headers
+
+    response = test_client.get("/api/time-slots/", params=params, headers=auth(admin))
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    listed = test_client.get("/api/_debug/profiles").json()
+    assert [(p["id"], p["method"], p["route"], p["status"], p["trigger"]) for p in listed] == [
+        (profile_id, "GET", "/api/time-slots/", 200, "header"),
+    ]
+    folded = test_client.get(f"/api/_debug/profiles/{profile_id}")
+    assert folded.status_code == 200
+    lines = folded.text.splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == listed[0]["samples"]
+    assert all(line.startswith("list_time_slots (") for line in lines)
+
+    assert test_client.get("/api/_debug/profiles/..%2F..%2Fetc%2Fpasswd").status_code == 404
@@ -1,5 +1,9 @@
+import json
+from io import BytesIO
+
 import pytest
 from fastapi.testclient import TestClient
+from openpyxl import Workbook
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -170,3 +174,112 @@ def test_delete_prr_limit(test_client, db_session):
 
     response = test_client.get(f"/api/prr-limits/{prr_limit.id}")
     assert response.status_code == 404
+
+
+def _prr_workbook(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "prr_limits"
+    ws.append(["object_name", "supplier_name", "transport_type", "vehicle_type", "duration_minutes"])
+    for row in rows:
+        ws.append(list(row))
+    buf = BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def _post_prr_import(client, rows, resolutions=None):
+    data = {"resolutions": json.dumps(resolutions)} if resolutions is not None else {}
+    return client.post(
+        "/api/prr-limits/import",
+        files={"file": ("prr.xlsx", _prr_workbook(rows), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+        data=data,
+    )
+
+
+def test_import_prr_limits_conflicts_and_bulk_write(test_client, db_session):
+    test_object = models.Object(name="Import Object", object_type="warehouse")
+    supplier = models.Supplier(name="Import Supplier", zone=models.Zone(name="Import Zone"))
+    vehicle_type = models.VehicleType(name="Fura", duration_minutes=60)
+    db_session.add_all([test_object, supplier, vehicle_type])
+    db_session.commit()
+
+    existing = models.PrrLimit(object_id=test_object.id, supplier_id=supplier.id, duration_minutes=60)
+    db_session.add(existing)
+    db_session.commit()
+
+    rows = [
+        ["import object", "Import Supplier", None, None, 90],
+        ["Import Object", None, None, "Fura", 120],
+        ["Import Object", None, None, "fura", 150],
+        ["Missing Object", None, None, None, 30],
+    ]
+    response = _post_prr_import(test_client, rows)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["created"] == 0
+    assert [(c["row_number"], c["source"], c["existing_duration"]) for c in payload["conflicts"]] == [
+        (2, "database", 60),
+        (4, "file", 120),
+    ]
+    assert [e["row_number"] for e in payload["errors"]] == [5]
+
+    resolutions = [
+        {"object_name": "Import Object", "supplier_name": "Import Supplier", "action": "replace_with_new"},
+        {"object_name": "Import Object", "vehicle_type": "Fura", "action": "keep_existing"},
+    ]
+    response = _post_prr_import(test_client, rows, resolutions)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["created"] == 1
+    assert payload["updated"] == 1
+    assert payload["conflicts"] == []
+
+    db_session.expire_all()
+    assert db_session.get(models.PrrLimit, existing.id).duration_minutes == 90
+    created = db_session.query(models.PrrLimit).filter(models.PrrLimit.vehicle_type_id == vehicle_type.id).one()
+    assert created.duration_minutes == 120
+
+
+def test_get_duration_precedence(test_client, db_session):
+    test_object = models.Object(name="Duration Object", object_type="warehouse")
+    supplier = models.Supplier(name="Duration Supplier", zone=models.Zone(name="Duration Zone"))
+    vehicle_type = models.VehicleType(name="Gazel", duration_minutes=30)
+    db_session.add_all([test_object, supplier, vehicle_type])
+    db_session.commit()
+
+    db_session.add_all([
+        models.PrrLimit(object_id=test_object.id, duration_minutes=30),
+        models.PrrLimit(object_id=test_object.id, vehicle_type_id=vehicle_type.id, duration_minutes=60),
+        models.PrrLimit(object_id=test_object.id, supplier_id=supplier.id, duration_minutes=90),
+    ])
+    db_session.commit()
+
+    def duration(**params):
+        response = test_client.get("/api/prr-limits/duration/", params={"object_id": test_object.id, **params})
+        assert response.status_code == 200
+        return response.json()["duration_minutes"]
+
+    assert duration() == 30
+    assert duration(vehicle_type_id=vehicle_type.id) == 60
+    # Object + supplier outranks object + vehicle type.
+    assert duration(supplier_id=supplier.id, vehicle_type_id=vehicle_type.id) == 90
+
+    response = test_client.get("/api/prr-limits/duration/", params={"object_id": test_object.id + 1000})
+    assert response.status_code == 404
+
+
+def test_import_prr_limits_from_csv(test_client, db_session):
+    test_object = models.Object(name="Csv Object", object_type="warehouse")
+    db_session.add(test_object)
+    db_session.commit()
+
+    payload = "object_name,supplier_name,transport_type,vehicle_type,duration_minutes\nCsv Object,,,,60\n,,,,\n"
+    response = test_client.post(
+        "/api/prr-limits/import",
+        files={"file": ("prr.csv", BytesIO(payload.encode("utf-8")), "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert db_session.query(models.PrrLimit).filter(models.PrrLimit.object_id == test_object.id).one().duration_minutes == 60
@@ -0,0 +1,115 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, query_stats
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def admin(db_session):
+    admin = models.User(email="stats-admin@example.com", password_hash="hash", full_name="Stats Admin", role=models.UserRole.admin)
+    db_session.add(admin)
+    db_session.commit()
+    return admin
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, admin):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        query_stats.route_stats(reset=True)
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def dock_slots(db_session):
+    obj = models.Object(name="Stats Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Dock A", dock_type=models.DockType.universal, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    db_session.add_all([
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=time(hour, minute), end_time=time(hour + (minute + 30) // 60, (minute + 30) % 60), capacity=1)
+        for hour in range(8, 12)
+        for minute in (0, 30)
+    ])
+    db_session.commit()
+    return obj, vehicle_type
+
+
+def book(client, obj, vehicle_type, start_time):
+    return client.post("/api/bookings/", json={
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": BOOKING_DATE.isoformat(),
+        "start_time": start_time,
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    })
+
+
+def test_endpoints_stay_within_query_budget(test_client, dock_slots, query_budget):
+    obj, vehicle_type = dock_slots
+    # 4 of them recheck under the lock: the holds on the object counters, then the slots (slots, bookings, holds).
+    with query_budget(29):
+        assert book(test_client, obj, vehicle_type, "09:00").status_code == 200
+    with query_budget(6):
+        listed = test_client.get("/api/time-slots/", params={"from_date": BOOKING_DATE, "to_date": BOOKING_DATE, "object_id": obj.id})
+        assert listed.status_code == 200
+
+
+def test_query_stats_per_route_and_headers(test_client, dock_slots, monkeypatch):
+    obj, vehicle_type = dock_slots
+    assert "X-DB-Query-Count" not in book(test_client, obj, vehicle_type, "09:00").headers
+
+    monkeypatch.setattr(query_stats, "QUERY_STATS_HEADERS", True)
+    response = book(test_client, obj, vehicle_type, "10:00")
+    assert int(response.headers["X-DB-Query-Count"]) > 0
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+    metrics = {m["route"]: m for m in test_client.get("/api/_debug/metrics", params={"reset": True}).json()}
+    created = metrics["POST /api/bookings/"]
+    assert created["requests"] == 2
+    assert created["max_queries"] >= int(response.headers["X-DB-Query-Count"])
+    assert created["slowest_statement"]
+    # The reset request itself is recorded after the reset.
+    assert [m["route"] for m in test_client.get("/api/_debug/metrics").json()] == ["GET /api/_debug/metrics"]
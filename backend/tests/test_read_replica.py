@@ -0,0 +1,76 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.db as app_db
+from app import models
+from app.db import Base, ReplicaRouter
+from app.deps import get_current_user
+
+
+DAY = date(2026, 6, 1)
+
+
+def _database(path, slots):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        obj = models.Object(name="Replica Object", object_type=models.ObjectType.warehouse)
+        dock = models.Dock(name="Replica Dock", dock_type=models.DockType.entrance, object=obj)
+        db.add_all([
+            models.TimeSlot(dock=dock, slot_date=DAY, start_time=time(9 + hour, 0), end_time=time(9 + hour, 30), capacity=1)
+            for hour in range(slots)
+        ])
+        db.commit()
+    return engine, factory
+
+
+@pytest.fixture(scope="function")
+def databases(tmp_path, monkeypatch):
+    # The replica has not caught up with the primary's second slot yet.
+    primary_engine, primary = _database(tmp_path / "primary.db", slots=2)
+    replica_engine, replica = _database(tmp_path / "replica.db", slots=1)
+    monkeypatch.setattr(app_db, "ReportsSessionLocal", primary)
+    monkeypatch.setattr(app_db, "ReplicaSessionLocal", replica)
+    yield replica_engine
+    primary_engine.dispose()
+    replica_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def journal(databases):
+    app_db.engine = databases
+
+    from app.main import app
+
+    app.dependency_overrides[get_current_user] = lambda: models.User(id=1, email="a@example.com", role=models.UserRole.admin, is_active=True)
+    with TestClient(app) as client:
+        yield lambda: client.get("/api/time-slots/journal", params={"start_date": DAY.isoformat(), "end_date": DAY.isoformat()})
+    app.dependency_overrides.pop(get_current_user)
+
+
+def test_reports_read_from_a_fresh_replica_and_fall_back_when_it_lags(journal, databases, monkeypatch):
+    monkeypatch.setattr(app_db, "reports_router", ReplicaRouter(databases, max_lag_seconds=30, fallback=True, check_seconds=0))
+    assert len(journal().json()) == 1
+
+    monkeypatch.setattr(app_db, "replica_lag_seconds", lambda connection: 45.0)
+    assert len(journal().json()) == 2
+    assert app_db.reports_router.lag_seconds == 45.0
+
+    monkeypatch.setattr(app_db, "replica_lag_seconds", lambda connection: 3.0)
+    assert len(journal().json()) == 1
+
+
+def test_unreachable_replica_falls_back_or_answers_503(journal, tmp_path, monkeypatch):
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(app_db, "reports_router", ReplicaRouter(unreachable, max_lag_seconds=30, fallback=True, check_seconds=60))
+    assert len(journal().json()) == 2
+
+    monkeypatch.setattr(app_db, "reports_router", ReplicaRouter(unreachable, max_lag_seconds=30, fallback=False, check_seconds=60))
+    response = journal()
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Read replica unavailable"
@@ -0,0 +1,156 @@
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.db import Base, get_db
+from app.deps import get_current_user
+from app.simulation import Demand, Layout, Shift, SimDock, SimObject, apply_scenario, load_demand, load_layout, simulate
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+MONDAY = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def admin(db_session):
+    admin = models.User(email="sim-admin@example.com", password_hash="hash", full_name="Sim Admin", role=models.UserRole.admin)
+    db_session.add(admin)
+    db_session.commit()
+    return admin
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session, admin):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def history(db_session, admin):
+    """Docks A and B work Mondays 09:00-11:00; last Monday had bookings at A 09:00, B 09:00 and A 10:00, made in that order."""
+    obj = models.Object(name="Sim Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    docks = [models.Dock(name=name, dock_type=models.DockType.entrance, object_id=obj.id) for name in ("Dock A", "Dock B")]
+    db_session.add_all(docks)
+    db_session.commit()
+
+    slots = {}
+    for dock in docks:
+        db_session.add(models.WorkSchedule(dock_id=dock.id, day_of_week=0, work_start=time(9, 0), work_end=time(11, 0), capacity=1))
+        for start, end in ((time(9, 0), time(9, 30)), (time(9, 30), time(10, 0)), (time(10, 0), time(10, 30)), (time(10, 30), time(11, 0))):
+            slot = models.TimeSlot(dock_id=dock.id, slot_date=MONDAY, start_time=start, end_time=end, capacity=1)
+            db_session.add(slot)
+            slots[(dock.name, start)] = slot
+    db_session.commit()
+
+    for dock_name, starts in (("Dock A", (time(9, 0), time(9, 30))), ("Dock B", (time(9, 0), time(9, 30))), ("Dock A", (time(10, 0), time(10, 30)))):
+        booking = models.Booking(user_id=admin.id, vehicle_type_id=vehicle_type.id, status="confirmed", booking_type=models.BookingDirection.inbound)
+        booking.booking_slots = [models.BookingTimeSlot(time_slot_id=slots[(dock_name, start)].id) for start in starts]
+        db_session.add(booking)
+        db_session.commit()
+    return obj, docks
+
+
+def test_replay_against_scenarios(db_session, history):
+    obj, (dock_a, dock_b) = history
+    layout = load_layout(db_session, obj.id)
+    demand = load_demand(db_session, obj.id, MONDAY, MONDAY)
+    assert [(d.start_time, d.duration_minutes) for d in demand] == [(time(9, 0), 60)] * 2 + [(time(10, 0), 60)]
+
+    current = simulate(layout, demand, MONDAY, MONDAY, name="current")
+    assert (current.placed, current.rejected, current.utilization) == (3, 0, 0.75)
+
+    one_dock = apply_scenario(layout, schemas.SimulationScenario(name="one dock", remove_dock_ids=[dock_b.id]))
+    result = simulate(one_dock, demand, MONDAY, MONDAY)
+    assert (result.placed, result.rejected) == (2, 1)
+    assert [r.booking_id for r in result.rejections] == [demand[1].booking_id]
+    # Moving the second truck to 10:00 only pushes out the third one.
+    shifted = simulate(one_dock, demand, MONDAY, MONDAY, max_shift_minutes=60)
+    assert (shifted.placed, shifted.shifted, shifted.rejected) == (2, 1, 1)
+
+    longer_day = apply_scenario(layout, schemas.SimulationScenario(
+        name="one long dock",
+        remove_dock_ids=[dock_b.id],
+        schedules=[schemas.WorkScheduleCreate(dock_id=dock_a.id, day_of_week=0, work_start="09:00", work_end="12:00", capacity=1)],
+    ))
+    assert simulate(longer_day, demand, MONDAY, MONDAY, max_shift_minutes=120).placed == 3
+    # The layout itself is left as it was.
+    assert [d.id for d in layout.docks] == [dock_a.id, dock_b.id]
+    assert layout.docks[0].schedules[0].work_end == time(11, 0)
+
+
+def test_simulation_endpoint(test_client, history):
+    obj, (dock_a, dock_b) = history
+    response = test_client.post("/api/simulation/", json={
+        "object_id": obj.id,
+        "from_date": MONDAY.isoformat(),
+        "to_date": MONDAY.isoformat(),
+        "scenarios": [{"name": "replace B", "remove_dock_ids": [dock_b.id], "add_docks": [{"name": "Dock C", "copy_of": dock_a.id}]}],
+    })
+    assert response.status_code == 200, response.text
+    results = response.json()
+    assert [(r["scenario"], r["placed"], r["rejected"]) for r in results] == [("current", 3, 0), ("replace B", 3, 0)]
+    assert [(d["dock_id"], d["booked_minutes"]) for d in results[1]["docks"]] == [(-1, 60), (dock_a.id, 120)]
+
+    bad = test_client.post("/api/simulation/", json={
+        "object_id": obj.id, "from_date": MONDAY.isoformat(), "to_date": MONDAY.isoformat(), "scenarios": [{"name": "x", "remove_dock_ids": [999]}],
+    })
+    assert bad.status_code == 400
+
+
+def test_best_fit_leaves_no_stranded_gap():
+    """Dock A works 09:00-11:00, Dock B 09:00-10:00; a truck and then a two-hour trailer arrive for 09:00."""
+    docks = [
+        SimDock(id=1, name="Dock A", object_id=1, dock_type=models.DockType.entrance, schedules={0: Shift(time(9, 0), time(11, 0))}),
+        SimDock(id=2, name="Dock B", object_id=1, dock_type=models.DockType.entrance, schedules={0: Shift(time(9, 0), time(10, 0))}),
+    ]
+    layout = Layout(object=SimObject(id=1), docks=docks)
+    demand = [
+        Demand(booking_id=1, booking_date=MONDAY, start_time=time(9, 0), duration_minutes=60, direction=models.BookingDirection.inbound),
+        Demand(booking_id=2, booking_date=MONDAY, start_time=time(9, 0), duration_minutes=120, direction=models.BookingDirection.inbound),
+    ]
+
+    first_fit = simulate(layout, demand, MONDAY, MONDAY)
+    assert (first_fit.placed, first_fit.rejected) == (1, 1)
+    # Dock A 10:00-11:00 and Dock B 09:00-10:00 stay free, both shorter than the median booking.
+    assert first_fit.fragmentation.model_dump() == {"free_minutes": 120, "stranded_minutes": 120, "largest_run_minutes": 60, "ratio": 1.0}
+
+    for policy in ("best_fit", "optimized"):
+        result = simulate(layout, demand, MONDAY, MONDAY, policy=policy)
+        assert (result.policy, result.placed, result.rejected) == (policy, 2, 0)
+        assert result.fragmentation.free_minutes == 0
+
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.benchmark import BenchmarkContext
+from app.db import Base, get_db
+from app.seed_data import seed
+
+
+FROM_DATE = date(2026, 3, 2)  # Monday
+
+
+@pytest.fixture(scope="module")
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    seed(session, "tiny", seed=7, from_date=FROM_DATE)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def test_client(db_session):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+
+
+def _as_rows(payload):
+    """Rebuild the row format from the columnar one."""
+    from_date = date.fromisoformat(payload["from_date"])
+    slots, bookings, links = payload["slots"], payload["bookings"], payload["links"]
+    booking_fields = [field for field in bookings if field != "start_slot_id"]
+    rows = []
+    for i, slot_id in enumerate(slots["id"]):
+        rows.append({
+            "id": slot_id,
+            "day_of_week": (from_date + timedelta(days=slots["day"][i])).weekday(),
+            "start_time": "%02d:%02d" % divmod(slots["start_minute"][i], 60),
+            "end_time": "%02d:%02d" % divmod(slots["end_minute"][i], 60),
+            "capacity": slots["capacity"][i],
+            "dock_id": slots["dock_id"][i],
+            "occupancy": slots["occupancy"][i],
+            "status": payload["status_codes"][slots["status"][i]],
+            "bookings": [],
+        })
+    for slot, booking in zip(links["slot"], links["booking"]):
+        info = {field: bookings[field][booking] for field in booking_fields}
+        info["is_start"] = bookings["start_slot_id"][booking] == rows[slot]["id"]
+        rows[slot]["bookings"].append(info)
+    return rows
+
+
+def test_columnar_calendar_carries_the_same_data_as_rows(test_client, db_session):
+    ctx = BenchmarkContext.load(db_session)
+    params = {"from_date": FROM_DATE + timedelta(days=14), "to_date": FROM_DATE + timedelta(days=20), "object_id": ctx.object_id}
+
+    rows = test_client.get("/api/time-slots/", headers=ctx.headers, params=params)
+    columnar = test_client.get("/api/time-slots/", headers=ctx.headers, params={**params, "format": "columnar"})
+
+    assert rows.status_code == columnar.status_code == 200
+    payload = columnar.json()
+    assert any(slot["bookings"] for slot in rows.json())
+    # Bookings spanning several slots are listed once.
+    assert len(payload["bookings"]["id"]) == len(set(payload["bookings"]["id"])) < len(payload["links"]["booking"])
+    assert _as_rows(payload) == rows.json()
+    assert len(columnar.content) < len(rows.content) / 2
+
+
+def test_columnar_calendar_without_slots_and_unknown_format(test_client, db_session):
+    ctx = BenchmarkContext.load(db_session)
+    params = {"from_date": "2030-01-01", "to_date": "2030-01-07", "format": "columnar"}
+
+    payload = test_client.get("/api/time-slots/", headers=ctx.headers, params=params).json()
+    assert payload["slots"]["id"] == [] and payload["bookings"]["id"] == [] and payload["links"]["slot"] == []
+    assert test_client.get("/api/time-slots/", headers=ctx.headers, params={**params, "format": "csv"}).status_code == 422
@@ -5,7 +5,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app import models
-from app.db import Base, get_db
+from app.db import Base, get_db, get_reports_db
 from app.deps import get_current_user
 
 
@@ -67,6 +67,7 @@ def test_time_slots_journal_filters_by_weekday():
         from app.main import app
 
         app.dependency_overrides[get_db] = lambda: session
+        app.dependency_overrides[get_reports_db] = lambda: session
         app.dependency_overrides[get_current_user] = lambda: admin_user
 
         with TestClient(app) as client:
@@ -88,6 +89,7 @@ def test_time_slots_journal_filters_by_weekday():
         from app.main import app
 
         app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_reports_db, None)
         app.dependency_overrides.pop(get_current_user, None)
         session.close()
         transaction.rollback()
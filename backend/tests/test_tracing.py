@@ -0,0 +1,123 @@
+import logging
+from datetime import date, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+BOOKING_DATE = date(2026, 3, 2)
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def users(db_session):
+    admin = models.User(email="trace-admin@example.com", password_hash="hash", full_name="Trace Admin", role=models.UserRole.admin)
+    carrier = models.User(email="trace-carrier@example.com", password_hash="hash", full_name="Trace Carrier", role=models.UserRole.carrier)
+    db_session.add_all([admin, carrier])
+    db_session.commit()
+    return {"admin": admin, "carrier": carrier}
+
+
+@pytest.fixture(scope="function")
+def client_as(db_session, users):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    current = {"user": users["admin"]}
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+
+    def use(role):
+        current["user"] = users[role]
+        return client
+
+    with TestClient(app) as client:
+        yield use
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture(scope="function")
+def dock_slots(db_session):
+    obj = models.Object(name="Trace Object", object_type=models.ObjectType.warehouse)
+    vehicle_type = models.VehicleType(name="Truck", duration_minutes=60)
+    db_session.add_all([obj, vehicle_type])
+    db_session.commit()
+    dock = models.Dock(name="Dock A", dock_type=models.DockType.universal, object_id=obj.id)
+    db_session.add(dock)
+    db_session.commit()
+    db_session.add_all([
+        models.TimeSlot(dock_id=dock.id, slot_date=BOOKING_DATE, start_time=start, end_time=end, capacity=1)
+        for start, end in ((time(9, 0), time(9, 30)), (time(9, 30), time(10, 0)), (time(10, 0), time(10, 30)), (time(10, 30), time(11, 0)))
+    ])
+    db_session.commit()
+    return obj, vehicle_type, dock
+
+
+def book(client, obj, vehicle_type, start_time, headers=None):
+    return client.post("/api/bookings/", headers=headers, json={
+        "vehicle_type_id": vehicle_type.id,
+        "booking_date": BOOKING_DATE.isoformat(),
+        "start_time": start_time,
+        "object_id": obj.id,
+        "vehicle_plate": "A001AA",
+        "driver_full_name": "Driver",
+        "driver_phone": "70000000000",
+    })
+
+
+def test_trace_is_silent_by_default_and_captured_for_admins(client_as, dock_slots, caplog):
+    obj, vehicle_type, dock = dock_slots
+    caplog.set_level(logging.INFO)
+
+    plain = book(client_as("admin"), obj, vehicle_type, "09:00", headers={"X-Request-ID": "req-1"})
+    assert plain.status_code == 200
+    assert plain.headers["X-Trace-Id"] == "req-1"
+    assert "X-Trace-Captured" not in plain.headers
+    assert not [r for r in caplog.records if r.name == "yms.trace"]
+
+    # Only admins get a trace captured.
+    carrier = book(client_as("carrier"), obj, vehicle_type, "10:00", headers={"X-Debug-Trace": "1"})
+    assert "X-Trace-Captured" not in carrier.headers
+
+    traced = book(client_as("admin"), obj, vehicle_type, "09:00", headers={"X-Debug-Trace": "1"})
+    assert traced.status_code == 409
+    assert traced.headers["X-Trace-Captured"] == "1"
+    trace_id = traced.headers["X-Trace-Id"]
+
+    events = client_as("admin").get(f"/api/_debug/traces/{trace_id}").json()["events"]
+    assert [e["event"] for e in events] == ["create_booking.start", "allocation.request", "allocation.search", "allocation.no_free_slots"]
+    assert {e["trace_id"] for e in events} == {trace_id}
+    assert events[0]["booking"]["start_time"] == "09:00"
+    assert events[2]["dock_ids"] == [dock.id] and events[2]["slot_ids"] is None
+    assert len([r for r in caplog.records if r.name == "yms.trace"]) == 4
+
+    assert client_as("carrier").get(f"/api/_debug/traces/{trace_id}").status_code == 403
+    assert client_as("admin").get("/api/_debug/traces/unknown").status_code == 404
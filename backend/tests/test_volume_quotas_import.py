@@ -0,0 +1,182 @@
+from datetime import date
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base, get_db
+from app.deps import get_current_user
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+
+
+@pytest.fixture(scope="module")
+def db_engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="function")
+def test_client(db_session):
+    import app.db as app_db
+    app_db.engine = db_session.get_bind()
+
+    from app.main import app
+
+    admin = models.User(email="quota-admin@example.com", password_hash="hash", full_name="Quota Admin", role=models.UserRole.admin)
+    db_session.add(admin)
+    db_session.commit()
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_current_user)
+
+
+def build_quota_workbook(quota_rows, override_rows=()):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Quotas"
+    ws.append(["object", "direction", "year", "month", "day_of_week", "transport_types", "volume", "allow_overbooking"])
+    for row in quota_rows:
+        ws.append(list(row))
+    ws_ov = wb.create_sheet("Overrides")
+    ws_ov.append(["object", "direction", "date", "transport_types", "volume"])
+    for row in override_rows:
+        ws_ov.append(list(row))
+    buf = BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def post_workbook(client, buf):
+    return client.post(
+        "/api/volume-quotas/import",
+        files={"file": ("quotas.xlsx", buf, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+
+
+def test_import_creates_updates_and_upserts_overrides(test_client, db_session):
+    obj = models.Object(name="Quota Object", object_type=models.ObjectType.warehouse)
+    purchased = models.TransportTypeRef(name="Purchased", enum_value=models.TransportType.purchased)
+    container = models.TransportTypeRef(name="Container", enum_value=models.TransportType.container)
+    db_session.add_all([obj, purchased, container])
+    db_session.commit()
+
+    # 2026-01-05 is a Monday.
+    existing = models.VolumeQuota(
+        object_id=obj.id,
+        direction=models.BookingDirection.inbound,
+        year=2026,
+        month=1,
+        day_of_week=0,
+        volume=100,
+        allow_overbooking=True,
+    )
+    existing.transport_types = [purchased]
+    existing.overrides = [
+        models.VolumeQuotaOverride(override_date=date(2026, 1, 5), volume=50),
+        models.VolumeQuotaOverride(override_date=date(2026, 1, 12), volume=60),
+    ]
+    db_session.add(existing)
+    db_session.commit()
+    existing_id = existing.id
+
+    buf = build_quota_workbook(
+        [
+            ["Quota Object", "in", 2026, 1, 1, "Purchased", 250, False],
+            ["Quota Object", "in", 2026, 1, 2, "Purchased, Container", 80, True],
+            ["Quota Object", "in", 2026, 1, 2, "Container", 10, True],
+            ["Missing Object", "in", 2026, 1, 3, "Purchased", 10, True],
+        ],
+        [
+            ["Quota Object", "in", "2026-01-12", "Purchased", 70],
+            ["Quota Object", "in", "2026-01-06", "Purchased, Container", 40],
+            ["Quota Object", "in", "2026-01-06", "Purchased, Container", 45],
+        ],
+    )
+    response = post_workbook(test_client, buf)
+    assert response.status_code == 200
+    payload = response.json()
+
+    assert payload["created"] == 1
+    assert payload["updated"] == 1
+    assert [(e["sheet"], e["row_number"]) for e in payload["errors"]] == [
+        ("Quotas", 4),
+        ("Quotas", 5),
+        ("Overrides", 4),
+    ]
+    assert "total_ms" in payload["timings"]
+
+    db_session.expire_all()
+    updated = db_session.query(models.VolumeQuota).filter(models.VolumeQuota.id == existing_id).one()
+    assert updated.volume == 250
+    assert updated.allow_overbooking is False
+    # File overrides replace the stored ones for quotas listed on the Quotas sheet.
+    assert {(ov.override_date, ov.volume) for ov in updated.overrides} == {(date(2026, 1, 12), 70)}
+
+    created = db_session.query(models.VolumeQuota).filter(models.VolumeQuota.day_of_week == 1).one()
+    assert set(created.transport_type_ids) == {purchased.id, container.id}
+    assert {(ov.override_date, ov.volume) for ov in created.overrides} == {(date(2026, 1, 6), 40)}
+
+
+def test_import_overrides_only_keeps_other_dates_and_reports_conflicts(test_client, db_session):
+    obj = models.Object(name="Override Object", object_type=models.ObjectType.warehouse)
+    purchased = models.TransportTypeRef(name="Purchased", enum_value=models.TransportType.purchased)
+    container = models.TransportTypeRef(name="Container", enum_value=models.TransportType.container)
+    db_session.add_all([obj, purchased, container])
+    db_session.commit()
+
+    quota = models.VolumeQuota(
+        object_id=obj.id,
+        direction=models.BookingDirection.outbound,
+        year=2026,
+        month=2,
+        day_of_week=0,
+        volume=100,
+    )
+    quota.transport_types = [purchased, container]
+    quota.overrides = [models.VolumeQuotaOverride(override_date=date(2026, 2, 2), volume=20)]
+    db_session.add(quota)
+    db_session.commit()
+
+    buf = build_quota_workbook(
+        [["Override Object", "out", 2026, 2, 1, "Container", 30, True]],
+        [["Override Object", "out", "2026-02-09", "Container, Purchased", 35]],
+    )
+    response = post_workbook(test_client, buf)
+    assert response.status_code == 200
+    payload = response.json()
+
+    assert payload["created"] == 0
+    assert payload["updated"] == 1
+    assert len(payload["errors"]) == 1
+    assert f"#{quota.id}" in payload["errors"][0]["message"]
+
+    db_session.expire_all()
+    stored = db_session.query(models.VolumeQuota).filter(models.VolumeQuota.id == quota.id).one()
+    assert {(ov.override_date, ov.volume) for ov in stored.overrides} == {
+        (date(2026, 2, 2), 20),
+        (date(2026, 2, 9), 35),
+    }